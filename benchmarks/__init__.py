@@ -0,0 +1,8 @@
+"""
+Benchmarks del bot
+Generan datasets sintéticos de stats y miden cómo escalan las partes
+críticas (agregadores, filtros, embeds, wrapped, persistencia).
+
+Uso:
+    python -m benchmarks.stats_pipeline --users 1000 10000 --output benchmarks/results/run.json
+"""
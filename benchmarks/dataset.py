@@ -0,0 +1,176 @@
+"""
+Datasets sintéticos con la misma forma que stats.json
+(ver core/stats_mutations.py: ensure_user / _ensure_game y core/party_session.py)
+
+Son deterministas para una misma semilla, así dos corridas miden lo mismo.
+"""
+
+import random
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+GAMES = [
+    'League of Legends', 'Valorant', 'Counter-Strike 2', 'Dota 2', 'Fortnite',
+    'Minecraft', 'Rocket League', 'Apex Legends', 'Overwatch 2', 'Rust',
+    'Among Us', 'Phasmophobia', 'Lethal Company', 'Helldivers 2', 'Elden Ring',
+    'Baldur\'s Gate 3', 'Terraria', 'Stardew Valley', 'GTA V', 'Dead by Daylight',
+    'Call of Duty', 'Rainbow Six Siege', 'Palworld', 'Deep Rock Galactic',
+    'Sea of Thieves', 'Path of Exile', 'Hearthstone', 'Genshin Impact',
+    'World of Warcraft', 'The Finals',
+]
+
+EMOJIS = ['😂', '👍', '🔥', '❤️', '😭', '🎮', '💀', '👀']
+STICKERS = ['gg', 'pog', 'sadge', 'hype']
+
+
+def _iso(day: str, hour: int = 20) -> str:
+    return f'{day}T{hour:02d}:00:00'
+
+
+def _daily(rng: random.Random, dates: List[str], active_days: int, low: int, high: int) -> Dict[str, int]:
+    return {dates[i]: rng.randint(low, high) for i in sorted(rng.sample(range(len(dates)), active_days))}
+
+
+def generate_user(rng: random.Random, index: int, dates: List[str], games_per_user: int,
+                  active_ratio: float) -> Dict:
+    """
+    Genera un usuario con juegos, voz, mensajes y conexiones.
+
+    Args:
+        rng: Generador aleatorio (con semilla)
+        index: Número de usuario (define id y username)
+        dates: Días disponibles ('YYYY-MM-DD', del más reciente al más viejo)
+        games_per_user: Juegos distintos por usuario
+        active_ratio: Fracción de días con actividad por juego
+
+    Returns:
+        Dict con la estructura de stats['users'][user_id]
+    """
+    active_days = max(1, int(len(dates) * active_ratio))
+    games = {}
+    for game_name in rng.sample(GAMES, min(games_per_user, len(GAMES))):
+        daily_minutes = _daily(rng, dates, active_days, 10, 240)
+        daily_counts = {day: rng.randint(1, 4) for day in daily_minutes}
+        days = sorted(daily_minutes)
+        games[game_name] = {
+            'count': sum(daily_counts.values()),
+            'first_played': _iso(days[0]),
+            'last_played': _iso(days[-1], 23),
+            'total_minutes': sum(daily_minutes.values()),
+            'daily_minutes': daily_minutes,
+            'daily_counts': daily_counts,
+            'current_session': None,
+        }
+
+    voice_minutes = _daily(rng, dates, active_days, 5, 300)
+    voice_counts = {day: rng.randint(1, 5) for day in voice_minutes}
+    connections = {day: rng.randint(1, 6) for day in voice_minutes}
+    record_day = max(connections, key=connections.get)
+    message_count = rng.randint(0, 20000)
+    by_emoji = {emoji: rng.randint(1, 500) for emoji in rng.sample(EMOJIS, 3)}
+    by_sticker = {name: rng.randint(1, 50) for name in rng.sample(STICKERS, 2)}
+
+    return {
+        'username': f'user{index}',
+        'games': games,
+        'voice': {
+            'count': sum(voice_counts.values()),
+            'last_join': _iso(max(voice_minutes)),
+            'total_minutes': sum(voice_minutes.values()),
+            'daily_minutes': voice_minutes,
+            'daily_counts': voice_counts,
+            'current_session': None,
+        },
+        'messages': {
+            'count': message_count,
+            'characters': message_count * rng.randint(15, 60),
+            'last_message': _iso(dates[0]),
+        },
+        'reactions': {'total': sum(by_emoji.values()), 'by_emoji': by_emoji},
+        'stickers': {'total': sum(by_sticker.values()), 'by_name': by_sticker},
+        'daily_connections': {
+            'total': sum(connections.values()),
+            'by_date': connections,
+            'personal_record': {'count': connections[record_day], 'date': record_day},
+        },
+    }
+
+
+def generate_party_history(rng: random.Random, user_ids: List[str], usernames: Dict[str, str],
+                           entries: int, end: datetime, days: int, guild_id: int = 1) -> Dict:
+    """
+    Genera stats['parties'] con `entries` parties en el historial (más reciente primero).
+
+    Returns:
+        Dict con la estructura de stats['parties']
+    """
+    history = []
+    stats_by_game: Dict[str, Dict] = {}
+    for _ in range(entries):
+        game = rng.choice(GAMES)
+        players = rng.sample(user_ids, min(len(user_ids), rng.randint(2, 5)))
+        start = end - timedelta(days=rng.uniform(0, days))
+        duration = rng.randint(15, 240)
+        history.append({
+            'game': game,
+            'start': start.isoformat(),
+            'end': (start + timedelta(minutes=duration)).isoformat(),
+            'duration_minutes': duration,
+            'players': players,
+            'player_names': [usernames[uid] for uid in players],
+            'max_players': len(players),
+            'guild_id': guild_id,
+        })
+
+        game_stats = stats_by_game.setdefault(game, {
+            'total_parties': 0,
+            'total_duration_minutes': 0,
+            'max_players_ever': 0,
+            'total_unique_players': [],
+        })
+        game_stats['total_parties'] += 1
+        game_stats['total_duration_minutes'] += duration
+        game_stats['max_players_ever'] = max(game_stats['max_players_ever'], len(players))
+        game_stats['total_unique_players'] = sorted(set(game_stats['total_unique_players']) | set(players))
+
+    history.sort(key=lambda party: party['start'], reverse=True)
+    return {
+        'active': {},
+        'active_by_guild': {},
+        'history': history,
+        'stats_by_game': stats_by_game,
+    }
+
+
+def generate_stats(users: int, days: int = 365, games_per_user: int = 3, active_ratio: float = 0.2,
+                   party_history: int = 1000, seed: int = 1234, end: Optional[datetime] = None) -> Dict:
+    """
+    Genera un dataset completo de stats.
+
+    Args:
+        users: Cantidad de usuarios
+        days: Días de historia (daily_minutes / by_date hacia atrás desde `end`)
+        games_per_user: Juegos distintos por usuario
+        active_ratio: Fracción de días con actividad (controla el tamaño de los históricos)
+        party_history: Entradas del historial de parties (el bot guarda hasta 1000)
+        seed: Semilla del generador
+        end: Último día con datos (default: hoy, así los períodos en curso tienen actividad)
+
+    Returns:
+        Dict con la forma de stats.json
+    """
+    rng = random.Random(seed)
+    end = end or datetime.now()
+    dates = [(end - timedelta(days=offset)).strftime('%Y-%m-%d') for offset in range(days)]
+
+    users_data = {}
+    for index in range(users):
+        users_data[str(100000000000000000 + index)] = generate_user(rng, index, dates, games_per_user, active_ratio)
+
+    user_ids = list(users_data)
+    usernames = {uid: data['username'] for uid, data in users_data.items()}
+    return {
+        'users': users_data,
+        'cooldowns': {},
+        'parties': generate_party_history(rng, user_ids, usernames, party_history, end, days),
+    }
@@ -0,0 +1,503 @@
+#!/usr/bin/env python3
+"""
+Generador de carga del gateway (simulado)
+
+Maneja los listeners reales de cogs.events.EventsCog (on_presence_update,
+on_voice_state_update, on_message) con miembros, actividades y estados de voz
+falsos a tasas configurables, como lo haría discord.py: cada evento se
+despacha en su propia task.
+
+Reporta:
+- Latencia por handler (p50/p90/p99/máx)
+- Lag del event loop (muestreado)
+- Escrituras a disco por segundo (snapshots de stats.json, líneas del journal
+  y pending_notifications.json)
+- Mensajes enviados al canal de notificaciones (canal falso que los registra)
+
+Lo que escribe la simulación va a un directorio temporal (stats, journal,
+notificaciones pendientes); cooldowns.json no se escribe. Pensado para correr
+en su propio proceso.
+
+Uso:
+    python -m benchmarks.gateway_load --members 5000 --presence-rate 500 --duration 30
+"""
+
+import argparse
+import asyncio
+import contextlib
+import logging
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+import discord
+
+from benchmarks.dataset import GAMES
+from benchmarks.harness import build_report, percentile, write_report
+from core.stats_repository import JsonStatsRepository
+
+DEFAULT_OUTPUT_DIR = Path(__file__).resolve().parent / 'results'
+NOTIFICATION_CHANNEL_ID = 900000000000000001
+
+
+# ==================== OBJETOS FALSOS DE DISCORD ====================
+
+class FakeMessage:
+    """Mensaje enviado por el bot (se puede editar y borrar)"""
+
+    def __init__(self, channel: 'RecordingChannel', message_id: int, content: str):
+        self.channel = channel
+        self.id = message_id
+        self.content = content
+
+    async def edit(self, content=None, **kwargs):
+        self.channel.edits += 1
+        self.content = content
+
+    async def delete(self):
+        self.channel.deletes += 1
+
+
+class RecordingChannel:
+    """Canal de texto que registra lo que el bot envía"""
+
+    def __init__(self, channel_id: int, name: str = 'notificaciones'):
+        self.id = channel_id
+        self.name = name
+        self.sent: List[str] = []
+        self.edits = 0
+        self.deletes = 0
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append(content)
+        return FakeMessage(self, len(self.sent), content)
+
+
+class FakeVoiceChannel:
+    def __init__(self, channel_id: int, name: str, guild: 'FakeGuild'):
+        self.id = channel_id
+        self.name = name
+        self.guild = guild
+        self.members: List['FakeMember'] = []
+
+
+class FakeMember:
+    """Miembro con presencia y estado de voz mutables (el `after` de los eventos)"""
+
+    def __init__(self, member_id: int, display_name: str, guild: 'FakeGuild'):
+        self.id = member_id
+        self.name = display_name
+        self.display_name = display_name
+        self.guild = guild
+        self.bot = False
+        self.status = discord.Status.offline
+        self.activities: tuple = ()
+        self.voice: Optional[SimpleNamespace] = None
+
+    def snapshot(self) -> SimpleNamespace:
+        """Copia del estado actual (el `before` de los eventos)"""
+        return SimpleNamespace(id=self.id, name=self.name, display_name=self.display_name, guild=self.guild,
+                               bot=self.bot, status=self.status, activities=self.activities, voice=self.voice)
+
+
+class FakeGuild:
+    def __init__(self, guild_id: int, name: str):
+        self.id = guild_id
+        self.name = name
+        self.members: List[FakeMember] = []
+        self.voice_channels: List[FakeVoiceChannel] = []
+        self._by_id: Dict[int, FakeMember] = {}
+
+    def add_member(self, member: FakeMember):
+        self.members.append(member)
+        self._by_id[member.id] = member
+
+    def get_member(self, member_id: int) -> Optional[FakeMember]:
+        return self._by_id.get(member_id)
+
+
+class FakeBot:
+    def __init__(self, guilds: List[FakeGuild], channel: RecordingChannel):
+        self.user = SimpleNamespace(id=1, name='dsbot', bot=True)
+        self.guilds = guilds
+        self.notification_channel = channel
+        self._guilds = {guild.id: guild for guild in guilds}
+
+    def get_guild(self, guild_id: int) -> Optional[FakeGuild]:
+        return self._guilds.get(guild_id)
+
+    def get_channel(self, channel_id: int):
+        return self.notification_channel
+
+
+def _game_activity(name: str) -> discord.Activity:
+    # application_id estable por juego: pasa el filtro de actividades verificadas
+    return discord.Activity(name=name, type=discord.ActivityType.playing,
+                            application_id=str(1000 + GAMES.index(name)))
+
+
+def build_world(guilds: int, members: int, voice_channels: int, rng: random.Random) -> List[FakeGuild]:
+    """Servidores con `members` miembros repartidos y algunos ya jugando/online"""
+    world = []
+    for g in range(guilds):
+        guild = FakeGuild(10 + g, f'Servidor {g}')
+        guild.voice_channels = [FakeVoiceChannel(5000 + g * 100 + c, f'voz-{c}', guild) for c in range(voice_channels)]
+        world.append(guild)
+
+    for index in range(members):
+        guild = world[index % guilds]
+        member = FakeMember(200000000000000000 + index, f'user{index}', guild)
+        if rng.random() < 0.6:
+            member.status = discord.Status.online
+            if rng.random() < 0.3:
+                member.activities = (_game_activity(rng.choice(GAMES[:10])),)
+        guild.add_member(member)
+    return world
+
+
+# ==================== MEDICIÓN ====================
+
+class CountingJsonRepository(JsonStatsRepository):
+    """Repositorio JSON que cuenta snapshots escritos y bytes"""
+
+    def __init__(self, path):
+        super().__init__(path, backup_generations=0)
+        self.snapshot_writes = 0
+        self.bytes_written = 0
+
+    def save_snapshot(self, stats: Dict):
+        super().save_snapshot(stats)
+        self.snapshot_writes += 1
+        self.bytes_written += self.path.stat().st_size
+
+
+class LoopLagSampler:
+    """Mide cuánto se atrasa un sleep corto: el tiempo que el loop estuvo bloqueado"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - start - self.interval))
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+
+
+@contextlib.contextmanager
+def isolated_runtime(data_dir: Path):
+    """
+    Persistencia en `data_dir` y stats vacías en memoria (en el mismo dict,
+    porque los módulos lo importan por nombre). Restaura todo al salir.
+    """
+    from core import pending_notifications, persistence
+    from core.cooldown import get_cooldown_store
+
+    cooldowns = get_cooldown_store()
+    saved_stats = dict(persistence.stats)
+    saved = (persistence._repository, persistence.STATS_JOURNAL_FILE, cooldowns.path,
+             pending_notifications.PENDING_NOTIFICATIONS_FILE, pending_notifications._pending_notifications,
+             persistence.config.get('channel_id'))
+    repository = CountingJsonRepository(data_dir / 'stats.json')
+
+    persistence._repository = repository
+    persistence.STATS_JOURNAL_FILE = data_dir / 'stats.journal'
+    cooldowns.path = None
+    pending_notifications.PENDING_NOTIFICATIONS_FILE = str(data_dir / 'pending_notifications.json')
+    pending_notifications._pending_notifications = {'voice': {}}
+    if persistence.get_channel_id() is None:
+        persistence.config['channel_id'] = NOTIFICATION_CHANNEL_ID
+    persistence.stats.clear()
+    persistence.stats.update({'users': {}, 'cooldowns': {}})
+    _invalidate_views(persistence)
+    try:
+        yield repository
+    finally:
+        persistence.stats.clear()
+        persistence.stats.update(saved_stats)
+        _invalidate_views(persistence)
+        (persistence._repository, persistence.STATS_JOURNAL_FILE, cooldowns.path,
+         pending_notifications.PENDING_NOTIFICATIONS_FILE, pending_notifications._pending_notifications,
+         channel_id) = saved
+        if channel_id is None:
+            persistence.config.pop('channel_id', None)
+
+
+def _invalidate_views(persistence):
+    persistence._snapshots.mark_root_dirty()
+    persistence.get_rollups().invalidate()
+    persistence.get_leaderboards().invalidate()
+
+
+def _cancel_session_timers(cog):
+    managers = [cog.game_manager, *cog.voice_managers, *cog.party_managers]
+    for manager in managers:
+        for session in list(manager.active_sessions.values()):
+            for timer in (session.verification_task, session.grace_timer, getattr(session, 'live_edit_timer', None)):
+                if timer is not None:
+                    timer.cancel()
+
+
+# ==================== SIMULADOR ====================
+
+class GatewaySimulator:
+    """Genera eventos de presencia, voz y mensajes contra EventsCog"""
+
+    def __init__(self, guilds: int = 1, members: int = 5000, voice_channels: int = 8,
+                 presence_rate: float = 500, voice_rate: float = 20, message_rate: float = 50,
+                 duration: float = 10, seed: int = 1234):
+        self.rng = random.Random(seed)
+        self.duration = duration
+        self.rates = {'presence': presence_rate, 'voice': voice_rate, 'message': message_rate}
+        self.world = build_world(guilds, members, voice_channels, self.rng)
+        self.members = [m for guild in self.world for m in guild.members]
+        self.channel = RecordingChannel(NOTIFICATION_CHANNEL_ID)
+        self.bot = FakeBot(self.world, self.channel)
+        self.latencies: Dict[str, List[float]] = {kind: [] for kind in self.rates}
+        self.errors: Dict[str, int] = {kind: 0 for kind in self.rates}
+        self.dispatched: Dict[str, int] = {kind: 0 for kind in self.rates}
+        self.cog = None
+
+    # ---------- Eventos ----------
+
+    def _presence_event(self):
+        member = self.rng.choice(self.members)
+        before = member.snapshot()
+        roll = self.rng.random()
+        if member.status == discord.Status.offline or roll < 0.05:
+            member.status = discord.Status.offline if member.status != discord.Status.offline else discord.Status.online
+            if member.status == discord.Status.offline:
+                member.activities = ()
+        elif roll < 0.55:
+            # Pocos juegos populares: se forman parties
+            member.activities = (_game_activity(self.rng.choice(GAMES[:10])),)
+        else:
+            member.activities = ()
+        return self.cog.on_presence_update(before, member)
+
+    def _voice_event(self):
+        member = self.rng.choice(self.members)
+        before = member.voice or SimpleNamespace(channel=None)
+        channels = member.guild.voice_channels
+        if member.voice is None:
+            member.voice = SimpleNamespace(channel=self.rng.choice(channels))
+        elif self.rng.random() < 0.6:
+            member.voice = None
+        else:
+            member.voice = SimpleNamespace(channel=self.rng.choice(channels))
+        after = member.voice or SimpleNamespace(channel=None)
+        return self.cog.on_voice_state_update(member, before, after)
+
+    def _message_event(self):
+        member = self.rng.choice(self.members)
+        content = 'a' * self.rng.randint(1, 200)
+        message = SimpleNamespace(author=member, content=content, stickers=[], guild=member.guild)
+        return self.cog.on_message(message)
+
+    async def _timed(self, kind: str, coro):
+        start = time.perf_counter()
+        try:
+            await coro
+        except Exception:
+            self.errors[kind] += 1
+        self.latencies[kind].append(time.perf_counter() - start)
+
+    # ---------- Corrida ----------
+
+    async def run(self) -> Dict:
+        """
+        Corre la simulación completa.
+
+        Returns:
+            Métricas de la corrida (ver summarize)
+        """
+        from cogs.events import EventsCog
+        from core import pending_notifications, persistence
+        from core.notification_queue import get_dispatcher
+
+        with tempfile.TemporaryDirectory() as tmp, isolated_runtime(Path(tmp)) as repository:
+            self.cog = EventsCog(self.bot)
+            for guild in self.world:
+                self.cog.presence.rebuild_guild(guild)
+
+            persistence.start_write_behind()
+            journal = persistence._journal
+            journal_appends = [0]
+            if journal is not None:
+                append = journal.append
+
+                def counting_append(*args, **kwargs):
+                    journal_appends[0] += 1
+                    return append(*args, **kwargs)
+
+                journal.append = counting_append
+
+            pending_writes = [0]
+            save_pending = pending_notifications._save_pending
+
+            def counting_save_pending():
+                pending_writes[0] += 1
+                save_pending()
+
+            pending_notifications._save_pending = counting_save_pending
+
+            sampler = LoopLagSampler()
+            sampler.start()
+            elapsed = await self._drive()
+            writes_during_run = repository.snapshot_writes
+            bytes_during_run = repository.bytes_written
+
+            _cancel_session_timers(self.cog)
+            await sampler.stop()
+            await persistence.stop_write_behind()
+            get_dispatcher().stop()
+            pending_notifications._save_pending = save_pending
+
+            return self.summarize(elapsed, sampler.samples, {
+                'snapshot_writes': writes_during_run,
+                'snapshot_bytes': bytes_during_run,
+                'journal_appends': journal_appends[0],
+                'pending_notification_writes': pending_writes[0],
+                'final_flush_writes': repository.snapshot_writes - writes_during_run,
+            })
+
+    async def _drive(self) -> float:
+        """Despacha eventos al ritmo configurado durante `duration` segundos"""
+        kinds = [kind for kind, rate in self.rates.items() if rate > 0]
+        weights = [self.rates[kind] for kind in kinds]
+        total_rate = sum(weights)
+        makers = {'presence': self._presence_event, 'voice': self._voice_event, 'message': self._message_event}
+        loop = asyncio.get_running_loop()
+        pending = set()
+
+        start = time.perf_counter()
+        index = 0
+        while total_rate:
+            target = start + index / total_rate
+            if target - start >= self.duration:
+                break
+            delay = target - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            kind = self.rng.choices(kinds, weights)[0]
+            task = loop.create_task(self._timed(kind, makers[kind]()))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+            self.dispatched[kind] += 1
+            index += 1
+
+        if pending:
+            await asyncio.gather(*pending)
+        return time.perf_counter() - start
+
+    def summarize(self, elapsed: float, lag_samples: List[float], disk: Dict) -> Dict:
+        """Métricas de la corrida"""
+        handlers = {}
+        for kind, samples in self.latencies.items():
+            if not samples:
+                continue
+            ms = [s * 1000 for s in samples]
+            handlers[kind] = {
+                'events': len(samples),
+                'rate_per_s': round(len(samples) / elapsed, 1),
+                'errors': self.errors[kind],
+                'p50_ms': round(percentile(ms, 50), 3),
+                'p90_ms': round(percentile(ms, 90), 3),
+                'p99_ms': round(percentile(ms, 99), 3),
+                'max_ms': round(max(ms), 3),
+            }
+        lag_ms = [s * 1000 for s in lag_samples] or [0.0]
+        return {
+            'elapsed_s': round(elapsed, 3),
+            'handlers': handlers,
+            'loop_lag': {
+                'samples': len(lag_samples),
+                'p50_ms': round(percentile(lag_ms, 50), 3),
+                'p99_ms': round(percentile(lag_ms, 99), 3),
+                'max_ms': round(max(lag_ms), 3),
+            },
+            'disk': {
+                **disk,
+                'snapshot_writes_per_s': round(disk['snapshot_writes'] / elapsed, 3),
+                'journal_appends_per_s': round(disk['journal_appends'] / elapsed, 1),
+                'pending_notification_writes_per_s': round(disk['pending_notification_writes'] / elapsed, 1),
+            },
+            'notifications': {
+                'sent': len(self.channel.sent),
+                'edits': self.channel.edits,
+                'deletes': self.channel.deletes,
+            },
+        }
+
+
+def format_summary(summary: Dict) -> str:
+    lines = [f'{"handler":<12} {"eventos":>8} {"ev/s":>8} {"p50 ms":>9} {"p90 ms":>9} {"p99 ms":>9} {"máx ms":>9}']
+    for kind, h in summary['handlers'].items():
+        lines.append(f'{kind:<12} {h["events"]:>8} {h["rate_per_s"]:>8} {h["p50_ms"]:>9.3f} '
+                     f'{h["p90_ms"]:>9.3f} {h["p99_ms"]:>9.3f} {h["max_ms"]:>9.3f}')
+    lag = summary['loop_lag']
+    disk = summary['disk']
+    notes = summary['notifications']
+    lines.append(f'\n⏱️ Lag del loop: p50 {lag["p50_ms"]} ms | p99 {lag["p99_ms"]} ms | máx {lag["max_ms"]} ms')
+    lines.append(f'💾 Disco: {disk["snapshot_writes"]} snapshots ({disk["snapshot_writes_per_s"]}/s), '
+                 f'{disk["journal_appends"]} líneas de journal ({disk["journal_appends_per_s"]}/s), '
+                 f'{disk["pending_notification_writes"]} pending_notifications.json '
+                 f'({disk["pending_notification_writes_per_s"]}/s)')
+    lines.append(f'📨 Notificaciones: {notes["sent"]} enviadas, {notes["edits"]} editadas, {notes["deletes"]} borradas')
+    return '\n'.join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Carga simulada del gateway contra EventsCog')
+    parser.add_argument('--guilds', type=int, default=1)
+    parser.add_argument('--members', type=int, default=5000)
+    parser.add_argument('--voice-channels', type=int, default=8, help='Canales de voz por servidor')
+    parser.add_argument('--presence-rate', type=float, default=500, help='Presence updates por segundo')
+    parser.add_argument('--voice-rate', type=float, default=20, help='Voice state updates por segundo')
+    parser.add_argument('--message-rate', type=float, default=50, help='Mensajes por segundo')
+    parser.add_argument('--duration', type=float, default=30, help='Segundos de carga')
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--log-level', default='WARNING', help='Nivel del logger dsbot durante la corrida')
+    parser.add_argument('--output', type=Path, default=None,
+                        help='Archivo JSON de resultados (default: benchmarks/results/gateway_load-<fecha>.json)')
+    args = parser.parse_args(argv)
+
+    logging.getLogger('dsbot').setLevel(args.log_level.upper())
+
+    simulator = GatewaySimulator(
+        guilds=args.guilds, members=args.members, voice_channels=args.voice_channels,
+        presence_rate=args.presence_rate, voice_rate=args.voice_rate, message_rate=args.message_rate,
+        duration=args.duration, seed=args.seed,
+    )
+    print(f'🚦 Simulando {args.duration:g}s: {args.members} miembros en {args.guilds} servidor(es), '
+          f'{args.presence_rate:g} presence/s, {args.voice_rate:g} voice/s, {args.message_rate:g} mensajes/s')
+    summary = asyncio.run(simulator.run())
+
+    params = {key: value for key, value in vars(args).items() if key not in ('output', 'log_level')}
+    report = build_report('gateway_load', params, [summary])
+    output = args.output or DEFAULT_OUTPUT_DIR / f'gateway_load-{time.strftime("%Y%m%d-%H%M%S")}.json'
+    write_report(output, report)
+
+    print()
+    print(format_summary(summary))
+    print(f'\n💾 Resultados: {output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+Utilidades comunes de los benchmarks: medición, resultados en JSON y
+comparación contra una corrida anterior (para ver regresiones en el tiempo).
+"""
+
+import gc
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+RESULTS_VERSION = 1
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Percentil por interpolación lineal (pct en 0-100)"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize_ms(samples: List[float]) -> Dict[str, float]:
+    """Resumen de muestras en segundos, expresado en milisegundos"""
+    ms = [s * 1000 for s in samples]
+    return {
+        'min_ms': round(min(ms), 4),
+        'median_ms': round(statistics.median(ms), 4),
+        'mean_ms': round(statistics.fmean(ms), 4),
+        'p95_ms': round(percentile(ms, 95), 4),
+        'max_ms': round(max(ms), 4),
+    }
+
+
+def time_call(func: Callable[[], object], repeat: int = 5, warmup: int = 1) -> List[float]:
+    """
+    Mide `func()` varias veces.
+
+    El GC se desactiva durante cada llamada para que una colección disparada
+    por la preparación no se cargue a la función medida.
+
+    Returns:
+        Duraciones en segundos (una por repetición)
+    """
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            func()
+            samples.append(time.perf_counter() - start)
+        finally:
+            gc.enable()
+    return samples
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                timeout=5, cwd=Path(__file__).resolve().parent)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def build_report(suite: str, params: Dict, results: List[Dict]) -> Dict:
+    """Documento de resultados con metadatos del entorno"""
+    return {
+        'version': RESULTS_VERSION,
+        'suite': suite,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'params': params,
+        'results': results,
+    }
+
+
+def write_report(path, report: Dict):
+    """Escribe el reporte JSON (crea el directorio si hace falta)"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+def load_report(path) -> Dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _result_key(result: Dict) -> tuple:
+    return (result['name'], result.get('users'))
+
+
+def compare_reports(baseline: Dict, current: Dict, threshold: float = 1.2) -> List[Dict]:
+    """
+    Compara medianas contra una corrida anterior.
+
+    Args:
+        baseline: Reporte anterior
+        current: Reporte actual
+        threshold: Cociente actual/anterior a partir del cual se marca regresión
+
+    Returns:
+        Lista de {name, users, baseline_ms, current_ms, ratio, regression}
+    """
+    previous = {_result_key(r): r for r in baseline.get('results', [])}
+    rows = []
+    for result in current.get('results', []):
+        before = previous.get(_result_key(result))
+        if before is None or not before.get('median_ms'):
+            continue
+        ratio = result['median_ms'] / before['median_ms']
+        rows.append({
+            'name': result['name'],
+            'users': result.get('users'),
+            'baseline_ms': before['median_ms'],
+            'current_ms': result['median_ms'],
+            'ratio': round(ratio, 3),
+            'regression': ratio >= threshold,
+        })
+    return rows
+
+
+def format_table(results: Iterable[Dict]) -> str:
+    """Tabla de texto para la consola"""
+    lines = [f'{"benchmark":<32} {"users":>8} {"median ms":>12} {"p95 ms":>12} {"max ms":>12}']
+    for r in results:
+        lines.append(
+            f'{r["name"]:<32} {str(r.get("users", "")):>8} {r["median_ms"]:>12.3f} '
+            f'{r["p95_ms"]:>12.3f} {r["max_ms"]:>12.3f}'
+        )
+    return '\n'.join(lines)
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Benchmark del pipeline de estadísticas
+
+Genera datasets sintéticos (ver benchmarks/dataset.py) de distintos tamaños y
+mide agregadores, filtros, embeds, rankings del wrapped y la persistencia
+(save_stats / load_stats contra un directorio temporal, nunca el stats.json real).
+
+Uso:
+    python -m benchmarks.stats_pipeline
+    python -m benchmarks.stats_pipeline --users 1000 10000 100000 --days 730
+    python -m benchmarks.stats_pipeline --output benchmarks/results/hoy.json --baseline benchmarks/results/ayer.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from benchmarks.dataset import generate_stats
+from benchmarks.harness import (
+    build_report, compare_reports, format_table, load_report, summarize_ms, time_call, write_report,
+)
+
+DEFAULT_OUTPUT_DIR = Path(__file__).resolve().parent / 'results'
+
+
+@contextlib.contextmanager
+def isolated_persistence(data: Dict, data_dir: Path):
+    """
+    Apunta core.persistence a un repositorio JSON temporal con `data` como stats
+    en memoria y restaura el estado original al salir.
+    """
+    from core import persistence
+    from core.stats_repository import JsonStatsRepository
+
+    saved = (persistence._repository, persistence.stats, persistence._journal, persistence._flusher,
+             persistence._pending_changes)
+    persistence._repository = JsonStatsRepository(data_dir / 'stats.json', backup_generations=0)
+    persistence.stats = data
+    persistence._journal = None
+    persistence._flusher = None
+    try:
+        yield persistence
+    finally:
+        (persistence._repository, persistence.stats, persistence._journal, persistence._flusher,
+         persistence._pending_changes) = saved
+
+
+def _bench(name: str, users: int, func, repeat: int, **extra) -> Dict:
+    result = {'name': name, 'users': users, 'repeat': repeat}
+    result.update(summarize_ms(time_call(func, repeat=repeat)))
+    if extra:
+        result['extra'] = extra
+    return result
+
+
+def run_size(users: int, days: int, party_history: int, repeat: int, seed: int) -> List[Dict]:
+    """
+    Corre todos los benchmarks sobre un dataset de `users` usuarios.
+
+    Returns:
+        Lista de resultados (uno por función medida)
+    """
+    from core.json_codec import JsonCodec, get_codec
+    from core.party_graph import PartyGraph
+    from core.rollups import StatsRollups
+    from core.stats_model import StatsModel
+    from stats.commands.wrapped import _calculate_gaming_stats, _calculate_rankings, compute_wrapped_year
+    from stats.data import aggregate_game_stats, aggregate_party_stats, filter_by_period
+    from stats.embeds import create_overview_embed
+
+    start = time.perf_counter()
+    data = generate_stats(users, days=days, party_history=party_history, seed=seed)
+    generated_s = time.perf_counter() - start
+    print(f'📦 Dataset: {users} usuarios, {days} días ({generated_s:.1f}s)')
+
+    sample_user = next(iter(data['users']))
+    rollups = StatsRollups(lambda: data)
+    rollups.period_users('month')  # Construcción inicial fuera de la medición
+    model = StatsModel(lambda: data)
+    model.users()
+    party_graph = PartyGraph.from_history(data['parties']['history'])
+    loop = asyncio.new_event_loop()
+
+    results = [
+        _bench('aggregate_game_stats', users, lambda: aggregate_game_stats(data), repeat),
+        _bench('aggregate_game_stats[model]', users, lambda: aggregate_game_stats(data, model=model), repeat),
+        _bench('filter_by_period[month]', users, lambda: filter_by_period(data, 'month'), repeat),
+        _bench('filter_by_period[year]', users, lambda: filter_by_period(data, 'year'), repeat),
+        _bench('filter_by_period[month,rollups]', users,
+               lambda: filter_by_period(data, 'month', rollups=rollups), repeat),
+        _bench('_calculate_rankings', users, lambda: _calculate_rankings(data, sample_user), repeat),
+        _bench('wrapped_gaming_stats[dict]', users,
+               lambda: [_calculate_gaming_stats(user, 2025) for user in data['users'].values()], repeat),
+        _bench('wrapped_gaming_stats[model]', users,
+               lambda: [_calculate_gaming_stats(user, 2025) for user in model.users().values()], repeat),
+        _bench('aggregate_party_stats', users, lambda: aggregate_party_stats(data), repeat),
+        _bench('party_graph.partners', users,
+               lambda: [party_graph.partners(uid, limit=12) for uid in data['users']], repeat),
+        _bench('compute_wrapped_year', users, lambda: compute_wrapped_year(data, 2025, model=model), repeat),
+        _bench('create_overview_embed', users,
+               lambda: loop.run_until_complete(create_overview_embed(data, 'Histórico')), repeat),
+    ]
+    loop.close()
+
+    with tempfile.TemporaryDirectory() as tmp, isolated_persistence(data, Path(tmp)) as persistence:
+        stats_file = Path(tmp) / 'stats.json'
+        results.append(_bench('save_stats', users, persistence.save_stats, repeat))
+        results[-1]['extra'] = {'bytes_written': stats_file.stat().st_size}
+        results.append(_bench('load_stats', users, persistence.load_stats, repeat))
+
+    # Codec activo (compacto) contra el formato histórico (json stdlib con indent=2)
+    codec = get_codec()
+    encoded = codec.dumps(data)
+    legacy = JsonCodec()
+    results.extend([
+        _bench(f'codec_dumps[{codec.name}]', users, lambda: codec.dumps(data), repeat, bytes=len(encoded)),
+        _bench(f'codec_loads[{codec.name}]', users, lambda: codec.loads(encoded), repeat),
+        _bench('codec_dumps[json,indent=2]', users, lambda: legacy.dumps(data, pretty=True), repeat,
+               bytes=len(legacy.dumps(data, pretty=True))),
+    ])
+
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark del pipeline de estadísticas')
+    parser.add_argument('--users', type=int, nargs='+', default=[1000, 10000],
+                        help='Tamaños de dataset (cantidad de usuarios)')
+    parser.add_argument('--days', type=int, default=365, help='Días de historia por usuario')
+    parser.add_argument('--party-history', type=int, default=1000, help='Entradas del historial de parties')
+    parser.add_argument('--repeat', type=int, default=5, help='Repeticiones por benchmark')
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--output', type=Path, default=None,
+                        help='Archivo JSON de resultados (default: benchmarks/results/stats_pipeline-<fecha>.json)')
+    parser.add_argument('--baseline', type=Path, default=None, help='Reporte anterior para comparar')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='Cociente de mediana actual/anterior considerado regresión')
+    parser.add_argument('--fail-on-regression', action='store_true', help='Exit code 1 si hay regresiones')
+    args = parser.parse_args(argv)
+
+    logging.getLogger('dsbot').setLevel(logging.WARNING)
+
+    results = []
+    for users in args.users:
+        results.extend(run_size(users, args.days, args.party_history, args.repeat, args.seed))
+
+    params = {'users': args.users, 'days': args.days, 'party_history': args.party_history,
+              'repeat': args.repeat, 'seed': args.seed}
+    report = build_report('stats_pipeline', params, results)
+    output = args.output or DEFAULT_OUTPUT_DIR / f'stats_pipeline-{time.strftime("%Y%m%d-%H%M%S")}.json'
+    write_report(output, report)
+
+    print()
+    print(format_table(results))
+    print(f'\n💾 Resultados: {output}')
+
+    if args.baseline:
+        rows = compare_reports(load_report(args.baseline), report, args.threshold)
+        regressions = [row for row in rows if row['regression']]
+        print(f'\n📈 Comparación con {args.baseline}:')
+        for row in rows:
+            flag = '⚠️ ' if row['regression'] else '  '
+            print(f'{flag}{row["name"]:<32} {str(row["users"]):>8} '
+                  f'{row["baseline_ms"]:>10.3f} → {row["current_ms"]:>10.3f} ms (x{row["ratio"]})')
+        if regressions and args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -7,6 +7,7 @@ import discord
 from discord.ext import commands
 import logging
 import os
+import signal
 from dotenv import load_dotenv
 
 # Cargar variables de entorno
@@ -20,7 +21,8 @@ logging.basicConfig(
 logger = logging.getLogger('dsbot')
 
 # Inicializar config y stats ANTES de crear el bot
-from core.persistence import config, stats, DATA_DIR
+from core.persistence import config, stats, DATA_DIR, start_write_behind, flush_now
+from core.rate_limits import get_rate_limit_tracker
 
 logger.info(f'✅ Canal configurado: {config.get("channel_id")}')
 logger.info(f'📁 Directorio de datos: {DATA_DIR}')
@@ -32,8 +34,9 @@ intents.presences = True
 intents.members = True
 intents.message_content = True
 
-# Crear bot
-bot = commands.Bot(command_prefix='!', intents=intents, help_command=None)
+# Crear bot (http_trace: headers de rate limit para acompasar envíos masivos)
+bot = commands.Bot(command_prefix='!', intents=intents, help_command=None,
+                   http_trace=get_rate_limit_tracker().trace_config())
 
 
 async def load_extensions():
@@ -59,6 +62,23 @@ async def load_extensions():
 @bot.event
 async def setup_hook():
     """Hook para cargar extensiones antes de que el bot se conecte"""
+    # Write-behind de estadísticas: agrupa escrituras a stats.json
+    start_write_behind()
+    
+    # Cooldowns heredados de stats.json -> cooldowns.json (una sola vez)
+    from core.cooldown import migrate_legacy_cooldowns
+    migrate_legacy_cooldowns()
+    
+    # Métricas de rendimiento: lag del loop y endpoint Prometheus opcional (!perf)
+    from core.metrics import start_metrics
+    await start_metrics(config.get('metrics', {}))
+    
+    # SIGTERM (redeploy en Railway): cerrar limpio para hacer el flush final
+    try:
+        bot.loop.add_signal_handler(signal.SIGTERM, lambda: bot.loop.create_task(bot.close()))
+    except (NotImplementedError, RuntimeError):
+        pass  # Windows no soporta add_signal_handler
+    
     await load_extensions()
 
 
@@ -82,4 +102,10 @@ except discord.errors.LoginFailure:
     logger.error('Verifica que DISCORD_BOT_TOKEN sea correcto')
 except Exception as e:
     logger.error(f'❌ ERROR inesperado: {e}')
+finally:
+    # Flush forzado de estadísticas pendientes al apagar
+    if flush_now():
+        logger.info('💾 Estadísticas pendientes guardadas antes de salir')
+    from core.cooldown import flush_cooldowns
+    flush_cooldowns()
 
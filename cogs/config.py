@@ -9,6 +9,7 @@ import logging
 from core.persistence import config, save_config, get_channel_id, get_stats_channel_id
 from core.helpers import send_notification
 from core.checks import is_owner
+from core.metrics import get_metrics
 
 logger = logging.getLogger('dsbot')
 
@@ -393,6 +394,71 @@ class ConfigCog(commands.Cog, name='Configuration'):
             except discord.errors.Forbidden:
                 logger.error(f'⚠️ No se pudo enviar confirmación en el canal {ctx.channel.name}')
 
+    @commands.command(name='perf', aliases=['metrics'])
+    async def show_perf(self, ctx):
+        """Muestra métricas de rendimiento del bot (solo owner)
+        
+        Ejemplo: !perf
+        """
+        if not is_owner(ctx):
+            await ctx.send('❌ Solo el owner del bot puede usar este comando.')
+            return
+        
+        embed = create_perf_embed(get_metrics().snapshot())
+        await ctx.send(embed=embed)
+
+
+def _format_latency(summary: dict) -> str:
+    return (f'n={summary["count"]} · p50 {summary["p50_ms"]:.1f} ms · '
+            f'p99 {summary["p99_ms"]:.1f} ms · máx {summary["max_ms"]:.1f} ms')
+
+
+def create_perf_embed(snapshot: dict) -> discord.Embed:
+    """Embed de !perf a partir de Metrics.snapshot()"""
+    embed = discord.Embed(
+        title='⚡ Rendimiento',
+        description='› Métricas desde el último reinicio (percentiles sobre las muestras recientes)',
+        color=discord.Color.dark_embed()
+    )
+    latencies = snapshot.get('latencies', {})
+    gauges = snapshot.get('gauges', {})
+    counters = snapshot.get('counters', {})
+    
+    listeners = latencies.get('dsbot_listener_duration_seconds', {})
+    lines = [f'› `{label.split("=", 1)[-1]}` {_format_latency(summary)}' for label, summary in sorted(listeners.items())]
+    embed.add_field(name='🎧 Listeners', value='\n'.join(lines) or '› Sin eventos todavía', inline=False)
+    
+    lag = latencies.get('dsbot_event_loop_lag_seconds', {}).get('_')
+    embed.add_field(
+        name='⏱️ Lag del event loop',
+        value=f'› {_format_latency(lag)}' if lag else '› Sin muestras (metrics.enabled desactivado?)',
+        inline=False
+    )
+    
+    writes = latencies.get('dsbot_stats_write_duration_seconds', {}).get('_')
+    if writes:
+        total_bytes = counters.get('dsbot_stats_write_bytes_total', {}).get('_', 0)
+        last_bytes = gauges.get('dsbot_stats_write_last_bytes', 0)
+        persistence_value = (f'› {_format_latency(writes)}\n'
+                             f'› Último snapshot: {last_bytes / 1024:.1f} KB · Total escrito: {total_bytes / 1024 / 1024:.1f} MB')
+    else:
+        persistence_value = '› Sin escrituras todavía'
+    embed.add_field(name='💾 Escrituras de stats', value=persistence_value, inline=False)
+    
+    sessions = gauges.get('dsbot_active_sessions', {})
+    embed.add_field(
+        name='🎮 Sesiones activas',
+        value=' · '.join(f'{name}: **{count}**' for name, count in sessions.items()) or '› —',
+        inline=True
+    )
+    embed.add_field(
+        name='📨 Colas',
+        value=(f'Notificaciones: **{gauges.get("dsbot_notification_queue_depth", 0)}**\n'
+               f'Timers: **{gauges.get("dsbot_scheduled_timers", 0)}**'),
+        inline=True
+    )
+    return embed
+
 
 async def setup(bot):
     """Función requerida para cargar el cog"""
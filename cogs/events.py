@@ -16,8 +16,13 @@ from core.session_dto import (
 from core.voice_session import VoiceSessionManager
 from core.game_session import GameSessionManager
 from core.party_session import PartySessionManager
+from core.guild_shards import GuildShards
+from core.presence_index import PresenceIndex
 from core.health_check import SessionHealthCheck
 from core.cooldown import check_cooldown
+from core.metrics import get_metrics, timed_listener
+from core.notification_queue import get_dispatcher
+from core.scheduler import get_scheduler
 from core.helpers import is_link_spam, get_activity_verb, send_notification
 from core.updates import format_latest_update_for_deploy
 
@@ -35,20 +40,42 @@ class EventsCog(commands.Cog, name='Events'):
         game_cfg = config.get('game_session', {})
         party_grace = int(party_cfg.get('grace_period_seconds', 1800))
         game_grace = int(game_cfg.get('grace_period_seconds', 900))
-        self.voice_manager = VoiceSessionManager(bot)
-        self.party_manager = PartySessionManager(bot, grace_period_seconds=party_grace)
+        # Voice y parties: un manager por servidor (creado al primer evento del servidor)
+        self.presence = PresenceIndex()
+        self.voice_managers = GuildShards(lambda guild_id: VoiceSessionManager(bot))
+        self.party_managers = GuildShards(lambda guild_id: PartySessionManager(
+            bot, grace_period_seconds=party_grace, guild_id=guild_id, presence=self.presence
+        ))
         self.game_manager = GameSessionManager(
-            bot, party_manager=self.party_manager, grace_period_seconds=game_grace
+            bot, party_managers=self.party_managers, grace_period_seconds=game_grace
         )
         
         # Recovery de sesiones + Health check periódico
         self.health_check = SessionHealthCheck(
             bot=bot,
-            voice_manager=self.voice_manager,
+            voice_managers=self.voice_managers,
             game_manager=self.game_manager,
-            party_manager=self.party_manager,
+            party_managers=self.party_managers,
             config=config
         )
+        self._register_metrics()
+
+    def _register_metrics(self):
+        """Gauges de sesiones activas y colas para !perf / Prometheus"""
+        metrics = get_metrics()
+        metrics.register_gauge(
+            'dsbot_active_sessions',
+            lambda: {
+                'game': len(self.game_manager.active_sessions),
+                'voice': self.voice_managers.session_count(),
+                'party': self.party_managers.session_count(),
+            },
+            label='manager', help_text='Sesiones activas por tipo de manager'
+        )
+        metrics.register_gauge('dsbot_notification_queue_depth', lambda: get_dispatcher().pending(),
+                               help_text='Notificaciones esperando envío')
+        metrics.register_gauge('dsbot_scheduled_timers', lambda: get_scheduler().pending(),
+                               help_text='Timers pendientes en el scheduler')
 
     def _is_allowed_no_app_id_activity(self, game_name: str) -> bool:
         """Permite emuladores conocidos que Discord muestra sin application_id."""
@@ -69,6 +96,10 @@ class EventsCog(commands.Cog, name='Events'):
         logger.info(f'{self.bot.user} se ha conectado a Discord!')
         logger.info(f'Bot ID: {self.bot.user.id}')
         
+        # Índice de presencia: un recorrido por servidor al conectar (después se mantiene por eventos)
+        for guild in self.bot.guilds:
+            self.presence.rebuild_guild(guild)
+        
         # Recovery de sesiones de voice después de reinicio
         await self.health_check.recover_on_startup()
         
@@ -150,12 +181,16 @@ class EventsCog(commands.Cog, name='Events'):
         self.deploy_notification_sent = True
     
     @commands.Cog.listener()
+    @timed_listener
     async def on_presence_update(self, before, after):
         """Detecta cuando alguien cambia su presencia (juegos, streaming, etc.)"""
         # Ignorar bots si está configurado
         if config.get('ignore_bots', True) and after.bot:
             return
         
+        # Índice de presencia (juego -> jugadores): se actualiza antes de cualquier return
+        previous_game, current_game = self.presence.update_member(after)
+        
         # TRACK CONEXIONES DIARIAS: Detectar cuando alguien se conecta (offline → online)
         if before.status == discord.Status.offline and after.status != discord.Status.offline:
             user_id = str(after.id)
@@ -283,46 +318,51 @@ class EventsCog(commands.Cog, name='Events'):
         
         # Detección de parties con sistema de sesiones (después de procesar cambios de juegos)
         try:
-            # Obtener jugadores agrupados por juego
-            players_by_game = self.party_manager.get_active_players_by_game(after.guild)
+            # Solo cambian los juegos de este miembro; además se revisan las parties activas
+            # (refresca su actividad o las cierra si ya no queda nadie)
+            party_manager = self.party_managers.get(after.guild.id)
+            games_to_check = set(party_manager.active_sessions.keys())
+            games_to_check.update(g for g in (previous_game, current_game) if g)
             
-            # Obtener juegos con parties activas (COPIAR para evitar "Set changed size")
-            active_party_games = set(self.party_manager.active_sessions.keys())
-            current_games = set(players_by_game.keys())
+            games_to_end = []
+            for game_name in games_to_check:
+                players = self.presence.players(after.guild, game_name)
+                if players:
+                    await party_manager.handle_start(game_name, players, after.guild.id, config)
+                elif game_name in party_manager.active_sessions:
+                    games_to_end.append(game_name)
             
-            # Procesar cada juego con suficientes jugadores
-            for game_name, players in players_by_game.items():
-                await self.party_manager.handle_start(game_name, players, after.guild.id, config)
-            
-            # Finalizar parties de juegos que ya no tienen suficientes jugadores
-            # 🚨 FIX: Convertir a lista para evitar "Set changed size during iteration"
-            games_to_end = list(active_party_games - current_games)
+            # Finalizar parties de juegos sin jugadores
             for game_name in games_to_end:
-                await self.party_manager.handle_end(game_name, config)
+                await party_manager.handle_end(game_name, config)
             
             # Health check simplificado: no necesita activación manual
         except Exception as e:
             logger.error(f'Error en gestión de parties: {e}')
     
     @commands.Cog.listener()
+    @timed_listener
     async def on_voice_state_update(self, member, before, after):
         """Detecta cuando alguien entra o sale de un canal de voz"""
         if config.get('ignore_bots', True) and member.bot:
             return
         
+        voice_manager = self.voice_managers.get(member.guild.id)
+        
         # Entrada a canal de voz
         if not before.channel and after.channel:
-            await self.voice_manager.handle_start(member, after.channel, config)
+            await voice_manager.handle_start(member, after.channel, config)
         
         # Salida de canal de voz (corte total: no aplicar gracia que deje sesión colgada)
         elif before.channel and not after.channel:
-            await self.voice_manager.handle_end(member, before.channel, config, skip_grace=True)
+            await voice_manager.handle_end(member, before.channel, config, skip_grace=True)
         
         # Cambio de canal de voz
         elif before.channel and after.channel and before.channel != after.channel:
-            await self.voice_manager.handle_voice_move(member, before.channel, after.channel, config)
+            await voice_manager.handle_voice_move(member, before.channel, after.channel, config)
     
     @commands.Cog.listener()
+    @timed_listener
     async def on_message(self, message):
         """Detecta mensajes para tracking de estadísticas"""
         # Ignorar mensajes del bot mismo
@@ -389,6 +429,8 @@ class EventsCog(commands.Cog, name='Events'):
     @commands.Cog.listener()
     async def on_member_remove(self, member):
         """Detecta cuando un miembro deja el servidor"""
+        self.presence.remove_member(member)
+        
         if config.get('ignore_bots', True) and member.bot:
             return
         
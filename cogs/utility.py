@@ -7,6 +7,7 @@ from discord.ext import commands
 import logging
 
 from core.checks import stats_channel_only
+from core.persistence import get_party_graph, get_stats_snapshot
 from core.party_session import PartySessionManager
 from core.updates import load_update_sections
 
@@ -20,10 +21,13 @@ class UtilityCog(commands.Cog, name='Utilidades'):
         self.bot = bot
         self.party_manager = PartySessionManager(bot)
 
-    def _get_party_manager(self):
-        """Usa el manager runtime de EventsCog para ver parties activas reales."""
+    def _get_party_manager(self, guild=None):
+        """Usa el manager runtime de EventsCog (el del servidor) para ver parties activas reales."""
         events_cog = self.bot.get_cog('Events')
-        return getattr(events_cog, 'party_manager', self.party_manager)
+        party_managers = getattr(events_cog, 'party_managers', None)
+        if party_managers is not None and guild is not None:
+            return party_managers.get(guild.id)
+        return self.party_manager
 
     @commands.command(name='bothelp', aliases=['help', 'ayuda', 'comandos'])
     @stats_channel_only()
@@ -108,7 +112,8 @@ class UtilityCog(commands.Cog, name='Utilidades'):
                     '› `!setchannel` • Configurar notificaciones\n'
                     '› `!unsetchannel` • Quitar notificaciones\n'
                     '› `!setstatschannel` • Configurar stats\n'
-                    '› `!unsetstatschannel` • Quitar stats'
+                    '› `!unsetstatschannel` • Quitar stats\n'
+                    '› `!perf` • Métricas de rendimiento'
                 ),
                 inline=True
             )
@@ -220,6 +225,7 @@ class UtilityCog(commands.Cog, name='Utilidades'):
                     '› `!unsetchannel` 🔒 • Quitar notificaciones\n'
                     '› `!setstatschannel` 🔒 • Configurar stats\n'
                     '› `!unsetstatschannel` 🔒 • Quitar stats\n'
+                    '› `!perf` 🔒 • Métricas de rendimiento\n'
                     '› `!channels` • Ver canales\n'
                     '› `!toggle` • Activar/desactivar\n'
                     '› `!config` • Ver configuración\n'
@@ -350,7 +356,7 @@ class UtilityCog(commands.Cog, name='Utilidades'):
         - !party - Muestra todas las parties activas
         - !party Valorant - Muestra quién está jugando Valorant
         """
-        party_manager = self._get_party_manager()
+        party_manager = self._get_party_manager(ctx.guild)
         active_parties = party_manager.get_active_parties()
         
         if not active_parties:
@@ -422,7 +428,7 @@ class UtilityCog(commands.Cog, name='Utilidades'):
             await ctx.send('⚠️ Timeframe inválido. Usa: today, week, month, all')
             return
         
-        party_manager = self._get_party_manager()
+        party_manager = self._get_party_manager(ctx.guild)
         history = party_manager.get_party_history(timeframe, limit=10)
         
         if not history:
@@ -465,7 +471,7 @@ class UtilityCog(commands.Cog, name='Utilidades'):
         - !partystats - Muestra stats de todos los juegos
         - !partystats Valorant - Muestra stats de un juego específico
         """
-        party_manager = self._get_party_manager()
+        party_manager = self._get_party_manager(ctx.guild)
         all_stats = party_manager.get_game_stats()
         
         if not all_stats:
@@ -502,12 +508,27 @@ class UtilityCog(commands.Cog, name='Utilidades'):
             embed.add_field(name='👥 Récord Jugadores', value=str(max_players), inline=True)
             embed.add_field(name='👤 Jugadores Únicos', value=str(unique_players), inline=True)
             
-            # Top duplas
-            if stats.get('most_frequent_pairs'):
-                top_pairs = sorted(stats['most_frequent_pairs'].items(), key=lambda x: x[1], reverse=True)[:5]
-                pairs_text = '\n'.join([f'{pair}: {count} veces' for pair, count in top_pairs])
+            # Top duplas y mejor squad (grafo de co-juego del historial)
+            graph = get_party_graph()
+            users = get_stats_snapshot().get('users', {})
+            
+            def name(user_id):
+                return users.get(user_id, {}).get('username', f'ID {user_id}')
+            
+            top_pairs = graph.top_pairs(game=matching_game, limit=5)
+            if top_pairs:
+                pairs_text = '\n'.join(f'{name(a)} & {name(b)}: {count} veces' for a, b, count, _ in top_pairs)
                 embed.add_field(name='🤝 Duplas Más Frecuentes', value=pairs_text, inline=False)
             
+            squad = graph.best_squad(game=matching_game)
+            if squad:
+                players, count, minutes = squad
+                embed.add_field(
+                    name='👥 Mejor Squad',
+                    value=f"{', '.join(name(uid) for uid in players)}: {count} parties ({minutes} min)",
+                    inline=False
+                )
+            
             await ctx.send(embed=embed)
             return
         
@@ -1,18 +1,23 @@
 """
 Wrapped Event - Envío automático de Wrapped 2025
 Se ejecuta SOLO el 31 de diciembre de 2025 a las 12:00
+El envío (core.wrapped_broadcast) guarda su progreso y se retoma tras un reinicio
 """
 
-import discord
 from discord.ext import commands, tasks
 import logging
 from datetime import datetime, time
-import json
-from core.persistence import get_channel_id, STATS_FILE
-from stats.commands.wrapped import generate_wrapped_embed
+from core.persistence import DATA_DIR, config, get_channel_id, get_stats_snapshot
+from core.wrapped_broadcast import WrappedBroadcast, load_cursor
+from stats.commands.wrapped import get_wrapped_engine
 
 logger = logging.getLogger('dsbot')
 
+WRAPPED_YEAR = 2025
+
+# Progreso del envío masivo (permite retomarlo tras un reinicio)
+WRAPPED_CURSOR_FILE = DATA_DIR / 'wrapped_broadcast.json'
+
 
 class WrappedEventCog(commands.Cog, name='WrappedEvent'):
     """Cog para envío automático del Wrapped 2025"""
@@ -24,6 +29,7 @@ class WrappedEventCog(commands.Cog, name='WrappedEvent'):
     
     async def cog_load(self):
         """Se ejecuta cuando el cog se carga"""
+        get_wrapped_engine().configure((config or {}).get('wrapped', {}))
         logger.info("🎁 Iniciando task de Wrapped 2025...")
         self.check_and_send_wrapped.start()
     
@@ -36,13 +42,25 @@ class WrappedEventCog(commands.Cog, name='WrappedEvent'):
     async def check_and_send_wrapped(self):
         """
         Revisa si es el momento de enviar el wrapped.
-        Se ejecuta solo el 31 de diciembre de 2025 a las 12:00
+        Se ejecuta solo el 31 de diciembre de 2025 a las 12:00, o en cuanto
+        arranca el bot si un envío anterior quedó a medias.
         """
         try:
             # Si ya se envió, no hacer nada
             if self.wrapped_sent:
                 return
             
+            cursor = load_cursor(WRAPPED_CURSOR_FILE)
+            if cursor and cursor.get('year') == WRAPPED_YEAR:
+                if cursor.get('finished'):
+                    # Ya enviado antes de un reinicio: no repetir
+                    self.wrapped_sent = True
+                    self.check_and_send_wrapped.cancel()
+                    return
+                logger.info(f"🎁 Envío del Wrapped {WRAPPED_YEAR} interrumpido, retomando...")
+                await self._send_and_stop()
+                return
+            
             now = datetime.now()
             
             # Verificar que sea 31 de diciembre de 2025
@@ -57,147 +75,64 @@ class WrappedEventCog(commands.Cog, name='WrappedEvent'):
             # Si es entre 12:00 y 12:05, enviar
             if now.hour == target_hour and now.minute < 10:
                 logger.info("🎁 ¡ES HORA! Enviando Wrapped 2025 a todos los usuarios...")
-                await self.send_wrapped_to_all()
-                self.wrapped_sent = True
-                logger.info("✅ Wrapped 2025 enviado exitosamente")
-                
-                # Detener el task después de enviar
-                self.check_and_send_wrapped.cancel()
+                await self._send_and_stop()
         
         except Exception as e:
             logger.error(f"❌ Error en check_and_send_wrapped: {e}", exc_info=True)
     
+    async def _send_and_stop(self):
+        if await self.send_wrapped_to_all():
+            self.wrapped_sent = True
+            logger.info("✅ Wrapped 2025 enviado exitosamente")
+            
+            # Detener el task después de enviar
+            self.check_and_send_wrapped.cancel()
+    
     @check_and_send_wrapped.before_loop
     async def before_check(self):
         """Esperar a que el bot esté listo"""
         await self.bot.wait_until_ready()
         logger.info("🎁 Bot listo, esperando momento para enviar Wrapped...")
     
-    async def send_wrapped_to_all(self):
+    async def send_wrapped_to_all(self) -> bool:
         """
-        Envía el wrapped a todos los usuarios con datos en stats.json
+        Envía (o retoma) el wrapped a todos los usuarios con datos en stats.json
+        
+        Returns:
+            True si el envío terminó (queda registrado en el cursor)
         """
         try:
             # Obtener canal de notificaciones
             channel_id = get_channel_id()
             if not channel_id:
                 logger.error("❌ No hay canal de notificaciones configurado")
-                return
+                return False
             
             channel = self.bot.get_channel(channel_id)
             if not channel:
                 logger.error(f"❌ No se encontró el canal {channel_id}")
-                return
+                return False
             
-            # Cargar stats
-            try:
-                with open(STATS_FILE, 'r', encoding='utf-8') as f:
-                    stats_data = json.load(f)
-            except Exception as e:
-                logger.error(f"❌ Error cargando stats.json: {e}")
-                return
+            # Snapshot en memoria: consistente durante todo el envío
+            stats_data = get_stats_snapshot()
             
-            users = stats_data.get('users', {})
-            if not users:
+            if not stats_data.get('users', {}):
                 logger.warning("⚠️  No hay usuarios en stats.json")
-                return
-            
-            # Enviar mensaje de introducción
-            intro_embed = discord.Embed(
-                title="🎉 WRAPPED 2025 🎉",
-                description=(
-                    "¡Llegó el momento de ver tu año en Discord!\n\n"
-                    "📊 A continuación verás tu resumen del 2025:\n"
-                    "🎮 Gaming • 🔊 Voice • 🎉 Parties • 💬 Social\n\n"
-                    "¡Feliz Año Nuevo! 🎆"
-                ),
-                color=0xFFD700,  # Dorado
-                timestamp=datetime.now()
-            )
-            intro_embed.set_footer(text="Wrapped 2025 • Generado automáticamente")
-            
-            await channel.send("@here", embed=intro_embed)
-            logger.info(f"✅ Mensaje de introducción enviado")
-            
-            # Enviar wrapped para cada usuario
-            sent_count = 0
-            skipped_count = 0
-            
-            for user_id, user_data in users.items():
-                try:
-                    # Obtener member object
-                    member = None
-                    for guild in self.bot.guilds:
-                        member = guild.get_member(int(user_id))
-                        if member:
-                            break
-                    
-                    if not member:
-                        logger.debug(f"⚠️  Usuario {user_id} no encontrado en ningún servidor")
-                        skipped_count += 1
-                        continue
-                    
-                    # Verificar que tenga datos significativos
-                    has_data = False
-                    
-                    # Verificar gaming
-                    if user_data.get('games'):
-                        has_data = True
-                    
-                    # Verificar voice
-                    if user_data.get('voice', {}).get('total_minutes', 0) > 0:
-                        has_data = True
-                    
-                    # Verificar parties
-                    parties_history = stats_data.get('parties', {}).get('history', [])
-                    user_parties = [p for p in parties_history if user_id in p.get('players', [])]
-                    if user_parties:
-                        has_data = True
-                    
-                    if not has_data:
-                        logger.debug(f"⚠️  {member.display_name} no tiene datos suficientes")
-                        skipped_count += 1
-                        continue
-                    
-                    # Generar wrapped
-                    wrapped_embed = generate_wrapped_embed(
-                        stats_data=stats_data,
-                        user_id=user_id,
-                        username=member.display_name,
-                        year=2025
-                    )
-                    
-                    # Enviar
-                    await channel.send(f"## {member.mention}", embed=wrapped_embed)
-                    sent_count += 1
-                    logger.info(f"✅ Wrapped enviado a {member.display_name}")
-                    
-                    # Pequeño delay para evitar rate limit
-                    import asyncio
-                    await asyncio.sleep(2)
-                
-                except Exception as e:
-                    logger.error(f"❌ Error enviando wrapped a {user_id}: {e}")
-                    skipped_count += 1
+                return False
             
-            # Mensaje final
-            summary_embed = discord.Embed(
-                title="✅ Wrapped 2025 Completado",
-                description=(
-                    f"📊 **Wrappeds enviados:** {sent_count}\n"
-                    f"⚠️ **Omitidos:** {skipped_count}\n\n"
-                    "¡Gracias por ser parte de este servidor! 🎉\n"
-                    "¡Feliz Año Nuevo! 🎆"
-                ),
-                color=0x00FF00,  # Verde
-                timestamp=datetime.now()
-            )
+            # Sin headers de rate limit todavía: el ritmo del bucket por canal de config
+            rate_limiting = (config or {}).get('rate_limiting', {})
+            min_interval = (float(rate_limiting.get('channel_window_seconds', 5))
+                            / max(1, int(rate_limiting.get('channel_messages', 5))))
             
-            await channel.send(embed=summary_embed)
-            logger.info(f"📊 Resumen: {sent_count} enviados, {skipped_count} omitidos")
+            broadcast = WrappedBroadcast(self.bot, channel, WRAPPED_YEAR, WRAPPED_CURSOR_FILE,
+                                         min_interval=min_interval)
+            cursor = await broadcast.run(stats_data)
+            return cursor.get('finished', False)
         
         except Exception as e:
             logger.error(f"❌ Error en send_wrapped_to_all: {e}", exc_info=True)
+            return False
 
 
 async def setup(bot: commands.Bot):
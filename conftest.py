@@ -0,0 +1,30 @@
+"""
+Configuración compartida de pytest
+
+Los tests escriben stats, journal, cooldowns y notificaciones pendientes en
+un directorio temporal: correr la suite no modifica el stats.json del repo.
+"""
+
+import pytest
+
+from core import cooldown, pending_notifications, persistence
+from core.stats_repository import JsonStatsRepository
+
+
+@pytest.fixture(autouse=True, scope='session')
+def _datos_temporales(tmp_path_factory):
+    data_dir = tmp_path_factory.mktemp('data')
+    saved = (persistence._repository, persistence.STATS_FILE, persistence.STATS_JOURNAL_FILE,
+             cooldown.COOLDOWNS_FILE, cooldown._store, pending_notifications.PENDING_NOTIFICATIONS_FILE)
+
+    persistence._repository = JsonStatsRepository(data_dir / 'stats.json', backup_generations=0)
+    persistence.STATS_FILE = data_dir / 'stats.json'
+    persistence.STATS_JOURNAL_FILE = data_dir / 'stats.journal'
+    cooldown.COOLDOWNS_FILE = data_dir / 'cooldowns.json'
+    cooldown._store = None
+    pending_notifications.PENDING_NOTIFICATIONS_FILE = str(data_dir / 'pending_notifications.json')
+    try:
+        yield data_dir
+    finally:
+        (persistence._repository, persistence.STATS_FILE, persistence.STATS_JOURNAL_FILE,
+         cooldown.COOLDOWNS_FILE, cooldown._store, pending_notifications.PENDING_NOTIFICATIONS_FILE) = saved
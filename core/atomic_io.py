@@ -0,0 +1,233 @@
+"""
+Escritura atómica de archivos JSON
+Temp file + fsync + rename, con generaciones de backup rotativas (archivo.1, .2, ...)
+
+Las escrituras grandes se pueden delegar al executor de I/O (un solo thread,
+en orden de llegada) para no bloquear el event loop mientras se serializa.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import shutil
+import stat
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Optional, Tuple
+
+logger = logging.getLogger('dsbot')
+
+_io_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _read_umask() -> int:
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# Permisos de un archivo nuevo (como open()): se leen una vez al importar,
+# antes de que existan otros threads que puedan crear archivos
+_DEFAULT_MODE = 0o666 & ~_read_umask()
+
+
+def backup_path(path, generation: int) -> Path:
+    """Ruta de la generación de backup N (stats.json -> stats.json.N)"""
+    path = Path(path)
+    return path.with_name(f'{path.name}.{generation}')
+
+
+def _fsync_dir(directory: Path):
+    """fsync del directorio para que el rename sobreviva a un corte de energía"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return  # Windows no permite abrir directorios
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _target_mode(path: Path) -> int:
+    """Permisos del archivo existente o, si no existe, los default según el umask"""
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except OSError:
+        return _DEFAULT_MODE
+
+
+def _rotate_backups(path: Path, generations: int):
+    """
+    Rota los backups: .N-1 -> .N, ..., .1 -> .2 y el archivo actual -> .1
+
+    El actual se enlaza (hardlink) en lugar de moverse, así el archivo
+    principal existe en todo momento hasta el rename final.
+    """
+    for i in range(generations - 1, 0, -1):
+        src = backup_path(path, i)
+        if src.exists():
+            os.replace(src, backup_path(path, i + 1))
+
+    if not path.exists():
+        return
+
+    first = backup_path(path, 1)
+    try:
+        if first.exists():
+            first.unlink()
+        os.link(path, first)
+    except OSError:
+        # Filesystems sin hardlinks
+        shutil.copy2(path, first)
+
+
+def write_text_atomic(path, content: str, backup_generations: int = 0):
+    """
+    Escribe un archivo de texto (UTF-8) de forma atómica.
+
+    Args:
+        path: Ruta destino
+        content: Contenido completo del archivo
+        backup_generations: Cantidad de generaciones anteriores a conservar (0 = ninguna)
+    """
+    write_bytes_atomic(path, content.encode('utf-8'), backup_generations)
+
+
+def write_bytes_atomic(path, content: bytes, backup_generations: int = 0):
+    """
+    Escribe un archivo de forma atómica.
+
+    Un kill en medio de la escritura deja el archivo anterior intacto:
+    nunca queda un archivo truncado en `path`. El archivo conserva los
+    permisos del anterior (mkstemp crea el temporal con 0600).
+
+    Args:
+        path: Ruta destino
+        content: Contenido completo del archivo
+        backup_generations: Cantidad de generaciones anteriores a conservar (0 = ninguna)
+    """
+    path = Path(path)
+    directory = path.parent
+
+    fd, tmp_name = tempfile.mkstemp(prefix=f'.{path.name}.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.chmod(tmp_name, _target_mode(path))
+
+        if backup_generations > 0:
+            _rotate_backups(path, backup_generations)
+
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+    _fsync_dir(directory)
+
+
+def write_json_atomic(path, data: Any, indent: Optional[int] = 2, backup_generations: int = 0):
+    """
+    Serializa `data` a JSON y lo escribe de forma atómica.
+
+    Args:
+        path: Ruta destino
+        data: Objeto serializable
+        indent: Indentación del JSON (None = compacto)
+        backup_generations: Cantidad de generaciones anteriores a conservar
+    """
+    content = json.dumps(data, indent=indent, ensure_ascii=False)
+    write_text_atomic(path, content, backup_generations)
+
+
+def get_io_executor() -> ThreadPoolExecutor:
+    """
+    Executor de I/O de disco compartido.
+
+    Un solo worker: las escrituras se ejecutan en el orden en que se
+    enviaron, así una versión vieja de un archivo nunca pisa a una nueva.
+    """
+    global _io_executor
+    if _io_executor is None:
+        _io_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='dsbot-io')
+    return _io_executor
+
+
+def write_json_in_background(path, data: Any, indent: Optional[int] = 2, backup_generations: int = 0):
+    """
+    Escribe un JSON fuera del event loop si hay uno corriendo.
+
+    `data` se serializa en el thread de I/O: el llamador no debe modificarlo
+    después (pasar una copia, ver core.stats_snapshot.copy_tree). Sin event
+    loop (scripts, tests) escribe inmediatamente.
+
+    Returns:
+        asyncio.Future de la escritura, o None si se escribió en el momento
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        write_json_atomic(path, data, indent=indent, backup_generations=backup_generations)
+        return None
+
+    future = loop.run_in_executor(
+        get_io_executor(), write_json_atomic, path, data, indent, backup_generations
+    )
+    future.add_done_callback(lambda f: _log_background_error(path, f))
+    return future
+
+
+def _log_background_error(path, future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.error(f'❌ Error escribiendo {path} en background: {future.exception()}')
+
+
+def load_json_with_fallback(path, backup_generations: int = 0,
+                            loads: Callable[[bytes], Any] = json.loads) -> Tuple[Optional[Any], Optional[Path]]:
+    """
+    Carga un JSON probando el archivo principal y luego sus backups (.1, .2, ...).
+
+    Args:
+        path: Ruta del archivo principal
+        backup_generations: Cantidad de generaciones a probar
+        loads: Parser de bytes JSON (ver core.json_codec)
+
+    Returns:
+        tuple: (datos, ruta_usada) o (None, None) si ningún archivo existe.
+
+    Raises:
+        ValueError: Si existen archivos pero ninguno es JSON válido
+    """
+    path = Path(path)
+    candidates = [path] + [backup_path(path, i) for i in range(1, backup_generations + 1)]
+
+    found_any = False
+    for candidate in candidates:
+        try:
+            with open(candidate, 'rb') as f:
+                data = loads(f.read())
+        except FileNotFoundError:
+            continue
+        except ValueError as e:  # JSON inválido o UTF-8 inválido
+            found_any = True
+            logger.error(f'❌ {candidate} corrupto: {e}')
+            continue
+
+        if candidate != path:
+            logger.warning(f'⚠️ Recuperado desde backup: {candidate}')
+        return data, candidate
+
+    if found_any:
+        raise ValueError(f'Ningún archivo válido para {path} (ni backups)')
+    return None, None
@@ -10,6 +10,8 @@ from datetime import datetime
 from typing import Optional, Dict
 import discord
 
+from core.scheduler import TimerHandle, get_scheduler
+
 logger = logging.getLogger('dsbot')
 
 
@@ -23,7 +25,8 @@ class BaseSession:
         self.start_time = datetime.now()
         self.last_activity_update = datetime.now()  # Última vez que Discord reportó actividad
         self.notification_message: Optional[discord.Message] = None
-        self.verification_task: Optional[asyncio.Task] = None
+        self.verification_task: Optional[TimerHandle] = None  # Timer de la fase de verificación en curso
+        self.grace_timer: Optional[TimerHandle] = None  # Vencimiento de la gracia (ver _schedule_grace_expiry)
         self.is_confirmed = False  # True si pasó el threshold mínimo
         self.entry_notification_sent = False  # True si se envió notificación de entrada (para no notificar salida si no hubo entrada)
     
@@ -55,17 +58,29 @@ class BaseSessionManager(ABC):
         """Maneja el fin de una sesión. Debe ser implementado por subclases."""
         pass
     
-    async def _verify_session(self, session: BaseSession, member: discord.Member, config: dict):
+    # Fases de verificación (segundos desde el inicio de la sesión)
+    VERIFY_PHASE1_DELAY = 3
+    VERIFY_PHASE2_DELAY = 7
+    
+    def _start_verification(self, session: BaseSession, member: discord.Member, config: dict):
         """
-        Verifica la sesión en background después de un delay (template method)
+        Programa la verificación en background de una sesión nueva (no bloquea).
         
         Fase 1 (3s): Verifica que sigue activo
-        Fase 2 (7s): Verifica nuevamente y confirma sesión
+        Fase 2 (7s más): Verifica nuevamente y confirma sesión
+        
+        Cada fase es un timer del scheduler compartido (no hay una task dormida por
+        sesión). session.verification_task guarda el timer de la fase en curso:
+        cancelarlo antes de que dispare equivale a la cancelación de la task anterior.
         """
+        session.verification_task = get_scheduler().call_later(
+            self.VERIFY_PHASE1_DELAY, self._verify_phase1, session, member, config,
+            on_cancel=lambda: self._on_verification_cancelled(session)
+        )
+    
+    async def _verify_phase1(self, session: BaseSession, member: discord.Member, config: dict):
+        """Fase 1 de la verificación (ver _start_verification)"""
         try:
-            # Fase 1: Delay inicial de 3s
-            await asyncio.sleep(3)
-            
             # Verificar que sigue activo (método abstracto)
             if not await self._is_still_active(session, member):
                 await self._cancel_session(session.user_id, reason="salió antes de 3s")
@@ -75,8 +90,20 @@ class BaseSessionManager(ABC):
             await self._on_session_confirmed_phase1(session, member, config)
             
             # Fase 2: Verificación adicional de 7s (total 10s)
-            await asyncio.sleep(7)
-            
+            session.verification_task = get_scheduler().call_later(
+                self.VERIFY_PHASE2_DELAY, self._verify_phase2, session, member, config,
+                on_cancel=lambda: self._on_verification_cancelled(session)
+            )
+        except asyncio.CancelledError:
+            await self._delete_notification_on_cancel(session)
+            self._cleanup_unconfirmed(session)
+        except Exception as e:
+            logger.error(f'❌ Error en _verify_session para {session.username}: {e}')
+            self._cleanup_unconfirmed(session)
+    
+    async def _verify_phase2(self, session: BaseSession, member: discord.Member, config: dict):
+        """Fase 2 de la verificación (ver _start_verification)"""
+        try:
             # Verificar una vez más
             if not await self._is_still_active(session, member):
                 # Se fue entre 3s y 10s: Borrar notificación
@@ -97,23 +124,48 @@ class BaseSessionManager(ABC):
             logger.debug(f'✅ Sesión confirmada: {session.username} > {self.min_duration_seconds}s')
         
         except asyncio.CancelledError:
-            logger.debug(f'Task de verificación cancelada para {session.username}')
-            if session.notification_message:
-                try:
-                    await session.notification_message.delete()
-                    logger.info(f'🗑️  Notificación borrada por cancelación: {session.username}')
-                except discord.errors.NotFound:
-                    logger.debug(f'⚠️  Mensaje ya fue borrado por cancelación: {session.username}')
-                except Exception as e:
-                    logger.error(f'❌ Error borrando notificación por cancelación: {e}')
+            await self._delete_notification_on_cancel(session)
         except Exception as e:
             logger.error(f'❌ Error en _verify_session para {session.username}: {e}')
         finally:
-            # Asegurarse de que la sesión se limpie si la task termina por cualquier razón
-            if session.user_id in self.active_sessions and self.active_sessions[session.user_id] == session:
-                if not session.is_confirmed:
-                    del self.active_sessions[session.user_id]
-                    logger.debug(f'🗑️  Sesión limpiada (no confirmada) para {session.username}')
+            # Asegurarse de que la sesión se limpie si la verificación termina por cualquier razón
+            self._cleanup_unconfirmed(session)
+    
+    def _on_verification_cancelled(self, session: BaseSession):
+        """Timer de verificación cancelado antes de disparar: misma limpieza que al cancelar la task"""
+        logger.debug(f'Verificación cancelada para {session.username}')
+        if session.notification_message:
+            asyncio.get_running_loop().create_task(self._delete_notification_on_cancel(session))
+        self._cleanup_unconfirmed(session)
+    
+    async def _delete_notification_on_cancel(self, session: BaseSession):
+        if session.notification_message:
+            try:
+                await session.notification_message.delete()
+                logger.info(f'🗑️  Notificación borrada por cancelación: {session.username}')
+            except discord.errors.NotFound:
+                logger.debug(f'⚠️  Mensaje ya fue borrado por cancelación: {session.username}')
+            except Exception as e:
+                logger.error(f'❌ Error borrando notificación por cancelación: {e}')
+    
+    def _cleanup_unconfirmed(self, session: BaseSession):
+        if session.user_id in self.active_sessions and self.active_sessions[session.user_id] == session:
+            if not session.is_confirmed:
+                del self.active_sessions[session.user_id]
+                logger.debug(f'🗑️  Sesión limpiada (no confirmada) para {session.username}')
+    
+    def _schedule_grace_expiry(self, session: BaseSession, callback, *args):
+        """
+        Programa `callback(*args)` para el momento exacto en que vence la gracia de la
+        sesión (última actividad + grace_period_seconds). Reemplaza el timer anterior.
+        
+        El callback debe revalidar la sesión: puede haber habido actividad mientras tanto.
+        """
+        if session.grace_timer is not None:
+            session.grace_timer.cancel()
+        elapsed = (datetime.now() - session.last_activity_update).total_seconds()
+        delay = max(0.0, self.grace_period_seconds - elapsed) + 1
+        session.grace_timer = get_scheduler().call_later(delay, callback, *args)
     
     def _update_activity(self, session: BaseSession):
         """
@@ -1,73 +1,291 @@
 """
 Módulo de cooldown (anti-spam)
 Maneja el sistema de cooldown de 10 minutos para eventos
+
+Los cooldowns viven en memoria como instantes monotónicos (sin parsear fechas
+ni reescribir stats.json en cada chequeo). Cada clave tiene un deadline de
+vencimiento: pasado ese momento ningún chequeo puede estar en cooldown y la
+clave se descarta. Se persisten en un archivo propio (cooldowns.json), de
+forma diferida, solo para sobrevivir a reinicios.
 """
 
+import heapq
 import logging
-from datetime import datetime, timedelta
-from core.persistence import stats, save_stats
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from core.atomic_io import load_json_with_fallback, write_json_atomic
+from core.persistence import DATA_DIR, stats, save_stats
+from core.scheduler import get_scheduler
 
 logger = logging.getLogger('dsbot')
 
+COOLDOWNS_FILE = DATA_DIR / 'cooldowns.json'
+
+# Cooldowns heredados de stats['cooldowns'] no guardan su duración: se conservan 24h
+LEGACY_TTL_SECONDS = 24 * 3600
+
+
+class CooldownStore:
+    """
+    Cooldowns en memoria con vencimiento.
+
+    Por clave guarda el instante monotónico del último evento exitoso y el
+    deadline a partir del cual ya no puede estar en cooldown (el mayor
+    cooldown con el que se registró).
+    """
+
+    def __init__(self, path: Optional[Path] = None, save_delay_seconds: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic, wall_clock: Callable[[], float] = time.time):
+        """
+        Args:
+            path: Archivo de persistencia (None = solo memoria)
+            save_delay_seconds: Demora de la escritura diferida tras un cambio
+            clock: Reloj monotónico
+            wall_clock: Reloj de pared (solo para persistir entre reinicios)
+        """
+        self.path = Path(path) if path is not None else None
+        self.save_delay_seconds = save_delay_seconds
+        self._clock = clock
+        self._wall_clock = wall_clock
+        self._last: Dict[str, float] = {}
+        self._expires: Dict[str, float] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._dirty = False
+        self._save_timer = None
+
+    def __len__(self) -> int:
+        return len(self._last)
+
+    def now(self) -> float:
+        """Instante actual del reloj monotónico del store"""
+        return self._clock()
+
+    def check(self, key: str, cooldown_seconds: float) -> bool:
+        """
+        Verifica y consume el cooldown de una clave.
+
+        Returns:
+            True si pasó el cooldown (y se registra el evento), False si está activo
+        """
+        now = self._clock()
+        self.evict_expired(now)
+        last = self._last.get(key)
+        if last is not None and now - last < cooldown_seconds:
+            logger.debug(f'⏳ En cooldown: {key} ({int(now - last)}s desde última notificación < {cooldown_seconds}s)')
+            return False
+        self.record(key, cooldown_seconds, at=now)
+        return True
+
+    def passed(self, key: str, cooldown_seconds: float) -> bool:
+        """True si el cooldown ya pasó (sin consumirlo)"""
+        last = self._last.get(key)
+        return last is None or self._clock() - last >= cooldown_seconds
+
+    def seconds_since(self, key: str) -> Optional[float]:
+        """Segundos desde el último evento de la clave o None"""
+        last = self._last.get(key)
+        return None if last is None else self._clock() - last
+
+    def record(self, key: str, cooldown_seconds: float, at: Optional[float] = None):
+        """
+        Registra un evento de la clave.
+
+        Args:
+            key: Clave del cooldown
+            cooldown_seconds: Duración del cooldown (define el vencimiento de la clave)
+            at: Instante monotónico del evento (default: ahora)
+        """
+        at = self._clock() if at is None else at
+        self._last[key] = at
+        expires = max(self._expires.get(key, 0.0), at + cooldown_seconds)
+        self._expires[key] = expires
+        heapq.heappush(self._heap, (expires, key))
+        self._mark_dirty()
+
+    def evict_expired(self, now: Optional[float] = None) -> int:
+        """
+        Descarta las claves vencidas.
+
+        Returns:
+            Cantidad de claves eliminadas
+        """
+        now = self._clock() if now is None else now
+        evicted = 0
+        while self._heap and self._heap[0][0] <= now:
+            expires, key = heapq.heappop(self._heap)
+            if self._expires.get(key) != expires:
+                continue  # Entrada vieja: la clave se renovó
+            del self._expires[key]
+            del self._last[key]
+            evicted += 1
+        if evicted:
+            self._mark_dirty()
+        return evicted
+
+    def clear(self):
+        """Elimina todos los cooldowns"""
+        self._last.clear()
+        self._expires.clear()
+        self._heap.clear()
+        self._mark_dirty()
+
+    # ==================== PERSISTENCIA ====================
+
+    def _mark_dirty(self):
+        self._dirty = True
+        if self.path is None or (self._save_timer is not None and not self._save_timer.done()):
+            return
+        self._save_timer = get_scheduler().call_later(self.save_delay_seconds, self.flush)
+
+    def _to_wall(self, instant: float, now: float, wall_now: float) -> float:
+        return wall_now - (now - instant)
+
+    def flush(self) -> bool:
+        """
+        Escribe los cooldowns vigentes si hubo cambios.
+
+        Returns:
+            True si escribió el archivo
+        """
+        if not self._dirty or self.path is None:
+            return False
+        now = self._clock()
+        wall_now = self._wall_clock()
+        self.evict_expired(now)
+        data = {
+            key: [round(self._to_wall(last, now, wall_now), 3), round(self._to_wall(self._expires[key], now, wall_now), 3)]
+            for key, last in self._last.items()
+        }
+        try:
+            write_json_atomic(self.path, data, indent=None)
+        except OSError as e:
+            logger.error(f'❌ Error guardando cooldowns: {e}')
+            return False
+        self._dirty = False
+        return True
+
+    def load(self) -> int:
+        """
+        Carga los cooldowns persistidos (descarta los vencidos).
+
+        Returns:
+            Cantidad de claves cargadas
+        """
+        if self.path is None or not self.path.exists():
+            return 0
+        data, _ = load_json_with_fallback(self.path)
+        if not isinstance(data, dict):
+            return 0
+        now = self._clock()
+        wall_now = self._wall_clock()
+        loaded = 0
+        for key, value in data.items():
+            try:
+                last_wall, expires_wall = float(value[0]), float(value[1])
+            except (TypeError, ValueError, IndexError):
+                continue
+            if expires_wall <= wall_now:
+                continue
+            self._last[key] = now - (wall_now - last_wall)
+            self._expires[key] = now + (expires_wall - wall_now)
+            heapq.heappush(self._heap, (self._expires[key], key))
+            loaded += 1
+        return loaded
+
+    def import_legacy(self, cooldowns: Dict[str, str], ttl_seconds: float = LEGACY_TTL_SECONDS) -> int:
+        """
+        Migra cooldowns del formato anterior (stats['cooldowns']: clave -> ISO).
+
+        Returns:
+            Cantidad de claves migradas (las vencidas se descartan)
+        """
+        now = self._clock()
+        wall_now = datetime.now()
+        imported = 0
+        for key, value in cooldowns.items():
+            try:
+                elapsed = (wall_now - datetime.fromisoformat(value)).total_seconds()
+            except (TypeError, ValueError):
+                continue
+            if elapsed >= ttl_seconds or key in self._last:
+                continue
+            self.record(key, ttl_seconds, at=now - max(0.0, elapsed))
+            imported += 1
+        return imported
+
+
+_store: Optional[CooldownStore] = None
+
+
+def get_cooldown_store() -> CooldownStore:
+    """Store de cooldowns del proceso (se carga de cooldowns.json en el primer uso)"""
+    global _store
+    if _store is None:
+        _store = CooldownStore(COOLDOWNS_FILE)
+        loaded = _store.load()
+        if loaded:
+            logger.debug(f'⏱️ {loaded} cooldowns cargados desde {COOLDOWNS_FILE}')
+    return _store
+
+
+def migrate_legacy_cooldowns() -> int:
+    """
+    Migración única desde stats['cooldowns'] (antes se guardaban en stats.json).
+    Paso explícito del arranque (setup_hook): importar el módulo no escribe nada.
+
+    Returns:
+        Cantidad de cooldowns vigentes migrados
+    """
+    legacy = stats.get('cooldowns')
+    if not legacy:
+        return 0
+    store = get_cooldown_store()
+    imported = store.import_legacy(legacy)
+    stats['cooldowns'] = {}
+    save_stats()
+    store.flush()
+    logger.info(f'⏱️ Cooldowns migrados desde stats.json: {imported} vigentes (de {len(legacy)})')
+    return imported
+
+
+def flush_cooldowns() -> bool:
+    """Fuerza la escritura de los cooldowns pendientes (shutdown)"""
+    if _store is None:
+        return False
+    return _store.flush()
+
 
 def check_cooldown(user_id, event_key, cooldown_seconds=600):
     """
     Verifica si pasó el tiempo de cooldown desde el último evento similar.
-    
+
     El cooldown es PREDECIBLE: se cuenta desde la última notificación EXITOSA.
     Si pasaron >cooldown_seconds desde la última notificación → Permite nueva notificación.
     Si pasaron <cooldown_seconds → Rechaza sin actualizar el timestamp.
-    
+
     Args:
         user_id: ID del usuario
         event_key: Clave del evento (ej: 'game:Fortnite', 'voice', 'daily_connection')
         cooldown_seconds: Tiempo de cooldown en segundos (default: 600 = 10 minutos)
-    
+
     Retorna True si puede registrar el evento, False si está en cooldown.
     """
-    cooldown_key = f"{user_id}:{event_key}"
-    last_time_str = stats['cooldowns'].get(cooldown_key)
-    now = datetime.now()
-    
-    if last_time_str:
-        try:
-            last_time = datetime.fromisoformat(last_time_str)
-            time_since_last = (now - last_time).total_seconds()
-            
-            if time_since_last < cooldown_seconds:
-                # Cooldown activo: NO actualizar timestamp (cooldown predecible)
-                logger.debug(f'⏳ En cooldown: {cooldown_key} ({int(time_since_last)}s desde última notificación < {cooldown_seconds}s)')
-                return False
-        except ValueError:
-            pass
-    
-    # Cooldown pasó o no existía: Actualizar y permitir notificación
-    stats['cooldowns'][cooldown_key] = now.isoformat()
-    save_stats()
-    return True
+    return get_cooldown_store().check(f"{user_id}:{event_key}", cooldown_seconds)
 
 
 def is_cooldown_passed(user_id, event_key, cooldown_seconds=600):
     """
     Verifica si pasó el tiempo de cooldown SIN actualizarlo.
     Útil para verificar el estado del cooldown sin consumirlo.
-    
+
     Args:
         user_id: ID del usuario
         event_key: Clave del evento
         cooldown_seconds: Tiempo de cooldown en segundos
-    
+
     Retorna True si el cooldown ya pasó, False si aún está activo.
     """
-    cooldown_key = f"{user_id}:{event_key}"
-    last_time_str = stats['cooldowns'].get(cooldown_key)
-    
-    if not last_time_str:
-        return True  # No hay cooldown registrado, se considera que pasó
-    
-    try:
-        last_time = datetime.fromisoformat(last_time_str)
-        return datetime.now() - last_time >= timedelta(seconds=cooldown_seconds)
-    except ValueError:
-        return True  # Error al parsear, se considera que pasó
-
+    return get_cooldown_store().passed(f"{user_id}:{event_key}", cooldown_seconds)
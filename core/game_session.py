@@ -4,7 +4,6 @@ Maneja tracking, notificaciones y verificación de duración mínima
 Incluye supresión de notificaciones cuando hay party activa
 """
 
-import asyncio
 import logging
 from typing import Optional, Dict, TYPE_CHECKING
 from datetime import datetime
@@ -19,6 +18,7 @@ from core.cooldown import check_cooldown, is_cooldown_passed
 from core.helpers import send_notification, get_activity_verb
 
 if TYPE_CHECKING:
+    from core.guild_shards import GuildShards
     from core.party_session import PartySessionManager
 
 logger = logging.getLogger('dsbot')
@@ -36,25 +36,42 @@ class GameSession(BaseSession):
 
 
 class GameSessionManager(BaseSessionManager):
-    """Gestiona todas las sesiones de juego activas"""
+    """
+    Gestiona todas las sesiones de juego activas.
+    
+    No se particiona por servidor: la actividad de juego es una presencia del
+    usuario que Discord repite en cada servidor compartido, y la key
+    (user_id, game_name) es la que evita contar el mismo juego dos veces.
+    """
     
     def __init__(
         self,
         bot,
         party_manager: Optional['PartySessionManager'] = None,
         grace_period_seconds: int = 900,
+        party_managers: Optional['GuildShards'] = None,
     ):
         """
         grace_period_seconds: gracia antes de dar por cerrada una sesión de juego cuando
         Discord deja de reportar la actividad (huecos tipo lobby LoL). Default 15 min.
+        party_managers: PartySessionManager por servidor (tiene prioridad sobre party_manager)
         """
         super().__init__(bot, min_duration_seconds=10, grace_period_seconds=grace_period_seconds)
         self.party_manager = party_manager
+        self.party_managers = party_managers
     
     def set_party_manager(self, party_manager: 'PartySessionManager'):
         """Establece referencia al PartySessionManager (llamado después de inicialización)"""
         self.party_manager = party_manager
     
+    def _in_party(self, guild_id: int, game_name: str, user_id: str) -> bool:
+        """Si el usuario está en una party activa/formándose del juego en ese servidor"""
+        if self.party_managers is not None:
+            party_manager = self.party_managers.peek(guild_id)
+        else:
+            party_manager = self.party_manager
+        return bool(party_manager and party_manager.has_active_party(game_name, user_id))
+    
     # Métodos abstractos requeridos por BaseSessionManager
     async def handle_start(self, member: discord.Member, config: dict, *args, **kwargs):
         """
@@ -117,10 +134,8 @@ class GameSessionManager(BaseSessionManager):
         self.active_sessions[session_key] = session
         logger.debug(f'🎮 Nueva sesión: {member.display_name} - {game_name} (total sesiones: {len(self.active_sessions)})')
         
-        # Iniciar task de verificación en background (no bloquea)
-        session.verification_task = asyncio.create_task(
-            self._verify_session(session, member, config)
-        )
+        # Programar verificación en background (no bloquea)
+        self._start_verification(session, member, config)
     
     async def handle_game_end(self, member: discord.Member, game_name: str, config: dict):
         """
@@ -161,6 +176,8 @@ class GameSessionManager(BaseSessionManager):
                 logger.warning(f'⚠️  Sesión en gracia demasiado tiempo ({int(time_in_grace)}s): Finalizando {member.display_name} - {game_name}')
                 # NO retornar, continuar con finalización
             else:
+                # Revisar exactamente cuando venza la gracia (sin esperar al health check)
+                self._schedule_grace_expiry(session, self._on_grace_expired, session, member, game_name, config)
                 return
         
         # Cancelar task de verificación si aún está corriendo
@@ -197,7 +214,7 @@ class GameSessionManager(BaseSessionManager):
             # Sesión válida: guardar tiempo si duró al menos 1 minuto
             # 🚨 IMPORTANTE: NO guardar si el jugador está en una party activa de este juego
             # (el tiempo se guardará cuando la party termine para evitar duplicados)
-            is_in_party = self.party_manager and self.party_manager.has_active_party(game_name, user_id)
+            is_in_party = self._in_party(session.guild_id, game_name, user_id)
             
             if minutes >= 1:
                 if is_in_party:
@@ -303,6 +320,15 @@ class GameSessionManager(BaseSessionManager):
         
         return False
     
+    async def _on_grace_expired(self, session: GameSession, member: discord.Member, game_name: str, config: dict):
+        """Venció la gracia de una sesión que terminó: cerrarla si Discord no volvió a reportarla"""
+        if self.active_sessions.get((session.user_id, game_name)) is not session:
+            return  # Ya se cerró o fue reemplazada
+        if await self._is_still_active(session, member):
+            logger.debug(f'✅ Sesión sigue activa al vencer la gracia: {session.username} - {game_name}')
+            return
+        await self.handle_game_end(member, game_name, config)
+    
     async def _on_session_confirmed_phase1(self, session: BaseSession, member: discord.Member, config: dict):
         """Callback cuando la sesión es confirmada después de 3s"""
         if not isinstance(session, GameSession):
@@ -313,7 +339,7 @@ class GameSessionManager(BaseSessionManager):
         
         # 🎮 Verificar si el usuario está EN una party activa/formándose de este juego
         # (suprime notificación individual si ya hay party)
-        if self.party_manager and self.party_manager.has_active_party(session.game_name, session.user_id):
+        if self._in_party(session.guild_id, session.game_name, session.user_id):
             logger.debug(f'⏭️  Notificación de game suprimida: {session.username} - {session.game_name} (en party)')
             session.entry_notification_sent = False  # No notificar, pero sí trackear tiempo
             return
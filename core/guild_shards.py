@@ -0,0 +1,59 @@
+"""
+Managers de sesiones particionados por servidor
+Cada servidor tiene su propia instancia (creada la primera vez que se usa),
+así dos servidores jugando al mismo juego no comparten parties y los
+recorridos del health check se limitan a los servidores con sesiones.
+"""
+
+import logging
+from typing import Callable, Dict, Generic, Iterator, List, Optional, Tuple, TypeVar
+
+logger = logging.getLogger('dsbot')
+
+M = TypeVar('M')
+
+
+class GuildShards(Generic[M]):
+    """Registro de managers por guild_id con creación perezosa"""
+
+    def __init__(self, factory: Callable[[int], M]):
+        """
+        Args:
+            factory: Función que crea el manager de un servidor a partir de su guild_id
+        """
+        self._factory = factory
+        self._shards: Dict[int, M] = {}
+
+    def get(self, guild_id: int) -> M:
+        """Manager del servidor (lo crea si no existe)"""
+        manager = self._shards.get(guild_id)
+        if manager is None:
+            manager = self._shards[guild_id] = self._factory(guild_id)
+            logger.debug(f'🧩 Manager creado para servidor {guild_id}: {type(manager).__name__}')
+        return manager
+
+    def peek(self, guild_id: int) -> Optional[M]:
+        """Manager del servidor o None si todavía no se creó"""
+        return self._shards.get(guild_id)
+
+    def items(self) -> List[Tuple[int, M]]:
+        """Copia de (guild_id, manager) (segura para modificar durante la iteración)"""
+        return list(self._shards.items())
+
+    def with_sessions(self) -> List[Tuple[int, M]]:
+        """(guild_id, manager) de los servidores con sesiones activas"""
+        return [(guild_id, manager) for guild_id, manager in self._shards.items()
+                if getattr(manager, 'active_sessions', None)]
+
+    def session_count(self) -> int:
+        """Total de sesiones activas en todos los servidores"""
+        return sum(len(getattr(manager, 'active_sessions', ())) for manager in self._shards.values())
+
+    def __iter__(self) -> Iterator[M]:
+        return iter(list(self._shards.values()))
+
+    def __len__(self) -> int:
+        return len(self._shards)
+
+    def __contains__(self, guild_id: int) -> bool:
+        return guild_id in self._shards
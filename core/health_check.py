@@ -14,7 +14,9 @@ from core.pending_notifications import (
     remove_voice_notification
 )
 from core.cooldown import check_cooldown
+from core.metrics import get_metrics
 from core.persistence import stats, save_stats
+from core.session_dto import clear_game_session
 
 logger = logging.getLogger('dsbot')
 
@@ -28,19 +30,19 @@ class SessionHealthCheck:
     2. Health check periódico (cada 30 min): Finaliza sesiones con grace period expirado
     """
     
-    def __init__(self, bot, voice_manager, game_manager, party_manager, config):
+    def __init__(self, bot, voice_managers, game_manager, party_managers, config):
         """
         Args:
             bot: Instancia del bot de Discord
-            voice_manager: VoiceSessionManager
+            voice_managers: GuildShards de VoiceSessionManager (uno por servidor)
             game_manager: GameSessionManager
-            party_manager: PartySessionManager
+            party_managers: GuildShards de PartySessionManager (uno por servidor)
             config: Configuración del bot
         """
         self.bot = bot
-        self.voice_manager = voice_manager
+        self.voice_managers = voice_managers
         self.game_manager = game_manager
-        self.party_manager = party_manager
+        self.party_managers = party_managers
         self.config = config
         self._recovery_done = False
         
@@ -118,7 +120,7 @@ class SessionHealthCheck:
                         session.is_confirmed = True
                         session.entry_notification_sent = True
                         
-                        self.voice_manager.active_sessions[user_id] = session
+                        self.voice_managers.get(member_obj.guild.id).active_sessions[user_id] = session
                         
                         # Activar cooldown para evitar re-notificar (30 minutos)
                         check_cooldown(user_id, 'voice', cooldown_seconds=1800)
@@ -228,41 +230,41 @@ class SessionHealthCheck:
     
     async def _recover_party_sessions(self):
         """
-        Recupera party sessions desde stats.json.
+        Recupera party sessions desde stats.json (partición de cada servidor).
         Recovery agresivo: Recupera si <2h, sin verificar jugadores.
         Si <2 jugadores, el grace period (20 min) la cerrará.
+        Las parties de la partición legacy (sin servidor) se asignan al primer servidor.
         """
+        from core.party_session import PartySession, active_parties_store, iter_active_party_stores
+        
         try:
             restored = 0
+            default_guild_id = next((guild.id for guild in self.bot.guilds), None)
             
-            for game_name, party_data in stats.get('parties', {}).get('active', {}).items():
-                try:
-                    # Leer start_time ORIGINAL
-                    start_time = datetime.fromisoformat(party_data['start'])
-                    
-                    # Solo recuperar parties recientes (<2h)
-                    age_hours = (datetime.now() - start_time).total_seconds() / 3600
-                    if age_hours > 2:
-                        continue
-                    
-                    # Recrear party con datos del disco (sin verificar jugadores actuales)
-                    guild_id = None
-                    for guild in self.bot.guilds:
-                        guild_id = guild.id
-                        break
-                    
-                    if not guild_id:
-                        continue
-                    
-                    # Usar datos del disco
-                    player_ids = set(party_data.get('players', []))
-                    player_names = party_data.get('player_names', [])
-                    
-                    if len(player_ids) >= 2:
-                        from core.party_session import PartySession
+            for store_guild_id, store in iter_active_party_stores():
+                guild_id = store_guild_id if store_guild_id is not None else default_guild_id
+                if guild_id is None:
+                    continue
+                
+                for game_name, party_data in list(store.items()):
+                    try:
+                        # Leer start_time ORIGINAL
+                        start_time = datetime.fromisoformat(party_data['start'])
                         
-                        player_ids = {p['user_id'] for p in current_players}
-                        player_names = [p['username'] for p in current_players]
+                        # Solo recuperar parties recientes (<2h)
+                        age_hours = (datetime.now() - start_time).total_seconds() / 3600
+                        if age_hours > 2:
+                            continue
+                        
+                        # Usar datos del disco (sin verificar jugadores actuales)
+                        player_ids = set(party_data.get('players', []))
+                        player_names = party_data.get('player_names', [])
+                        if len(player_ids) < 2:
+                            continue
+                        
+                        if store_guild_id is None:
+                            # Migrar a la partición del servidor
+                            active_parties_store(guild_id)[game_name] = store.pop(game_name)
                         
                         session = PartySession(
                             game_name=game_name,
@@ -276,13 +278,13 @@ class SessionHealthCheck:
                         session.is_confirmed = True
                         session.notification_message = None
                         
-                        self.party_manager.active_sessions[game_name] = session
+                        self.party_managers.get(guild_id).active_sessions[game_name] = session
                         
                         restored += 1
-                        logger.info(f'♻️  Party restaurada: {game_name} con {len(current_players)} jugadores (inicio: {start_time.strftime("%H:%M")})')
-                
-                except Exception as e:
-                    logger.error(f'Error recuperando party {game_name}: {e}')
+                        logger.info(f'♻️  Party restaurada: {game_name} con {len(player_ids)} jugadores (inicio: {start_time.strftime("%H:%M")})')
+                    
+                    except Exception as e:
+                        logger.error(f'Error recuperando party {game_name}: {e}')
             
             return restored
         
@@ -304,9 +306,11 @@ class SessionHealthCheck:
         try:
             # Contar sesiones activas
             game_sessions = len(self.game_manager.active_sessions)
-            party_sessions = len(self.party_manager.active_sessions)
+            party_sessions = self.party_managers.session_count()
             
-            logger.info(f'🏥 Health check iniciado (games: {game_sessions}, parties: {party_sessions})')
+            lag = get_metrics().latency('dsbot_event_loop_lag_seconds')
+            lag_info = f', lag p99: {lag.summary()["p99_ms"]:.0f} ms' if lag else ''
+            logger.info(f'🏥 Health check iniciado (games: {game_sessions}, parties: {party_sessions}{lag_info})')
             
             finalized = 0
             
@@ -428,20 +432,41 @@ class SessionHealthCheck:
         finalized = 0
         recovered = 0
         now = datetime.now()
-        grace_period_seconds = getattr(self.party_manager, 'grace_period_seconds', 300)
+        
+        # Solo servidores con parties activas
+        for guild_id, party_manager in self.party_managers.with_sessions():
+            guild_finalized, guild_recovered = await self._check_guild_party_sessions(party_manager, now)
+            finalized += guild_finalized
+            recovered += guild_recovered
+        
+        if recovered > 0:
+            logger.debug(f'✅ {recovered} parties validadas (siguen activas)')
+        
+        return finalized
+    
+    async def _check_guild_party_sessions(self, party_manager, now: datetime):
+        """
+        Revisa las parties de un servidor (ver _check_party_sessions).
+        
+        Returns:
+            Tupla (finalizadas, validadas como activas)
+        """
+        finalized = 0
+        recovered = 0
+        grace_period_seconds = getattr(party_manager, 'grace_period_seconds', 300)
         
         # Copiar lista para evitar modificación durante iteración
-        sessions_to_check = list(self.party_manager.active_sessions.items())
+        sessions_to_check = list(party_manager.active_sessions.items())
         
         for game_name, session in sessions_to_check:
             try:
                 # 1. Verificar grace periods INDIVIDUALES de jugadores
-                players_removed = self.party_manager.check_player_grace_periods(game_name)
+                players_removed = party_manager.check_player_grace_periods(game_name)
                 if players_removed > 0:
                     logger.debug(f'♻️  {players_removed} jugadores salieron definitivamente de party: {game_name}')
                 
                 # Verificar si aún existe la sesión (puede haberse cerrado en check_player_grace_periods)
-                if game_name not in self.party_manager.active_sessions:
+                if game_name not in party_manager.active_sessions:
                     continue
                 
                 # Calcular tiempo desde última actividad de la party
@@ -457,11 +482,11 @@ class SessionHealthCheck:
                 )
                 
                 # 3. Verificar estado REAL en Discord
-                is_still_active = await self.party_manager._is_still_active(session, None)
+                is_still_active = await party_manager._is_still_active(session, None)
                 
                 if is_still_active:
                     # Party SIGUE activa! Actualizar timestamp
-                    self.party_manager._update_activity(session)
+                    party_manager._update_activity(session)
                     recovered += 1
                     logger.debug(
                         f'✅ Party activa: {game_name} '
@@ -475,16 +500,13 @@ class SessionHealthCheck:
                     f'🔄 Finalizando party expirada: {game_name} '
                     f'({int(time_since_activity/60)} min sin actividad, <2 jugadores)'
                 )
-                await self.party_manager.handle_end(game_name, self.config)
+                await party_manager.handle_end(game_name, self.config)
                 finalized += 1
             
             except Exception as e:
                 logger.error(f'Error revisando party {game_name}: {e}')
         
-        if recovered > 0:
-            logger.debug(f'✅ {recovered} parties validadas (siguen activas)')
-        
-        return finalized
+        return finalized, recovered
     
     async def _get_member(self, user_id: int, guild_id: int):
         """
@@ -550,36 +572,40 @@ class SessionHealthCheck:
                         
                         if age_hours > max_age_hours:
                             # Sesión huérfana antigua, limpiar
-                            game_data['current_session'] = None
+                            clear_game_session(user_id, game_name)
                             username = user_data.get('username', 'Unknown')
                             logger.warning(f'🧹 Sesión colgada limpiada: {username} - {game_name} ({age_hours:.1f}h)')
                             cleaned += 1
                     except Exception as e:
                         logger.error(f'Error procesando current_session de {game_name}: {e}')
             
-            # Limpiar party sessions huérfanas
-            parties_to_remove = []
-            for game_name, party_data in stats.get('parties', {}).get('active', {}).items():
-                # Verificar si está en memoria
-                if game_name in self.party_manager.active_sessions:
-                    continue  # Está activa en memoria, OK
-                
-                # Calcular antigüedad
-                try:
-                    start_time = datetime.fromisoformat(party_data['start'])
-                    age_hours = (now - start_time).total_seconds() / 3600
-                    
-                    if age_hours > max_age_hours:
-                        # Party huérfana antigua, marcar para eliminar
-                        parties_to_remove.append(game_name)
-                        logger.warning(f'🧹 Party colgada limpiada: {game_name} ({age_hours:.1f}h)')
-                        cleaned += 1
-                except Exception as e:
-                    logger.error(f'Error procesando party activa de {game_name}: {e}')
+            # Limpiar party sessions huérfanas (por partición de servidor)
+            from core.party_session import iter_active_party_stores
             
-            # Eliminar parties marcadas
-            for game_name in parties_to_remove:
-                del stats['parties']['active'][game_name]
+            for guild_id, store in iter_active_party_stores():
+                party_manager = self.party_managers.peek(guild_id) if guild_id is not None else None
+                parties_to_remove = []
+                for game_name, party_data in store.items():
+                    # Verificar si está en memoria
+                    if party_manager is not None and game_name in party_manager.active_sessions:
+                        continue  # Está activa en memoria, OK
+                    
+                    # Calcular antigüedad
+                    try:
+                        start_time = datetime.fromisoformat(party_data['start'])
+                        age_hours = (now - start_time).total_seconds() / 3600
+                        
+                        if age_hours > max_age_hours:
+                            # Party huérfana antigua, marcar para eliminar
+                            parties_to_remove.append(game_name)
+                            logger.warning(f'🧹 Party colgada limpiada: {game_name} ({age_hours:.1f}h)')
+                            cleaned += 1
+                    except Exception as e:
+                        logger.error(f'Error procesando party activa de {game_name}: {e}')
+                
+                # Eliminar parties marcadas
+                for game_name in parties_to_remove:
+                    del store[game_name]
             
             # Guardar cambios si hubo limpieza
             if cleaned > 0:
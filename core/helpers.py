@@ -5,9 +5,9 @@ Funciones helper para el bot
 
 import re
 import discord
-import asyncio
 import logging
 from core.persistence import get_channel_id
+from core.notification_queue import get_dispatcher
 
 logger = logging.getLogger('dsbot')
 
@@ -111,51 +111,43 @@ def get_primary_game_activity(activities):
     return None
 
 
-async def send_notification(message, bot, return_message=False):
-    """Envía un mensaje al canal configurado con manejo de errores robusto
+async def send_notification(message, bot, return_message=False, coalesce_key=None):
+    """Encola un mensaje para el canal configurado
+    
+    El envío lo hace el dispatcher de core/notification_queue.py, que respeta
+    el rate limit del canal y reintenta con backoff; el handler que notifica
+    no queda bloqueado esperando a Discord.
     
     Args:
         message: Contenido del mensaje a enviar
         bot: Instancia del bot
-        return_message: Si True, retorna el objeto Message enviado (para poder borrarlo después)
+        return_message: Si True, espera el envío y retorna el objeto Message (para poder borrarlo después)
+        coalesce_key: Si hay un mensaje pendiente con la misma clave, se reemplaza en lugar de enviar ambos
         
     Returns:
         discord.Message si return_message=True y envío exitoso, None en otro caso
     """
+    future = queue_notification(message, bot, coalesce_key=coalesce_key)
+    if future is not None and return_message:
+        return await future
+    return None
+
+
+def queue_notification(message, bot, coalesce_key=None):
+    """Encola un mensaje para el canal configurado sin esperar el envío
+    
+    Args:
+        message: Contenido del mensaje a enviar
+        bot: Instancia del bot
+        coalesce_key: Si hay un mensaje pendiente con la misma clave, se reemplaza en lugar de enviar ambos
+        
+    Returns:
+        Future que se resuelve con el discord.Message enviado (o None si falló), None si no hay canal
+    """
     channel_id = get_channel_id()
     if not channel_id:
         logger.warning('⚠️  No hay canal configurado. Configura DISCORD_CHANNEL_ID o usa !setchannel')
         return None
     
-    try:
-        channel = bot.get_channel(channel_id)
-        if channel:
-            sent_message = await channel.send(message)
-            logger.info(f'✅ Notificación enviada: {message[:50]}...')
-            if return_message:
-                return sent_message
-        else:
-            logger.error(f'⚠️  No se encontró el canal con ID {channel_id}')
-            return None
-    except discord.errors.HTTPException as e:
-        if e.status == 429:  # Rate limited
-            retry_after = e.retry_after if hasattr(e, 'retry_after') else 1.0
-            logger.warning(f'⚠️  Rate limited. Esperando {retry_after}s...')
-            await asyncio.sleep(retry_after)
-            try:
-                sent_message = await channel.send(message)
-                if return_message:
-                    return sent_message
-            except Exception as retry_error:
-                logger.error(f'❌ Error al reintentar: {retry_error}')
-                return None
-        else:
-            logger.error(f'❌ Error HTTP: {e}')
-            return None
-    except discord.errors.Forbidden:
-        logger.error(f'⚠️  Sin permisos para enviar mensajes al canal {channel_id}')
-        return None
-    except Exception as e:
-        logger.error(f'❌ Error al enviar notificación: {e}')
-        return None
+    return get_dispatcher().submit(bot, channel_id, message, coalesce_key=coalesce_key)
 
@@ -0,0 +1,134 @@
+"""
+Codec JSON para stats.json y el journal
+Usa orjson o msgspec si están instalados (varias veces más rápidos que el
+módulo json) y si no, la librería estándar. Todos producen el mismo JSON:
+compacto por defecto, con indentación solo en modo `pretty` (ej: !export).
+"""
+
+import json
+import logging
+from typing import Any, Optional, Union
+
+logger = logging.getLogger('dsbot')
+
+# Orden de preferencia en modo auto
+PREFERRED = ('orjson', 'msgspec', 'json')
+
+
+class JsonCodec:
+    """Codec de la librería estándar (siempre disponible)"""
+
+    name = 'json'
+
+    def dumps(self, data: Any, pretty: bool = False) -> bytes:
+        """
+        Serializa a JSON UTF-8.
+
+        Args:
+            data: Objeto serializable
+            pretty: Indentar con 2 espacios (más grande y lento, para lectura humana)
+        """
+        if pretty:
+            text = json.dumps(data, indent=2, ensure_ascii=False)
+        else:
+            text = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+        return text.encode('utf-8')
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        """
+        Parsea JSON.
+
+        Raises:
+            ValueError: Si el contenido no es JSON válido
+        """
+        return json.loads(data)
+
+
+class OrjsonCodec(JsonCodec):
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+
+    def dumps(self, data: Any, pretty: bool = False) -> bytes:
+        option = self._orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= self._orjson.OPT_INDENT_2
+        return self._orjson.dumps(data, option=option)
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        # orjson.JSONDecodeError ya es subclase de ValueError
+        return self._orjson.loads(data)
+
+
+class MsgspecCodec(JsonCodec):
+    name = 'msgspec'
+
+    def __init__(self):
+        import msgspec
+        self._msgspec = msgspec
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+
+    def dumps(self, data: Any, pretty: bool = False) -> bytes:
+        encoded = self._encoder.encode(data)
+        if pretty:
+            return self._msgspec.json.format(encoded, indent=2)
+        return encoded
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        try:
+            return self._decoder.decode(data)
+        except self._msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+
+
+_CODECS = {
+    'orjson': OrjsonCodec,
+    'msgspec': MsgspecCodec,
+    'json': JsonCodec,
+}
+
+_codec: Optional[JsonCodec] = None
+
+
+def create_codec(name: str = 'auto') -> JsonCodec:
+    """
+    Crea el codec pedido, o el más rápido disponible con 'auto'.
+
+    Si la librería pedida no está instalada se usa la siguiente disponible.
+
+    Args:
+        name: auto | orjson | msgspec | json
+    """
+    name = (name or 'auto').strip().lower()
+    if name != 'auto' and name not in _CODECS:
+        logger.warning(f'⚠️ Codec JSON desconocido "{name}", usando auto')
+        name = 'auto'
+
+    candidates = PREFERRED if name == 'auto' else (name,) + PREFERRED
+    for candidate in candidates:
+        try:
+            codec = _CODECS[candidate]()
+        except ImportError:
+            if candidate == name:
+                logger.warning(f'⚠️ {name} no está instalado, usando otro codec JSON')
+            continue
+        return codec
+    return JsonCodec()
+
+
+def set_codec(name: str = 'auto') -> JsonCodec:
+    """Elige el codec del proceso (config['persistence']['json_codec'])"""
+    global _codec
+    _codec = create_codec(name)
+    logger.debug(f'🧬 Codec JSON: {_codec.name}')
+    return _codec
+
+
+def get_codec() -> JsonCodec:
+    """Codec JSON del proceso (auto si no se eligió uno)"""
+    if _codec is None:
+        return set_codec('auto')
+    return _codec
@@ -0,0 +1,372 @@
+"""
+Leaderboards mantenidos incrementalmente
+Los rankings (!topgamers, !topvoice, !topchat, StatsView, !wrapped) se leen
+de estructuras ordenadas que se actualizan en cada mutación de stats, en lugar
+de recorrer todos los usuarios y juegos y ordenar en cada consulta.
+
+- Un `Leaderboard` por (métrica, período) mantiene los usuarios ordenados
+  por puntaje con bisect: top-k en O(k), actualizar un usuario en O(log n)
+- Los períodos (today/week/month/year) puntúan con los rollups del bucket
+  de calendario en curso (core.rollups). Al cambiar de bucket el board del
+  período se reconstruye solo con los usuarios activos del bucket nuevo
+"""
+
+import logging
+from bisect import bisect_left, insort
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from core.rollups import StatsRollups, period_bucket
+
+logger = logging.getLogger('dsbot')
+
+PERIODS = ('all', 'today', 'week', 'month', 'year')
+
+
+class Leaderboard:
+    """
+    Ranking ordenado de miembros por puntaje (descendente).
+
+    Cada miembro guarda además una tupla de detalle (ej: sesiones, juegos
+    únicos) cuyos totales se mantienen junto al total de puntaje.
+    """
+
+    def __init__(self):
+        self._keys: List[Tuple[float, str]] = []
+        self._entries: Dict[str, Tuple[float, tuple]] = {}
+        self.total = 0
+        self.detail_totals: List[int] = []
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, member):
+        return member in self._entries
+
+    def get(self, member: str) -> Optional[Tuple[float, tuple]]:
+        """Retorna (score, detail) del miembro o None"""
+        return self._entries.get(member)
+
+    def update(self, member: str, score: float, detail: tuple = ()):
+        """
+        Inserta o actualiza un miembro.
+
+        Args:
+            member: Identificador (user_id)
+            score: Puntaje por el que se ordena
+            detail: Valores adicionales que se devuelven con el miembro
+        """
+        previous = self._entries.get(member)
+        if previous == (score, detail):
+            return
+        if previous is not None:
+            self._remove(member, previous)
+
+        insort(self._keys, (-score, member))
+        self._entries[member] = (score, detail)
+        self.total += score
+        if len(self.detail_totals) < len(detail):
+            self.detail_totals.extend([0] * (len(detail) - len(self.detail_totals)))
+        for i, value in enumerate(detail):
+            self.detail_totals[i] += value
+
+    def discard(self, member: str):
+        """Quita un miembro si existe"""
+        previous = self._entries.get(member)
+        if previous is not None:
+            self._remove(member, previous)
+
+    def _remove(self, member: str, entry: Tuple[float, tuple]):
+        score, detail = entry
+        index = bisect_left(self._keys, (-score, member))
+        del self._keys[index]
+        del self._entries[member]
+        self.total -= score
+        for i, value in enumerate(detail):
+            self.detail_totals[i] -= value
+
+    def clear(self):
+        self._keys.clear()
+        self._entries.clear()
+        self.total = 0
+        self.detail_totals = []
+
+    def top(self, limit: Optional[int] = None) -> List[Tuple[str, float, tuple]]:
+        """
+        Retorna los primeros `limit` miembros (todos si es None).
+
+        Returns:
+            Lista de (member, score, detail) ordenada por puntaje descendente
+        """
+        keys = self._keys[:limit] if limit else self._keys
+        return [(member, -neg_score, self._entries[member][1]) for neg_score, member in keys]
+
+    def rank_for_score(self, score: float) -> int:
+        """Posición (1-based) que ocuparía un puntaje: miembros con más puntaje + 1"""
+        return bisect_left(self._keys, (-score, '')) + 1
+
+    def rank(self, member: str) -> int:
+        """Posición (1-based) del miembro, 0 si no figura"""
+        entry = self._entries.get(member)
+        if entry is None:
+            return 0
+        return self.rank_for_score(entry[0])
+
+
+# ==================== MÉTRICAS ====================
+# Cada métrica tiene una función de puntaje histórico (sobre los datos del
+# usuario) y, si se mantiene por período, otra sobre los totales del bucket
+# (ver core.rollups.new_totals). Ambas retornan (score, detail) o None si el
+# usuario no figura en el ranking.
+
+def _game_time_all(user_data: Dict):
+    games = user_data.get('games', {})
+    minutes = sum(g.get('total_minutes', 0) for g in games.values())
+    sessions = sum(g.get('count', 0) for g in games.values())
+    if minutes > 0 or sessions > 0:
+        return minutes, (sessions, len(games))
+    return None
+
+
+def _game_time_period(totals: Dict):
+    if totals['game_minutes'] > 0 or totals['game_count'] > 0:
+        # Los juegos en 0 (solo sesiones históricas sin día) no suman como jugados
+        unique_games = sum(1 for minutes, count in totals['games'].values() if minutes or count)
+        return totals['game_minutes'], (totals['game_count'], unique_games)
+    return None
+
+
+def _voice_time_all(user_data: Dict):
+    voice = user_data.get('voice', {})
+    minutes, count = voice.get('total_minutes', 0), voice.get('count', 0)
+    if minutes > 0 or count > 0:
+        return minutes, (count,)
+    return None
+
+
+def _voice_time_period(totals: Dict):
+    if totals['voice_minutes'] > 0 or totals['voice_count'] > 0:
+        return totals['voice_minutes'], (totals['voice_count'],)
+    return None
+
+
+def _activity_all(user_data: Dict):
+    games = user_data.get('games', {})
+    voice = user_data.get('voice', {})
+    game_sessions = sum(g.get('count', 0) for g in games.values())
+    voice_count = voice.get('count', 0)
+    messages = user_data.get('messages', {}).get('count', 0)
+
+    sessions = game_sessions + voice_count
+    if sessions <= 0 and messages <= 0:
+        return None
+    minutes = sum(g.get('total_minutes', 0) for g in games.values()) + voice.get('total_minutes', 0)
+    return minutes, (sessions, game_sessions, voice_count, messages)
+
+
+def _activity_period(totals: Dict):
+    # Los mensajes no tienen fecha por evento: en períodos no cuentan
+    sessions = totals['game_count'] + totals['voice_count']
+    minutes = totals['game_minutes'] + totals['voice_minutes']
+    if sessions <= 0 and minutes <= 0:
+        return None
+    return minutes, (sessions, totals['game_count'], totals['voice_count'], 0)
+
+
+def _messages_all(user_data: Dict):
+    messages = user_data.get('messages', {})
+    if messages.get('count', 0) > 0:
+        return messages.get('count', 0), (messages.get('characters', 0),)
+    return None
+
+
+def _social_all(user_data: Dict):
+    score = user_data.get('messages', {}).get('count', 0) + user_data.get('reactions', {}).get('total', 0)
+    if score > 0:
+        return score, ()
+    return None
+
+
+# métrica -> (puntaje histórico, puntaje por período o None)
+METRICS: Dict[str, Tuple[Callable, Optional[Callable]]] = {
+    'game_time': (_game_time_all, _game_time_period),
+    'voice_time': (_voice_time_all, _voice_time_period),
+    'activity': (_activity_all, _activity_period),
+    'messages': (_messages_all, None),
+    'social': (_social_all, None),
+}
+
+# Operaciones de core.stats_mutations -> métricas que pueden cambiar
+OP_METRICS: Dict[str, Tuple[str, ...]] = {
+    'game_time': ('game_time', 'activity'),
+    'game_count': ('game_time', 'activity'),
+    'voice_time': ('voice_time', 'activity'),
+    'voice_count': ('voice_time', 'activity'),
+    'message': ('messages', 'social', 'activity'),
+    'reaction': ('social',),
+    'game_session_start': (),
+    'game_session_clear': (),
+    'voice_session_start': (),
+    'voice_session_clear': (),
+    'sticker': (),
+    'connection': (),
+}
+
+
+def score_user(metric: str, user_data: Dict):
+    """
+    Calcula el puntaje histórico de un usuario para una métrica.
+
+    Returns:
+        (score, detail) o None si el usuario no figura en el ranking
+    """
+    return METRICS[metric][0](user_data)
+
+
+class StatsLeaderboards:
+    """
+    Conjunto de leaderboards sobre el dict de stats en memoria.
+
+    Se construye de forma perezosa en la primera consulta (O(n log n)) y
+    luego se mantiene con `user_changed()` en cada mutación.
+    """
+
+    def __init__(self, source: Callable[[], Dict], rollups: StatsRollups):
+        """
+        Args:
+            source: Función que retorna el dict de stats en vivo
+            rollups: Rollups por período sobre el mismo dict
+        """
+        self._source = source
+        self._rollups = rollups
+        self._built_for: Optional[Dict] = None
+        self._built = False
+        self._boards: Dict[Tuple[str, str], Leaderboard] = {
+            (metric, period): Leaderboard()
+            for metric, (_, period_fn) in METRICS.items()
+            for period in PERIODS
+            if period == 'all' or period_fn is not None
+        }
+        # (métrica, período) -> bucket de calendario con el que se armó el board
+        self._buckets: Dict[Tuple[str, str], Optional[str]] = {}
+
+    def _live_users(self) -> Dict:
+        return (self._source() or {}).get('users', {})
+
+    def invalidate(self):
+        """Descarta los rankings (se reconstruyen en la próxima consulta)"""
+        self._built = False
+        self._built_for = None
+
+    def _ensure_built(self):
+        live = self._source()
+        if self._built and live is self._built_for:
+            return
+
+        for board in self._boards.values():
+            board.clear()
+        self._buckets.clear()
+
+        users = (live or {}).get('users', {})
+        for user_id, user_data in users.items():
+            for metric, (all_fn, _) in METRICS.items():
+                self._apply(self._boards[(metric, 'all')], user_id, all_fn(user_data))
+        # Se guarda la referencia (no el id) para detectar un dict reemplazado
+        self._built_for = live
+        self._built = True
+        logger.debug(f'🏆 Leaderboards reconstruidos ({len(users)} usuarios)')
+
+    @staticmethod
+    def _apply(board: Leaderboard, user_id: str, result):
+        if result is None:
+            board.discard(user_id)
+        else:
+            board.update(user_id, result[0], result[1])
+
+    def _ensure_bucket(self, metric: str, period: str, now: datetime):
+        """Reconstruye el board de un período si cambió el bucket de calendario"""
+        bucket = period_bucket(period, now)
+        if self._buckets.get((metric, period)) == bucket:
+            return
+
+        board = self._boards[(metric, period)]
+        board.clear()
+        period_fn = METRICS[metric][1]
+        for user_id, totals in self._rollups.period_users(period, now).items():
+            self._apply(board, user_id, period_fn(totals))
+        self._buckets[(metric, period)] = bucket
+
+    def user_changed(self, user_id: Optional[str], op: Optional[str] = None, now: Optional[datetime] = None):
+        """
+        Actualiza los rankings de un usuario modificado.
+
+        Args:
+            user_id: Usuario modificado
+            op: Operación aplicada (limita las métricas a recalcular); None = todas
+            now: Momento del cambio
+        """
+        if user_id is None or not self._built:
+            return
+        if self._source() is not self._built_for:
+            return  # Se reconstruye entero en la próxima consulta
+        metrics = OP_METRICS.get(op, tuple(METRICS)) if op else tuple(METRICS)
+        if not metrics:
+            return
+
+        now = now or datetime.now()
+        user_data = self._live_users().get(user_id)
+        for metric in metrics:
+            all_fn, period_fn = METRICS[metric]
+            self._apply(self._boards[(metric, 'all')], user_id, all_fn(user_data) if user_data else None)
+            if period_fn is None:
+                continue
+            for period in PERIODS[1:]:
+                # Boards de un bucket viejo se reconstruyen al consultarse
+                if self._buckets.get((metric, period)) != period_bucket(period, now):
+                    continue
+                totals = self._rollups.user_totals(user_id, period, now)
+                self._apply(self._boards[(metric, period)], user_id, period_fn(totals) if totals else None)
+
+    def board(self, metric: str, period: str = 'all', now: Optional[datetime] = None) -> Leaderboard:
+        """
+        Leaderboard actualizado de una métrica y período.
+
+        Args:
+            metric: 'game_time', 'voice_time', 'activity', 'messages' o 'social'
+            period: 'all', 'today', 'week', 'month' o 'year'
+        """
+        self._ensure_built()
+        if (metric, period) not in self._boards:
+            period = 'all'
+        if period != 'all':
+            self._ensure_bucket(metric, period, now or datetime.now())
+        return self._boards[(metric, period)]
+
+    def top(self, metric: str, period: str = 'all', limit: Optional[int] = None) -> List[Tuple[str, str, float, tuple]]:
+        """
+        Top-k de una métrica.
+
+        Returns:
+            Lista de (user_id, username, score, detail)
+        """
+        users = self._live_users()
+        return [
+            (user_id, users.get(user_id, {}).get('username', 'Unknown'), score, detail)
+            for user_id, score, detail in self.board(metric, period).top(limit)
+        ]
+
+    def ranking(self, metric: str, period: str = 'all', limit: Optional[int] = None):
+        """
+        Top-k con los totales del ranking completo (para los embeds de StatsView).
+
+        Returns:
+            Tupla (rows, members, total, detail_totals) donde rows es una lista
+            de (username, score, *detail)
+        """
+        board = self.board(metric, period)
+        users = self._live_users()
+        rows = [
+            (users.get(user_id, {}).get('username', 'Unknown'), score, *detail)
+            for user_id, score, detail in board.top(limit)
+        ]
+        return rows, len(board), board.total, list(board.detail_totals)
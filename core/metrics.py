@@ -0,0 +1,351 @@
+"""
+Métricas de rendimiento en memoria
+Latencia de los listeners, lag del event loop, duración y tamaño de las
+escrituras de stats, y gauges (sesiones activas, cola de notificaciones).
+
+Se consultan con `!perf` (owner) y, opcionalmente, en formato texto de
+Prometheus por HTTP local (config.json -> metrics.prometheus_port).
+"""
+
+import asyncio
+import functools
+import logging
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger('dsbot')
+
+# Muestras recientes por serie (para percentiles)
+RECENT_SAMPLES = 1024
+QUANTILES = (0.5, 0.9, 0.99)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _quantile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class LatencyStat:
+    """Conteo, suma, máximo y muestras recientes de una serie de duraciones"""
+
+    __slots__ = ('count', 'total', 'max', 'last', 'recent')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+        self.recent: Deque[float] = deque(maxlen=RECENT_SAMPLES)
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.recent.append(seconds)
+
+    def quantiles(self) -> Dict[float, float]:
+        ordered = sorted(self.recent)
+        return {q: _quantile(ordered, q) for q in QUANTILES}
+
+    def summary(self) -> Dict[str, float]:
+        """Resumen en milisegundos"""
+        q = self.quantiles()
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            'p50_ms': round(q[0.5] * 1000, 3),
+            'p90_ms': round(q[0.9] * 1000, 3),
+            'p99_ms': round(q[0.99] * 1000, 3),
+            'max_ms': round(self.max * 1000, 3),
+            'last_ms': round(self.last * 1000, 3),
+        }
+
+
+class Metrics:
+    """Registro de métricas del proceso"""
+
+    def __init__(self):
+        self._latencies: Dict[str, Dict[LabelKey, LatencyStat]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Tuple[Callable, Optional[str]]] = {}
+        self._help: Dict[str, str] = {}
+
+    @staticmethod
+    def _key(labels: Dict[str, str]) -> LabelKey:
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def describe(self, name: str, help_text: str):
+        """Texto de ayuda de una métrica (línea # HELP en Prometheus)"""
+        self._help[name] = help_text
+
+    def observe(self, name: str, seconds: float, **labels):
+        """Registra una duración (en segundos)"""
+        series = self._latencies.setdefault(name, {})
+        key = self._key(labels)
+        stat = series.get(key)
+        if stat is None:
+            stat = series[key] = LatencyStat()
+        stat.observe(seconds)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Suma `value` a un contador"""
+        series = self._counters.setdefault(name, {})
+        key = self._key(labels)
+        series[key] = series.get(key, 0) + value
+
+    def register_gauge(self, name: str, func: Callable, label: Optional[str] = None, help_text: str = ''):
+        """
+        Registra un gauge que se evalúa al consultar.
+
+        Args:
+            name: Nombre de la métrica
+            func: Retorna un número, o {valor_de_label: número} si se indica `label`
+            label: Nombre del label para gauges con varias series
+            help_text: Descripción
+        """
+        self._gauges[name] = (func, label)
+        if help_text:
+            self._help[name] = help_text
+
+    def latency(self, name: str, **labels) -> Optional[LatencyStat]:
+        return self._latencies.get(name, {}).get(self._key(labels))
+
+    def counter(self, name: str, **labels) -> float:
+        return self._counters.get(name, {}).get(self._key(labels), 0)
+
+    def gauge_values(self) -> Dict[str, object]:
+        """Valor actual de cada gauge (los que fallan se omiten)"""
+        values = {}
+        for name, (func, _) in self._gauges.items():
+            try:
+                values[name] = func()
+            except Exception as e:
+                logger.debug(f'📈 Gauge {name} no disponible: {e}')
+        return values
+
+    def snapshot(self) -> Dict:
+        """Todas las métricas como dict (para !perf o export)"""
+        return {
+            'latencies': {
+                name: {_label_str(key) or '_': stat.summary() for key, stat in series.items()}
+                for name, series in self._latencies.items()
+            },
+            'counters': {
+                name: {_label_str(key) or '_': value for key, value in series.items()}
+                for name, series in self._counters.items()
+            },
+            'gauges': self.gauge_values(),
+        }
+
+    def render_prometheus(self) -> str:
+        """Exposición en formato texto de Prometheus (0.0.4)"""
+        lines = []
+
+        for name, series in self._latencies.items():
+            self._header(lines, name, 'summary')
+            for key, stat in series.items():
+                for q, value in stat.quantiles().items():
+                    lines.append(f'{name}{_labels(key, quantile=q)} {value:.6f}')
+                lines.append(f'{name}_sum{_labels(key)} {stat.total:.6f}')
+                lines.append(f'{name}_count{_labels(key)} {stat.count}')
+
+        for name, series in self._counters.items():
+            self._header(lines, name, 'counter')
+            for key, value in series.items():
+                lines.append(f'{name}{_labels(key)} {value:g}')
+
+        for name, value in self.gauge_values().items():
+            label = self._gauges[name][1]
+            self._header(lines, name, 'gauge')
+            if isinstance(value, dict):
+                for label_value, number in value.items():
+                    lines.append(f'{name}{_labels(((label or "name", str(label_value)),))} {number:g}')
+            else:
+                lines.append(f'{name} {value:g}')
+
+        return '\n'.join(lines) + '\n'
+
+    def _header(self, lines: List[str], name: str, metric_type: str):
+        if name in self._help:
+            lines.append(f'# HELP {name} {self._help[name]}')
+        lines.append(f'# TYPE {name} {metric_type}')
+
+    def reset(self):
+        """Descarta latencias y contadores (los gauges se conservan)"""
+        self._latencies.clear()
+        self._counters.clear()
+
+
+def _label_str(key: LabelKey) -> str:
+    return ','.join(f'{k}={v}' for k, v in key)
+
+
+def _labels(key: LabelKey, **extra) -> str:
+    pairs = list(key) + [(k, str(v)) for k, v in extra.items()]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class LoopLagMonitor:
+    """Mide cuánto se atrasa un sleep periódico: el tiempo que el loop estuvo bloqueado"""
+
+    def __init__(self, metrics: Metrics, interval_seconds: float = 1.0):
+        self.metrics = metrics
+        self.interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if not self.is_running():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval_seconds)
+            lag = max(0.0, time.perf_counter() - start - self.interval_seconds)
+            self.metrics.observe('dsbot_event_loop_lag_seconds', lag)
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+class PrometheusServer:
+    """Servidor HTTP mínimo que expone /metrics (sin dependencias externas)"""
+
+    def __init__(self, metrics: Metrics, host: str = '127.0.0.1', port: int = 9108):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        logger.info(f'📈 Métricas Prometheus en http://{self.host}:{self.port}/metrics')
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+            # Descartar headers
+            while True:
+                line = await asyncio.wait_for(reader.readline(), timeout=5)
+                if not line or line in (b'\r\n', b'\n'):
+                    break
+            parts = request_line.decode('latin-1').split()
+            path = parts[1].split('?')[0] if len(parts) > 1 else ''
+            if len(parts) > 1 and parts[0] == 'GET' and path == '/metrics':
+                body = self.metrics.render_prometheus().encode('utf-8')
+                status, content_type = '200 OK', 'text/plain; version=0.0.4; charset=utf-8'
+            else:
+                body = b'not found\n'
+                status, content_type = '404 Not Found', 'text/plain; charset=utf-8'
+            writer.write(
+                f'HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n'
+                f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode('latin-1') + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+
+_metrics = Metrics()
+_metrics.describe('dsbot_listener_duration_seconds', 'Duración de los listeners de eventos de Discord')
+_metrics.describe('dsbot_event_loop_lag_seconds', 'Atraso del event loop respecto de un sleep periódico')
+_metrics.describe('dsbot_stats_write_duration_seconds', 'Duración de cada escritura del snapshot de stats')
+_metrics.describe('dsbot_stats_write_bytes_total', 'Bytes escritos en snapshots de stats')
+
+_last_stats_write_bytes = 0
+_metrics.register_gauge('dsbot_stats_write_last_bytes', lambda: _last_stats_write_bytes,
+                        help_text='Tamaño del último snapshot de stats escrito')
+
+_lag_monitor: Optional[LoopLagMonitor] = None
+_http_server: Optional[PrometheusServer] = None
+
+
+def get_metrics() -> Metrics:
+    """Registro de métricas del proceso"""
+    return _metrics
+
+
+def timed_listener(func):
+    """Decorador para listeners async: registra su duración por nombre de evento"""
+    name = func.__name__
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            _metrics.observe('dsbot_listener_duration_seconds', time.perf_counter() - start, listener=name)
+
+    return wrapper
+
+
+def record_stats_write(seconds: float, size_bytes: Optional[int]):
+    """Registra una escritura del snapshot de stats (duración y tamaño)"""
+    global _last_stats_write_bytes
+    _metrics.observe('dsbot_stats_write_duration_seconds', seconds)
+    if size_bytes is not None:
+        _metrics.inc('dsbot_stats_write_bytes_total', size_bytes)
+        _last_stats_write_bytes = size_bytes
+
+
+async def start_metrics(settings: Optional[Dict] = None):
+    """
+    Inicia el muestreo de lag del loop y, si hay puerto configurado, el endpoint HTTP.
+
+    Args:
+        settings: Bloque metrics de config.json
+    """
+    global _lag_monitor, _http_server
+    settings = settings or {}
+    if not settings.get('enabled', True):
+        return
+
+    if _lag_monitor is None:
+        _lag_monitor = LoopLagMonitor(_metrics, float(settings.get('loop_lag_interval_seconds', 1)))
+    _lag_monitor.start()
+
+    port = int(settings.get('prometheus_port') or 0)
+    if port and _http_server is None:
+        server = PrometheusServer(_metrics, settings.get('prometheus_host', '127.0.0.1'), port)
+        try:
+            await server.start()
+            _http_server = server
+        except OSError as e:
+            logger.error(f'❌ No se pudo abrir el endpoint de métricas en el puerto {port}: {e}')
+
+
+async def stop_metrics():
+    """Detiene el muestreo de lag y el endpoint HTTP"""
+    global _lag_monitor, _http_server
+    if _lag_monitor is not None:
+        _lag_monitor.stop()
+        _lag_monitor = None
+    if _http_server is not None:
+        await _http_server.stop()
+        _http_server = None
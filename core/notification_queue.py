@@ -0,0 +1,293 @@
+"""
+Cola de notificaciones salientes
+Los handlers de eventos encolan mensajes y vuelven de inmediato; una única task
+(dispatcher) los reparte respetando el rate limit de cada canal, con un envío
+en curso por canal: un canal lento o limitado no demora a los demás.
+
+- Bucket por canal: como máximo `channel_messages` envíos cada
+  `channel_window_seconds`, y pausa del canal completo ante un 429
+  (retry_after) sin frenar a los demás canales
+- Reintentos con backoff exponencial (config.json -> rate_limiting)
+- Coalescing: un mensaje encolado con la misma `coalesce_key` que otro que
+  todavía no empezó a enviarse lo reemplaza (se envía solo el último); si el
+  otro ya está en vuelo se encola uno nuevo
+- Ediciones: `submit_edit` edita un mensaje ya enviado pasando por la misma cola
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional
+
+import discord
+
+logger = logging.getLogger('dsbot')
+
+DEFAULT_SETTINGS = {
+    'max_retries': 5,
+    'initial_delay': 30,
+    'max_delay': 300,
+    'exponential_base': 2,
+    'channel_messages': 5,
+    'channel_window_seconds': 5,
+}
+
+
+class _Job:
+    """Envío o edición pendiente"""
+
+    __slots__ = ('bot', 'channel_id', 'content', 'message', 'coalesce_key', 'future', 'attempts', 'not_before',
+                 'sending')
+
+    def __init__(self, bot, channel_id: int, content: str, message: Optional[discord.Message],
+                 coalesce_key: Optional[str], future: asyncio.Future):
+        self.bot = bot
+        self.channel_id = channel_id
+        self.content = content
+        self.message = message  # Mensaje a editar (None = mensaje nuevo)
+        self.coalesce_key = coalesce_key
+        self.future = future
+        self.attempts = 0
+        self.not_before = 0.0
+        self.sending = False  # En vuelo: ya no admite coalescing
+
+
+class _ChannelBucket:
+    """Ventana deslizante de envíos de un canal + pausa por 429"""
+
+    __slots__ = ('sent', 'blocked_until')
+
+    def __init__(self):
+        self.sent: Deque[float] = deque()
+        self.blocked_until = 0.0
+
+    def ready_at(self, now: float, limit: int, window: float) -> float:
+        while self.sent and self.sent[0] <= now - window:
+            self.sent.popleft()
+        ready = self.blocked_until
+        if len(self.sent) >= limit:
+            ready = max(ready, self.sent[0] + window)
+        return ready
+
+
+class NotificationDispatcher:
+    """Cola por canal drenada por una única task (un envío en vuelo por canal)"""
+
+    def __init__(self, settings: Optional[Dict] = None, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            settings: Bloque rate_limiting de config.json (ver DEFAULT_SETTINGS)
+            clock: Reloj monotónico
+        """
+        self._clock = clock
+        self.configure(settings or {})
+        self._queues: Dict[int, Deque[_Job]] = {}
+        self._buckets: Dict[int, _ChannelBucket] = {}
+        self._pending_keys: Dict[str, _Job] = {}
+        # Envío en curso de cada canal (el siguiente sale cuando termina)
+        self._inflight: Dict[int, asyncio.Task] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+
+    def configure(self, settings: Dict):
+        """Aplica el bloque rate_limiting (las claves ausentes usan los defaults)"""
+        merged = {**DEFAULT_SETTINGS, **(settings or {})}
+        self.max_retries = max(0, int(merged['max_retries']))
+        self.initial_delay = max(0.0, float(merged['initial_delay']))
+        self.max_delay = max(self.initial_delay, float(merged['max_delay']))
+        self.exponential_base = max(1.0, float(merged['exponential_base']))
+        self.channel_messages = max(1, int(merged['channel_messages']))
+        self.channel_window_seconds = max(0.0, float(merged['channel_window_seconds']))
+
+    def pending(self) -> int:
+        """Cantidad de envíos/ediciones en cola"""
+        return sum(len(queue) for queue in self._queues.values())
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Demora antes del reintento N (1 = primer reintento)"""
+        return min(self.max_delay, self.initial_delay * self.exponential_base ** max(0, attempt - 1))
+
+    # ==================== ENCOLAR ====================
+
+    def submit(self, bot, channel_id: int, content: str, coalesce_key: Optional[str] = None) -> asyncio.Future:
+        """
+        Encola un mensaje nuevo.
+
+        Args:
+            bot: Instancia del bot
+            channel_id: Canal destino
+            content: Contenido del mensaje
+            coalesce_key: Si hay un envío pendiente con la misma clave, se reemplaza su contenido
+
+        Returns:
+            Future que se resuelve con el discord.Message enviado (o None si falló)
+        """
+        return self._submit(bot, channel_id, content, None, coalesce_key)
+
+    def submit_edit(self, message: discord.Message, content: str, coalesce_key: Optional[str] = None) -> asyncio.Future:
+        """
+        Encola la edición de un mensaje ya enviado (mismo bucket que su canal).
+
+        Returns:
+            Future que se resuelve con el mensaje editado (o None si falló)
+        """
+        return self._submit(None, message.channel.id, content, message, coalesce_key)
+
+    def _submit(self, bot, channel_id: int, content: str, message, coalesce_key: Optional[str]) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        if coalesce_key is not None:
+            queued = self._pending_keys.get(coalesce_key)
+            if queued is not None and not queued.sending and not queued.future.done():
+                queued.content = content
+                if message is not None:
+                    queued.message = message
+                logger.debug(f'📨 Notificación combinada con la pendiente: {coalesce_key}')
+                return queued.future
+
+        job = _Job(bot, channel_id, content, message, coalesce_key, loop.create_future())
+        self._queues.setdefault(channel_id, deque()).append(job)
+        if coalesce_key is not None:
+            self._pending_keys[coalesce_key] = job
+        self._ensure_running(loop)
+        self._wake.set()
+        return job.future
+
+    # ==================== DISPATCHER ====================
+
+    def _ensure_running(self, loop: asyncio.AbstractEventLoop):
+        if self._task is not None and not self._task.done() and self._loop is loop:
+            return
+        self._loop = loop
+        self._wake = asyncio.Event()
+        self._task = loop.create_task(self._run())
+
+    async def _run(self):
+        wake = self._wake
+        while True:
+            wake.clear()
+            next_at = await self._dispatch_ready()
+            if next_at is None:
+                await wake.wait()
+                continue
+            timeout = next_at - self._clock()
+            if timeout <= 0:
+                continue
+            try:
+                await asyncio.wait_for(wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _dispatch_ready(self) -> Optional[float]:
+        """
+        Lanza el envío del primer trabajo de cada canal listo, en paralelo
+        entre canales. Al terminar un envío se despierta al dispatcher.
+
+        Returns:
+            Próximo instante en que algún canal estará listo o None si no hay
+            cola (o solo hay envíos en curso)
+        """
+        next_at = None
+        for channel_id in list(self._queues):
+            if channel_id in self._inflight:
+                continue
+            queue = self._queues[channel_id]
+            if not queue:
+                del self._queues[channel_id]
+                continue
+            bucket = self._buckets.setdefault(channel_id, _ChannelBucket())
+            now = self._clock()
+            ready = max(bucket.ready_at(now, self.channel_messages, self.channel_window_seconds),
+                        queue[0].not_before)
+            if ready <= now:
+                task = asyncio.create_task(self._process(queue, bucket))
+                self._inflight[channel_id] = task
+                task.add_done_callback(lambda _, channel_id=channel_id: self._processed(channel_id))
+                continue
+            if next_at is None or ready < next_at:
+                next_at = ready
+        return next_at
+
+    def _processed(self, channel_id: int):
+        self._inflight.pop(channel_id, None)
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _process(self, queue: Deque[_Job], bucket: _ChannelBucket):
+        job = queue[0]
+        bucket.sent.append(self._clock())
+        job.sending = True
+        try:
+            result = await self._deliver(job)
+        except discord.errors.HTTPException as e:
+            job.sending = False
+            if self._retry(job, e, bucket):
+                return
+            result = None
+        except Exception as e:
+            logger.error(f'❌ Error al enviar notificación: {e}')
+            result = None
+
+        queue.popleft()
+        if job.coalesce_key is not None and self._pending_keys.get(job.coalesce_key) is job:
+            del self._pending_keys[job.coalesce_key]
+        if not job.future.done():
+            job.future.set_result(result)
+
+    async def _deliver(self, job: _Job):
+        if job.message is not None:
+            await job.message.edit(content=job.content)
+            logger.debug(f'✏️ Notificación editada: {job.content[:50]}...')
+            return job.message
+
+        channel = job.bot.get_channel(job.channel_id)
+        if channel is None:
+            logger.error(f'⚠️  No se encontró el canal con ID {job.channel_id}')
+            return None
+        sent = await channel.send(job.content)
+        logger.info(f'✅ Notificación enviada: {job.content[:50]}...')
+        return sent
+
+    def _retry(self, job: _Job, error: discord.errors.HTTPException, bucket: _ChannelBucket) -> bool:
+        """Programa el reintento del trabajo; False si se descarta"""
+        if isinstance(error, (discord.errors.Forbidden, discord.errors.NotFound)):
+            logger.error(f'⚠️  Notificación descartada (HTTP {error.status}) en canal {job.channel_id}: {error}')
+            return False
+
+        job.attempts += 1
+        if job.attempts > self.max_retries:
+            logger.error(f'❌ Notificación descartada tras {self.max_retries} reintentos: {error}')
+            return False
+
+        now = self._clock()
+        if error.status == 429:
+            retry_after = float(getattr(error, 'retry_after', None) or 1.0)
+            bucket.blocked_until = max(bucket.blocked_until, now + retry_after)
+            logger.warning(f'⚠️  Rate limited en canal {job.channel_id}. Reintento en {retry_after}s')
+        else:
+            delay = self.backoff_delay(job.attempts)
+            job.not_before = now + delay
+            logger.warning(f'⚠️  Error HTTP {error.status}. Reintento {job.attempts}/{self.max_retries} en {delay:g}s')
+        return True
+
+    def stop(self):
+        """Detiene el dispatcher (los pendientes quedan en cola)"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        self._task = None
+        for task in list(self._inflight.values()):
+            task.cancel()
+        self._inflight.clear()
+
+
+_dispatcher: Optional[NotificationDispatcher] = None
+
+
+def get_dispatcher() -> NotificationDispatcher:
+    """Dispatcher del proceso (configurado con config.json -> rate_limiting)"""
+    global _dispatcher
+    if _dispatcher is None:
+        from core.persistence import config
+        _dispatcher = NotificationDispatcher(config.get('rate_limiting', {}))
+    return _dispatcher
@@ -0,0 +1,253 @@
+"""
+Grafo de co-juego de las parties
+Aristas usuario↔usuario ponderadas (parties juntos y minutos), en total y
+por juego, mantenidas a medida que se cierran parties en lugar de recorrer
+todo el historial con un doble loop por jugador en cada consulta.
+
+- "¿Con quién juega X?": lista de adyacencia del usuario, top-k en
+  O(grado · log k)
+- "Top duplas (del juego Y)": Leaderboard de aristas, top-k en O(k)
+- "Mejor squad": Leaderboard de grupos exactos de 3+ jugadores, O(1)
+
+Sumar o quitar una party cuesta O(k²) con k jugadores de la party. Los
+rankings se arman recién en la primera consulta de duplas / squads.
+"""
+
+import heapq
+import logging
+from itertools import combinations
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from core.leaderboard import Leaderboard
+
+logger = logging.getLogger('dsbot')
+
+# Tamaño mínimo de un squad (las duplas tienen su propio ranking)
+MIN_SQUAD_SIZE = 3
+
+
+def party_players(entry: Dict) -> List[str]:
+    """
+    Jugadores de una entrada del historial como user_ids (sin repetidos).
+    Entradas corruptas (players como string) no tienen jugadores.
+    """
+    players = entry.get('players') or []
+    if isinstance(players, str):
+        return []
+    return list(dict.fromkeys(str(p) for p in players))
+
+
+class CoPlayLayer:
+    """Aristas y rankings de un juego (o de todos los juegos)"""
+
+    __slots__ = ('edges', 'adjacency', 'parties', 'squads', 'ranked', '_pairs_board', '_squads_board')
+
+    def __init__(self):
+        # (a, b) con a < b -> [parties, minutos]; la adyacencia comparte las listas
+        self.edges: Dict[Tuple[str, str], List[int]] = {}
+        self.adjacency: Dict[str, Dict[str, List[int]]] = {}
+        # Participaciones por usuario
+        self.parties: Dict[str, int] = {}
+        # Grupos exactos de 3+ jugadores (tupla ordenada) -> [parties, minutos]
+        self.squads: Dict[Tuple[str, ...], List[int]] = {}
+        # Los rankings se arman en la primera consulta y desde ahí se mantienen
+        self.ranked = False
+        self._pairs_board = Leaderboard()
+        self._squads_board = Leaderboard()
+
+    def apply(self, players: List[str], minutes: int, sign: int):
+        """Suma (sign=1) o resta (sign=-1) una party"""
+        for uid in players:
+            count = self.parties.get(uid, 0) + sign
+            if count > 0:
+                self.parties[uid] = count
+            else:
+                self.parties.pop(uid, None)
+
+        for a, b in combinations(sorted(players), 2):
+            edge = self.edges.get((a, b))
+            if edge is None:
+                if sign < 0:
+                    continue
+                edge = self.edges[(a, b)] = [0, 0]
+                self.adjacency.setdefault(a, {})[b] = edge
+                self.adjacency.setdefault(b, {})[a] = edge
+            edge[0] += sign
+            edge[1] += sign * minutes
+            if edge[0] <= 0:
+                del self.edges[(a, b)]
+                self._unlink(a, b)
+                self._unlink(b, a)
+            if self.ranked:
+                self._rank(self._pairs_board, (a, b), edge)
+
+        if len(players) >= MIN_SQUAD_SIZE:
+            squad = tuple(sorted(players))
+            totals = self.squads.get(squad)
+            if totals is None:
+                if sign < 0:
+                    return
+                totals = self.squads[squad] = [0, 0]
+            totals[0] += sign
+            totals[1] += sign * minutes
+            if totals[0] <= 0:
+                del self.squads[squad]
+            if self.ranked:
+                self._rank(self._squads_board, squad, totals)
+
+    @staticmethod
+    def _rank(board: Leaderboard, member, totals: List[int]):
+        if totals[0] > 0:
+            board.update(member, totals[0], (totals[1],))
+        else:
+            board.discard(member)
+
+    def _unlink(self, user_id: str, other: str):
+        neighbours = self.adjacency.get(user_id)
+        if neighbours is not None:
+            neighbours.pop(other, None)
+            if not neighbours:
+                del self.adjacency[user_id]
+
+    def rankings(self) -> Tuple[Leaderboard, Leaderboard]:
+        """Rankings (duplas, squads); la primera vez se arman desde los contadores"""
+        if not self.ranked:
+            for board, totals in ((self._pairs_board, self.edges), (self._squads_board, self.squads)):
+                board.clear()
+                for member, entry in totals.items():
+                    self._rank(board, member, entry)
+            self.ranked = True
+        return self._pairs_board, self._squads_board
+
+
+class PartyGraph:
+    """Grafo de co-juego sobre entradas del historial de parties"""
+
+    def __init__(self):
+        self._all = CoPlayLayer()
+        self._games: Dict[str, CoPlayLayer] = {}
+
+    @classmethod
+    def from_history(cls, history: Iterable[Dict]) -> 'PartyGraph':
+        """Grafo construido en una pasada por el historial"""
+        graph = cls()
+        for entry in history:
+            graph.add_party(entry)
+        return graph
+
+    def _apply(self, entry: Dict, sign: int):
+        players = party_players(entry)
+        if not players:
+            return
+        minutes = entry.get('duration_minutes', 0) or 0
+        game = entry.get('game', 'Unknown')
+        layer = self._games.get(game)
+        if layer is None:
+            if sign < 0:
+                return
+            layer = self._games[game] = CoPlayLayer()
+        self._all.apply(players, minutes, sign)
+        layer.apply(players, minutes, sign)
+        if not layer.parties:
+            del self._games[game]
+
+    def add_party(self, entry: Dict):
+        """Suma una entrada del historial"""
+        self._apply(entry, 1)
+
+    def remove_party(self, entry: Dict):
+        """Quita una entrada sumada antes (actualizada o descartada del historial)"""
+        self._apply(entry, -1)
+
+    # ==================== CONSULTAS ====================
+
+    def _layer(self, game: Optional[str]) -> Optional[CoPlayLayer]:
+        return self._all if game is None else self._games.get(game)
+
+    def partners(self, user_id: str, game: Optional[str] = None,
+                 limit: int = 10) -> List[Tuple[str, int, int]]:
+        """
+        Con quién jugó más un usuario.
+
+        Args:
+            user_id: ID del usuario
+            game: Solo parties de ese juego (default: todas)
+            limit: Cantidad máxima
+
+        Returns:
+            Lista de (user_id, parties, minutos) por parties, minutos y user_id
+        """
+        layer = self._layer(game)
+        neighbours = layer.adjacency.get(user_id) if layer else None
+        if not neighbours:
+            return []
+        best = heapq.nsmallest(limit, neighbours.items(), key=lambda x: (-x[1][0], -x[1][1], x[0]))
+        return [(other, edge[0], edge[1]) for other, edge in best]
+
+    def top_pairs(self, game: Optional[str] = None, limit: int = 10) -> List[Tuple[str, str, int, int]]:
+        """
+        Duplas que más parties compartieron.
+
+        Returns:
+            Lista de (user_a, user_b, parties, minutos)
+        """
+        layer = self._layer(game)
+        if layer is None:
+            return []
+        pairs, _ = layer.rankings()
+        return [(a, b, int(count), detail[0]) for (a, b), count, detail in pairs.top(limit)]
+
+    def best_squad(self, game: Optional[str] = None) -> Optional[Tuple[Tuple[str, ...], int, int]]:
+        """
+        Grupo exacto de 3+ jugadores que más parties armó.
+
+        Returns:
+            (user_ids, parties, minutos) o None si no hubo parties de 3+
+        """
+        layer = self._layer(game)
+        top = layer.rankings()[1].top(1) if layer else []
+        if not top:
+            return None
+        squad, count, detail = top[0]
+        return squad, int(count), detail[0]
+
+    def party_counts(self, game: Optional[str] = None) -> Dict[str, int]:
+        """Participaciones por usuario {user_id: parties} (solo lectura)"""
+        layer = self._layer(game)
+        return layer.parties if layer else {}
+
+    def pair_counts(self, game: Optional[str] = None) -> Dict[Tuple[str, str], int]:
+        """Parties compartidas por dupla {(a, b): parties} con a < b"""
+        layer = self._layer(game)
+        return {pair: edge[0] for pair, edge in layer.edges.items()} if layer else {}
+
+
+class StatsPartyGraph:
+    """
+    Grafo del historial de parties en memoria.
+
+    Se construye de forma perezosa en la primera consulta y luego lo mantiene
+    quien modifica el historial (PartySessionManager) con add/remove_party.
+    """
+
+    def __init__(self, source: Callable[[], Dict]):
+        """
+        Args:
+            source: Función que retorna el dict de stats en vivo
+        """
+        self._source = source
+        self._built_for: Optional[Dict] = None
+        self._graph = PartyGraph()
+
+    def get(self) -> PartyGraph:
+        """
+        Grafo al día con el historial. Pedirlo ANTES de modificar el historial:
+        si se construye después, la party nueva se contaría dos veces.
+        """
+        live = self._source()
+        if live is not self._built_for:
+            history = (live or {}).get('parties', {}).get('history', [])
+            self._graph = PartyGraph.from_history(history)
+            self._built_for = live
+            logger.debug(f'🕸️ Grafo de parties reconstruido ({len(history)} parties)')
+        return self._graph
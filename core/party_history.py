@@ -0,0 +1,273 @@
+"""
+Historial de parties
+stats['parties']['history'] guarda una ventana acotada de las parties más
+recientes (la más nueva primero, el formato que leen comandos, wrapped y el
+backend SQLite). Cada entrada tiene un `id` estable y un índice hash por id
+reemplaza la búsqueda lineal de duplicados al cerrar una party.
+
+Las entradas que salen de la ventana no se descartan: se archivan por lotes
+en segmentos mensuales comprimidos (party_archive/parties-YYYY-MM.jsonl.gz)
+y `iter_history` recorre ventana + segmentos de a uno, del más nuevo al más
+viejo, sin cargar todo el archivo en memoria.
+"""
+
+import asyncio
+import gzip
+import json
+import logging
+import re
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from core.atomic_io import get_io_executor
+
+logger = logging.getLogger('dsbot')
+
+DEFAULT_LIVE_LIMIT = 1000
+DEFAULT_ARCHIVE_BATCH = 100
+
+_SEGMENT_NAME = re.compile(r'^parties-(\d{4}-\d{2})\.jsonl\.gz$')
+_UNDATED_MONTH = '0000-00'
+
+
+def party_key(game: Optional[str], start: Optional[str], guild_id: Optional[int] = None) -> str:
+    """
+    Id de una party: servidor + juego + inicio.
+
+    Las parties históricas sin guild_id usan el id sin servidor.
+    """
+    return f'{"" if guild_id is None else guild_id}|{game}|{start}'
+
+
+def entry_key(entry: Dict) -> str:
+    """Id de una entrada del historial (el guardado o el derivado de sus campos)"""
+    return entry.get('id') or party_key(entry.get('game'), entry.get('start'), entry.get('guild_id'))
+
+
+def entry_month(entry: Dict) -> str:
+    """Mes 'YYYY-MM' del inicio de la entrada (segmento del archivo)"""
+    start = entry.get('start')
+    if isinstance(start, str) and re.match(r'^\d{4}-\d{2}', start):
+        return start[:7]
+    return _UNDATED_MONTH
+
+
+class PartyArchive:
+    """Segmentos mensuales comprimidos con las parties que salieron del historial en memoria"""
+
+    def __init__(self, directory):
+        """
+        Args:
+            directory: Carpeta de los segmentos
+        """
+        self.directory = Path(directory)
+
+    def segment_path(self, month: str) -> Path:
+        return self.directory / f'parties-{month}.jsonl.gz'
+
+    def append(self, entries: Iterable[Dict]):
+        """
+        Agrega entradas a sus segmentos (un miembro gzip nuevo por escritura:
+        no se reescribe lo ya archivado).
+        """
+        by_month: Dict[str, List[Dict]] = {}
+        for entry in entries:
+            by_month.setdefault(entry_month(entry), []).append(entry)
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for month, items in by_month.items():
+            lines = ''.join(json.dumps(item, ensure_ascii=False) + '\n' for item in items)
+            with gzip.open(self.segment_path(month), 'at', encoding='utf-8') as f:
+                f.write(lines)
+
+    def months(self) -> List[str]:
+        """Meses con segmento, del más nuevo al más viejo"""
+        if not self.directory.is_dir():
+            return []
+        found = (_SEGMENT_NAME.match(path.name) for path in self.directory.iterdir())
+        return sorted((match.group(1) for match in found if match), reverse=True)
+
+    def read_segment(self, month: str) -> List[Dict]:
+        """
+        Entradas de un segmento, la más nueva primero.
+
+        Un final truncado (corte durante una escritura) se ignora: se
+        conservan las líneas completas anteriores.
+        """
+        path = self.segment_path(month)
+        entries = []
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        logger.warning(f'⚠️  Línea inválida en {path.name}, se ignora')
+        except FileNotFoundError:
+            return []
+        except (OSError, EOFError, zlib.error) as e:
+            logger.warning(f'⚠️  Segmento {path.name} truncado ({e}): se leen {len(entries)} parties')
+        entries.sort(key=lambda entry: str(entry.get('start', '')), reverse=True)
+        return entries
+
+    def iter_entries(self, since_month: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Entradas archivadas de la más nueva a la más vieja, un segmento a la vez.
+
+        Args:
+            since_month: No leer segmentos anteriores a este mes ('YYYY-MM')
+        """
+        for month in self.months():
+            if since_month is not None and month < since_month:
+                return
+            yield from self.read_segment(month)
+
+
+class PartyHistoryStore:
+    """
+    Ventana del historial en stats + índice por id + archivo mensual.
+
+    El índice se arma la primera vez que se usa y se rearma solo si la lista
+    del historial es otra (recarga de stats, script de limpieza).
+    """
+
+    def __init__(self, source: Callable[[], Dict], archive_dir,
+                 live_limit: int = DEFAULT_LIVE_LIMIT, archive_batch: int = DEFAULT_ARCHIVE_BATCH):
+        """
+        Args:
+            source: Función que retorna el dict de stats en vivo
+            archive_dir: Carpeta de los segmentos archivados
+            live_limit: Parties que quedan en stats después de archivar
+            archive_batch: Se archiva cuando la ventana supera live_limit por esta cantidad
+        """
+        self._source = source
+        self.archive = PartyArchive(archive_dir)
+        self.live_limit = live_limit
+        self.archive_batch = archive_batch
+        self._index: Dict[str, Dict] = {}
+        self._indexed_for: Optional[List[Dict]] = None
+
+    def configure(self, settings: Dict):
+        """Aplica el bloque party_detection de config.json"""
+        self.live_limit = max(1, int(settings.get('history_live_limit', self.live_limit)))
+        self.archive_batch = max(1, int(settings.get('history_archive_batch', self.archive_batch)))
+
+    def history(self) -> List[Dict]:
+        """Ventana en memoria (la más nueva primero)"""
+        return self._source()['parties'].setdefault('history', [])
+
+    def _ensure_index(self) -> List[Dict]:
+        history = self.history()
+        if history is not self._indexed_for:
+            # De la más vieja a la más nueva: ante ids repetidos queda la más reciente
+            self._index = {entry_key(entry): entry for entry in reversed(history)}
+            self._indexed_for = history
+        return history
+
+    def find(self, game: str, start: str, guild_id: Optional[int] = None) -> Optional[Dict]:
+        """Entrada de la ventana con ese juego e inicio (o la histórica sin servidor)"""
+        self._ensure_index()
+        entry = self._index.get(party_key(game, start, guild_id))
+        if entry is None and guild_id is not None:
+            entry = self._index.get(party_key(game, start))
+        return entry
+
+    def record(self, party_record: Dict) -> Tuple[Optional[Dict], List[Dict]]:
+        """
+        Guarda una party cerrada: reemplaza la entrada con el mismo id (cuando
+        handle_end se llama más de una vez) o la agrega al principio.
+
+        Args:
+            party_record: Entrada nueva (se le asigna `id`)
+
+        Returns:
+            Tupla (copia de la entrada reemplazada o None, entradas archivadas)
+        """
+        history = self._ensure_index()
+        key = party_key(party_record.get('game'), party_record.get('start'), party_record.get('guild_id'))
+        party_record['id'] = key
+
+        existing = self.find(party_record.get('game'), party_record.get('start'), party_record.get('guild_id'))
+        if existing is not None:
+            previous = dict(existing)
+            # Se actualiza en su lugar: la posición en la lista no hace falta
+            self._index.pop(entry_key(existing), None)
+            existing.clear()
+            existing.update(party_record)
+            self._index[key] = existing
+            return previous, []
+
+        history.insert(0, party_record)
+        self._index[key] = party_record
+        return None, self._trim(history)
+
+    def _trim(self, history: List[Dict]) -> List[Dict]:
+        """Archiva lo que excede la ventana (por lotes: el corte no copia la lista)"""
+        if len(history) <= self.live_limit + self.archive_batch:
+            return []
+
+        archived = history[self.live_limit:]
+        del history[self.live_limit:]
+        for entry in archived:
+            if self._index.get(entry_key(entry)) is entry:
+                del self._index[entry_key(entry)]
+
+        # Más vieja primero dentro de cada segmento
+        oldest_first = archived[::-1]
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.archive.append(oldest_first)
+        else:
+            # Thread de I/O: queda en cola antes que el guardado de stats que sigue
+            future = loop.run_in_executor(get_io_executor(), self.archive.append, oldest_first)
+            future.add_done_callback(_log_archive_error)
+        logger.info(f'🗄️ {len(archived)} parties archivadas (historial en memoria: {len(history)})')
+        return archived
+
+    def iter_history(self, guild_id: Optional[int] = None, since: Optional[datetime] = None) -> Iterator[Dict]:
+        """
+        Historial completo de la party más nueva a la más vieja: primero la
+        ventana en memoria, después los segmentos archivados de a uno.
+
+        Args:
+            guild_id: Solo parties de este servidor (y las históricas sin guild_id)
+            since: Solo parties que empezaron desde este momento
+        """
+        history = list(self._ensure_index())
+        seen = set()
+        for entry in history:
+            if _matches(entry, guild_id, since):
+                seen.add(entry_key(entry))
+                yield entry
+
+        since_month = since.strftime('%Y-%m') if since is not None else None
+        for entry in self.archive.iter_entries(since_month):
+            if since is not None and _started_before(entry, since):
+                # Segmentos y entradas vienen ordenados: el resto es más viejo
+                return
+            key = entry_key(entry)
+            if key in seen or not _matches(entry, guild_id, None):
+                continue
+            seen.add(key)
+            yield entry
+
+
+def _started_before(entry: Dict, since: datetime) -> bool:
+    try:
+        return datetime.fromisoformat(entry['start']) < since
+    except (ValueError, KeyError, TypeError):
+        return True
+
+
+def _matches(entry: Dict, guild_id: Optional[int], since: Optional[datetime]) -> bool:
+    if guild_id is not None and entry.get('guild_id', guild_id) != guild_id:
+        return False
+    return since is None or not _started_before(entry, since)
+
+
+def _log_archive_error(future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.error(f'❌ Error archivando parties: {future.exception()}')
@@ -7,16 +7,22 @@ Tracking individual de tiempo por jugador (entrada/salida dinámica)
 
 import asyncio
 import logging
+import time
 from datetime import datetime
+from itertools import islice
 from typing import Dict, List, Optional, Set, Tuple
 from dataclasses import dataclass
 import discord
 
 from core.base_session import BaseSession, BaseSessionManager
-from core.persistence import stats, save_stats
+from core.persistence import stats, save_stats, get_party_graph, get_party_history_store
 from core.session_dto import save_game_time
 from core.cooldown import check_cooldown
-from core.helpers import send_notification
+from core.helpers import queue_notification
+from core.notification_queue import get_dispatcher
+from core.presence_index import PresenceIndex
+from core.rollups import period_range
+from core.scheduler import TimerHandle, get_scheduler
 
 logger = logging.getLogger('dsbot')
 
@@ -63,6 +69,15 @@ class PartySession(BaseSession):
                 time_saved=False
             )
         
+        # Mensaje "en vivo" de la party: los joins lo editan en lugar de enviar uno nuevo
+        self.live_message: Optional[discord.Message] = None
+        self.live_message_kind: Optional[str] = None  # 'formed' o 'join' (template con el que se renderiza)
+        self.joined_names: List[str] = []  # Jugadores anunciados como unidos en el mensaje en vivo
+        self.live_edit_timer: Optional[TimerHandle] = None  # Próxima edición pendiente (debounce)
+        self.live_edited_at = 0.0  # Instante monotónico del último envío/edición
+        self.live_content: Optional[str] = None  # Último contenido encolado (envío o edición)
+        self.live_sending = False  # Envío inicial en la cola: los joins esperan a que salga
+        
         logger.debug(f'🎮 Party iniciada con tracking individual: {game_name} ({len(self.players)} jugadores)')
     
     def mark_player_left(self, user_id: str):
@@ -136,20 +151,57 @@ class PartySession(BaseSession):
         return active_count
 
 
+def active_parties_store(guild_id: Optional[int]) -> Dict[str, Dict]:
+    """
+    Partición de parties activas de un servidor en stats.
+    
+    Args:
+        guild_id: ID del servidor o None para la partición legacy ('active')
+    
+    Returns:
+        Dict game_name -> party activa (creado si no existía)
+    """
+    parties = stats.setdefault('parties', {})
+    if guild_id is None:
+        return parties.setdefault('active', {})
+    return parties.setdefault('active_by_guild', {}).setdefault(str(guild_id), {})
+
+
+def iter_active_party_stores():
+    """
+    Particiones de parties activas guardadas.
+    
+    Returns:
+        Lista de (guild_id o None para legacy, dict game_name -> party)
+    """
+    parties = stats.get('parties', {})
+    stores = [(None, parties['active'])] if parties.get('active') else []
+    for guild_id, store in parties.get('active_by_guild', {}).items():
+        stores.append((int(guild_id), store))
+    return stores
+
+
 class PartySessionManager(BaseSessionManager):
     """Gestiona sesiones de parties con verificación automática"""
     
-    def __init__(self, bot, grace_period_seconds: int = 1800):
+    def __init__(self, bot, grace_period_seconds: int = 1800, guild_id: Optional[int] = None,
+                 presence: Optional[PresenceIndex] = None):
         """
         grace_period_seconds: tiempo sin actividad "suficiente" antes de cerrar la party.
         Default 30 min: cubre huecos tipo LoL (post-partida → cola) donde Discord deja de
         mostrar a 2+ jugadores en el mismo juego y antes el party caía a 5 min de gracia.
+        guild_id: servidor del manager (ver core.guild_shards). Sin servidor usa la
+        partición legacy stats['parties']['active'].
+        presence: índice de presencia compartido entre los managers de cada servidor
         """
         super().__init__(bot, min_duration_seconds=10, grace_period_seconds=grace_period_seconds)
+        self.guild_id = guild_id
         self._ensure_party_structure()
         self._finalize_locks = {}  # Lock por game_name para prevenir finalize múltiple
         # Timestamp de última party finalizada por juego (anti-spam "party formada" en re-fila)
         self._last_party_end_by_game: Dict[str, datetime] = {}
+        # Juego -> jugadores por servidor (se actualiza en on_presence_update)
+        self.presence = presence if presence is not None else PresenceIndex()
 
     def _notification_key(self, game_name: str, party_config: dict) -> str:
         """
@@ -196,11 +248,16 @@ class PartySessionManager(BaseSessionManager):
         if 'parties' not in stats:
             stats['parties'] = {
                 'active': {},
+                'active_by_guild': {},
                 'history': [],
                 'stats_by_game': {}
             }
             save_stats()
     
+    def _active_parties(self) -> Dict[str, Dict]:
+        """Parties activas en stats de este servidor (partición creada al primer uso)"""
+        return active_parties_store(self.guild_id)
+    
     def check_player_grace_periods(self, game_name: str) -> int:
         """
         Verifica y guarda tiempo de jugadores que expiraron su grace period individual.
@@ -274,9 +331,7 @@ class PartySessionManager(BaseSessionManager):
             self.active_sessions[game_name] = session
             
             # Iniciar verificación en background
-            session.verification_task = asyncio.create_task(
-                self._verify_session(session, None, config)
-            )
+            self._start_verification(session, None, config)
             
             logger.info(f'🎮 Nueva party iniciada: {game_name} con {len(current_players)} jugadores')
             logger.debug(f'   Jugadores: {", ".join(current_player_names)}')
@@ -338,10 +393,13 @@ class PartySessionManager(BaseSessionManager):
                     
                     # Notificar solo si quedan jugadores después del filtro de cooldown
                     if new_player_names:
-                        message = self._create_player_joined_message(game_name, new_player_names, current_player_names, party_config)
-                        if message:
-                            await send_notification(message, self.bot)
-                            logger.info(f'🎮 Notificación de jugador unido a party: {game_name}')
+                        session.joined_names.extend(name for name in new_player_names if name not in session.joined_names)
+                        if session.live_message is None:
+                            # Sin mensaje en vivo (party formada sin notificar): el join lo crea
+                            self._publish_live_message(session, session.live_message_kind or 'join', party_config)
+                        else:
+                            self._schedule_live_edit(session, party_config)
+                        logger.info(f'🎮 Notificación de jugador unido a party: {game_name}')
                 
                 # Actualizar en stats si está confirmada
                 self._update_active_party_in_stats(game_name, session)
@@ -370,6 +428,8 @@ class PartySessionManager(BaseSessionManager):
             # Buffer de gracia: Verificar si realmente terminó o es lag/reconexión
             if self._is_in_grace_period(session):
                 logger.debug(f'⏳ Party en gracia: {game_name}')
+                # Revisar exactamente cuando venza la gracia (sin esperar al health check)
+                self._schedule_grace_expiry(session, self._on_grace_expired, session, config)
                 return
             
             # ✅ CERRAR DEFINITIVAMENTE
@@ -377,6 +437,8 @@ class PartySessionManager(BaseSessionManager):
             if session.verification_task and not session.verification_task.done():
                 session.verification_task.cancel()
                 await asyncio.sleep(0.1)  # Dar tiempo a que se procese la cancelación
+            if session.live_edit_timer is not None:
+                session.live_edit_timer.cancel()
             
             # Borrar mensaje de notificación si existe y la sesión no fue confirmada
             if session.notification_message and not session.is_confirmed:
@@ -420,21 +482,8 @@ class PartySessionManager(BaseSessionManager):
         if not guild:
             return False
         
-        # Contar jugadores actuales en ese juego
-        current_count = 0
-        for mem in guild.members:
-            if mem.bot:
-                continue
-            for activity in mem.activities:
-                if activity.type in [
-                    discord.ActivityType.playing,
-                    discord.ActivityType.streaming,
-                    discord.ActivityType.watching,
-                    discord.ActivityType.listening
-                ]:
-                    if activity.name == session.game_name:
-                        current_count += 1
-                        break
+        # Contar jugadores actuales en ese juego (índice de presencia)
+        current_count = self.presence.count(guild, session.game_name)
         
         # Verificar si hay suficientes jugadores (mínimo 2)
         is_active = current_count >= 2
@@ -445,6 +494,17 @@ class PartySessionManager(BaseSessionManager):
         
         return is_active
     
+    async def _on_grace_expired(self, session: PartySession, config: dict):
+        """Venció la gracia de la party: cerrarla si ya no quedan jugadores suficientes"""
+        if self.active_sessions.get(session.game_name) is not session:
+            return  # Ya se cerró o fue reemplazada
+        self.check_player_grace_periods(session.game_name)
+        if session.game_name not in self.active_sessions:
+            return
+        if await self._is_still_active(session, None):
+            return
+        await self.handle_end(session.game_name, config)
+    
     async def _on_session_confirmed_phase1(self, session: PartySession, member: discord.Member, config: dict):
         """
         Fase 1 de confirmación (después de 3s): notificar party formada.
@@ -469,20 +529,15 @@ class PartySessionManager(BaseSessionManager):
         # Notificar party formada
         if party_config.get('notify_on_formed', True):
             cooldown_minutes = party_config.get('cooldown_minutes', 10)
+            # Por servidor: el mismo juego en otro servidor es otra party
             if check_cooldown(
                 'party',
-                f'formed:{notification_key}',
+                f'formed:{session.guild_id}:{notification_key}',
                 cooldown_seconds=cooldown_minutes * 60,
             ):
-                message = self._create_party_formed_message(session.game_name, session.player_names, party_config)
-                if message:
-                    try:
-                        notification_msg = await send_notification(message, self.bot)
-                        session.notification_message = notification_msg
-                        session.entry_notification_sent = True
-                        logger.info(f'🎮 Notificación de party formada enviada: {session.game_name}')
-                    except Exception as e:
-                        logger.error(f'Error enviando notificación de party: {e}')
+                if self._publish_live_message(session, 'formed', party_config):
+                    session.entry_notification_sent = True
+                    logger.info(f'🎮 Notificación de party formada enviada: {session.game_name}')
             else:
                 logger.debug(f'⏭️  Notificación de party no enviada: {session.game_name} (cooldown activo)')
         
@@ -496,6 +551,84 @@ class PartySessionManager(BaseSessionManager):
         session.is_confirmed = True
         logger.info(f'✅ Party confirmada después de 10s: {session.game_name}')
     
+    # Mensaje en vivo de la party
+    
+    def _live_message_key(self, session: PartySession) -> str:
+        """Clave de coalescing del mensaje en vivo en la cola de notificaciones"""
+        return f'party-live:{session.guild_id}:{session.game_name}'
+    
+    def _render_live_message(self, session: PartySession, party_config: dict) -> Optional[str]:
+        """Contenido actual del mensaje en vivo según el template con el que se creó"""
+        if session.live_message_kind == 'join':
+            return self._create_player_joined_message(
+                session.game_name, session.joined_names, session.player_names, party_config
+            )
+        return self._create_party_formed_message(session.game_name, session.player_names, party_config)
+    
+    def _publish_live_message(self, session: PartySession, kind: str, party_config: dict) -> bool:
+        """
+        Encola el mensaje en vivo de la party (no espera el envío).
+        Si ya hay un envío en la cola no se encola otro: al salir se edita
+        con los jugadores que se unieron mientras tanto.
+        
+        Returns:
+            True si se encoló (o ya estaba encolado)
+        """
+        if session.live_sending:
+            return True
+        session.live_message_kind = kind
+        message = self._render_live_message(session, party_config)
+        if not message:
+            return False
+        future = queue_notification(message, self.bot, coalesce_key=self._live_message_key(session))
+        if future is None:
+            return False
+        session.live_content = message
+        session.live_sending = True
+        future.add_done_callback(lambda f: self._on_live_message_sent(session, f, party_config))
+        return True
+    
+    def _on_live_message_sent(self, session: PartySession, future: asyncio.Future, party_config: dict):
+        session.live_sending = False
+        if future.cancelled() or future.result() is None:
+            return
+        session.live_message = future.result()
+        session.notification_message = session.live_message
+        session.live_edited_at = time.monotonic()
+        self._sync_live_message(session, party_config)
+    
+    def _sync_live_message(self, session: PartySession, party_config: dict):
+        """Tras un envío o edición: si el plantel cambió mientras estaba en vuelo, programar otra edición"""
+        if self.active_sessions.get(session.game_name) is not session or session.live_message is None:
+            return
+        if self._render_live_message(session, party_config) != session.live_content:
+            self._schedule_live_edit(session, party_config)
+    
+    def _schedule_live_edit(self, session: PartySession, party_config: dict):
+        """
+        Programa la edición del mensaje en vivo respetando la cadencia
+        party_detection.live_message_edit_seconds: varios joins dentro de la
+        misma ventana se reflejan en una sola edición.
+        """
+        if session.live_edit_timer is not None and not session.live_edit_timer.done():
+            return  # Ya hay una edición programada: mostrará el estado más reciente
+        cadence = float(party_config.get('live_message_edit_seconds', 15))
+        delay = max(0.0, session.live_edited_at + cadence - time.monotonic())
+        session.live_edit_timer = get_scheduler().call_later(delay, self._edit_live_message, session, party_config)
+    
+    def _edit_live_message(self, session: PartySession, party_config: dict):
+        if self.active_sessions.get(session.game_name) is not session or session.live_message is None:
+            return
+        message = self._render_live_message(session, party_config)
+        if not message or message == session.live_content:
+            return
+        future = get_dispatcher().submit_edit(session.live_message, message,
+                                              coalesce_key=f'{self._live_message_key(session)}:edit')
+        future.add_done_callback(lambda f: self._sync_live_message(session, party_config))
+        session.live_content = message
+        session.live_edited_at = time.monotonic()
+        logger.debug(f'✏️ Mensaje de party actualizado: {session.game_name} ({len(session.player_names)} jugadores)')
+    
     # Métodos auxiliares para mensajes
     
     def _create_party_formed_message(self, game_name: str, player_names: List[str], party_config: dict) -> Optional[str]:
@@ -541,7 +674,7 @@ class PartySessionManager(BaseSessionManager):
     
     def _create_active_party_in_stats(self, game_name: str, session: PartySession):
         """Crea una party activa en stats"""
-        stats['parties']['active'][game_name] = {
+        self._active_parties()[game_name] = {
             'start': session.start_time.isoformat(),
             'players': list(session.player_ids),
             'player_names': session.player_names,
@@ -551,8 +684,9 @@ class PartySessionManager(BaseSessionManager):
     
     def _update_active_party_in_stats(self, game_name: str, session: PartySession):
         """Actualiza una party activa en stats"""
-        if game_name in stats['parties']['active']:
-            active_party = stats['parties']['active'][game_name]
+        active_parties = self._active_parties()
+        if game_name in active_parties:
+            active_party = active_parties[game_name]
             active_party['players'] = list(session.player_ids)
             active_party['player_names'] = session.player_names
             active_party['max_players'] = session.max_players
@@ -561,12 +695,13 @@ class PartySessionManager(BaseSessionManager):
     def _finalize_party_in_stats(self, game_name: str, session: PartySession):
         """Finaliza una party y la guarda en historial + tiempo individual"""
         
-        if game_name not in stats['parties']['active']:
+        active_parties = self._active_parties()
+        if game_name not in active_parties:
             # Puede no estar en active si no llegó a confirmarse en fase 1
             logger.debug(f'⚠️  Party no estaba en active: {game_name}')
             return
         
-        active_party = stats['parties']['active'][game_name]
+        active_party = active_parties[game_name]
         
         # Calcular duración total de la party (para historial)
         end_time = datetime.now()
@@ -601,37 +736,32 @@ class PartySessionManager(BaseSessionManager):
             'duration_minutes': duration_minutes,
             'players': active_party.get('players', list(session.player_ids)),
             'player_names': active_party.get('player_names', session.player_names),
-            'max_players': active_party.get('max_players', session.max_players)
+            'max_players': active_party.get('max_players', session.max_players),
+            'guild_id': session.guild_id
         }
         
-        # Buscar si ya existe una entrada con el mismo start time y game
-        # (para evitar duplicados cuando handle_end se llama múltiples veces)
-        existing_entry = None
-        for i, entry in enumerate(stats['parties']['history']):
-            if entry.get('game') == game_name and entry.get('start') == party_record['start']:
-                existing_entry = i
-                break
-        
-        if existing_entry is not None:
-            # Actualizar entrada existente
-            old_duration = stats['parties']['history'][existing_entry]['duration_minutes']
-            stats['parties']['history'][existing_entry] = party_record
-            logger.debug(f'🔄 Party actualizada en historial: {game_name} ({old_duration}→{duration_minutes} min)')
+        # Pedir el grafo antes de tocar el historial (si se construye ahora, ve el estado previo)
+        party_graph = get_party_graph()
+        
+        # Reemplaza la entrada con el mismo id (handle_end llamado más de una vez)
+        # o la agrega; lo que excede la ventana en memoria se archiva
+        previous, archived = get_party_history_store().record(party_record)
+        
+        if previous is not None:
+            party_graph.remove_party(previous)
+            logger.debug(f'🔄 Party actualizada en historial: {game_name} ({previous.get("duration_minutes")}→{duration_minutes} min)')
         else:
-            # Agregar nueva entrada al inicio
-            stats['parties']['history'].insert(0, party_record)
             logger.debug(f'💾 Party guardada en historial: {game_name} ({duration_minutes} min)')
-            
-            # Limitar historial a 1000 parties (solo si agregamos nueva)
-            if len(stats['parties']['history']) > 1000:
-                stats['parties']['history'] = stats['parties']['history'][:1000]
+        party_graph.add_party(party_record)
+        for entry in archived:
+            party_graph.remove_party(entry)
         
         # Actualizar estadísticas por juego (solo si es nueva o si la duración cambió significativamente)
-        if existing_entry is None:
+        if previous is None:
             self._update_game_stats(game_name, party_record)
         
         # Eliminar de parties activas
-        del stats['parties']['active'][game_name]
+        del active_parties[game_name]
         
         save_stats()
     
@@ -698,36 +828,17 @@ class PartySessionManager(BaseSessionManager):
         return active_parties
     
     def get_party_history(self, timeframe: str = 'all', limit: int = 50) -> List[Dict]:
-        """Retorna historial de parties filtrado por timeframe"""
-        from datetime import timedelta
-        
-        history = stats['parties'].get('history', [])
-        
-        if timeframe == 'all':
-            return history[:limit]
-        
-        now = datetime.now()
-        timeframe_deltas = {
-            'today': timedelta(days=1),
-            'week': timedelta(days=7),
-            'month': timedelta(days=30)
-        }
-        
-        delta = timeframe_deltas.get(timeframe, timedelta(days=365))
-        cutoff = now - delta
-        
-        filtered = []
-        for party in history:
-            try:
-                party_time = datetime.fromisoformat(party['start'])
-                if party_time >= cutoff:
-                    filtered.append(party)
-                    if len(filtered) >= limit:
-                        break
-            except (ValueError, KeyError):
-                continue
+        """
+        Retorna historial de parties filtrado por timeframe.
+        Los períodos son de calendario (hoy, semana y mes en curso), como en los rankings.
+        Con servidor asignado solo incluye sus parties (y las históricas sin guild_id).
+        Sigue por los segmentos archivados si la ventana en memoria no alcanza.
+        """
+        bounds = period_range(timeframe)
+        cutoff = datetime.fromisoformat(bounds[0]) if bounds else None
         
-        return filtered
+        entries = get_party_history_store().iter_history(self.guild_id, since=cutoff)
+        return list(islice(entries, limit))
     
     def get_game_stats(self, game_name: Optional[str] = None) -> Dict:
         """Retorna estadísticas de parties por juego"""
@@ -747,29 +858,9 @@ class PartySessionManager(BaseSessionManager):
         """
         Obtiene jugadores activos agrupados por juego.
         Usa prioridad de actividades para ignorar Spotify y actividades secundarias.
+        Lee el índice de presencia (no recorre guild.members).
         
         Returns:
             Dict con formato: {game_name: [{user_id, username, activity}, ...]}
         """
-        from collections import defaultdict
-        from core.helpers import get_primary_game_activity
-        
-        players_by_game = defaultdict(list)
-        
-        for member in guild.members:
-            if member.bot:
-                continue
-            
-            # 🎯 Obtener actividad PRINCIPAL (ignora Spotify automáticamente)
-            primary_activity = get_primary_game_activity(member.activities)
-            
-            if primary_activity:
-                game_name = primary_activity.name
-                players_by_game[game_name].append({
-                    'user_id': str(member.id),
-                    'username': member.display_name,
-                    'activity': primary_activity
-                })
-        
-        return dict(players_by_game)
-
+        return self.presence.players_by_game(guild)
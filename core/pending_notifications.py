@@ -1,12 +1,17 @@
 """
 Light Persistence para notificaciones de voice pendientes
 SIMPLIFICADO: Solo voice, games no necesita persistence
+
+El dict en memoria es la fuente de verdad (se carga una vez al importar);
+cada cambio se escribe en el thread de I/O sin bloquear el event loop.
 """
 
 import json
 import os
 import logging
 from core.persistence import DATA_DIR
+from core.atomic_io import write_json_in_background
+from core.stats_snapshot import copy_tree
 
 logger = logging.getLogger('dsbot')
 
@@ -34,10 +39,9 @@ def _load_pending():
 
 
 def _save_pending():
-    """Guarda notificaciones pendientes en archivo"""
+    """Guarda notificaciones pendientes en archivo (copia: se serializa en otro thread)"""
     try:
-        with open(PENDING_NOTIFICATIONS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(_pending_notifications, f, indent=2, ensure_ascii=False)
+        write_json_in_background(PENDING_NOTIFICATIONS_FILE, copy_tree(_pending_notifications), indent=2)
     except Exception as e:
         logger.error(f'Error guardando pending notifications: {e}')
 
@@ -53,8 +57,6 @@ def save_voice_notification(user_id: str, username: str, channel_name: str):
         username: Nombre del usuario
         channel_name: Nombre del canal de voz
     """
-    _load_pending()
-    
     _pending_notifications['voice'][user_id] = {
         'user_id': user_id,
         'username': username,
@@ -72,8 +74,6 @@ def remove_voice_notification(user_id: str):
     Args:
         user_id: ID del usuario
     """
-    _load_pending()
-    
     if user_id in _pending_notifications['voice']:
         del _pending_notifications['voice'][user_id]
         _save_pending()
@@ -87,7 +87,6 @@ def get_pending_voice_notifications() -> dict:
     Returns:
         Diccionario de notificaciones de voice: {user_id: {data}}
     """
-    _load_pending()
     return _pending_notifications['voice'].copy()
 
 
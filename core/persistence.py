@@ -1,21 +1,76 @@
 """
 Módulo de persistencia de datos
-Maneja carga y guardado de config.json y stats.json
+Maneja carga y guardado de config.json y de las estadísticas
+(repositorio JSON/SQLite + journal de mutaciones)
 """
 
+import asyncio
+import atexit
 import json
+import logging
 import os
+import threading
+import time
+from datetime import datetime
 from pathlib import Path
 
+from core.atomic_io import get_io_executor, write_json_atomic, write_json_in_background
+from core.json_codec import set_codec
+from core.leaderboard import StatsLeaderboards
+from core.metrics import record_stats_write
+from core.party_graph import StatsPartyGraph
+from core.party_history import PartyHistoryStore
+from core.rollups import StatsRollups
+from core.stats_repository import create_repository
+from core.stats_snapshot import StatsSnapshotProvider, copy_tree
+
+logger = logging.getLogger('dsbot')
+
 # Usar /data si existe (Railway Volume), sino local
 DATA_DIR = Path('/data') if Path('/data').exists() else Path('.')
 CONFIG_FILE = DATA_DIR / 'config.json'
 STATS_FILE = DATA_DIR / 'stats.json'
+STATS_JOURNAL_FILE = DATA_DIR / 'stats.journal'
+PARTY_ARCHIVE_DIR = DATA_DIR / 'party_archive'
+
+# Repositorio de estadísticas (STATS_BACKEND: json | sqlite)
+_repository = None
+
+# Snapshots de solo lectura para comandos (copy-on-write por usuario)
+_snapshots = StatsSnapshotProvider(lambda: stats)
+
+# Totales pre-agregados por día / semana ISO / mes / año
+_rollups = StatsRollups(lambda: stats)
+
+# Rankings mantenidos incrementalmente (top-k sin recorrer todos los usuarios)
+_leaderboards = StatsLeaderboards(lambda: stats, _rollups)
+
+# Grafo de co-juego del historial de parties (duplas, squads, compañeros)
+_party_graph = StatsPartyGraph(lambda: stats)
+
+# Historial de parties: ventana en stats indexada por id + segmentos mensuales archivados
+_party_history = PartyHistoryStore(lambda: stats, PARTY_ARCHIVE_DIR)
 
 # Variables globales compartidas
 config = None
 stats = None
 
+# Write-behind: cambios pendientes de escribir y flusher en background
+_pending_changes = 0
+_flusher = None
+
+# Journal (WAL) de mutaciones: último seq aplicado en memoria, journal y compactor
+_journal_seq = 0
+_journal = None
+_compactor = None
+
+# Escrituras de snapshot: cada una recibe una generación creciente y solo se
+# escribe si es más nueva que la última escrita (las del thread de I/O y las
+# síncronas de flush_now() pueden cruzarse)
+_write_lock = threading.Lock()
+_snapshot_generation = 0
+_written_generation = 0
+
 def load_config():
     """Carga la configuración desde config.json"""
     try:
@@ -77,7 +132,31 @@ def load_config():
                 "max_retries": 5,
                 "initial_delay": 30,
                 "max_delay": 300,
-                "exponential_base": 2
+                "exponential_base": 2,
+                "channel_messages": 5,
+                "channel_window_seconds": 5
+            },
+            "metrics": {
+                "enabled": True,
+                "loop_lag_interval_seconds": 1,
+                "prometheus_host": "127.0.0.1",
+                "prometheus_port": 0
+            },
+            "persistence": {
+                "flush_interval_seconds": 5,
+                "flush_max_pending": 100,
+                "backup_generations": 3,
+                "json_codec": "auto",
+                "pretty_json": False,
+                "journal_enabled": True,
+                "journal_fsync": False,
+                "journal_compact_interval_seconds": 60,
+                "journal_compact_max_records": 2000
+            },
+            "wrapped": {
+                "workers": 0,
+                "parallel_min_users": 1000,
+                "chunk_size": 250
             },
             "party_detection": {
                 "enabled": True,
@@ -85,8 +164,11 @@ def load_config():
                 "grace_period_seconds": 1800,
                 "notify_on_formed": True,
                 "notify_on_join": True,
+                "live_message_edit_seconds": 15,
                 "cooldown_minutes": 60,
                 "reactivation_window_minutes": 45,
+                "history_live_limit": 1000,
+                "history_archive_batch": 100,
                 "suppress_join_notifications_for_games": [
                     "League of Legends"
                 ],
@@ -107,30 +189,363 @@ def load_config():
                 "message_template_join": "🎮 {mention}{players} {verb} a la party de **{game}** ({total} jugadores)"
             }
         }
-        with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(default_config, f, indent=4, ensure_ascii=False)
+        write_json_atomic(CONFIG_FILE, default_config, indent=4)
         return default_config
 
+def _persistence_config():
+    """Bloque persistence de config.json"""
+    return (config or {}).get('persistence', {})
+
+def _backup_generations():
+    """Cantidad de backups rotativos de stats.json (config['persistence'])"""
+    return int(_persistence_config().get('backup_generations', 3))
+
 def load_stats():
-    """Carga las estadísticas desde stats.json"""
-    try:
-        with open(STATS_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except FileNotFoundError:
+    """
+    Carga las estadísticas desde el repositorio configurado (STATS_BACKEND).
+    
+    JSON: si stats.json está corrupto usa la generación de backup válida más
+    reciente (stats.json.1, .2, ...). SQLite: si la base está vacía migra
+    desde stats.json (+ journal) la primera vez.
+    """
+    data = _repository.load()
+    
+    if data is None and _repository.name != 'json':
+        data = _migrate_from_json()
+    
+    if data is None:
         return {
             'users': {},
             'cooldowns': {}
         }
+    return data
+
+def _migrate_from_json():
+    """Importa stats.json + journal al repositorio actual (cambio de backend)"""
+    from core.stats_journal import StatsJournal
+    from core.stats_repository import JsonStatsRepository
+    
+    data = JsonStatsRepository(STATS_FILE, _backup_generations()).load()
+    if data is None:
+        return None
+    
+    seq = int(data.pop('_journal_seq', 0) or 0)
+    if STATS_JOURNAL_FILE.exists():
+        seq = StatsJournal(STATS_JOURNAL_FILE).replay(data, seq)
+    data['_journal_seq'] = seq
+    
+    _repository.save_snapshot(data, include_days=True)
+    logger.info(f'🗄️ Migración: {len(data.get("users", {}))} usuarios importados desde {STATS_FILE} a {_repository.name}')
+    return data
+
+def _capture_snapshot(consistent: bool = False):
+    """
+    Toma el estado a escribir y reserva su generación.
+    
+    Args:
+        consistent: Usar el snapshot copy-on-write (necesario si se serializa
+            fuera del event loop mientras el bot sigue mutando stats)
+    
+    Returns:
+        tuple: (datos con `_journal_seq`, generación, marca del journal o None)
+    """
+    global _snapshot_generation
+    data = dict(_snapshots.get() if consistent else stats)
+    data['_journal_seq'] = _journal_seq
+    _snapshot_generation += 1
+    mark = _journal.mark() if _journal is not None else None
+    return data, _snapshot_generation, mark
+
+def _write_stats_file(data, generation):
+    """
+    Escribe el estado completo de stats en el repositorio (cualquier thread).
+    Incluye `_journal_seq`: el último evento del journal ya plegado en el snapshot.
+    
+    Returns:
+        bool: False si ya se había escrito una generación más nueva
+    """
+    global _written_generation
+    with _write_lock:
+        if generation <= _written_generation:
+            return False
+        start = time.perf_counter()
+        _repository.save_snapshot(data)
+        elapsed = time.perf_counter() - start
+        _written_generation = generation
+    
+    # Duración y tamaño para !perf / métricas (SQLite escribe filas, no un archivo entero)
+    size = None
+    if _repository.name == 'json':
+        try:
+            size = _repository.path.stat().st_size
+        except OSError:
+            pass
+    record_stats_write(elapsed, size)
+    return True
+
+def _write_snapshot():
+    """Escribe el snapshot y vacía el journal (sus eventos quedan incluidos)"""
+    global _pending_changes
+    
+    # Resetear antes de escribir: los cambios que lleguen durante la
+    # escritura quedan pendientes para el próximo flush
+    pending = _pending_changes
+    _pending_changes = 0
+    data, generation, _ = _capture_snapshot()
+    try:
+        _write_stats_file(data, generation)
+    except Exception:
+        _pending_changes += pending
+        raise
+    
+    if _journal is not None:
+        _journal.truncate()
+
+async def _write_snapshot_async():
+    """
+    Como _write_snapshot(), pero serializa y escribe en el thread de I/O.
+    
+    El event loop solo copia los usuarios modificados desde el último snapshot;
+    json.dumps y el fsync del archivo completo no bloquean heartbeats ni comandos.
+    Los eventos que lleguen al journal durante la escritura se conservan.
+    """
+    global _pending_changes
+    if not _repository.thread_safe_snapshots:
+        _write_snapshot()
+        return
+    
+    pending = _pending_changes
+    _pending_changes = 0
+    data, generation, mark = _capture_snapshot(consistent=True)
+    loop = asyncio.get_running_loop()
+    try:
+        written = await loop.run_in_executor(get_io_executor(), _write_stats_file, data, generation)
+    except Exception:
+        _pending_changes += pending
+        raise
+    
+    if written and _journal is not None:
+        _journal.truncate(upto=mark)
+
+def _replay_journal():
+    """
+    Re-aplica sobre el snapshot cargado los eventos del journal
+    que todavía no estaban plegados (seq > _journal_seq del snapshot).
+    """
+    global _journal_seq
+    from core.stats_journal import StatsJournal
+    
+    _journal_seq = int(stats.pop('_journal_seq', 0) or 0)
+    if _repository.uses_journal and STATS_JOURNAL_FILE.exists():
+        _journal_seq = StatsJournal(STATS_JOURNAL_FILE).replay(stats, _journal_seq)
+
+def record_mutation(op: str, **args):
+    """
+    Aplica una mutación de stats (ver core.stats_mutations) y la persiste.
+    
+    Con el journal activo se agrega una línea al journal (O(evento)) y el
+    compactor la pliega luego en stats.json. Los backends sin journal
+    (SQLite) persisten la mutación directamente. Sin journal se usa save_stats().
+    
+    Args:
+        op: Nombre de la operación
+        **args: Argumentos de la operación (serializables a JSON)
+    
+    Returns:
+        Resultado del aplicador de la operación
+    """
+    global _journal_seq
+    from core.stats_mutations import apply_mutation
+    
+    now = datetime.now()
+    result = apply_mutation(stats, op, args, now)
+    _snapshots.mark_user_dirty(args.get('user_id'))
+    _rollups.record(op, args, now)
+    _leaderboards.user_changed(args.get('user_id'), op, now)
+    
+    if not _repository.uses_journal:
+        _repository.record_mutation(stats, op, args, now)
+        return result
+    
+    if _journal is None:
+        save_stats()
+        return result
+    
+    _journal_seq += 1
+    _journal.append(_journal_seq, op, args, now)
+    if _compactor is not None:
+        _compactor.notify(_journal.record_count)
+    return result
 
 def save_stats():
-    """Guarda las estadísticas en disco"""
-    with open(STATS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(stats, f, indent=2, ensure_ascii=False)
+    """
+    Registra un cambio en las estadísticas.
+    
+    Con el write-behind activo solo marca el store como sucio y el flusher
+    agrupa los cambios en una sola escritura. Sin flusher (tests, scripts)
+    escribe a disco inmediatamente.
+    """
+    global _pending_changes
+    _pending_changes += 1
+    _snapshots.mark_root_dirty()
+    
+    if _flusher is None or not _flusher.is_running():
+        flush_now()
+        return
+    
+    _flusher.notify(_pending_changes)
+
+async def _flush_dirty():
+    """Flush del write-behind: solo escribe si hay cambios marcados con save_stats()"""
+    if _pending_changes == 0:
+        return False
+    await _write_snapshot_async()
+    return True
+
+def compact_journal():
+    """
+    Pliega el journal en un snapshot nuevo de stats.json.
+    
+    Returns:
+        bool: True si había eventos en el journal y se compactó
+    """
+    if _journal is None or _journal.record_count == 0:
+        return False
+    _write_snapshot()
+    logger.debug('📜 Journal compactado en stats.json')
+    return True
+
+async def _compact_journal_async():
+    """compact_journal() con la escritura en el thread de I/O (usado por el compactor)"""
+    if _journal is None or _journal.record_count == 0:
+        return False
+    await _write_snapshot_async()
+    logger.debug('📜 Journal compactado en stats.json')
+    return True
+
+def flush_now():
+    """
+    Escribe inmediatamente a disco los cambios pendientes (incluido el journal).
+    
+    Returns:
+        bool: True si había cambios y se escribieron
+    """
+    journal_records = _journal.record_count if _journal is not None else 0
+    if _pending_changes == 0 and journal_records == 0:
+        return False
+    _write_snapshot()
+    return True
+
+async def flush_async():
+    """
+    flush_now() sin bloquear el event loop (la escritura corre en el thread de I/O).
+    
+    Returns:
+        bool: True si había cambios y se escribieron
+    """
+    journal_records = _journal.record_count if _journal is not None else 0
+    if _pending_changes == 0 and journal_records == 0:
+        return False
+    await _write_snapshot_async()
+    return True
+
+def has_pending_changes():
+    """True si hay cambios en memoria que todavía no están en stats.json"""
+    journal_records = _journal.record_count if _journal is not None else 0
+    return _pending_changes > 0 or journal_records > 0
+
+def start_write_behind():
+    """
+    Inicia el flusher write-behind y, si está habilitado, el journal
+    con su compactor (requiere un event loop corriendo).
+    Lee intervalos y umbrales de config['persistence'].
+    """
+    global _flusher, _journal, _compactor
+    from core.write_behind import WriteBehindFlusher
+    from core.stats_journal import StatsJournal
+    
+    if _flusher is not None and _flusher.is_running():
+        return _flusher
+    
+    persistence_config = _persistence_config()
+    _flusher = WriteBehindFlusher(
+        _flush_dirty,
+        interval_seconds=persistence_config.get('flush_interval_seconds', 5),
+        max_pending=persistence_config.get('flush_max_pending', 100)
+    )
+    _flusher.start()
+    
+    if _repository.uses_journal and persistence_config.get('journal_enabled', True):
+        _journal = StatsJournal(
+            STATS_JOURNAL_FILE,
+            fsync=persistence_config.get('journal_fsync', False)
+        )
+        _journal.open()
+        _compactor = WriteBehindFlusher(
+            _compact_journal_async,
+            interval_seconds=persistence_config.get('journal_compact_interval_seconds', 60),
+            max_pending=persistence_config.get('journal_compact_max_records', 2000),
+            name='Compactor de journal'
+        )
+        _compactor.start()
+    
+    return _flusher
+
+async def stop_write_behind():
+    """Detiene flusher y compactor, fuerza un flush final y cierra el journal"""
+    global _flusher, _journal, _compactor
+    if _compactor is not None:
+        await _compactor.stop()
+        _compactor = None
+    if _flusher is not None:
+        await _flusher.stop()
+        _flusher = None
+    flush_now()
+    if _journal is not None:
+        _journal.close()
+        _journal = None
+
+def get_stats_snapshot():
+    """
+    Snapshot de solo lectura de las estadísticas en memoria.
+    
+    Sin I/O de disco ni parseo de JSON: se reutiliza mientras no haya cambios
+    y solo re-copia los usuarios modificados. No modificar el dict retornado.
+    """
+    return _snapshots.get()
+
+def mark_user_dirty(user_id: str):
+    """Avisa a snapshots, repositorio, rollups y leaderboards que un usuario se modificó fuera de record_mutation()"""
+    _snapshots.mark_user_dirty(user_id)
+    _repository.mark_user_dirty(user_id)
+    # Los rollups no pueden restar el estado anterior: se reconstruyen
+    _rollups.invalidate()
+    _leaderboards.invalidate()
+
+
+def get_leaderboards():
+    """Leaderboards en memoria (ver core.leaderboard)"""
+    return _leaderboards
+
+def get_rollups():
+    """Rollups por período en memoria (ver core.rollups)"""
+    return _rollups
+
+def get_party_graph():
+    """Grafo de co-juego de las parties (ver core.party_graph)"""
+    return _party_graph.get()
+
+def get_party_history_store():
+    """Historial de parties con archivo mensual (ver core.party_history)"""
+    return _party_history
+
+def get_repository():
+    """Repositorio de estadísticas activo (consultas indexadas en SQLite)"""
+    return _repository
 
 def save_config():
-    """Guarda la configuración en disco"""
-    with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-        json.dump(config, f, indent=4, ensure_ascii=False)
+    """Guarda la configuración en disco (en el thread de I/O si hay event loop)"""
+    write_json_in_background(CONFIG_FILE, copy_tree(config), indent=4)
 
 def get_channel_id():
     """Obtiene el channel_id con prioridad: ENV > config.json"""
@@ -152,7 +567,19 @@ def get_stats_channel_id():
     # Prioridad 2: config.json persistente
     return config.get('stats_channel_id')
 
+def _flush_on_exit():
+    """Último recurso: no perder cambios pendientes si el proceso termina"""
+    try:
+        flush_now()
+    except Exception:
+        pass
+
 # Inicializar al importar
 config = load_config()
+_party_history.configure(config.get('party_detection', {}))
+set_codec(_persistence_config().get('json_codec', 'auto'))
+_repository = create_repository(DATA_DIR, _backup_generations(), _persistence_config().get('pretty_json', False))
 stats = load_stats()
+_replay_journal()
+atexit.register(_flush_on_exit)
 
@@ -0,0 +1,146 @@
+"""
+Índice de presencia: juego -> jugadores, por servidor
+Se mantiene con el diff before/after de cada on_presence_update, así la
+detección de parties consulta quién juega a qué sin recorrer guild.members.
+
+Usa la actividad PRINCIPAL de cada miembro (ver get_primary_game_activity),
+igual que la detección de parties. El primer acceso a un servidor todavía no
+indexado lo construye con un único recorrido de sus miembros.
+"""
+
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from core.helpers import get_primary_game_activity
+
+logger = logging.getLogger('dsbot')
+
+
+class PresenceIndex:
+    """Jugadores por juego y juego por jugador, por servidor"""
+
+    def __init__(self):
+        # guild_id -> juego -> user_id -> {'user_id', 'username', 'activity'}
+        self._players: Dict[int, Dict[str, Dict[str, Dict]]] = {}
+        # guild_id -> user_id -> juego
+        self._games: Dict[int, Dict[str, str]] = {}
+
+    def is_indexed(self, guild_id: int) -> bool:
+        """Si el servidor ya fue indexado"""
+        return guild_id in self._players
+
+    def rebuild_guild(self, guild) -> int:
+        """
+        Indexa un servidor desde cero recorriendo sus miembros.
+
+        Args:
+            guild: discord.Guild
+
+        Returns:
+            Cantidad de miembros jugando
+        """
+        self._players[guild.id] = {}
+        self._games[guild.id] = {}
+        playing = 0
+        for member in guild.members:
+            if self._set_member(guild.id, member)[1] is not None:
+                playing += 1
+        logger.debug(f'🗂️ Índice de presencia construido: {guild.name} ({playing} jugando)')
+        return playing
+
+    def forget_guild(self, guild_id: int):
+        """Descarta el índice de un servidor"""
+        self._players.pop(guild_id, None)
+        self._games.pop(guild_id, None)
+
+    def _ensure_guild(self, guild):
+        if guild.id not in self._players:
+            self.rebuild_guild(guild)
+
+    def _set_member(self, guild_id: int, member) -> Tuple[Optional[str], Optional[str]]:
+        user_id = str(member.id)
+        players = self._players[guild_id]
+        games = self._games[guild_id]
+
+        previous = games.pop(user_id, None)
+        if previous is not None:
+            bucket = players.get(previous)
+            if bucket is not None:
+                bucket.pop(user_id, None)
+                if not bucket:
+                    del players[previous]
+
+        if member.bot:
+            return previous, None
+        activity = get_primary_game_activity(member.activities)
+        if activity is None:
+            return previous, None
+
+        game_name = activity.name
+        games[user_id] = game_name
+        players.setdefault(game_name, {})[user_id] = {
+            'user_id': user_id,
+            'username': member.display_name,
+            'activity': activity,
+        }
+        return previous, game_name
+
+    def update_member(self, member) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Actualiza la presencia de un miembro (after de on_presence_update).
+
+        Args:
+            member: discord.Member con su presencia actual
+
+        Returns:
+            (juego anterior, juego actual); None si no jugaba / no juega
+        """
+        guild = member.guild
+        if guild.id not in self._players:
+            # El recorrido inicial ya lee la presencia actual del miembro
+            self.rebuild_guild(guild)
+            return None, self._games[guild.id].get(str(member.id))
+        return self._set_member(guild.id, member)
+
+    def remove_member(self, member) -> Optional[str]:
+        """
+        Quita a un miembro del índice (salió del servidor).
+
+        Returns:
+            Juego en el que figuraba o None
+        """
+        if member.guild.id not in self._players:
+            return None
+        user_id = str(member.id)
+        previous = self._games[member.guild.id].pop(user_id, None)
+        if previous is not None:
+            bucket = self._players[member.guild.id].get(previous, {})
+            bucket.pop(user_id, None)
+            if not bucket:
+                self._players[member.guild.id].pop(previous, None)
+        return previous
+
+    def players_by_game(self, guild) -> Dict[str, List[Dict]]:
+        """
+        Jugadores agrupados por juego.
+
+        Returns:
+            Dict con formato: {game_name: [{user_id, username, activity}, ...]}
+        """
+        self._ensure_guild(guild)
+        return {game: list(players.values()) for game, players in self._players[guild.id].items()}
+
+    def players(self, guild, game_name: str) -> List[Dict]:
+        """Jugadores de un juego en el servidor"""
+        self._ensure_guild(guild)
+        return list(self._players[guild.id].get(game_name, {}).values())
+
+    def count(self, guild, game_name: str) -> int:
+        """Cantidad de jugadores de un juego en el servidor"""
+        self._ensure_guild(guild)
+        return len(self._players[guild.id].get(game_name, ()))
+
+    def game_of(self, guild, user_id: str) -> Optional[str]:
+        """Juego principal de un miembro o None"""
+        self._ensure_guild(guild)
+        return self._games[guild.id].get(str(user_id))
@@ -0,0 +1,93 @@
+"""
+Rate limits reales de la API de Discord
+Lee los headers X-RateLimit-* de cada respuesta (TraceConfig de aiohttp que
+discord.py acepta como `http_trace`) para que los envíos masivos se
+acompasen al bucket de cada ruta en lugar de usar pausas fijas.
+"""
+
+import logging
+import re
+import time
+from typing import Callable, Dict, Mapping, Optional, Tuple
+
+logger = logging.getLogger('dsbot')
+
+# '/api/v10/channels/1/messages' -> '/channels/1/messages'
+_API_PREFIX = re.compile(r'^/api/v\d+')
+
+
+class RateLimitTracker:
+    """
+    Estado de rate limit por ruta: (restantes, instante de reset).
+
+    discord.py ya espera por su cuenta cuando un bucket se agota; el tracker
+    permite que quien envía muchos mensajes seguidos sepa de antemano cuánto
+    esperar y no llegue a encolar pedidos (ni a recibir 429).
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            clock: Reloj monotónico
+        """
+        self._clock = clock
+        self._routes: Dict[str, Tuple[int, float]] = {}
+
+    @staticmethod
+    def route_key(method: str, path: str) -> str:
+        return f'{method.upper()} {_API_PREFIX.sub("", path)}'
+
+    def observe(self, method: str, path: str, headers: Mapping[str, str]):
+        """
+        Registra los headers de una respuesta.
+
+        Args:
+            method: Método HTTP
+            path: Path de la URL (con o sin prefijo /api/vN)
+            headers: Headers de la respuesta
+        """
+        remaining = headers.get('X-RateLimit-Remaining')
+        reset_after = headers.get('X-RateLimit-Reset-After') or headers.get('Retry-After')
+        if remaining is None or reset_after is None:
+            return
+        try:
+            state = (int(remaining), self._clock() + float(reset_after))
+        except ValueError:
+            return
+        self._routes[self.route_key(method, path)] = state
+
+    def delay(self, method: str, path: str) -> Optional[float]:
+        """
+        Segundos a esperar antes del próximo pedido a la ruta.
+
+        Returns:
+            0 si hay cupo, la espera hasta el reset si el bucket está agotado,
+            o None si todavía no se vio ninguna respuesta de esa ruta
+        """
+        state = self._routes.get(self.route_key(method, path))
+        if state is None:
+            return None
+        remaining, reset_at = state
+        now = self._clock()
+        if remaining > 0 or now >= reset_at:
+            return 0.0
+        return reset_at - now
+
+    def trace_config(self):
+        """TraceConfig de aiohttp para `commands.Bot(..., http_trace=...)`"""
+        import aiohttp
+
+        async def on_request_end(session, context, params):
+            self.observe(params.method, params.url.path, params.response.headers)
+
+        trace = aiohttp.TraceConfig()
+        trace.on_request_end.append(on_request_end)
+        return trace
+
+
+_tracker = RateLimitTracker()
+
+
+def get_rate_limit_tracker() -> RateLimitTracker:
+    """Tracker del proceso (alimentado por el http_trace del bot)"""
+    return _tracker
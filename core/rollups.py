@@ -0,0 +1,340 @@
+"""
+Rollups de estadísticas por período (día / semana ISO / mes / año)
+Totales de minutos y sesiones por usuario y por juego, pre-agregados por
+bucket de calendario y mantenidos a medida que llegan los eventos.
+
+Los períodos son de calendario: 'today' es el día en curso, 'week' la semana
+ISO en curso (lunes a domingo), 'month' el mes y 'year' el año en curso.
+Las consultas leen el bucket del período directamente, así que cuentan solo
+los minutos y sesiones ocurridos dentro del período (antes se contaban los
+totales históricos de quien hubiera jugado recientemente).
+
+Fuente de los datos por día:
+- minutos: `daily_minutes` de cada juego y de voz
+- sesiones: `daily_counts` (se registra desde que existe este módulo). Las
+  sesiones históricas sin desglose diario no tienen día: cuentan solo en el
+  histórico ('all'), que se lee de los totales de cada usuario. En el día de
+  `last_played` / `last_join` el juego figura con 0 minutos y 0 sesiones
+"""
+
+import logging
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger('dsbot')
+
+PERIODS = ('today', 'week', 'month', 'year')
+
+_PERIOD_INDEX = {'today': 0, 'week': 1, 'month': 2, 'year': 3}
+
+
+def period_range(period: str, now: Optional[datetime] = None) -> Optional[Tuple[str, str]]:
+    """
+    Rango de días (inclusive) del período de calendario en curso.
+
+    Args:
+        period: 'today', 'week', 'month', 'year' o 'all'
+        now: Momento de referencia (default: ahora)
+
+    Returns:
+        Tupla ('YYYY-MM-DD', 'YYYY-MM-DD') o None para 'all' / desconocidos
+    """
+    today = (now or datetime.now()).date()
+    if period == 'today':
+        start = end = today
+    elif period == 'week':
+        start = today - timedelta(days=today.weekday())
+        end = start + timedelta(days=6)
+    elif period == 'month':
+        start = today.replace(day=1)
+        end = (start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    elif period == 'year':
+        start = date(today.year, 1, 1)
+        end = date(today.year, 12, 31)
+    else:
+        return None
+    return start.isoformat(), end.isoformat()
+
+
+@lru_cache(maxsize=4096)
+def bucket_keys(day: str) -> Tuple[str, str, str, str]:
+    """
+    Buckets a los que pertenece un día.
+
+    Args:
+        day: Fecha 'YYYY-MM-DD'
+
+    Returns:
+        ('D:2025-03-01', 'W:2025-W09', 'M:2025-03', 'Y:2025')
+
+    Raises:
+        ValueError: Si la fecha no es válida
+    """
+    iso_year, iso_week, _ = date.fromisoformat(day).isocalendar()
+    return f'D:{day}', f'W:{iso_year}-W{iso_week:02d}', f'M:{day[:7]}', f'Y:{day[:4]}'
+
+
+def period_bucket(period: str, now: Optional[datetime] = None) -> Optional[str]:
+    """Bucket del período en curso o None para 'all' / desconocidos"""
+    index = _PERIOD_INDEX.get(period)
+    if index is None:
+        return None
+    return bucket_keys((now or datetime.now()).strftime('%Y-%m-%d'))[index]
+
+
+def _iter_days(data: Dict, last_key: str) -> Iterator[Tuple[str, int, int]]:
+    """(day, minutes, count) de un juego o de la voz de un usuario"""
+    for day, minutes in (data.get('daily_minutes') or {}).items():
+        if minutes:
+            yield day, minutes, 0
+
+    counts = data.get('daily_counts') or {}
+    for day, count in counts.items():
+        if count:
+            yield day, 0, count
+
+    # Las sesiones anteriores a daily_counts (count - suma de daily_counts) no
+    # tienen día: cuentan solo en el histórico ('all'), nunca en un bucket. El
+    # día de la última actividad solo marca que el juego se jugó (0 min, 0 sesiones)
+    last_day = (data.get(last_key) or '')[:10]
+    if data.get('count', 0) > sum(counts.values()) and last_day:
+        yield last_day, 0, 0
+
+
+def iter_user_events(user_data: Dict) -> Iterator[Tuple[Optional[str], str, int, int]]:
+    """
+    Eventos por día de un usuario.
+
+    Returns:
+        Iterador de (game_name o None para voz, day, minutes, count)
+    """
+    for game_name, game_data in (user_data.get('games') or {}).items():
+        for day, minutes, count in _iter_days(game_data, 'last_played'):
+            yield game_name, day, minutes, count
+    for day, minutes, count in _iter_days(user_data.get('voice') or {}, 'last_join'):
+        yield None, day, minutes, count
+
+
+def new_totals() -> Dict:
+    """Totales vacíos de un usuario en un bucket"""
+    return {'game_minutes': 0, 'game_count': 0, 'voice_minutes': 0, 'voice_count': 0, 'games': {}}
+
+
+def _add(totals: Dict, game_name: Optional[str], minutes: int, count: int):
+    if game_name is None:
+        totals['voice_minutes'] += minutes
+        totals['voice_count'] += count
+        return
+    totals['game_minutes'] += minutes
+    totals['game_count'] += count
+    entry = totals['games'].setdefault(game_name, [0, 0])
+    entry[0] += minutes
+    entry[1] += count
+
+
+def user_period_totals(user_data: Dict, period: str, now: Optional[datetime] = None) -> Optional[Dict]:
+    """
+    Totales de un usuario en el período recorriendo sus históricos por día.
+
+    Returns:
+        Dict de totales (ver new_totals) o None si no tuvo actividad
+    """
+    bounds = period_range(period, now)
+    if bounds is None:
+        return None
+    start, end = bounds
+
+    totals = None
+    for game_name, day, minutes, count in iter_user_events(user_data):
+        if start <= day[:10] <= end:
+            if totals is None:
+                totals = new_totals()
+            _add(totals, game_name, minutes, count)
+    return totals
+
+
+class StatsRollups:
+    """
+    Buckets pre-agregados sobre el dict de stats en memoria.
+
+    Se construye de forma perezosa en la primera consulta recorriendo los
+    históricos por día, y luego se mantiene con `record()` en cada mutación.
+    """
+
+    def __init__(self, source: Callable[[], Dict]):
+        """
+        Args:
+            source: Función que retorna el dict de stats en vivo
+        """
+        self._source = source
+        self._built_for: Optional[Dict] = None
+        self._built = False
+        # bucket -> user_id -> totales
+        self._users: Dict[str, Dict[str, Dict]] = {}
+        # bucket -> juego -> {'minutes', 'count', 'players'}
+        self._games: Dict[str, Dict[str, Dict]] = {}
+
+    def invalidate(self):
+        """Descarta los buckets (se reconstruyen en la próxima consulta)"""
+        self._built = False
+        self._built_for = None
+
+    def _ensure_built(self):
+        live = self._source()
+        if self._built and live is self._built_for:
+            return
+
+        self._users.clear()
+        self._games.clear()
+        users = (live or {}).get('users', {})
+        for user_id, user_data in users.items():
+            for game_name, day, minutes, count in iter_user_events(user_data):
+                self._add_event(user_id, game_name, day, minutes, count)
+
+        self._built_for = live
+        self._built = True
+        logger.debug(f'🗓️ Rollups reconstruidos ({len(self._users)} buckets)')
+
+    def _add_event(self, user_id: str, game_name: Optional[str], day: str, minutes: int, count: int):
+        try:
+            keys = bucket_keys(day[:10])
+        except ValueError:
+            return
+
+        for key in keys:
+            users = self._users.setdefault(key, {})
+            totals = users.get(user_id)
+            if totals is None:
+                totals = users[user_id] = new_totals()
+            _add(totals, game_name, minutes, count)
+
+            if game_name is not None:
+                game = self._games.setdefault(key, {}).setdefault(
+                    game_name, {'minutes': 0, 'count': 0, 'players': set()}
+                )
+                game['minutes'] += minutes
+                game['count'] += count
+                game['players'].add(user_id)
+
+    def record(self, op: str, args: Dict, now: datetime):
+        """
+        Suma una mutación ya aplicada (ver core.stats_mutations) a sus buckets.
+
+        Args:
+            op: Operación aplicada
+            args: Argumentos de la operación
+            now: Momento del evento
+        """
+        if not self._built or self._source() is not self._built_for:
+            return  # Se reconstruye entero en la próxima consulta
+
+        if op in ('game_time', 'voice_time') and not args['minutes']:
+            return  # Igual que al reconstruir: daily_minutes en 0 no es actividad
+
+        day = now.strftime('%Y-%m-%d')
+        user_id = args.get('user_id')
+        if op == 'game_time':
+            self._add_event(user_id, args['game_name'], day, args['minutes'], 0)
+        elif op == 'game_count':
+            self._add_event(user_id, args['game_name'], day, 0, 1)
+        elif op == 'voice_time':
+            self._add_event(user_id, None, day, args['minutes'], 0)
+        elif op == 'voice_count':
+            self._add_event(user_id, None, day, 0, 1)
+
+    def period_users(self, period: str, now: Optional[datetime] = None) -> Dict[str, Dict]:
+        """
+        Totales por usuario del período en curso (solo usuarios con actividad).
+
+        Returns:
+            Dict user_id -> totales (solo lectura)
+        """
+        key = period_bucket(period, now)
+        if key is None:
+            return {}
+        self._ensure_built()
+        return self._users.get(key, {})
+
+    def user_totals(self, user_id: str, period: str, now: Optional[datetime] = None) -> Optional[Dict]:
+        """Totales de un usuario en el período en curso o None si no tuvo actividad"""
+        return self.period_users(period, now).get(user_id)
+
+    def period_games(self, period: str, now: Optional[datetime] = None) -> Dict[str, Dict]:
+        """
+        Totales por juego del período en curso.
+
+        Returns:
+            Dict game -> {'minutes', 'count', 'players': set(user_id)} (solo lectura)
+        """
+        key = period_bucket(period, now)
+        if key is None:
+            return {}
+        self._ensure_built()
+        return self._games.get(key, {})
+
+
+def filter_stats_by_period(stats_data: Dict, period: str, rollups: Optional[StatsRollups] = None,
+                           keep_social: bool = True, now: Optional[datetime] = None) -> Dict:
+    """
+    Vista de stats con solo la actividad del período.
+
+    Cada juego y la voz de cada usuario llevan los minutos y sesiones
+    ocurridos dentro del período (no los totales históricos).
+
+    Args:
+        stats_data: Datos completos de stats
+        period: 'today', 'week', 'month', 'year' o 'all'
+        rollups: Rollups en memoria; sin ellos se recorren los históricos por día
+        keep_social: Si incluir mensajes/reacciones/stickers (no tienen fecha por evento)
+        now: Momento de referencia
+
+    Returns:
+        Dict con la misma forma que stats (solo 'users')
+    """
+    if period not in PERIODS:
+        return stats_data
+
+    users = stats_data.get('users', {})
+    if rollups is not None:
+        totals_by_user = rollups.period_users(period, now)
+    else:
+        totals_by_user = {}
+        for user_id, user_data in users.items():
+            totals = user_period_totals(user_data, period, now)
+            if totals is not None:
+                totals_by_user[user_id] = totals
+
+    filtered = {'users': {}}
+    for user_id, totals in totals_by_user.items():
+        user_data = users.get(user_id)
+        if user_data is None:
+            continue
+        games = user_data.get('games', {})
+        voice = user_data.get('voice', {})
+
+        filtered_user = {
+            'username': user_data.get('username', 'Unknown'),
+            'games': {
+                game_name: {
+                    'count': count,
+                    'total_minutes': minutes,
+                    'last_played': games.get(game_name, {}).get('last_played'),
+                }
+                for game_name, (minutes, count) in totals['games'].items()
+            },
+            'voice': {
+                'count': totals['voice_count'],
+                'total_minutes': totals['voice_minutes'],
+                'last_join': voice.get('last_join'),
+            },
+        }
+        if keep_social:
+            filtered_user['messages'] = user_data.get('messages', {})
+            filtered_user['reactions'] = user_data.get('reactions', {})
+            filtered_user['stickers'] = user_data.get('stickers', {})
+
+        if filtered_user['games'] or totals['voice_count'] > 0 or totals['voice_minutes'] > 0:
+            filtered['users'][user_id] = filtered_user
+
+    return filtered
@@ -0,0 +1,207 @@
+"""
+Scheduler de timers del bot
+Una sola task en background dispara todos los deadlines (verificación de
+sesiones en fases de 3s/7s, vencimiento de gracia) desde un heap ordenado por
+tiempo monotónico, en lugar de una task dormida por sesión.
+
+- Programar: O(log n)
+- Cancelar: O(1) (se marca el handle; se descarta al llegar al tope del heap)
+- Los callbacks pueden ser funciones o corrutinas (estas corren en una task
+  corta recién al vencer el timer)
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Callable, List, Optional, Tuple
+
+logger = logging.getLogger('dsbot')
+
+# Compactar el heap cuando más de la mitad son timers cancelados
+_COMPACT_MIN_CANCELLED = 64
+
+
+class TimerHandle:
+    """Timer programado; se puede cancelar y consultar si terminó"""
+
+    __slots__ = ('when', '_callback', '_args', '_on_cancel', '_scheduler',
+                 '_cancelled', '_fired', '_task')
+
+    def __init__(self, when: float, callback: Callable, args: tuple,
+                 on_cancel: Optional[Callable[[], None]], scheduler: 'Scheduler'):
+        self.when = when
+        self._callback = callback
+        self._args = args
+        self._on_cancel = on_cancel
+        self._scheduler = scheduler
+        self._cancelled = False
+        self._fired = False
+        self._task: Optional[asyncio.Task] = None
+
+    def cancel(self):
+        """
+        Cancela el timer.
+        Si ya disparó y su corrutina sigue corriendo, cancela esa task.
+        """
+        if self._fired:
+            if self._task is not None and not self._task.done():
+                self._task.cancel()
+            return
+        if self._cancelled:
+            return
+        self._cancelled = True
+        self._callback = None
+        self._args = ()
+        self._scheduler._on_handle_cancelled()
+        if self._on_cancel is not None:
+            try:
+                self._on_cancel()
+            except Exception as e:
+                logger.error(f'❌ Error en on_cancel de timer: {e}')
+
+    def cancelled(self) -> bool:
+        """True si se canceló antes de disparar"""
+        return self._cancelled
+
+    def done(self) -> bool:
+        """True si se canceló o si ya disparó y terminó su callback"""
+        if self._cancelled:
+            return True
+        return self._fired and (self._task is None or self._task.done())
+
+
+class Scheduler:
+    """Heap de deadlines manejado por una única task"""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            clock: Reloj monotónico (inyectable para tests)
+        """
+        self._clock = clock
+        self._heap: List[Tuple[float, int, TimerHandle]] = []
+        self._seq = itertools.count()
+        self._cancelled = 0
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+
+    def call_later(self, delay: float, callback: Callable, *args,
+                   on_cancel: Optional[Callable[[], None]] = None) -> TimerHandle:
+        """
+        Programa un callback dentro de `delay` segundos.
+
+        Args:
+            delay: Segundos hasta el disparo
+            callback: Función o corrutina a ejecutar
+            *args: Argumentos del callback
+            on_cancel: Función a llamar si el timer se cancela antes de disparar
+
+        Returns:
+            TimerHandle
+        """
+        return self.call_at(self._clock() + max(0.0, delay), callback, *args, on_cancel=on_cancel)
+
+    def call_at(self, when: float, callback: Callable, *args,
+                on_cancel: Optional[Callable[[], None]] = None) -> TimerHandle:
+        """Programa un callback en un instante del reloj monotónico (ver call_later)"""
+        handle = TimerHandle(when, callback, args, on_cancel, self)
+        heapq.heappush(self._heap, (when, next(self._seq), handle))
+        self._ensure_running()
+        if self._wake is not None and self._heap[0][2] is handle:
+            self._wake.set()  # Nuevo deadline más próximo: recalcular la espera
+        return handle
+
+    def pending(self) -> int:
+        """Cantidad de timers pendientes (sin contar cancelados)"""
+        return len(self._heap) - self._cancelled
+
+    def run_due(self, now: Optional[float] = None) -> int:
+        """
+        Dispara los timers vencidos.
+
+        Args:
+            now: Instante de referencia (default: reloj del scheduler)
+
+        Returns:
+            Cantidad de timers disparados
+        """
+        now = self._clock() if now is None else now
+        fired = 0
+        while self._heap and self._heap[0][0] <= now:
+            _, _, handle = heapq.heappop(self._heap)
+            if handle._cancelled:
+                self._cancelled -= 1
+                continue
+            self._fire(handle)
+            fired += 1
+        return fired
+
+    def _fire(self, handle: TimerHandle):
+        handle._fired = True
+        callback, args = handle._callback, handle._args
+        handle._callback = None
+        handle._args = ()
+        try:
+            result = callback(*args)
+        except Exception as e:
+            logger.error(f'❌ Error en timer {getattr(callback, "__qualname__", callback)}: {e}', exc_info=True)
+            return
+        if asyncio.iscoroutine(result):
+            handle._task = asyncio.get_running_loop().create_task(result)
+            handle._task.add_done_callback(_log_task_error)
+
+    def _on_handle_cancelled(self):
+        self._cancelled += 1
+        if self._cancelled > _COMPACT_MIN_CANCELLED and self._cancelled * 2 > len(self._heap):
+            self._heap = [entry for entry in self._heap if not entry[2]._cancelled]
+            heapq.heapify(self._heap)
+            self._cancelled = 0
+
+    def _ensure_running(self):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # Sin loop todavía: arranca con el primer timer programado desde el loop
+        if self._task is not None and not self._task.done() and self._loop is loop:
+            return
+        self._loop = loop
+        self._wake = asyncio.Event()
+        self._task = loop.create_task(self._run())
+
+    async def _run(self):
+        wake = self._wake
+        while True:
+            self.run_due()
+            wake.clear()
+            if not self._heap:
+                await wake.wait()
+                continue
+            timeout = self._heap[0][0] - self._clock()
+            if timeout <= 0:
+                continue
+            try:
+                await asyncio.wait_for(wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def stop(self):
+        """Detiene la task del scheduler (los timers pendientes se conservan)"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        self._task = None
+
+
+def _log_task_error(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f'❌ Error en callback de timer: {task.exception()}', exc_info=task.exception())
+
+
+_scheduler = Scheduler()
+
+
+def get_scheduler() -> Scheduler:
+    """Scheduler compartido del proceso"""
+    return _scheduler
@@ -0,0 +1,544 @@
+"""
+Backend SQLite para estadísticas
+stats.db en modo WAL con tablas indexadas:
+users, user_games, game_days, game_day_counts, voice_days, voice_day_counts,
+connections, parties, party_players
+
+Los históricos por día (daily_minutes, daily_counts, by_date) viven en tablas propias y
+el resto de cada usuario en un documento JSON compacto, así el dict de
+stats se reconstruye sin pérdidas y los rankings son queries indexadas.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from core.rollups import period_range
+from core.stats_repository import StatsRepository
+
+logger = logging.getLogger('dsbot')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    username TEXT,
+    doc TEXT NOT NULL,
+    game_minutes INTEGER NOT NULL DEFAULT 0,
+    game_sessions INTEGER NOT NULL DEFAULT 0,
+    unique_games INTEGER NOT NULL DEFAULT 0,
+    voice_minutes INTEGER NOT NULL DEFAULT 0,
+    voice_count INTEGER NOT NULL DEFAULT 0,
+    last_join TEXT,
+    messages INTEGER NOT NULL DEFAULT 0,
+    characters INTEGER NOT NULL DEFAULT 0,
+    reactions INTEGER NOT NULL DEFAULT 0,
+    connections INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_users_game_minutes ON users(game_minutes DESC);
+CREATE INDEX IF NOT EXISTS idx_users_voice_minutes ON users(voice_minutes DESC);
+CREATE INDEX IF NOT EXISTS idx_users_messages ON users(messages DESC);
+CREATE INDEX IF NOT EXISTS idx_users_social ON users((messages + reactions) DESC);
+
+CREATE TABLE IF NOT EXISTS user_games (
+    user_id TEXT NOT NULL,
+    game TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    total_minutes INTEGER NOT NULL DEFAULT 0,
+    last_played TEXT,
+    doc TEXT NOT NULL,
+    PRIMARY KEY (user_id, game)
+);
+CREATE INDEX IF NOT EXISTS idx_user_games_last_played ON user_games(last_played);
+
+CREATE TABLE IF NOT EXISTS game_days (
+    user_id TEXT NOT NULL,
+    game TEXT NOT NULL,
+    day TEXT NOT NULL,
+    minutes INTEGER NOT NULL,
+    PRIMARY KEY (user_id, game, day)
+);
+CREATE INDEX IF NOT EXISTS idx_game_days_day ON game_days(day);
+
+CREATE TABLE IF NOT EXISTS game_day_counts (
+    user_id TEXT NOT NULL,
+    game TEXT NOT NULL,
+    day TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (user_id, game, day)
+);
+CREATE INDEX IF NOT EXISTS idx_game_day_counts_day ON game_day_counts(day);
+
+CREATE TABLE IF NOT EXISTS voice_days (
+    user_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    minutes INTEGER NOT NULL,
+    PRIMARY KEY (user_id, day)
+);
+CREATE INDEX IF NOT EXISTS idx_voice_days_day ON voice_days(day);
+
+CREATE TABLE IF NOT EXISTS voice_day_counts (
+    user_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (user_id, day)
+);
+CREATE INDEX IF NOT EXISTS idx_voice_day_counts_day ON voice_day_counts(day);
+
+CREATE TABLE IF NOT EXISTS connections (
+    user_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (user_id, day)
+);
+CREATE INDEX IF NOT EXISTS idx_connections_day ON connections(day);
+
+CREATE TABLE IF NOT EXISTS parties (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    position INTEGER NOT NULL,
+    game TEXT,
+    start_time TEXT,
+    end_time TEXT,
+    duration_minutes INTEGER NOT NULL DEFAULT 0,
+    max_players INTEGER NOT NULL DEFAULT 0,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_parties_game ON parties(game);
+CREATE INDEX IF NOT EXISTS idx_parties_start ON parties(start_time);
+
+CREATE TABLE IF NOT EXISTS party_players (
+    party_id INTEGER NOT NULL,
+    user_id TEXT NOT NULL,
+    PRIMARY KEY (party_id, user_id)
+);
+CREATE INDEX IF NOT EXISTS idx_party_players_user ON party_players(user_id);
+"""
+
+# Operaciones que tocan un histórico por día (ver core.stats_mutations)
+_GAME_DAY_OPS = {'game_time'}
+_GAME_COUNT_OPS = {'game_count'}
+_VOICE_DAY_OPS = {'voice_time'}
+_VOICE_COUNT_OPS = {'voice_count'}
+_CONNECTION_DAY_OPS = {'connection'}
+
+# Claves con históricos por día que viven en tablas propias
+_DAY_KEYS = ('daily_minutes', 'daily_counts')
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+class SqliteStatsRepository(StatsRepository):
+    """Backend SQLite (WAL) con tablas indexadas para rankings"""
+
+    name = 'sqlite'
+    uses_journal = False  # El WAL de SQLite ya es el journal
+
+    def __init__(self, path):
+        """
+        Args:
+            path: Ruta de stats.db
+        """
+        self.path = Path(path)
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        self._party_signature = self._get_meta('party_signature')
+        # Usuarios modificados o borrados fuera de record_mutation()
+        self._dirty_users = set()
+
+    def close(self):
+        self._conn.close()
+
+    # ==================== META ====================
+
+    def _get_meta(self, key: str, default=None):
+        row = self._conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _set_meta(self, key: str, value):
+        self._conn.execute(
+            'INSERT INTO meta (key, value) VALUES (?, ?) '
+            'ON CONFLICT(key) DO UPDATE SET value = excluded.value',
+            (key, _dumps(value))
+        )
+
+    # ==================== LOAD ====================
+
+    def load(self) -> Optional[Dict]:
+        """Reconstruye el dict completo de stats desde las tablas"""
+        if self._get_meta('initialized') is None:
+            return None
+
+        data = self._get_meta('root', {})
+        data['users'] = {}
+        users = data['users']
+
+        for user_id, doc in self._conn.execute('SELECT user_id, doc FROM users'):
+            user = json.loads(doc)
+            user['games'] = {}
+            if 'voice' in user:
+                user['voice']['daily_minutes'] = {}
+            if 'daily_connections' in user:
+                user['daily_connections']['by_date'] = {}
+            users[user_id] = user
+
+        for user_id, game, doc in self._conn.execute('SELECT user_id, game, doc FROM user_games'):
+            game_data = json.loads(doc)
+            game_data['daily_minutes'] = {}
+            users[user_id]['games'][game] = game_data
+
+        for user_id, game, day, minutes in self._conn.execute(
+            'SELECT user_id, game, day, minutes FROM game_days ORDER BY day'
+        ):
+            users[user_id]['games'][game]['daily_minutes'][day] = minutes
+
+        for user_id, game, day, count in self._conn.execute(
+            'SELECT user_id, game, day, count FROM game_day_counts ORDER BY day'
+        ):
+            users[user_id]['games'][game].setdefault('daily_counts', {})[day] = count
+
+        for user_id, day, minutes in self._conn.execute(
+            'SELECT user_id, day, minutes FROM voice_days ORDER BY day'
+        ):
+            users[user_id]['voice']['daily_minutes'][day] = minutes
+
+        for user_id, day, count in self._conn.execute(
+            'SELECT user_id, day, count FROM voice_day_counts ORDER BY day'
+        ):
+            users[user_id]['voice'].setdefault('daily_counts', {})[day] = count
+
+        for user_id, day, count in self._conn.execute(
+            'SELECT user_id, day, count FROM connections ORDER BY day'
+        ):
+            users[user_id]['daily_connections']['by_date'][day] = count
+
+        parties = self._get_meta('parties')
+        if parties is not None:
+            parties['history'] = [
+                json.loads(doc)
+                for (doc,) in self._conn.execute('SELECT doc FROM parties ORDER BY position')
+            ]
+            data['parties'] = parties
+
+        data['_journal_seq'] = self._get_meta('journal_seq', 0)
+        return data
+
+    # ==================== WRITE ====================
+
+    def save_snapshot(self, stats: Dict, include_days: bool = False):
+        """
+        Sincroniza con las tablas la raíz de stats y las parties.
+
+        Las filas de cada usuario ya se escriben en record_mutation(), así que
+        un snapshot normal solo reescribe los usuarios marcados con
+        mark_user_dirty() (y borra los que ya no están en stats).
+        include_days=True (migración desde stats.json) copia todos los
+        usuarios con sus históricos por día y borra los que sobran.
+        """
+        users = stats.get('users', {})
+        with self._conn:
+            root = {
+                k: v for k, v in stats.items()
+                if k not in ('users', 'parties', '_journal_seq')
+            }
+            self._set_meta('root', root)
+            self._set_meta('journal_seq', stats.get('_journal_seq', 0))
+
+            if include_days:
+                stored = {user_id for (user_id,) in self._conn.execute('SELECT user_id FROM users')}
+                for user_id in stored - users.keys():
+                    self._delete_user(user_id)
+                for user_id, user in users.items():
+                    self._write_user(user_id, user, include_days=True)
+            else:
+                for user_id in self._dirty_users:
+                    if user_id in users:
+                        self._write_user(user_id, users[user_id])
+                    else:
+                        self._delete_user(user_id)
+
+            parties = stats.get('parties')
+            if parties is not None:
+                self._write_parties(parties)
+
+            self._set_meta('initialized', True)
+        self._dirty_users.clear()
+
+    def mark_user_dirty(self, user_id: str):
+        if user_id is not None:
+            self._dirty_users.add(user_id)
+
+    def record_mutation(self, stats: Dict, op: str, args: Dict, now: datetime):
+        """Persiste la mutación: fila del usuario + el día tocado (O(usuario))"""
+        user_id = args.get('user_id')
+        user = stats.get('users', {}).get(user_id)
+        if user is None:
+            return
+
+        today = now.strftime('%Y-%m-%d')
+        with self._conn:
+            self._write_user(user_id, user)
+
+            if op in _GAME_DAY_OPS:
+                game = args['game_name']
+                minutes = user['games'][game]['daily_minutes'].get(today, 0)
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO game_days (user_id, game, day, minutes) VALUES (?, ?, ?, ?)',
+                    (user_id, game, today, minutes)
+                )
+            elif op in _GAME_COUNT_OPS:
+                game = args['game_name']
+                count = user['games'][game]['daily_counts'].get(today, 0)
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO game_day_counts (user_id, game, day, count) VALUES (?, ?, ?, ?)',
+                    (user_id, game, today, count)
+                )
+            elif op in _VOICE_COUNT_OPS:
+                count = user['voice']['daily_counts'].get(today, 0)
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO voice_day_counts (user_id, day, count) VALUES (?, ?, ?)',
+                    (user_id, today, count)
+                )
+            elif op in _VOICE_DAY_OPS:
+                minutes = user['voice']['daily_minutes'].get(today, 0)
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO voice_days (user_id, day, minutes) VALUES (?, ?, ?)',
+                    (user_id, today, minutes)
+                )
+            elif op in _CONNECTION_DAY_OPS:
+                count = user['daily_connections']['by_date'].get(today, 0)
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO connections (user_id, day, count) VALUES (?, ?, ?)',
+                    (user_id, today, count)
+                )
+
+    def _write_user(self, user_id: str, user: Dict, include_days: bool = False):
+        """Upsert de un usuario y sus juegos (los días solo si include_days)"""
+        games = user.get('games', {})
+        voice = user.get('voice', {})
+        messages = user.get('messages', {})
+        connections = user.get('daily_connections', {})
+
+        doc = {k: v for k, v in user.items() if k != 'games'}
+        if 'voice' in user:
+            doc['voice'] = {k: v for k, v in voice.items() if k not in _DAY_KEYS}
+        if 'daily_connections' in user:
+            doc['daily_connections'] = {k: v for k, v in connections.items() if k != 'by_date'}
+
+        self._conn.execute(
+            'INSERT OR REPLACE INTO users (user_id, username, doc, game_minutes, game_sessions, unique_games, '
+            'voice_minutes, voice_count, last_join, messages, characters, reactions, connections) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (
+                user_id,
+                user.get('username', 'Unknown'),
+                _dumps(doc),
+                sum(g.get('total_minutes', 0) for g in games.values()),
+                sum(g.get('count', 0) for g in games.values()),
+                len(games),
+                voice.get('total_minutes', 0),
+                voice.get('count', 0),
+                voice.get('last_join'),
+                messages.get('count', 0),
+                messages.get('characters', 0),
+                user.get('reactions', {}).get('total', 0),
+                connections.get('total', 0),
+            )
+        )
+
+        self._conn.executemany(
+            'INSERT OR REPLACE INTO user_games (user_id, game, count, total_minutes, last_played, doc) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            [
+                (
+                    user_id, game,
+                    g.get('count', 0), g.get('total_minutes', 0), g.get('last_played'),
+                    _dumps({k: v for k, v in g.items() if k not in _DAY_KEYS})
+                )
+                for game, g in games.items()
+            ]
+        )
+
+        if not include_days:
+            return
+
+        self._conn.executemany(
+            'INSERT OR REPLACE INTO game_days (user_id, game, day, minutes) VALUES (?, ?, ?, ?)',
+            [
+                (user_id, game, day, minutes)
+                for game, g in games.items()
+                for day, minutes in g.get('daily_minutes', {}).items()
+            ]
+        )
+        self._conn.executemany(
+            'INSERT OR REPLACE INTO game_day_counts (user_id, game, day, count) VALUES (?, ?, ?, ?)',
+            [
+                (user_id, game, day, count)
+                for game, g in games.items()
+                for day, count in g.get('daily_counts', {}).items()
+            ]
+        )
+        self._conn.executemany(
+            'INSERT OR REPLACE INTO voice_days (user_id, day, minutes) VALUES (?, ?, ?)',
+            [(user_id, day, minutes) for day, minutes in voice.get('daily_minutes', {}).items()]
+        )
+        self._conn.executemany(
+            'INSERT OR REPLACE INTO voice_day_counts (user_id, day, count) VALUES (?, ?, ?)',
+            [(user_id, day, count) for day, count in voice.get('daily_counts', {}).items()]
+        )
+        self._conn.executemany(
+            'INSERT OR REPLACE INTO connections (user_id, day, count) VALUES (?, ?, ?)',
+            [(user_id, day, count) for day, count in connections.get('by_date', {}).items()]
+        )
+
+    def _delete_user(self, user_id: str):
+        """Borra todas las filas de un usuario que ya no está en stats"""
+        for table in ('users', 'user_games', 'game_days', 'game_day_counts',
+                      'voice_days', 'voice_day_counts', 'connections'):
+            self._conn.execute(f'DELETE FROM {table} WHERE user_id = ?', (user_id,))
+
+    def _write_parties(self, parties: Dict):
+        """Guarda active/stats_by_game como meta y reescribe el historial solo si cambió"""
+        self._set_meta('parties', {k: v for k, v in parties.items() if k != 'history'})
+
+        history = parties.get('history', [])
+        # Hash de toda la ventana: record() actualiza entradas en el lugar
+        signature = hashlib.sha1(_dumps(history).encode('utf-8')).hexdigest()
+        if signature == self._party_signature:
+            return
+
+        self._conn.execute('DELETE FROM party_players')
+        self._conn.execute('DELETE FROM parties')
+        for position, party in enumerate(history):
+            cursor = self._conn.execute(
+                'INSERT INTO parties (position, game, start_time, end_time, duration_minutes, max_players, doc) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (
+                    position, party.get('game'), party.get('start'), party.get('end'),
+                    party.get('duration_minutes', 0) or 0, party.get('max_players', 0) or 0,
+                    _dumps(party)
+                )
+            )
+            players = party.get('players') or []
+            if isinstance(players, list):
+                self._conn.executemany(
+                    'INSERT OR IGNORE INTO party_players (party_id, user_id) VALUES (?, ?)',
+                    [(cursor.lastrowid, str(uid)) for uid in players]
+                )
+
+        self._party_signature = signature
+        self._set_meta('party_signature', signature)
+
+    # ==================== CONSULTAS ====================
+
+    def _fetch(self, sql: str, params: Iterable, limit: Optional[int]) -> List[Tuple]:
+        if limit:
+            sql += ' LIMIT ?'
+            params = list(params) + [limit]
+        return [tuple(row) for row in self._conn.execute(sql, tuple(params))]
+
+    def top_game_time(self, period: str = 'all', limit: Optional[int] = None):
+        bounds = period_range(period)
+        if bounds is None:
+            return self._fetch(
+                'SELECT username, game_minutes, game_sessions, unique_games FROM users '
+                'WHERE game_minutes > 0 OR game_sessions > 0 '
+                'ORDER BY game_minutes DESC',
+                (), limit
+            )
+
+        # Minutos y sesiones del período por (usuario, juego). Las sesiones
+        # sin desglose diario (anteriores a daily_counts) solo cuentan en 'all'
+        start, end = bounds
+        return self._fetch(
+            'WITH events AS ('
+            '  SELECT user_id, game, minutes, 0 AS count FROM game_days WHERE day BETWEEN ? AND ? '
+            '  UNION ALL '
+            '  SELECT user_id, game, 0, count FROM game_day_counts WHERE day BETWEEN ? AND ? '
+            '), per_game AS ('
+            '  SELECT user_id, SUM(minutes) AS minutes, SUM(count) AS count FROM events '
+            '  GROUP BY user_id, game HAVING SUM(minutes) > 0 OR SUM(count) > 0'
+            ') '
+            'SELECT u.username, SUM(p.minutes) AS minutes, SUM(p.count), COUNT(*) '
+            'FROM per_game p JOIN users u ON u.user_id = p.user_id '
+            'GROUP BY p.user_id '
+            'ORDER BY minutes DESC',
+            (start, end) * 2, limit
+        )
+
+    def top_voice_time(self, period: str = 'all', limit: Optional[int] = None):
+        bounds = period_range(period)
+        if bounds is None:
+            return self._fetch(
+                'SELECT username, voice_minutes, voice_count FROM users '
+                'WHERE voice_minutes > 0 OR voice_count > 0 '
+                'ORDER BY voice_minutes DESC',
+                (), limit
+            )
+
+        start, end = bounds
+        return self._fetch(
+            'WITH events AS ('
+            '  SELECT user_id, minutes, 0 AS count FROM voice_days WHERE day BETWEEN ? AND ? '
+            '  UNION ALL '
+            '  SELECT user_id, 0, count FROM voice_day_counts WHERE day BETWEEN ? AND ? '
+            ') '
+            'SELECT u.username, SUM(e.minutes) AS minutes, SUM(e.count) '
+            'FROM events e JOIN users u ON u.user_id = e.user_id '
+            'GROUP BY e.user_id '
+            'HAVING SUM(e.minutes) > 0 OR SUM(e.count) > 0 '
+            'ORDER BY minutes DESC',
+            (start, end) * 2, limit
+        )
+
+    def top_messages(self, limit: Optional[int] = None):
+        return self._fetch(
+            'SELECT username, messages, characters FROM users '
+            'WHERE messages > 0 '
+            'ORDER BY messages DESC',
+            (), limit
+        )
+
+    def user_rankings(self, user_id: str) -> Dict[str, int]:
+        row = self._conn.execute(
+            'SELECT game_minutes, messages + reactions FROM users WHERE user_id = ?', (user_id,)
+        ).fetchone()
+        if row is None:
+            return {'gaming': 0, 'social': 0, 'parties': 0}
+        game_minutes, social = row
+
+        gaming_rank = self._conn.execute(
+            'SELECT COUNT(*) + 1 FROM users WHERE game_minutes > ?', (game_minutes,)
+        ).fetchone()[0]
+        social_rank = self._conn.execute(
+            'SELECT COUNT(*) + 1 FROM users WHERE messages + reactions > ?', (social,)
+        ).fetchone()[0]
+
+        my_parties = self._conn.execute(
+            'SELECT COUNT(*) FROM party_players WHERE user_id = ?', (user_id,)
+        ).fetchone()[0]
+        parties_rank = self._conn.execute(
+            'SELECT COUNT(*) + 1 FROM ('
+            '  SELECT pp.user_id FROM party_players pp JOIN users u ON u.user_id = pp.user_id '
+            '  GROUP BY pp.user_id HAVING COUNT(*) > ?'
+            ')',
+            (my_parties,)
+        ).fetchone()[0]
+
+        return {
+            'gaming': gaming_rank,
+            'social': social_rank,
+            'parties': parties_rank
+        }
@@ -0,0 +1,177 @@
+"""
+Journal append-only (WAL) de mutaciones de estadísticas
+Una línea JSON compacta por evento; se re-aplica sobre el último snapshot al iniciar
+"""
+
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+from core.atomic_io import write_bytes_atomic
+from core.json_codec import get_codec
+from core.stats_mutations import MUTATIONS, apply_mutation
+
+logger = logging.getLogger('dsbot')
+
+
+class StatsJournal:
+    """
+    Journal de mutaciones de stats.
+
+    Formato de cada línea:
+        {"seq": 12, "ts": "2025-01-01T20:15:00", "op": "message", "args": {...}}
+
+    `seq` es monotónico: el snapshot guarda el último seq incluido y el
+    replay ignora los registros ya plegados en él.
+    """
+
+    def __init__(self, path, fsync: bool = False):
+        """
+        Args:
+            path: Ruta del archivo de journal
+            fsync: Hacer fsync en cada registro (más seguro ante cortes de energía, más lento)
+        """
+        self.path = Path(path)
+        self.fsync = fsync
+        self.record_count = 0
+        self._file = None
+        # Aumenta con cada truncate(): invalida las marcas anteriores
+        self._generation = 0
+
+    def is_open(self) -> bool:
+        return self._file is not None
+
+    def open(self):
+        """Abre el journal para append (y cuenta los registros existentes)"""
+        if self._file is not None:
+            return
+
+        self.record_count = sum(1 for _ in self.iter_records())
+
+        needs_newline = False
+        if self.path.exists() and self.path.stat().st_size > 0:
+            with open(self.path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b'\n'
+
+        self._file = open(self.path, 'a', encoding='utf-8')
+        if needs_newline:
+            # Última línea cortada por un crash: no pegarle el próximo registro
+            self._file.write('\n')
+            self._file.flush()
+
+    def append(self, seq: int, op: str, args: dict, now: datetime):
+        """
+        Agrega un registro al journal.
+
+        Args:
+            seq: Número de secuencia del registro
+            op: Operación (ver core.stats_mutations)
+            args: Argumentos de la operación
+            now: Momento del evento
+        """
+        record = {'seq': seq, 'ts': now.isoformat(), 'op': op, 'args': args}
+        self._file.write(get_codec().dumps(record).decode('utf-8') + '\n')
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self.record_count += 1
+
+    def mark(self) -> Tuple[int, int, int]:
+        """
+        Posición actual del journal, para truncar luego solo hasta aquí.
+
+        Returns:
+            tuple: (generación, offset en bytes, registros hasta la marca)
+        """
+        offset = self._file.tell() if self._file is not None else 0
+        return self._generation, offset, self.record_count
+
+    def truncate(self, upto: Optional[Tuple[int, int, int]] = None):
+        """
+        Vacía el journal (sus registros ya están plegados en el snapshot).
+
+        Args:
+            upto: Marca de mark(). Si se indica, se conservan los registros
+                agregados después de ella (llegaron mientras se escribía el
+                snapshot en background). Una marca de antes de otro truncate()
+                no hace nada: ese truncate ya incluyó sus registros.
+        """
+        if upto is not None:
+            generation, offset, count = upto
+            if generation != self._generation:
+                return
+            if self._file is not None:
+                self._file.close()
+            with open(self.path, 'rb') as f:
+                f.seek(offset)
+                tail = f.read()
+            write_bytes_atomic(self.path, tail)
+            self._file = open(self.path, 'a', encoding='utf-8')
+            self.record_count = max(0, self.record_count - count)
+        else:
+            if self._file is not None:
+                self._file.close()
+            self._file = open(self.path, 'w', encoding='utf-8')
+            self.record_count = 0
+        self._generation += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def iter_records(self) -> Iterator[dict]:
+        """Itera los registros válidos del journal (ignora líneas cortadas/corruptas)"""
+        try:
+            f = open(self.path, 'r', encoding='utf-8')
+        except FileNotFoundError:
+            return
+
+        loads = get_codec().loads
+        with f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield loads(line)
+                except ValueError:
+                    logger.warning(f'⚠️ Journal: línea {line_number} inválida, ignorada')
+
+    def replay(self, stats: dict, after_seq: int = 0) -> int:
+        """
+        Re-aplica sobre `stats` los registros con seq > after_seq.
+
+        Args:
+            stats: Dict de estadísticas (último snapshot)
+            after_seq: Último seq ya incluido en el snapshot
+
+        Returns:
+            int: Último seq aplicado (after_seq si no había nada nuevo)
+        """
+        last_seq = after_seq
+        applied = 0
+
+        for record in self.iter_records():
+            seq = record.get('seq', 0)
+            if seq <= after_seq:
+                continue
+
+            op = record.get('op')
+            if op not in MUTATIONS:
+                logger.warning(f'⚠️ Journal: operación desconocida "{op}" (seq {seq}), ignorada')
+                continue
+
+            try:
+                apply_mutation(stats, op, record.get('args', {}), datetime.fromisoformat(record['ts']))
+                applied += 1
+            except Exception as e:
+                logger.error(f'❌ Journal: error aplicando seq {seq} ({op}): {e}')
+            last_seq = max(last_seq, seq)
+
+        if applied:
+            logger.info(f'📜 Journal: {applied} eventos re-aplicados sobre el snapshot')
+        return last_seq
@@ -0,0 +1,562 @@
+"""
+Modelo tipado de las estadísticas de usuario
+Registros con __slots__ (UserStats, GameStats, VoiceStats, ...) y los
+históricos por día como arrays densos de enteros (DayCounts) en lugar de
+dicts de 'YYYY-MM-DD' -> int. Las consultas por rango de días (sumas,
+rachas, recorte por año) operan sobre el array, vectorizadas con numpy si
+está instalado.
+
+El dict de stats (mismo esquema que stats.json) es el formato de
+almacenamiento y el único residente en memoria: el journal, el backend
+SQLite y los comandos lo usan. Convertir a todos los usuarios cuesta mucho
+más que leer el dict una vez, así que el bot no arma el modelo por comando:
+el Wrapped convierte solo el usuario que procesa (UserStats.from_dict) y los
+agregadores aceptan un StatsModel opcional ya construido. La conversión es sin pérdidas en ambos sentidos (from_dict /
+to_dict), incluidas claves desconocidas y secciones faltantes de datos viejos.
+"""
+
+import logging
+from array import array
+from datetime import date
+from typing import Callable, Dict, FrozenSet, Iterable, Iterator, Optional, Set, Tuple
+
+from core.stats_snapshot import copy_tree
+
+try:
+    import numpy as np
+except ImportError:  # Opcional: sin numpy se recorren los arrays de la stdlib
+    np = None
+
+logger = logging.getLogger('dsbot')
+
+
+# ==================== DÍAS ====================
+
+_NO_ZEROS: FrozenSet[int] = frozenset()
+
+# 2 bytes por día alcanzan para minutos (<= 1440) y sesiones por día; si un
+# valor no entra (datos viejos en segundos, sumas) el array pasa a 4 bytes
+_SMALL, _LARGE = 'H', 'I'
+_SMALL_MAX = 0xFFFF
+
+
+def _zeros(typecode: str, length: int) -> array:
+    return array(typecode, bytes(array(typecode).itemsize * length))
+
+
+def _to_array(values) -> array:
+    """Array compacto (2 o 4 bytes) con los valores de una lista o un ndarray"""
+    if np is not None and isinstance(values, np.ndarray):
+        typecode = _SMALL if not len(values) or int(values.max()) <= _SMALL_MAX else _LARGE
+        out = array(typecode)
+        out.frombytes(values.astype(f'u{out.itemsize}').tobytes())
+        return out
+    typecode = _SMALL if not values or max(values) <= _SMALL_MAX else _LARGE
+    return array(typecode, values)
+
+
+class DayCounts:
+    """
+    Contadores por día en un array denso: posición i = día `start + i`
+    (ordinal de date). 2-4 bytes por día en lugar de un par str/int en un dict.
+
+    Los días presentes con valor 0 (poco frecuentes) se guardan aparte para
+    que to_dict() reproduzca exactamente el dict original.
+    """
+
+    __slots__ = ('start', 'values', 'zeros')
+
+    def __init__(self, start: int = 0, values: Optional[array] = None, zeros: FrozenSet[int] = _NO_ZEROS):
+        self.start = start
+        self.values = values if values is not None else array(_SMALL)
+        self.zeros = zeros
+
+    @classmethod
+    def from_dict(cls, by_date: Dict[str, int]) -> 'DayCounts':
+        """
+        Args:
+            by_date: {'YYYY-MM-DD': cantidad}
+
+        Raises:
+            ValueError: Si una fecha o un valor no se puede representar
+        """
+        if not by_date:
+            return cls()
+        parsed = {}
+        for day, value in by_date.items():
+            if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+                raise ValueError(f'Valor no entero para {day}: {value!r}')
+            parsed[date.fromisoformat(day).toordinal()] = value
+
+        start = min(parsed)
+        typecode = _SMALL if max(parsed.values()) <= _SMALL_MAX else _LARGE
+        values = _zeros(typecode, max(parsed) - start + 1)
+        zeros = set()
+        for ordinal, value in parsed.items():
+            values[ordinal - start] = value
+            if value == 0:
+                zeros.add(ordinal)
+        return cls(start, values, frozenset(zeros) if zeros else _NO_ZEROS)
+
+    def to_dict(self) -> Dict[str, int]:
+        out = {}
+        for ordinal, value in self.items_ordinal():
+            out[date.fromordinal(ordinal).isoformat()] = value
+        return out
+
+    def items_ordinal(self) -> Iterator[Tuple[int, int]]:
+        """(ordinal, valor) de los días presentes, en orden"""
+        start, zeros = self.start, self.zeros
+        for i, value in enumerate(self.values):
+            if value or (start + i) in zeros:
+                yield start + i, value
+
+    def get(self, day: date) -> int:
+        i = day.toordinal() - self.start
+        if 0 <= i < len(self.values):
+            return self.values[i]
+        return 0
+
+    def add(self, day: date, amount: int):
+        """Suma `amount` al día (extiende el array si hace falta)"""
+        ordinal = day.toordinal()
+        typecode = self.values.typecode
+        if not self.values:
+            self.start = ordinal
+            self.values.append(0)
+        elif ordinal < self.start:
+            self.values[0:0] = _zeros(typecode, self.start - ordinal)
+            self.start = ordinal
+        elif ordinal >= self.start + len(self.values):
+            self.values.extend(_zeros(typecode, ordinal - self.start - len(self.values) + 1))
+
+        i = ordinal - self.start
+        value = self.values[i] + amount
+        if value > _SMALL_MAX and typecode == _SMALL:
+            self.values = array(_LARGE, self.values)
+        self.values[i] = value
+        if amount == 0:
+            self.zeros = self.zeros | {ordinal}
+
+    def total(self) -> int:
+        return sum(self.values)
+
+    # ---- Consultas por rango (first/last inclusive, None = sin límite) ----
+
+    def _span(self, first: Optional[date], last: Optional[date]) -> Tuple[int, int]:
+        """Índices [i, j) del array que caen entre first y last"""
+        n = len(self.values)
+        i = 0 if first is None else min(n, max(0, first.toordinal() - self.start))
+        j = n if last is None else min(n, max(0, last.toordinal() - self.start + 1))
+        return i, max(i, j)
+
+    def _window(self, first: Optional[date], last: Optional[date]):
+        """(índice inicial, valores del rango): vista numpy sin copia o slice del array"""
+        i, j = self._span(first, last)
+        if np is not None and i < j:
+            view = np.frombuffer(self.values, dtype=f'u{self.values.itemsize}')
+            return i, view[i:j]
+        return i, self.values[i:j]
+
+    def range_sum(self, first: Optional[date] = None, last: Optional[date] = None) -> int:
+        """Suma de los días entre first y last"""
+        _, window = self._window(first, last)
+        if np is not None and isinstance(window, np.ndarray):
+            return int(window.sum(dtype=np.int64))
+        return sum(window)
+
+    def active_days(self, first: Optional[date] = None, last: Optional[date] = None) -> int:
+        """Cantidad de días con valor > 0 entre first y last"""
+        _, window = self._window(first, last)
+        if np is not None and isinstance(window, np.ndarray):
+            return int(np.count_nonzero(window))
+        return len(window) - window.count(0)
+
+    def max_day(self, first: Optional[date] = None,
+                last: Optional[date] = None) -> Optional[Tuple[date, int]]:
+        """
+        Día con el valor más alto entre first y last (el primero si hay empate).
+
+        Returns:
+            Tupla (día, valor) o None si no hay días con valor > 0
+        """
+        i, window = self._window(first, last)
+        if not len(window):
+            return None
+        if np is not None and isinstance(window, np.ndarray):
+            k = int(window.argmax())
+        else:
+            k = window.index(max(window))
+        value = int(window[k])
+        if value == 0:
+            return None
+        return date.fromordinal(self.start + i + k), value
+
+    def longest_streak(self, first: Optional[date] = None, last: Optional[date] = None) -> int:
+        """Racha más larga de días consecutivos con valor > 0 entre first y last"""
+        _, window = self._window(first, last)
+        if not len(window):
+            return 0
+        if np is not None and isinstance(window, np.ndarray):
+            # Bordes de cada racha: +1 donde empieza, -1 donde termina
+            edges = np.diff(np.concatenate(([0], (window > 0).view(np.int8), [0])))
+            starts = np.flatnonzero(edges == 1)
+            if not len(starts):
+                return 0
+            return int((np.flatnonzero(edges == -1) - starts).max())
+
+        longest = current = 0
+        for value in window:
+            if value:
+                current += 1
+                if current > longest:
+                    longest = current
+            else:
+                current = 0
+        return longest
+
+    def between(self, first: Optional[date] = None, last: Optional[date] = None) -> 'DayCounts':
+        """Copia con solo los días entre first y last"""
+        i, j = self._span(first, last)
+        if i >= j:
+            return DayCounts()
+        start = self.start + i
+        zeros = self.zeros
+        if zeros:
+            zeros = frozenset(ordinal for ordinal in zeros if start <= ordinal < self.start + j) or _NO_ZEROS
+        return DayCounts(start, self.values[i:j], zeros)
+
+    def year(self, year: int) -> 'DayCounts':
+        """Copia con solo los días del año"""
+        return self.between(date(year, 1, 1), date(year, 12, 31))
+
+    @classmethod
+    def combine(cls, items: Iterable['DayCounts']) -> 'DayCounts':
+        """Suma día a día de varios históricos (ej: todos los juegos de un usuario)"""
+        items = [item for item in items if item.values]
+        if not items:
+            return cls()
+        if len(items) == 1:
+            only = items[0]
+            return cls(only.start, array(only.values.typecode, only.values), only.zeros)
+
+        start = min(item.start for item in items)
+        end = max(item.start + len(item.values) for item in items)
+        if np is not None:
+            totals = np.zeros(end - start, dtype=np.int64)
+            for item in items:
+                offset = item.start - start
+                view = np.frombuffer(item.values, dtype=f'u{item.values.itemsize}')
+                totals[offset:offset + len(view)] += view
+        else:
+            totals = [0] * (end - start)
+            for item in items:
+                offset = item.start - start
+                for k, value in enumerate(item.values):
+                    if value:
+                        totals[offset + k] += value
+
+        zeros = set()
+        for item in items:
+            zeros.update(ordinal for ordinal in item.zeros if not totals[ordinal - start])
+        return cls(start, _to_array(totals), frozenset(zeros) if zeros else _NO_ZEROS)
+
+    def __len__(self) -> int:
+        """Cantidad de días presentes"""
+        return sum(1 for _ in self.items_ordinal())
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, DayCounts) and self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        return f'DayCounts({len(self)} días, total={self.total()})'
+
+
+# ==================== REGISTROS ====================
+
+# Tipos de campo: valor tal cual, DayCounts, registro anidado o dict de registros
+VALUE, DAYS, RECORD, RECORDS = range(4)
+
+
+def _missing_value(kind: int, spec):
+    """Valor de un campo que falta en el dict (las secciones faltantes quedan en None)"""
+    if kind == RECORD:
+        return None
+    if kind == DAYS:
+        return DayCounts()
+    if kind == RECORDS:
+        return {}
+    return copy_tree(spec)
+
+
+class Record:
+    """
+    Base de los registros: cada subclase declara FIELDS como
+    (clave JSON, atributo, tipo, default o clase del registro anidado).
+
+    - `absent`: claves del esquema que faltaban en el dict original
+    - `extra`: claves fuera del esquema (se conservan tal cual)
+    """
+
+    __slots__ = ('absent', 'extra')
+    FIELDS: Tuple[Tuple[str, str, int, object], ...] = ()
+
+    @classmethod
+    def empty(cls, **values) -> 'Record':
+        """Registro nuevo con los defaults del esquema (y `values` por atributo)"""
+        record = cls.__new__(cls)
+        for key, attr, kind, spec in cls.FIELDS:
+            if attr in values:
+                value = values[attr]
+            elif kind == DAYS:
+                value = DayCounts()
+            elif kind == RECORD:
+                value = spec.empty()
+            elif kind == RECORDS:
+                value = {}
+            else:
+                value = copy_tree(spec)
+            setattr(record, attr, value)
+        record.absent = ()
+        record.extra = None
+        return record
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Record':
+        record = cls.__new__(cls)
+        absent = []
+        extra = {}
+        for key, attr, kind, spec in cls.FIELDS:
+            if key not in data:
+                absent.append(key)
+                value = _missing_value(kind, spec)
+            else:
+                raw = data[key]
+                try:
+                    if kind == DAYS:
+                        value = DayCounts.from_dict(raw)
+                    elif kind == RECORD:
+                        value = spec.from_dict(raw)
+                    elif kind == RECORDS:
+                        value = {name: spec.from_dict(item) for name, item in raw.items()}
+                    else:
+                        value = copy_tree(raw)
+                except (ValueError, TypeError, AttributeError):
+                    # Forma inesperada (datos viejos/corruptos): se conserva sin tipar
+                    absent.append(key)
+                    extra[key] = copy_tree(raw)
+                    value = _missing_value(kind, spec)
+            setattr(record, attr, value)
+
+        known = cls._keys()
+        for key, value in data.items():
+            if key not in known:
+                extra[key] = copy_tree(value)
+
+        record.absent = tuple(absent) if absent else ()
+        record.extra = extra or None
+        return record
+
+    def to_dict(self) -> Dict:
+        out = {}
+        for key, attr, kind, _ in self.FIELDS:
+            if key in self.absent:
+                continue
+            value = getattr(self, attr)
+            if kind == DAYS:
+                value = value.to_dict()
+            elif kind == RECORD:
+                value = value.to_dict()
+            elif kind == RECORDS:
+                value = {name: item.to_dict() for name, item in value.items()}
+            else:
+                value = copy_tree(value)
+            out[key] = value
+        if self.extra:
+            out.update(copy_tree(self.extra))
+        return out
+
+    @classmethod
+    def _keys(cls) -> FrozenSet[str]:
+        keys = cls.__dict__.get('_KEYS')
+        if keys is None:
+            keys = frozenset(key for key, _, _, _ in cls.FIELDS)
+            cls._KEYS = keys
+        return keys
+
+    def __eq__(self, other) -> bool:
+        return type(self) is type(other) and self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({self.to_dict()!r})'
+
+
+class GameStats(Record):
+    __slots__ = ('count', 'first_played', 'last_played', 'total_minutes', 'daily_minutes',
+                 'daily_counts', 'current_session')
+    FIELDS = (
+        ('count', 'count', VALUE, 0),
+        ('first_played', 'first_played', VALUE, None),
+        ('last_played', 'last_played', VALUE, None),
+        ('total_minutes', 'total_minutes', VALUE, 0),
+        ('daily_minutes', 'daily_minutes', DAYS, None),
+        ('daily_counts', 'daily_counts', DAYS, None),
+        ('current_session', 'current_session', VALUE, None),
+    )
+
+
+class VoiceStats(Record):
+    __slots__ = ('count', 'last_join', 'total_minutes', 'daily_minutes', 'daily_counts', 'current_session')
+    FIELDS = (
+        ('count', 'count', VALUE, 0),
+        ('last_join', 'last_join', VALUE, None),
+        ('total_minutes', 'total_minutes', VALUE, 0),
+        ('daily_minutes', 'daily_minutes', DAYS, None),
+        ('daily_counts', 'daily_counts', DAYS, None),
+        ('current_session', 'current_session', VALUE, None),
+    )
+
+
+class MessageStats(Record):
+    __slots__ = ('count', 'characters', 'last_message')
+    FIELDS = (
+        ('count', 'count', VALUE, 0),
+        ('characters', 'characters', VALUE, 0),
+        ('last_message', 'last_message', VALUE, None),
+    )
+
+
+class ReactionStats(Record):
+    __slots__ = ('total', 'by_emoji')
+    FIELDS = (
+        ('total', 'total', VALUE, 0),
+        ('by_emoji', 'by_emoji', VALUE, {}),
+    )
+
+
+class StickerStats(Record):
+    __slots__ = ('total', 'by_name')
+    FIELDS = (
+        ('total', 'total', VALUE, 0),
+        ('by_name', 'by_name', VALUE, {}),
+    )
+
+
+class ConnectionStats(Record):
+    __slots__ = ('total', 'by_date', 'personal_record')
+    FIELDS = (
+        ('total', 'total', VALUE, 0),
+        ('by_date', 'by_date', DAYS, None),
+        ('personal_record', 'personal_record', VALUE, {'count': 0, 'date': None}),
+    )
+
+
+class UserStats(Record):
+    __slots__ = ('username', 'games', 'voice', 'messages', 'reactions', 'stickers', 'daily_connections')
+    FIELDS = (
+        ('username', 'username', VALUE, 'Unknown'),
+        ('games', 'games', RECORDS, GameStats),
+        ('voice', 'voice', RECORD, VoiceStats),
+        ('messages', 'messages', RECORD, MessageStats),
+        ('reactions', 'reactions', RECORD, ReactionStats),
+        ('stickers', 'stickers', RECORD, StickerStats),
+        ('daily_connections', 'daily_connections', RECORD, ConnectionStats),
+    )
+
+    @property
+    def game_minutes(self) -> int:
+        return sum(game.total_minutes for game in self.games.values())
+
+    @property
+    def game_sessions(self) -> int:
+        return sum(game.count for game in self.games.values())
+
+    @property
+    def voice_minutes(self) -> int:
+        return self.voice.total_minutes if self.voice is not None else 0
+
+    @property
+    def voice_count(self) -> int:
+        return self.voice.count if self.voice is not None else 0
+
+
+def new_user_dict(username: str) -> Dict:
+    """Estructura inicial de un usuario en stats (esquema de stats.json)"""
+    record = UserStats.empty(username=username)
+    # Los usuarios nuevos no llevan daily_counts en voz hasta la primera sesión
+    record.voice.absent = ('daily_counts',)
+    return record.to_dict()
+
+
+def new_game_dict(first_played: str) -> Dict:
+    """Estructura inicial de un juego de un usuario"""
+    record = GameStats.empty(first_played=first_played)
+    record.absent = ('daily_counts',)
+    return record.to_dict()
+
+
+# ==================== MODELO ====================
+
+class StatsModel:
+    """
+    Vista tipada de stats['users'], convertida en la primera consulta.
+
+    Si la fuente cambia, solo se re-convierten los usuarios marcados con
+    mark_user_dirty() desde la última consulta.
+    """
+
+    def __init__(self, source: Callable[[], Dict]):
+        """
+        Args:
+            source: Función que retorna el dict de stats en vivo
+        """
+        self._source = source
+        self._source_id: Optional[int] = None
+        self._users: Dict[str, UserStats] = {}
+        self._dirty: Set[str] = set()
+        self._complete = False
+
+    def mark_user_dirty(self, user_id: Optional[str]):
+        if user_id is not None:
+            self._dirty.add(user_id)
+
+    def invalidate(self):
+        self._users.clear()
+        self._dirty.clear()
+        self._complete = False
+
+    def users(self) -> Dict[str, UserStats]:
+        """
+        Registros de todos los usuarios {user_id: UserStats}.
+        Solo lectura: los cambios se hacen con record_mutation().
+        """
+        live = self._source() or {}
+        if id(live) != self._source_id:
+            self._source_id = id(live)
+            self.invalidate()
+
+        live_users = live.get('users', {})
+        if not self._complete:
+            self._users = {user_id: UserStats.from_dict(data) for user_id, data in live_users.items()}
+            self._complete = True
+            self._dirty.clear()
+            return self._users
+
+        for user_id in self._dirty:
+            data = live_users.get(user_id)
+            if data is None:
+                self._users.pop(user_id, None)
+            else:
+                self._users[user_id] = UserStats.from_dict(data)
+        self._dirty.clear()
+
+        if len(self._users) != len(live_users):
+            # Usuarios agregados/borrados sin marcar: sincronizar las claves
+            for user_id in set(self._users) - set(live_users):
+                del self._users[user_id]
+            for user_id in live_users.keys() - self._users.keys():
+                self._users[user_id] = UserStats.from_dict(live_users[user_id])
+        return self._users
+
+    def user(self, user_id: str) -> Optional[UserStats]:
+        return self.users().get(user_id)
@@ -0,0 +1,204 @@
+"""
+Mutaciones de estadísticas como operaciones puras sobre el dict de stats
+Cada operación recibe el timestamp del evento, así el mismo registro del
+journal produce exactamente el mismo resultado al re-aplicarse (replay).
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict
+
+from core.stats_model import new_game_dict, new_user_dict
+
+logger = logging.getLogger('dsbot')
+
+# op -> función(stats, now, **args)
+MUTATIONS: Dict[str, Callable] = {}
+
+
+def mutation(op: str):
+    """Registra una función como aplicador de la operación `op`"""
+    def decorator(func):
+        MUTATIONS[op] = func
+        return func
+    return decorator
+
+
+def apply_mutation(stats: dict, op: str, args: dict, now: datetime) -> Any:
+    """
+    Aplica una operación registrada sobre `stats`.
+
+    Args:
+        stats: Dict de estadísticas a modificar
+        op: Nombre de la operación
+        args: Argumentos de la operación
+        now: Momento del evento (define fechas y timestamps)
+
+    Returns:
+        Lo que retorne el aplicador (ej: (count_today, broke_record) en 'connection')
+
+    Raises:
+        KeyError: Si la operación no existe
+    """
+    return MUTATIONS[op](stats, now, **args)
+
+
+def ensure_user(stats: dict, user_id: str, username: str):
+    """Asegura que el usuario existe en stats con estructura completa"""
+    if user_id not in stats['users']:
+        stats['users'][user_id] = new_user_dict(username)
+    else:
+        # Actualizar username si cambió
+        stats['users'][user_id]['username'] = username
+
+
+def _ensure_game(stats: dict, user_id: str, game_name: str, now: datetime) -> dict:
+    """Asegura que el juego existe para el usuario y retorna su dict"""
+    games = stats['users'][user_id]['games']
+    if game_name not in games:
+        games[game_name] = new_game_dict(now.isoformat())
+    return games[game_name]
+
+
+# ==================== JUEGOS ====================
+
+@mutation('game_time')
+def _game_time(stats, now, user_id, username, game_name, minutes):
+    ensure_user(stats, user_id, username)
+    game_data = _ensure_game(stats, user_id, game_name, now)
+
+    game_data['total_minutes'] = game_data.get('total_minutes', 0) + minutes
+
+    today = now.strftime('%Y-%m-%d')
+    if 'daily_minutes' not in game_data:
+        game_data['daily_minutes'] = {}
+    game_data['daily_minutes'][today] = game_data['daily_minutes'].get(today, 0) + minutes
+
+
+@mutation('game_count')
+def _game_count(stats, now, user_id, username, game_name):
+    ensure_user(stats, user_id, username)
+    game_data = _ensure_game(stats, user_id, game_name, now)
+    game_data['count'] += 1
+    game_data['last_played'] = now.isoformat()
+
+    today = now.strftime('%Y-%m-%d')
+    if 'daily_counts' not in game_data:
+        game_data['daily_counts'] = {}
+    game_data['daily_counts'][today] = game_data['daily_counts'].get(today, 0) + 1
+
+
+@mutation('game_session_start')
+def _game_session_start(stats, now, user_id, username, game_name):
+    ensure_user(stats, user_id, username)
+    game_data = _ensure_game(stats, user_id, game_name, now)
+    game_data['current_session'] = {'start': now.isoformat()}
+
+
+@mutation('game_session_clear')
+def _game_session_clear(stats, now, user_id, game_name):
+    user_data = stats['users'].get(user_id)
+    if not user_data or game_name not in user_data['games']:
+        return
+    user_data['games'][game_name]['current_session'] = None
+
+
+# ==================== VOZ ====================
+
+@mutation('voice_time')
+def _voice_time(stats, now, user_id, username, minutes):
+    ensure_user(stats, user_id, username)
+    voice_data = stats['users'][user_id]['voice']
+
+    voice_data['total_minutes'] = voice_data.get('total_minutes', 0) + minutes
+
+    today = now.strftime('%Y-%m-%d')
+    if 'daily_minutes' not in voice_data:
+        voice_data['daily_minutes'] = {}
+    voice_data['daily_minutes'][today] = voice_data['daily_minutes'].get(today, 0) + minutes
+
+
+@mutation('voice_count')
+def _voice_count(stats, now, user_id, username):
+    ensure_user(stats, user_id, username)
+    voice_data = stats['users'][user_id]['voice']
+    voice_data['count'] += 1
+    voice_data['last_join'] = now.isoformat()
+
+    today = now.strftime('%Y-%m-%d')
+    if 'daily_counts' not in voice_data:
+        voice_data['daily_counts'] = {}
+    voice_data['daily_counts'][today] = voice_data['daily_counts'].get(today, 0) + 1
+
+
+@mutation('voice_session_start')
+def _voice_session_start(stats, now, user_id, username, channel_name):
+    ensure_user(stats, user_id, username)
+    stats['users'][user_id]['voice']['current_session'] = {
+        'channel': channel_name,
+        'start': now.isoformat()
+    }
+
+
+@mutation('voice_session_clear')
+def _voice_session_clear(stats, now, user_id):
+    if user_id not in stats['users']:
+        return
+    stats['users'][user_id]['voice']['current_session'] = None
+
+
+# ==================== MENSAJES / REACCIONES / STICKERS ====================
+
+@mutation('message')
+def _message(stats, now, user_id, username, message_length):
+    ensure_user(stats, user_id, username)
+    messages_data = stats['users'][user_id]['messages']
+    messages_data['count'] += 1
+    messages_data['characters'] += message_length
+    messages_data['last_message'] = now.isoformat()
+
+
+@mutation('reaction')
+def _reaction(stats, now, user_id, username, emoji):
+    ensure_user(stats, user_id, username)
+    reactions_data = stats['users'][user_id]['reactions']
+    reactions_data['total'] += 1
+
+    if 'by_emoji' not in reactions_data:
+        reactions_data['by_emoji'] = {}
+    reactions_data['by_emoji'][emoji] = reactions_data['by_emoji'].get(emoji, 0) + 1
+
+
+@mutation('sticker')
+def _sticker(stats, now, user_id, username, sticker_name):
+    ensure_user(stats, user_id, username)
+    stickers_data = stats['users'][user_id]['stickers']
+    stickers_data['total'] += 1
+
+    if 'by_name' not in stickers_data:
+        stickers_data['by_name'] = {}
+    stickers_data['by_name'][sticker_name] = stickers_data['by_name'].get(sticker_name, 0) + 1
+
+
+# ==================== CONEXIONES ====================
+
+@mutation('connection')
+def _connection(stats, now, user_id, username):
+    ensure_user(stats, user_id, username)
+
+    today = now.strftime('%Y-%m-%d')
+    connections = stats['users'][user_id]['daily_connections']
+
+    connections['total'] += 1
+    connections['by_date'][today] = connections['by_date'].get(today, 0) + 1
+
+    count_today = connections['by_date'][today]
+
+    broke_record = False
+    personal_record = connections['personal_record']
+    if count_today > personal_record['count']:
+        personal_record['count'] = count_today
+        personal_record['date'] = today
+        broke_record = True
+
+    return count_today, broke_record
@@ -0,0 +1,247 @@
+"""
+Repositorio de estadísticas
+Abstracción del almacenamiento de stats con backends intercambiables:
+- json:   stats.json (+ journal), comportamiento histórico
+- sqlite: stats.db en modo WAL con tablas indexadas
+
+Se elige con la variable de entorno STATS_BACKEND (json por defecto).
+"""
+
+import logging
+import os
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from core.atomic_io import load_json_with_fallback, write_bytes_atomic
+from core.json_codec import get_codec
+
+logger = logging.getLogger('dsbot')
+
+
+class StatsRepository(ABC):
+    """
+    Interfaz de almacenamiento y consultas de estadísticas.
+
+    El bot sigue trabajando sobre el dict `stats` en memoria; el repositorio
+    define cómo se persiste y cómo se resuelven las consultas pesadas
+    (rankings), que en SQLite son queries indexadas.
+    """
+
+    name = 'base'
+
+    # Si True, las mutaciones se registran en el journal (stats.journal) y se
+    # pliegan luego con save_snapshot(). Si False el backend persiste cada
+    # mutación por sí mismo en record_mutation().
+    uses_journal = True
+
+    # Si True, save_snapshot() puede correr en el thread de I/O con un
+    # snapshot copiado (los backends con conexiones atadas a un thread no)
+    thread_safe_snapshots = False
+
+    # ==================== ALMACENAMIENTO ====================
+
+    @abstractmethod
+    def load(self) -> Optional[Dict]:
+        """
+        Carga el dict completo de estadísticas.
+
+        Returns:
+            Dict de stats (puede incluir `_journal_seq`) o None si no hay datos
+        """
+
+    @abstractmethod
+    def save_snapshot(self, stats: Dict):
+        """
+        Persiste el estado completo de stats.
+
+        Args:
+            stats: Dict de stats (incluye `_journal_seq`)
+        """
+
+    def record_mutation(self, stats: Dict, op: str, args: Dict, now: datetime):
+        """
+        Persiste una mutación ya aplicada en memoria (solo backends sin journal).
+
+        Args:
+            stats: Dict de stats con la mutación aplicada
+            op: Operación (ver core.stats_mutations)
+            args: Argumentos de la operación
+            now: Momento del evento
+        """
+
+    def mark_user_dirty(self, user_id: str):
+        """
+        Un usuario se modificó (o se borró) fuera de record_mutation(): el
+        próximo save_snapshot() debe reescribirlo. Solo lo usan los backends
+        cuyo snapshot no reescribe a todos los usuarios.
+        """
+
+    def close(self):
+        """Libera recursos del backend"""
+
+    # ==================== CONSULTAS ====================
+
+    @abstractmethod
+    def top_game_time(self, period: str = 'all', limit: Optional[int] = None) -> List[Tuple[str, int, int, int]]:
+        """
+        Ranking de tiempo de juego.
+
+        Returns:
+            Lista de (username, minutes, sessions, unique_games) ordenada por tiempo
+        """
+
+    @abstractmethod
+    def top_voice_time(self, period: str = 'all', limit: Optional[int] = None) -> List[Tuple[str, int, int]]:
+        """
+        Ranking de tiempo en voz.
+
+        Returns:
+            Lista de (username, minutes, count) ordenada por tiempo
+        """
+
+    @abstractmethod
+    def top_messages(self, limit: Optional[int] = None) -> List[Tuple[str, int, int]]:
+        """
+        Ranking de mensajes.
+
+        Returns:
+            Lista de (username, count, characters) ordenada por count
+        """
+
+    @abstractmethod
+    def user_rankings(self, user_id: str) -> Dict[str, int]:
+        """
+        Posición del usuario en los rankings del servidor (usado por !wrapped).
+
+        Returns:
+            Dict con posiciones {'gaming', 'social', 'parties'} (0 si no figura)
+        """
+
+
+class JsonStatsRepository(StatsRepository):
+    """Backend JSON: stats.json con escritura atómica y backups rotativos"""
+
+    name = 'json'
+    uses_journal = True
+    thread_safe_snapshots = True
+
+    def __init__(self, path, backup_generations: int = 3, pretty: bool = False):
+        """
+        Args:
+            path: Ruta de stats.json
+            backup_generations: Cantidad de backups rotativos (stats.json.1, .2, ...)
+            pretty: Escribir indentado (por defecto compacto: menos bytes y más rápido)
+        """
+        self.path = Path(path)
+        self.backup_generations = backup_generations
+        self.pretty = pretty
+
+    def _live_stats(self) -> Dict:
+        """Las consultas JSON se resuelven sobre el dict en memoria"""
+        from core import persistence
+        return persistence.stats or {}
+
+    def load(self) -> Optional[Dict]:
+        """
+        Carga stats.json.
+
+        Si el archivo está corrupto (ej: kill en medio de una escritura vieja)
+        usa la generación de backup válida más reciente. Si nada es
+        recuperable aparta el archivo corrupto y retorna None.
+        """
+        try:
+            data, _ = load_json_with_fallback(self.path, self.backup_generations, loads=get_codec().loads)
+        except ValueError as e:
+            # Nada recuperable: apartar el archivo corrupto para no pisarlo
+            corrupt_path = self.path.with_name(
+                f'{self.path.name}.corrupt-{datetime.now().strftime("%Y%m%d_%H%M%S")}'
+            )
+            try:
+                os.replace(self.path, corrupt_path)
+            except OSError:
+                pass
+            logger.error(f'❌ {e}. Archivo corrupto movido a {corrupt_path}, iniciando vacío')
+            return None
+        return data
+
+    def save_snapshot(self, stats: Dict):
+        write_bytes_atomic(self.path, get_codec().dumps(stats, pretty=self.pretty), self.backup_generations)
+
+    def _leaderboards(self):
+        """Las consultas JSON se resuelven con los leaderboards en memoria"""
+        from core import persistence
+        return persistence.get_leaderboards()
+
+    def top_game_time(self, period: str = 'all', limit: Optional[int] = None):
+        return [
+            (username, minutes, sessions, unique_games)
+            for _, username, minutes, (sessions, unique_games)
+            in self._leaderboards().top('game_time', period, limit)
+        ]
+
+    def top_voice_time(self, period: str = 'all', limit: Optional[int] = None):
+        return [
+            (username, minutes, count)
+            for _, username, minutes, (count,) in self._leaderboards().top('voice_time', period, limit)
+        ]
+
+    def top_messages(self, limit: Optional[int] = None):
+        return [
+            (username, count, characters)
+            for _, username, count, (characters,) in self._leaderboards().top('messages', 'all', limit)
+        ]
+
+    def user_rankings(self, user_id: str) -> Dict[str, int]:
+        from core.leaderboard import score_user
+
+        stats_data = self._live_stats()
+        user_data = stats_data.get('users', {}).get(user_id)
+        if user_data is None:
+            return {'gaming': 0, 'social': 0, 'parties': 0}
+
+        leaderboards = self._leaderboards()
+
+        def rank(metric):
+            scored = score_user(metric, user_data)
+            return leaderboards.board(metric).rank_for_score(scored[0] if scored else 0)
+
+        users = stats_data.get('users', {})
+        party_counts: Dict[str, int] = {}
+        for party in stats_data.get('parties', {}).get('history', []):
+            for uid in party.get('players', []):
+                if uid in users:
+                    party_counts[uid] = party_counts.get(uid, 0) + 1
+        my_parties = party_counts.get(user_id, 0)
+
+        return {
+            'gaming': rank('game_time'),
+            'social': rank('social'),
+            'parties': sum(1 for count in party_counts.values() if count > my_parties) + 1
+        }
+
+
+def create_repository(data_dir, backup_generations: int = 3, pretty_json: bool = False) -> StatsRepository:
+    """
+    Crea el repositorio según STATS_BACKEND (json | sqlite).
+
+    Args:
+        data_dir: Directorio de datos (DATA_DIR)
+        backup_generations: Backups rotativos del backend JSON
+        pretty_json: stats.json indentado en lugar de compacto
+
+    Returns:
+        StatsRepository configurado
+    """
+    backend = os.getenv('STATS_BACKEND', 'json').strip().lower()
+    data_dir = Path(data_dir)
+
+    if backend == 'sqlite':
+        from core.sqlite_repository import SqliteStatsRepository
+        logger.info('🗄️ Backend de estadísticas: SQLite')
+        return SqliteStatsRepository(data_dir / 'stats.db')
+
+    if backend != 'json':
+        logger.warning(f'⚠️ STATS_BACKEND desconocido "{backend}", usando json')
+    return JsonStatsRepository(data_dir / 'stats.json', backup_generations, pretty=pretty_json)
@@ -0,0 +1,104 @@
+"""
+Snapshots de solo lectura de las estadísticas en memoria
+Los comandos leen de aquí en lugar de re-parsear stats.json en cada invocación.
+
+Copy-on-write por usuario: cada snapshot comparte las copias de los usuarios
+que no cambiaron desde el anterior; solo se re-copian los usuarios (y las
+claves raíz como parties/cooldowns) marcados como modificados.
+"""
+
+import logging
+from typing import Callable, Dict, Optional, Set
+
+logger = logging.getLogger('dsbot')
+
+
+def copy_tree(value):
+    """Copia profunda de un árbol JSON (dict/list/escalares), más rápida que deepcopy"""
+    if isinstance(value, dict):
+        return {k: copy_tree(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [copy_tree(v) for v in value]
+    return value
+
+
+class StatsSnapshotProvider:
+    """
+    Proveedor de snapshots versionados del dict de stats.
+
+    - `version` aumenta con cada cambio marcado
+    - `get()` retorna el mismo snapshot mientras la versión no cambie
+    - Los snapshots son de solo lectura por convención: nunca se modifican
+      después de entregados, así que un comando puede usarlos a través de
+      varios `await` sin ver cambios a mitad de camino
+    """
+
+    def __init__(self, source: Callable[[], Dict]):
+        """
+        Args:
+            source: Función que retorna el dict de stats en vivo
+        """
+        self._source = source
+        self.version = 0
+        self._source_id: Optional[int] = None
+        self._users_cache: Dict[str, Dict] = {}
+        self._root_cache: Dict[str, object] = {}
+        self._dirty_users: Set[str] = set()
+        self._root_dirty = True
+        self._snapshot: Optional[Dict] = None
+        self._snapshot_version = -1
+
+    def mark_user_dirty(self, user_id: Optional[str]):
+        """Marca un usuario como modificado (se re-copia en el próximo snapshot)"""
+        self.version += 1
+        if user_id is not None:
+            self._dirty_users.add(user_id)
+
+    def mark_root_dirty(self):
+        """Marca como modificadas las claves raíz que no son usuarios (parties, cooldowns, ...)"""
+        self.version += 1
+        self._root_dirty = True
+
+    def invalidate(self):
+        """Descarta todas las copias (ej: el dict de stats fue reemplazado)"""
+        self.version += 1
+        self._users_cache.clear()
+        self._root_cache.clear()
+        self._dirty_users.clear()
+        self._root_dirty = True
+
+    def get(self) -> Dict:
+        """
+        Retorna un snapshot consistente del estado actual.
+
+        Returns:
+            Dict con la misma forma que stats (solo lectura)
+        """
+        live = self._source()
+        if id(live) != self._source_id:
+            self._source_id = id(live)
+            self.invalidate()
+
+        if self._snapshot is not None and self._snapshot_version == self.version:
+            return self._snapshot
+
+        live_users = live.get('users', {})
+        users = {}
+        for user_id, user_data in live_users.items():
+            cached = self._users_cache.get(user_id)
+            if cached is None or user_id in self._dirty_users:
+                cached = copy_tree(user_data)
+                self._users_cache[user_id] = cached
+            users[user_id] = cached
+        self._dirty_users.clear()
+
+        if self._root_dirty:
+            self._root_cache = {k: copy_tree(v) for k, v in live.items() if k != 'users'}
+            self._root_dirty = False
+
+        snapshot = dict(self._root_cache)
+        snapshot['users'] = users
+
+        self._snapshot = snapshot
+        self._snapshot_version = self.version
+        return snapshot
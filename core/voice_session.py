@@ -84,10 +84,8 @@ class VoiceSessionManager(BaseSessionManager):
         
         self.active_sessions[user_id] = session
         
-        # Iniciar task de verificación en background (no bloquea)
-        session.verification_task = asyncio.create_task(
-            self._verify_session(session, member, config)
-        )
+        # Programar verificación en background (no bloquea)
+        self._start_verification(session, member, config)
     
     async def handle_end(
         self,
@@ -128,6 +126,8 @@ class VoiceSessionManager(BaseSessionManager):
         # Gracia solo para flickers; al cortar voice del todo, finalizar siempre
         if not skip_grace and self._is_in_grace_period(session):
             logger.info(f'⏳ Sesión de voz en gracia: {member.display_name} - {channel.name}')
+            # Revisar exactamente cuando venza la gracia (sin esperar al health check)
+            self._schedule_grace_expiry(session, self._on_grace_expired, session, member, channel, config)
             return
         
         # Cancelar task de verificación si aún está corriendo
@@ -282,6 +282,15 @@ class VoiceSessionManager(BaseSessionManager):
         
         return is_active
     
+    async def _on_grace_expired(self, session: VoiceSession, member: discord.Member,
+                                channel: discord.VoiceChannel, config: dict):
+        """Venció la gracia de una salida de voz: cerrar si el usuario no volvió al canal"""
+        if self.active_sessions.get(session.user_id) is not session:
+            return  # Ya se cerró o fue reemplazada
+        if await self._is_still_active(session, member):
+            return
+        await self.handle_end(member, channel, config)
+    
     async def _on_session_confirmed_phase1(self, session: BaseSession, member: discord.Member, config: dict):
         """Callback cuando la sesión es confirmada después de 3s"""
         if not isinstance(session, VoiceSession):
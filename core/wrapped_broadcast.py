@@ -0,0 +1,277 @@
+"""
+Envío masivo del Wrapped
+Pipeline de generadores: calcular (motor del wrapped) → armar embeds →
+agrupar hasta 10 embeds por mensaje → enviar acompasado por los headers de
+rate limit de Discord. El progreso se guarda en un cursor en disco, así un
+envío interrumpido por un reinicio se retoma donde quedó. Un mensaje que no
+sale tras los reintentos corta el envío sin avanzar el cursor: la próxima
+ejecución lo retoma desde ese lote.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import discord
+
+from core.atomic_io import write_json_in_background
+from core.rate_limits import RateLimitTracker, get_rate_limit_tracker
+from core.wrapped_engine import WrappedYear, get_wrapped_engine
+
+logger = logging.getLogger('dsbot')
+
+# Límites de Discord por mensaje
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+
+
+def load_cursor(path) -> Optional[Dict]:
+    """
+    Cursor del último envío (None si no hay o no se puede leer).
+
+    Formato:
+        {"year": 2025, "channel_id": 1, "intro_sent": true, "last_user_id": "123",
+         "sent": 40, "skipped": 3, "finished": false, "updated_at": "..."}
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            cursor = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.error(f'❌ Cursor del wrapped ilegible ({path}): {e}')
+        return None
+    return cursor if isinstance(cursor, dict) else None
+
+
+def create_intro_embed(year: int) -> discord.Embed:
+    embed = discord.Embed(
+        title=f"🎉 WRAPPED {year} 🎉",
+        description=(
+            "¡Llegó el momento de ver tu año en Discord!\n\n"
+            f"📊 A continuación verás tu resumen del {year}:\n"
+            "🎮 Gaming • 🔊 Voice • 🎉 Parties • 💬 Social\n\n"
+            "¡Feliz Año Nuevo! 🎆"
+        ),
+        color=0xFFD700,  # Dorado
+        timestamp=datetime.now()
+    )
+    embed.set_footer(text=f"Wrapped {year} • Generado automáticamente")
+    return embed
+
+
+def create_summary_embed(year: int, sent: int, skipped: int) -> discord.Embed:
+    return discord.Embed(
+        title=f"✅ Wrapped {year} Completado",
+        description=(
+            f"📊 **Wrappeds enviados:** {sent}\n"
+            f"⚠️ **Omitidos:** {skipped}\n\n"
+            "¡Gracias por ser parte de este servidor! 🎉\n"
+            "¡Feliz Año Nuevo! 🎆"
+        ),
+        color=0x00FF00,  # Verde
+        timestamp=datetime.now()
+    )
+
+
+def iter_batches(rendered: Iterable[Tuple[str, object, discord.Embed]],
+                 max_embeds: int = MAX_EMBEDS_PER_MESSAGE,
+                 max_chars: int = MAX_EMBED_CHARS_PER_MESSAGE) -> Iterator[List[Tuple[str, object, discord.Embed]]]:
+    """
+    Agrupa embeds en mensajes: hasta `max_embeds` por mensaje y sin pasar
+    el total de caracteres que Discord acepta entre todos los embeds.
+    """
+    batch = []
+    chars = 0
+    for item in rendered:
+        size = len(item[2])
+        if batch and (len(batch) >= max_embeds or chars + size > max_chars):
+            yield batch
+            batch = []
+            chars = 0
+        batch.append(item)
+        chars += size
+    if batch:
+        yield batch
+
+
+class WrappedBroadcast:
+    """Envío del wrapped de un año a todos los usuarios en un canal"""
+
+    def __init__(self, bot, channel, year: int, cursor_path,
+                 tracker: Optional[RateLimitTracker] = None,
+                 render: Optional[Callable[[str, int, Dict], discord.Embed]] = None,
+                 min_interval: float = 1.0, max_retries: int = 3, retry_delay: float = 5.0):
+        """
+        Args:
+            bot: Instancia del bot (para buscar los members)
+            channel: Canal destino
+            year: Año del wrapped
+            cursor_path: Archivo del cursor de progreso
+            tracker: Headers de rate limit observados (default: el del proceso)
+            render: Arma el embed de un usuario (default: render_wrapped_embed)
+            min_interval: Pausa entre mensajes si todavía no hay headers de la ruta
+            max_retries: Reintentos de un mensaje ante errores HTTP
+            retry_delay: Demora base de los reintentos (se duplica en cada uno)
+        """
+        self.bot = bot
+        self.channel = channel
+        self.year = year
+        self.cursor_path = Path(cursor_path)
+        self.tracker = tracker or get_rate_limit_tracker()
+        self.render = render
+        self.min_interval = min_interval
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.cursor: Dict = {}
+        self._last_send = 0.0
+
+    # ==================== CURSOR ====================
+
+    def _load_or_start_cursor(self) -> Dict:
+        cursor = load_cursor(self.cursor_path)
+        if cursor and cursor.get('year') == self.year and cursor.get('channel_id') == self.channel.id \
+                and not cursor.get('finished'):
+            logger.info(f'🎁 Retomando Wrapped {self.year}: {cursor.get("sent", 0)} ya enviados')
+            return cursor
+        return {'year': self.year, 'channel_id': self.channel.id, 'intro_sent': False,
+                'last_user_id': None, 'sent': 0, 'skipped': 0, 'finished': False}
+
+    def _save_cursor(self):
+        self.cursor['updated_at'] = datetime.now().isoformat()
+        write_json_in_background(self.cursor_path, dict(self.cursor), indent=2)
+
+    # ==================== ETAPAS ====================
+
+    def _find_member(self, user_id: str):
+        if not user_id.isdigit():
+            return None
+        for guild in self.bot.guilds:
+            member = guild.get_member(int(user_id))
+            if member:
+                return member
+        return None
+
+    def iter_targets(self, wrapped_year: WrappedYear, user_ids: Iterable[str]) -> Iterator[Tuple[str, object, Dict]]:
+        """
+        (user_id, member, secciones) de los usuarios que reciben su wrapped,
+        en orden de user_id y después del cursor. Los omitidos avanzan el cursor.
+        """
+        after = self.cursor.get('last_user_id')
+        for user_id in sorted(user_ids):
+            if after is not None and user_id <= after:
+                continue
+            member = self._find_member(user_id)
+            if member is None:
+                logger.debug(f"⚠️  Usuario {user_id} no encontrado en ningún servidor")
+            elif not wrapped_year.has_data(user_id):
+                logger.debug(f"⚠️  {member.display_name} no tiene datos suficientes")
+            else:
+                yield user_id, member, wrapped_year.get(user_id)
+                continue
+            self.cursor['skipped'] += 1
+            self.cursor['last_user_id'] = user_id
+
+    def iter_rendered(self, targets: Iterable[Tuple[str, object, Dict]]) -> Iterator[Tuple[str, object, discord.Embed]]:
+        """Arma los embeds a medida que el envío los pide"""
+        render = self.render
+        if render is None:
+            from stats.commands.wrapped import render_wrapped_embed as render
+        for user_id, member, sections in targets:
+            try:
+                yield user_id, member, render(member.display_name, self.year, sections)
+            except Exception as e:
+                logger.error(f"❌ Error armando wrapped de {user_id}: {e}")
+                self.cursor['skipped'] += 1
+                self.cursor['last_user_id'] = user_id
+
+    # ==================== ENVÍO ====================
+
+    async def _pace(self):
+        """Espera lo que indican los headers de rate limit del canal (o la pausa mínima)"""
+        delay = self.tracker.delay('POST', f'/channels/{self.channel.id}/messages')
+        if delay is None:
+            delay = self.min_interval - (time.monotonic() - self._last_send)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _send(self, content: Optional[str] = None, embeds: Optional[List[discord.Embed]] = None) -> bool:
+        """
+        Envía un mensaje con reintentos.
+
+        Returns:
+            False si se descartó tras los reintentos
+
+        Raises:
+            discord.Forbidden / discord.NotFound: El canal no es usable (se corta el envío)
+        """
+        kwargs = {'embeds': embeds} if embeds else {}
+        for attempt in range(self.max_retries + 1):
+            await self._pace()
+            try:
+                await self.channel.send(content, **kwargs)
+                self._last_send = time.monotonic()
+                return True
+            except (discord.Forbidden, discord.NotFound):
+                raise
+            except discord.HTTPException as e:
+                self._last_send = time.monotonic()
+                if attempt >= self.max_retries:
+                    logger.error(f'❌ Mensaje del wrapped descartado tras {self.max_retries} reintentos: {e}')
+                    return False
+                delay = getattr(e, 'retry_after', None) or self.retry_delay * 2 ** attempt
+                logger.warning(f'⚠️  Error HTTP {e.status} enviando wrapped. Reintento en {delay:g}s')
+                await asyncio.sleep(delay)
+        return False
+
+    async def run(self, stats_data: Dict, model=None) -> Dict:
+        """
+        Ejecuta (o retoma) el envío.
+
+        Args:
+            stats_data: Snapshot de stats
+            model: StatsModel ya construido; si es None se convierte cada usuario
+
+        Returns:
+            Cursor final con los totales {sent, skipped, finished, ...}
+            (finished=False si un mensaje no salió: hay que volver a correrlo)
+        """
+        self.cursor = self._load_or_start_cursor()
+        wrapped_year = await get_wrapped_engine().get_year_async(stats_data, self.year, model=model)
+
+        if not self.cursor['intro_sent']:
+            if not await self._send("@here", [create_intro_embed(self.year)]):
+                logger.error('❌ No se pudo enviar la introducción del wrapped: se reintenta en la próxima ejecución')
+                return self.cursor
+            self.cursor['intro_sent'] = True
+            self._save_cursor()
+            logger.info("✅ Mensaje de introducción enviado")
+
+        # Posición ya guardada: un lote fallido vuelve acá (los omitidos
+        # contados después se vuelven a contar al retomar)
+        checkpoint = (self.cursor['last_user_id'], self.cursor['skipped'])
+        targets = self.iter_targets(wrapped_year, stats_data.get('users', {}))
+        for batch in iter_batches(self.iter_rendered(targets)):
+            content = "## " + " ".join(member.mention for _, member, _ in batch)
+            if not await self._send(content, [embed for _, _, embed in batch]):
+                self.cursor['last_user_id'], self.cursor['skipped'] = checkpoint
+                self._save_cursor()
+                logger.error(f'❌ Lote del wrapped no enviado ({len(batch)} usuarios): '
+                             'se reintenta en la próxima ejecución')
+                return self.cursor
+            self.cursor['sent'] += len(batch)
+            logger.info(f"✅ Wrapped enviado a {', '.join(member.display_name for _, member, _ in batch)}")
+            # Los omitidos ya contados pueden estar más adelante que el lote
+            self.cursor['last_user_id'] = max(self.cursor['last_user_id'] or '', batch[-1][0])
+            self._save_cursor()
+            checkpoint = (self.cursor['last_user_id'], self.cursor['skipped'])
+
+        await self._send(embeds=[create_summary_embed(self.year, self.cursor['sent'], self.cursor['skipped'])])
+        self.cursor['finished'] = True
+        self._save_cursor()
+        logger.info(f"📊 Resumen: {self.cursor['sent']} enviados, {self.cursor['skipped']} omitidos")
+        return self.cursor
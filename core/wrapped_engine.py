@@ -0,0 +1,642 @@
+"""
+Motor del Wrapped (resumen anual)
+Cálculos puros sobre el dict de stats / los registros tipados: no importan
+discord ni core.persistence, así que también corren en procesos worker
+(ver iter_wrapped_year).
+"""
+
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from core.party_graph import PartyGraph
+from core.stats_model import DayCounts, UserStats
+
+logger = logging.getLogger('dsbot')
+
+
+def compute_wrapped_sections(stats_data: Dict, user_id: str, year: int,
+                             rankings: Optional[Dict] = None,
+                             record: Optional[UserStats] = None) -> Dict:
+    """
+    Calcula las secciones del wrapped de un usuario (sin armar el embed)
+    
+    Args:
+        rankings: Posiciones ya calculadas (ej: consulta del repositorio).
+                  Si es None se calculan sobre stats_data.
+        record: Registro tipado del usuario (StatsModel.user()).
+                Si es None se convierte desde stats_data.
+    
+    Returns:
+        Dict con {gaming, voice, parties, social, personality, rankings}
+    """
+    user_data = stats_data['users'][user_id]
+    if record is None:
+        record = UserStats.from_dict(user_data)
+    
+    gaming_stats = _calculate_gaming_stats(record, year)
+    party_stats = _calculate_party_stats(stats_data, user_id, year)
+    if rankings is None:
+        rankings = _calculate_rankings(stats_data, user_id)
+    
+    return {
+        'gaming': gaming_stats,
+        'voice': _calculate_voice_stats(record, year),
+        'parties': party_stats,
+        'social': _calculate_social_stats(user_data),
+        'personality': _detect_personality(user_data, gaming_stats, party_stats),
+        'rankings': rankings
+    }
+
+def _user_record(user_data) -> UserStats:
+    """Registro tipado del usuario (acepta el dict de stats o un UserStats del modelo)"""
+    if isinstance(user_data, UserStats):
+        return user_data
+    return UserStats.from_dict(user_data)
+
+
+def _as_days(daily_minutes) -> DayCounts:
+    """DayCounts de un histórico por día (dict 'YYYY-MM-DD' -> minutos o DayCounts)"""
+    if isinstance(daily_minutes, DayCounts):
+        return daily_minutes
+    try:
+        return DayCounts.from_dict(daily_minutes or {})
+    except (ValueError, TypeError, AttributeError):
+        return DayCounts()
+
+
+def _calculate_gaming_stats(user_data, year: int) -> Optional[Dict]:
+    """
+    Calcula estadísticas de gaming para el wrapped
+    
+    Args:
+        user_data: Dict del usuario o su UserStats (StatsModel.user())
+        year: Año del wrapped
+    """
+    user = _user_record(user_data)
+    if not user.games:
+        return None
+    
+    # Recorte por año de cada histórico (arrays por día, sin comparar strings)
+    total_minutes = 0
+    games_filtered = {}
+    
+    for game_name, game in user.games.items():
+        year_days = game.daily_minutes.year(year)
+        year_minutes = year_days.total()
+        if year_minutes > 0:
+            games_filtered[game_name] = {
+                'minutes': year_minutes,
+                'count': game.count or 0,
+                'daily_minutes': year_days
+            }
+            total_minutes += year_minutes
+    
+    if not games_filtered:
+        return None
+    
+    # Top juego
+    top_game = max(games_filtered.items(), key=lambda x: x[1]['minutes'])
+    
+    # Racha más larga (días consecutivos)
+    longest_streak = _calculate_longest_streak(games_filtered)
+    
+    # Día más gamer (suma día a día de todos los juegos)
+    all_daily = DayCounts.combine(g['daily_minutes'] for g in games_filtered.values())
+    best_day = all_daily.max_day()
+    
+    return {
+        'total_hours': round(total_minutes / 60, 1),
+        'total_minutes': total_minutes,
+        'top_game': top_game[0],
+        'top_game_hours': round(top_game[1]['minutes'] / 60, 1),
+        'unique_games': len(games_filtered),
+        'longest_streak': longest_streak,
+        'best_day': f"{best_day[0].isoformat()} ({round(best_day[1] / 60, 1)}h)" if best_day else "N/A",
+        'avg_session': round((total_minutes / sum(g['count'] for g in games_filtered.values())) / 60, 1) if games_filtered else 0
+    }
+
+
+def _calculate_longest_streak(games_filtered: Dict) -> int:
+    """Calcula la racha más larga de días consecutivos jugando (en cualquier juego)"""
+    all_daily = DayCounts.combine(
+        _as_days(game_data.get('daily_minutes')) for game_data in games_filtered.values()
+    )
+    return all_daily.longest_streak()
+
+
+def _calculate_voice_stats(user_data, year: int) -> Optional[Dict]:
+    """Calcula estadísticas de voice para el wrapped"""
+    voice = _user_record(user_data).voice
+    if voice is None or not voice.total_minutes:
+        return None
+    
+    # Filtrar por año
+    year_days = voice.daily_minutes.year(year)
+    year_minutes = year_days.total()
+    
+    if year_minutes == 0:
+        return None
+    
+    # Sesiones en el año (estimado)
+    sessions = voice.count or 0
+    
+    # Maratón más larga (día con más minutos)
+    longest = year_days.max_day()
+    longest_day = longest[1] if longest else 0
+    
+    return {
+        'total_hours': round(year_minutes / 60, 1),
+        'sessions': sessions,
+        'avg_session': round((year_minutes / sessions) / 60, 1) if sessions > 0 else 0,
+        'longest_session': round(longest_day / 60, 1)
+    }
+
+
+def _calculate_party_stats(stats_data: Dict, user_id: str, year: int) -> Optional[Dict]:
+    """Calcula estadísticas de parties para el wrapped"""
+    parties = stats_data.get('parties', {})
+    history = parties.get('history', [])
+    
+    if not history:
+        return None
+    
+    # Filtrar parties donde el usuario participó en el año
+    year_str = str(year)
+    user_parties = [
+        p for p in history
+        if user_id in p.get('players', []) and p.get('start', '').startswith(year_str)
+    ]
+    
+    return _summarize_parties(stats_data, user_id, user_parties)
+
+
+def _summarize_parties(stats_data: Dict, user_id: str, user_parties: List[Dict],
+                       graph: Optional[PartyGraph] = None) -> Optional[Dict]:
+    """
+    Resumen de las parties de un usuario en el año (ya filtradas).
+    
+    Args:
+        graph: Grafo de co-juego de las parties del año (default: se arma con user_parties)
+    """
+    if not user_parties:
+        return None
+    
+    # Juego más jugado en party
+    game_counts = {}
+    for party in user_parties:
+        game = party.get('game', 'Unknown')
+        game_counts[game] = game_counts.get(game, 0) + 1
+    
+    top_game = max(game_counts.items(), key=lambda x: x[1])[0] if game_counts else "N/A"
+    
+    # Party más larga
+    longest = max(user_parties, key=lambda x: x.get('duration', 0))
+    longest_hours = round(longest.get('duration', 0) / 60, 1)
+    
+    # Mejor compañero (con quien jugó más)
+    if graph is None:
+        graph = PartyGraph.from_history(user_parties)
+    partners = graph.partners(user_id, limit=1)
+    
+    if partners:
+        best_partner_id, best_partner_count, _ = partners[0]
+        # Buscar username
+        best_partner_name = stats_data['users'].get(best_partner_id, {}).get('username', 'Unknown')
+        best_partner = f"{best_partner_name} ({best_partner_count} parties)"
+    else:
+        best_partner = "Solo"
+    
+    return {
+        'total_parties': len(user_parties),
+        'top_game': top_game,
+        'longest_party': longest_hours,
+        'best_partner': best_partner
+    }
+
+
+def _calculate_social_stats(user_data: Dict) -> Optional[Dict]:
+    """Calcula estadísticas sociales para el wrapped"""
+    messages = user_data.get('messages', {})
+    reactions = user_data.get('reactions', {})
+    stickers = user_data.get('stickers', {})
+    
+    if not messages and not reactions:
+        return None
+    
+    # Top emoji
+    by_emoji = reactions.get('by_emoji', {})
+    top_emoji = max(by_emoji.items(), key=lambda x: x[1]) if by_emoji else ("❓", 0)
+    
+    return {
+        'messages': messages.get('count', 0),
+        'reactions': reactions.get('total', 0),
+        'stickers': stickers.get('total', 0),
+        'top_emoji': f"{top_emoji[0]} ({top_emoji[1]}x)" if by_emoji else "N/A"
+    }
+
+
+def _detect_personality(user_data: Dict, gaming_stats: Optional[Dict], party_stats: Optional[Dict]) -> List[Tuple[str, str]]:
+    """Detecta la personalidad del usuario basado en sus stats"""
+    personality = []
+    
+    if not gaming_stats:
+        return [("🤷", "Sin datos suficientes")]
+    
+    # Maratonero vs Casual
+    avg_session = gaming_stats.get('avg_session', 0)
+    if avg_session >= 3:
+        personality.append(("🏃", "Maratonero"))
+    elif avg_session < 1 and avg_session > 0:
+        personality.append(("🎲", "Casual"))
+    
+    # Social vs Loner
+    if party_stats:
+        total_parties = party_stats.get('total_parties', 0)
+        if total_parties > 30:
+            personality.append(("👥", "Social Butterfly"))
+        elif total_parties < 5 and total_parties > 0:
+            personality.append(("🦅", "Loner"))
+    
+    # Fidelidad vs Explorer
+    unique_games = gaming_stats.get('unique_games', 0)
+    if unique_games >= 10:
+        personality.append(("🗺️", "Explorer"))
+    elif unique_games <= 3 and unique_games > 0:
+        personality.append(("💎", "Fiel a sus juegos"))
+    
+    # Racha
+    longest_streak = gaming_stats.get('longest_streak', 0)
+    if longest_streak >= 14:
+        personality.append(("🔥", "Constante"))
+    
+    return personality if personality else [("🎮", "Gamer")]
+
+
+def _gaming_score(user_data: Dict) -> int:
+    return sum(game.get('total_minutes', 0) for game in user_data.get('games', {}).values())
+
+
+def _social_score(user_data: Dict) -> int:
+    return user_data.get('messages', {}).get('count', 0) + user_data.get('reactions', {}).get('total', 0)
+
+
+def _rank_positions(scores: List[Tuple[str, int]]) -> Dict[str, int]:
+    """
+    Posición de cada usuario: 1 + usuarios con puntaje estrictamente mayor
+    (los empates comparten puesto, como rank_for_score y user_rankings())
+    """
+    ordered = sorted(scores, key=lambda x: x[1], reverse=True)
+    positions = {}
+    position, previous = 0, None
+    for i, (uid, score) in enumerate(ordered, 1):
+        if score != previous:
+            position, previous = i, score
+        positions[uid] = position
+    return positions
+
+
+def _calculate_rankings(stats_data: Dict, user_id: str) -> Optional[Dict]:
+    """Calcula rankings del usuario en el servidor"""
+    users = stats_data.get('users', {})
+    
+    # Gaming ranking (por total_minutes)
+    gaming_scores = [(uid, _gaming_score(udata)) for uid, udata in users.items()]
+    
+    # Social ranking (mensajes + reacciones)
+    social_scores = [(uid, _social_score(udata)) for uid, udata in users.items()]
+    
+    # Party ranking (contar parties)
+    party_counts = _count_parties(stats_data.get('parties', {}).get('history', []))
+    party_scores = [(uid, party_counts.get(uid, 0)) for uid in users.keys()]
+    
+    return {
+        'gaming': _rank_positions(gaming_scores).get(user_id, 0),
+        'social': _rank_positions(social_scores).get(user_id, 0),
+        'parties': _rank_positions(party_scores).get(user_id, 0)
+    }
+
+
+def _count_parties(history: List[Dict]) -> Dict[str, int]:
+    """Cantidad de parties (de todo el historial) de cada jugador"""
+    counts = {}
+    for party in history:
+        for uid in dict.fromkeys(party.get('players', [])):
+            counts[uid] = counts.get(uid, 0) + 1
+    return counts
+
+
+# ==================== MOTOR PRECALCULADO (envío a todos) ====================
+
+class WrappedYear:
+    """
+    Secciones del wrapped de todos los usuarios para un año, calculadas en
+    una sola pasada sobre un snapshot. Solo lectura.
+    """
+
+    def __init__(self, year: int, source: Dict, sections: Dict[str, Dict], active: set):
+        """
+        Args:
+            year: Año del wrapped
+            source: Snapshot del que se calculó (identifica si sigue vigente)
+            sections: {user_id: secciones (ver compute_wrapped_sections)}
+            active: Usuarios con datos suficientes para recibir su wrapped
+        """
+        self.year = year
+        self.source = source
+        self.sections = sections
+        self.active = active
+        self.generated_at = datetime.now()
+
+    def __len__(self) -> int:
+        return len(self.sections)
+
+    def get(self, user_id: str) -> Optional[Dict]:
+        return self.sections.get(user_id)
+
+    def has_data(self, user_id: str) -> bool:
+        """Tiene juegos, minutos de voz o parties registradas"""
+        return user_id in self.active
+
+
+def _prepare_year(stats_data: Dict, year: int) -> Dict:
+    """
+    Parte global del wrapped de un año: una pasada por el historial de
+    parties (agrupadas por jugador) y un solo ordenamiento por ranking.
+    
+    Returns:
+        Dict con {year, party_counts, year_parties, year_graph, ranks}
+    """
+    users = stats_data.get('users', {})
+    history = stats_data.get('parties', {}).get('history', [])
+    year_str = str(year)
+    
+    # Parties: conteo histórico (ranking), parties del año por jugador y
+    # grafo de co-juego del año (mejor compañero de cada uno)
+    party_counts = _count_parties(history)
+    year_parties: Dict[str, List[Dict]] = {}
+    year_graph = PartyGraph()
+    for party in history:
+        if party.get('start', '').startswith(year_str):
+            for uid in dict.fromkeys(party.get('players', [])):
+                year_parties.setdefault(uid, []).append(party)
+            year_graph.add_party(party)
+    
+    return {
+        'year': year,
+        'party_counts': party_counts,
+        'year_parties': year_parties,
+        'year_graph': year_graph,
+        'ranks': {
+            'gaming': _rank_positions([(uid, _gaming_score(udata)) for uid, udata in users.items()]),
+            'social': _rank_positions([(uid, _social_score(udata)) for uid, udata in users.items()]),
+            'parties': _rank_positions([(uid, party_counts.get(uid, 0)) for uid in users.keys()])
+        }
+    }
+
+
+def _user_sections(stats_data: Dict, context: Dict, uid: str,
+                   record: Optional[UserStats] = None) -> Tuple[Dict, bool]:
+    """
+    Secciones del wrapped de un usuario usando la parte global ya calculada.
+    
+    Returns:
+        Tupla (secciones, tiene datos suficientes para recibir su wrapped)
+    """
+    udata = stats_data['users'][uid]
+    year = context['year']
+    if record is None:
+        record = UserStats.from_dict(udata)
+    
+    gaming_stats = _calculate_gaming_stats(record, year)
+    party_stats = _summarize_parties(stats_data, uid, context['year_parties'].get(uid, []),
+                                     graph=context['year_graph'])
+    ranks = context['ranks']
+    sections = {
+        'gaming': gaming_stats,
+        'voice': _calculate_voice_stats(record, year),
+        'parties': party_stats,
+        'social': _calculate_social_stats(udata),
+        'personality': _detect_personality(udata, gaming_stats, party_stats),
+        'rankings': {
+            'gaming': ranks['gaming'][uid],
+            'social': ranks['social'][uid],
+            'parties': ranks['parties'][uid]
+        }
+    }
+    
+    has_data = bool(
+        udata.get('games')
+        or udata.get('voice', {}).get('total_minutes', 0) > 0
+        or context['party_counts'].get(uid)
+    )
+    return sections, has_data
+
+
+def compute_wrapped_year(stats_data: Dict, year: int, model=None) -> WrappedYear:
+    """
+    Calcula el wrapped de todos los usuarios de una vez.
+    
+    Una pasada por el historial de parties (agrupadas por jugador) y un solo
+    ordenamiento por ranking, en lugar de recorrer todos los usuarios y todo
+    el historial por cada wrapped.
+    
+    Args:
+        stats_data: Snapshot de stats (get_stats_snapshot())
+        year: Año del wrapped
+        model: StatsModel ya construido; si es None se convierte cada usuario
+    """
+    context = _prepare_year(stats_data, year)
+    
+    sections = {}
+    active = set()
+    for uid in stats_data.get('users', {}):
+        record = model.user(uid) if model is not None else None
+        sections[uid], has_data = _user_sections(stats_data, context, uid, record)
+        if has_data:
+            active.add(uid)
+    
+    return WrappedYear(year, stats_data, sections, active)
+
+
+# ==================== CÁLCULO EN PARALELO (procesos worker) ====================
+
+# Snapshot y parte global del año en cada worker (se cargan una vez por proceso)
+_worker_state: Optional[Tuple[Dict, Dict]] = None
+
+
+def _init_worker(stats_data: Dict, context: Dict):
+    global _worker_state
+    _worker_state = (stats_data, context)
+
+
+def _compute_chunk(user_ids: List[str]) -> List[Tuple[str, Dict, bool]]:
+    """Secciones de un grupo de usuarios (corre en un proceso worker)"""
+    stats_data, context = _worker_state
+    return [(uid,) + _user_sections(stats_data, context, uid) for uid in user_ids]
+
+
+def default_workers() -> int:
+    """
+    Procesos para el cálculo en paralelo: todos los CPUs menos uno (el del
+    event loop). Con un solo CPU igual se usa un worker: el loop no se congela.
+    """
+    return max(1, (os.cpu_count() or 1) - 1)
+
+
+async def iter_wrapped_year(stats_data: Dict, year: int, workers: Optional[int] = None,
+                            chunk_size: int = 250) -> AsyncIterator[Tuple[str, Dict, bool]]:
+    """
+    Calcula el wrapped de todos los usuarios en un pool de procesos y entrega
+    los resultados al event loop a medida que terminan.
+    
+    Cada worker recibe el snapshot una sola vez (initializer) y procesa
+    grupos de `chunk_size` usuarios; el event loop solo espera futures.
+    
+    Args:
+        stats_data: Snapshot de stats (solo lectura)
+        year: Año del wrapped
+        workers: Cantidad de procesos (default: default_workers())
+        chunk_size: Usuarios por tarea
+    
+    Yields:
+        Tuplas (user_id, secciones, tiene datos) en orden de llegada
+    
+    Raises:
+        OSError / BrokenProcessPool: Si no se pudo crear o usar el pool
+    """
+    context = _prepare_year(stats_data, year)
+    user_ids = list(stats_data.get('users', {}))
+    chunks = [user_ids[i:i + chunk_size] for i in range(0, len(user_ids), chunk_size)]
+    if not chunks:
+        return
+    
+    loop = asyncio.get_running_loop()
+    pool = ProcessPoolExecutor(
+        max_workers=min(workers or default_workers(), len(chunks)),
+        initializer=_init_worker,
+        initargs=(stats_data, context)
+    )
+    try:
+        futures = [loop.run_in_executor(pool, _compute_chunk, chunk) for chunk in chunks]
+        for future in asyncio.as_completed(futures):
+            for row in await future:
+                yield row
+    finally:
+        # Sin esperar: si el consumidor cortó antes, no bloquear el loop
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+class WrappedEngine:
+    """
+    Cache por año de los wrapped precalculados.
+    
+    Un año se recalcula solo si se pide sobre otro snapshot: los snapshots
+    son inmutables, así que mientras no haya cambios todos los wrapped del
+    año son una búsqueda en un dict.
+    
+    Con muchos usuarios (parallel_min_users) get_year_async() reparte el
+    cálculo en un pool de procesos para no congelar el event loop.
+    """
+
+    def __init__(self, max_years: int = 2, workers: int = 0, parallel_min_users: int = 1000,
+                 chunk_size: int = 250):
+        """
+        Args:
+            max_years: Años que se mantienen en cache (se descarta el más viejo)
+            workers: Procesos del cálculo en paralelo (0 = CPUs - 1)
+            parallel_min_users: Usuarios a partir de los cuales se usa el pool (0 = nunca)
+            chunk_size: Usuarios por tarea del pool
+        """
+        self.max_years = max_years
+        self.workers = workers
+        self.parallel_min_users = parallel_min_users
+        self.chunk_size = chunk_size
+        self._years: Dict[int, WrappedYear] = {}
+
+    def configure(self, settings: Dict):
+        """Aplica config['wrapped'] (workers, parallel_min_users, chunk_size)"""
+        self.workers = int(settings.get('workers', self.workers))
+        self.parallel_min_users = int(settings.get('parallel_min_users', self.parallel_min_users))
+        self.chunk_size = max(1, int(settings.get('chunk_size', self.chunk_size)))
+
+    def get_year(self, stats_data: Dict, year: int, model=None) -> WrappedYear:
+        """Wrapped de todos los usuarios del año (del cache si el snapshot no cambió)"""
+        cached = self.cached(stats_data, year)
+        if cached is not None:
+            return cached
+        
+        start = time.perf_counter()
+        result = compute_wrapped_year(stats_data, year, model=model)
+        self._store(result, start)
+        return result
+
+    async def get_year_async(self, stats_data: Dict, year: int, model=None) -> WrappedYear:
+        """
+        Como get_year(), pero con muchos usuarios calcula en procesos worker
+        mientras el event loop sigue atendiendo el gateway.
+        
+        Si el pool no está disponible se calcula en el proceso.
+        """
+        cached = self.cached(stats_data, year)
+        if cached is not None:
+            return cached
+        
+        if self.parallel_min_users <= 0 or len(stats_data.get('users', {})) < self.parallel_min_users:
+            return self.get_year(stats_data, year, model=model)
+        workers = self.workers or default_workers()
+        
+        start = time.perf_counter()
+        collected = {}
+        active = set()
+        try:
+            async for uid, sections, has_data in iter_wrapped_year(
+                    stats_data, year, workers=workers, chunk_size=self.chunk_size):
+                collected[uid] = sections
+                if has_data:
+                    active.add(uid)
+        except (OSError, BrokenProcessPool) as e:
+            logger.warning(f'⚠️ Wrapped en paralelo no disponible ({e}), calculando en el proceso')
+            return self.get_year(stats_data, year, model=model)
+        
+        # Mismo orden que stats['users'] (los grupos llegan en cualquier orden)
+        sections = {uid: collected[uid] for uid in stats_data.get('users', {})}
+        result = WrappedYear(year, stats_data, sections, active)
+        self._store(result, start, workers=workers)
+        return result
+
+    def _store(self, result: WrappedYear, start: float, workers: int = 0):
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        mode = f' ({workers} procesos)' if workers else ''
+        logger.info(f'🎁 Wrapped {result.year} precalculado: {len(result)} usuarios en {elapsed_ms:.0f} ms{mode}')
+        
+        self._years.pop(result.year, None)
+        self._years[result.year] = result
+        while len(self._years) > self.max_years:
+            del self._years[next(iter(self._years))]
+
+    def cached(self, stats_data: Dict, year: int) -> Optional[WrappedYear]:
+        """Resultado en cache para el año si se calculó sobre este mismo snapshot"""
+        cached = self._years.get(year)
+        if cached is not None and cached.source is stats_data:
+            return cached
+        return None
+
+    def invalidate(self, year: Optional[int] = None):
+        if year is None:
+            self._years.clear()
+        else:
+            self._years.pop(year, None)
+
+
+_engine = WrappedEngine()
+
+
+def get_wrapped_engine() -> WrappedEngine:
+    """Motor de wrapped del proceso (cache por año)"""
+    return _engine
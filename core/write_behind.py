@@ -0,0 +1,92 @@
+"""
+Write-behind para persistencia de estadísticas
+Agrupa muchas mutaciones de stats en una sola escritura a disco
+"""
+
+import asyncio
+import inspect
+import logging
+from typing import Awaitable, Callable, Optional, Union
+
+logger = logging.getLogger('dsbot')
+
+
+class WriteBehindFlusher:
+    """
+    Flusher en background para el store de estadísticas.
+
+    Las mutaciones solo notifican que hay cambios pendientes; el flusher escribe:
+    - Cada `interval_seconds` si hay cambios pendientes
+    - Inmediatamente si se acumulan `max_pending` cambios sin escribir
+    - Una última vez al detenerse (shutdown)
+    """
+
+    def __init__(self, flush_fn: Callable[[], Union[bool, Awaitable[bool]]], interval_seconds: float = 5.0, max_pending: int = 100,
+                 name: str = 'Write-behind'):
+        """
+        Args:
+            flush_fn: Función (o corutina) que escribe los cambios pendientes (retorna True si escribió)
+            interval_seconds: Intervalo máximo entre escrituras
+            max_pending: Cantidad de cambios que fuerza una escritura anticipada
+            name: Nombre para los logs
+        """
+        self.flush_fn = flush_fn
+        self.name = name
+        self.interval_seconds = max(0.1, float(interval_seconds))
+        self.max_pending = max(1, int(max_pending))
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+
+    def is_running(self) -> bool:
+        """True si la task de flush está activa"""
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Inicia la task de flush (requiere un event loop corriendo)"""
+        if self.is_running():
+            return
+        self._wake = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        logger.info(
+            f'💾 {self.name} iniciado (cada {self.interval_seconds:g}s '
+            f'o {self.max_pending} cambios pendientes)'
+        )
+
+    def notify(self, pending_changes: int):
+        """
+        Notifica que hay cambios pendientes.
+        Si se superó el umbral, despierta al flusher para escribir ya.
+        """
+        if self._wake is not None and pending_changes >= self.max_pending:
+            self._wake.set()
+
+    async def stop(self):
+        """Detiene la task y hace un flush final forzado"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._flush()
+        logger.info(f'💾 {self.name} detenido (flush final realizado)')
+
+    async def _run(self):
+        """Loop principal: espera el intervalo (o el umbral) y escribe"""
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self._flush()
+
+    async def _flush(self):
+        """Ejecuta el flush sin dejar que un error mate la task"""
+        try:
+            result = self.flush_fn()
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            logger.error(f'❌ {self.name}: error en flush de estadísticas: {e}', exc_info=True)
@@ -5,9 +5,8 @@ Comandos de Juegos
 
 import discord
 from discord.ext import commands
-import json
 
-from core.persistence import STATS_FILE
+from core.persistence import get_stats_snapshot
 from ..visualization import (
     create_bar_chart,
     create_ranking_visual,
@@ -44,13 +43,8 @@ def setup_game_commands(bot):
             await ctx.send(f"❌ Orden inválido. Usa: {', '.join(valid_sorts)}")
             return
         
-        # Cargar stats
-        try:
-            with open(STATS_FILE, 'r', encoding='utf-8') as f:
-                stats_data = json.load(f)
-        except Exception as e:
-            await ctx.send(f"❌ Error al cargar estadísticas: {e}")
-            return
+        # Snapshot en memoria (sin leer stats.json)
+        stats_data = get_stats_snapshot()
         
         # Agregar datos
         game_stats = aggregate_game_stats(stats_data)
@@ -127,13 +121,8 @@ def setup_game_commands(bot):
             await ctx.send("❌ Debes especificar el nombre del juego.\nEjemplo: `!topgame Hades`")
             return
         
-        # Cargar stats
-        try:
-            with open(STATS_FILE, 'r', encoding='utf-8') as f:
-                stats_data = json.load(f)
-        except Exception as e:
-            await ctx.send(f"❌ Error al cargar estadísticas: {e}")
-            return
+        # Snapshot en memoria (sin leer stats.json)
+        stats_data = get_stats_snapshot()
         
         # Obtener stats del juego
         game_stats = get_game_stats_detailed(stats_data, game_name)
@@ -221,13 +210,8 @@ def setup_game_commands(bot):
         
         Muestra tu top 10 de juegos por tiempo jugado
         """
-        # Cargar stats
-        try:
-            with open(STATS_FILE, 'r', encoding='utf-8') as f:
-                stats_data = json.load(f)
-        except Exception as e:
-            await ctx.send(f"❌ Error al cargar estadísticas: {e}")
-            return
+        # Snapshot en memoria (sin leer stats.json)
+        stats_data = get_stats_snapshot()
         
         # Buscar datos del usuario
         user_id = str(ctx.author.id)
@@ -5,9 +5,8 @@ Comandos de Parties
 
 import discord
 from discord.ext import commands
-import json
 
-from core.persistence import STATS_FILE
+from core.persistence import get_party_graph, get_stats_snapshot
 from ..data.aggregators import aggregate_party_stats
 from ..visualization import format_time
 
@@ -20,14 +19,9 @@ def setup_party_commands(bot):
         """
         👥 Usuarios con más participaciones en parties (historial)
         """
-        try:
-            with open(STATS_FILE, 'r', encoding='utf-8') as f:
-                stats_data = json.load(f)
-        except Exception as e:
-            await ctx.send(f"❌ Error al cargar estadísticas: {e}")
-            return
+        stats_data = get_stats_snapshot()
 
-        ap = aggregate_party_stats(stats_data)
+        ap = aggregate_party_stats(stats_data, graph=get_party_graph())
         by_user = ap.get('by_user') or {}
         if not by_user:
             await ctx.send("📊 Aún no hay parties registradas en el historial.")
@@ -57,31 +51,15 @@ def setup_party_commands(bot):
         👥 Con quién compartiste más parties (mismo historial)
         """
         target = member or ctx.author
-        try:
-            with open(STATS_FILE, 'r', encoding='utf-8') as f:
-                stats_data = json.load(f)
-        except Exception as e:
-            await ctx.send(f"❌ Error al cargar estadísticas: {e}")
-            return
+        stats_data = get_stats_snapshot()
 
         uid = str(target.id)
-        ap = aggregate_party_stats(stats_data)
-        pairs = ap.get('companion_pairs') or {}
         users_map = stats_data.get('users', {})
+        companions = [
+            (users_map.get(other, {}).get('username', f'ID {other}'), cnt)
+            for other, cnt, _ in get_party_graph().partners(uid, limit=12)
+        ]
 
-        # Parejas donde participó uid
-        companions = []
-        for (a, b), cnt in pairs.items():
-            other = None
-            if a == uid:
-                other = b
-            elif b == uid:
-                other = a
-            if other is not None:
-                oname = users_map.get(other, {}).get('username', f'ID {other}')
-                companions.append((oname, cnt))
-
-        companions.sort(key=lambda x: x[1], reverse=True)
         if not companions:
             await ctx.send(
                 f"📊 No hay datos de companions en parties para **{target.display_name}**."
@@ -102,14 +80,9 @@ def setup_party_commands(bot):
         """
         🎮 Juegos con más parties formadas (stats_by_game)
         """
-        try:
-            with open(STATS_FILE, 'r', encoding='utf-8') as f:
-                stats_data = json.load(f)
-        except Exception as e:
-            await ctx.send(f"❌ Error al cargar estadísticas: {e}")
-            return
+        stats_data = get_stats_snapshot()
 
-        ap = aggregate_party_stats(stats_data)
+        ap = aggregate_party_stats(stats_data, graph=get_party_graph())
         sorted_g = ap.get('by_game_sorted') or []
         if not sorted_g:
             await ctx.send("📊 No hay estadísticas de parties por juego todavía.")
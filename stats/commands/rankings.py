@@ -6,21 +6,14 @@ Comandos de Rankings
 import discord
 from discord.ext import commands
 from typing import Optional
-import json
 
-from core.persistence import STATS_FILE
+from core.persistence import get_repository
 from ..visualization import (
     create_ranking_visual,
     format_time,
     format_large_number,
     get_period_label
 )
-from ..data import (
-    aggregate_game_time_by_user,
-    aggregate_voice_stats,
-    aggregate_message_stats,
-    filter_by_period
-)
 
 
 def setup_ranking_commands(bot):
@@ -42,21 +35,13 @@ def setup_ranking_commands(bot):
             await ctx.send(f"❌ Período inválido. Usa: {', '.join(valid_periods)}")
             return
         
-        # Cargar stats
+        # Ranking desde el repositorio (query indexada en SQLite)
         try:
-            with open(STATS_FILE, 'r', encoding='utf-8') as f:
-                stats_data = json.load(f)
+            user_stats = get_repository().top_game_time(period, limit=10)
         except Exception as e:
             await ctx.send(f"❌ Error al cargar estadísticas: {e}")
             return
         
-        # Filtrar por período
-        if period != 'all':
-            stats_data = filter_by_period(stats_data, period)
-        
-        # Agregar datos
-        user_stats = aggregate_game_time_by_user(stats_data)
-        
         if not user_stats:
             await ctx.send(f"📊 No hay datos de juegos para el período: {get_period_label(period)}")
             return
@@ -100,21 +85,13 @@ def setup_ranking_commands(bot):
             await ctx.send(f"❌ Período inválido. Usa: {', '.join(valid_periods)}")
             return
         
-        # Cargar stats
+        # Ranking desde el repositorio (query indexada en SQLite)
         try:
-            with open(STATS_FILE, 'r', encoding='utf-8') as f:
-                stats_data = json.load(f)
+            voice_stats = get_repository().top_voice_time(period, limit=10)
         except Exception as e:
             await ctx.send(f"❌ Error al cargar estadísticas: {e}")
             return
         
-        # Filtrar por período
-        if period != 'all':
-            stats_data = filter_by_period(stats_data, period)
-        
-        # Agregar datos
-        voice_stats = aggregate_voice_stats(stats_data)
-        
         if not voice_stats:
             await ctx.send(f"📊 No hay datos de voz para el período: {get_period_label(period)}")
             return
@@ -151,17 +128,13 @@ def setup_ranking_commands(bot):
         
         Muestra los usuarios más activos en chat
         """
-        # Cargar stats
+        # Ranking desde el repositorio (query indexada en SQLite)
         try:
-            with open(STATS_FILE, 'r', encoding='utf-8') as f:
-                stats_data = json.load(f)
+            message_stats = get_repository().top_messages(limit=10)
         except Exception as e:
             await ctx.send(f"❌ Error al cargar estadísticas: {e}")
             return
         
-        # Agregar datos
-        message_stats = aggregate_message_stats(stats_data)
-        
         if not message_stats:
             await ctx.send("📊 No hay datos de mensajes")
             return
@@ -5,9 +5,8 @@ Comandos Sociales
 
 import discord
 from discord.ext import commands
-import json
 
-from core.persistence import STATS_FILE
+from core.persistence import get_stats_snapshot
 from core.checks import stats_channel_only
 from ..visualization import (
     create_bar_chart,
@@ -27,13 +26,8 @@ def setup_social_commands(bot):
         
         Uso: !topreactions
         """
-        # Cargar stats
-        try:
-            with open(STATS_FILE, 'r', encoding='utf-8') as f:
-                stats_data = json.load(f)
-        except Exception as e:
-            await ctx.send(f"❌ Error al cargar estadísticas: {e}")
-            return
+        # Snapshot en memoria (sin leer stats.json)
+        stats_data = get_stats_snapshot()
         
         # Agregar datos
         reaction_stats = []
@@ -72,13 +66,8 @@ def setup_social_commands(bot):
         
         Uso: !topstickers
         """
-        # Cargar stats
-        try:
-            with open(STATS_FILE, 'r', encoding='utf-8') as f:
-                stats_data = json.load(f)
-        except Exception as e:
-            await ctx.send(f"❌ Error al cargar estadísticas: {e}")
-            return
+        # Snapshot en memoria (sin leer stats.json)
+        stats_data = get_stats_snapshot()
         
         # Agregar datos
         sticker_stats = []
@@ -122,12 +111,7 @@ def setup_social_commands(bot):
         if tf not in valid:
             await ctx.send(f"❌ Período inválido. Usa: {', '.join(valid)}")
             return
-        try:
-            with open(STATS_FILE, 'r', encoding='utf-8') as f:
-                stats_data = json.load(f)
-        except Exception as e:
-            await ctx.send(f"❌ Error al cargar estadísticas: {e}")
-            return
+        stats_data = get_stats_snapshot()
         label = get_period_label(tf)
         embed = await create_connections_ranking_embed(stats_data, label, timeframe=tf)
         await ctx.send(embed=embed)
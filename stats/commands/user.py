@@ -5,9 +5,8 @@ Comandos de Usuario
 
 import discord
 from discord.ext import commands
-import json
 
-from core.persistence import STATS_FILE
+from core.persistence import get_stats_snapshot
 from ..visualization import (
     create_bar_chart,
     create_comparison_bars,
@@ -34,13 +33,8 @@ def setup_user_commands(bot):
         # Determinar el usuario
         target_user = user if user else ctx.author
         
-        # Cargar stats
-        try:
-            with open(STATS_FILE, 'r', encoding='utf-8') as f:
-                stats_data = json.load(f)
-        except Exception as e:
-            await ctx.send(f"❌ Error al cargar estadísticas: {e}")
-            return
+        # Snapshot en memoria (sin leer stats.json)
+        stats_data = get_stats_snapshot()
         
         # Buscar datos del usuario
         user_id = str(target_user.id)
@@ -201,13 +195,8 @@ def setup_user_commands(bot):
             await ctx.send("❌ No puedes compararte contigo mismo!")
             return
         
-        # Cargar stats
-        try:
-            with open(STATS_FILE, 'r', encoding='utf-8') as f:
-                stats_data = json.load(f)
-        except Exception as e:
-            await ctx.send(f"❌ Error al cargar estadísticas: {e}")
-            return
+        # Snapshot en memoria (sin leer stats.json)
+        stats_data = get_stats_snapshot()
         
         users = stats_data.get('users', {})
         
@@ -5,14 +5,16 @@ Incluye: export, backup, etc.
 
 import discord
 from discord.ext import commands
-import json
+import asyncio
 import csv
 import logging
 from datetime import datetime
 from pathlib import Path
 from io import StringIO
 
-from core.persistence import stats, STATS_FILE, DATA_DIR
+from core.atomic_io import get_io_executor
+from core.json_codec import get_codec
+from core.persistence import stats, STATS_FILE, DATA_DIR, flush_async, get_stats_snapshot
 from core.checks import stats_channel_only
 from stats_viz import filter_by_period, get_period_label
 from ..embeds import create_overview_embed
@@ -21,6 +23,11 @@ from ..ui_components import StatsView
 logger = logging.getLogger('dsbot')
 
 
+def _write_export(filepath: Path, data: dict):
+    """Escribe el JSON de !export, indentado para lectura humana (corre en el thread de I/O)"""
+    filepath.write_bytes(get_codec().dumps(data, pretty=True))
+
+
 def setup_utils_commands(bot: commands.Bot):
     """Configura los comandos de utilidades"""
     
@@ -43,13 +50,17 @@ def setup_utils_commands(bot: commands.Bot):
             return
         
         try:
+            # Asegurar que stats.json en disco refleje lo exportado
+            await flush_async()
+            
             if format == 'json':
-                # Exportar como JSON
+                # Exportar como JSON (snapshot de solo lectura, serializado fuera del event loop)
                 filename = f'stats_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
                 filepath = Path(DATA_DIR) / filename
                 
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    json.dump(stats, f, indent=2, ensure_ascii=False)
+                await asyncio.get_running_loop().run_in_executor(
+                    get_io_executor(), _write_export, filepath, get_stats_snapshot()
+                )
                 
                 # Enviar archivo
                 await ctx.send(
@@ -147,6 +158,9 @@ def setup_utils_commands(bot: commands.Bot):
         try:
             import os
             
+            # Escribir cambios pendientes del write-behind antes de inspeccionar el archivo
+            await flush_async()
+            
             if not os.path.exists(STATS_FILE):
                 await ctx.send(f'❌ El archivo `stats.json` no existe en: `{STATS_FILE}`')
                 return
@@ -192,12 +206,7 @@ def setup_utils_commands(bot: commands.Bot):
         """
         📊 Menú interactivo: rankings, timeline y períodos (select menus).
         """
-        try:
-            with open(STATS_FILE, 'r', encoding='utf-8') as f:
-                stats_data = json.load(f)
-        except Exception as e:
-            await ctx.send(f'❌ Error al cargar estadísticas: {e}')
-            return
+        stats_data = get_stats_snapshot()
 
         filtered = filter_by_period(stats_data, 'all')
         period_label = get_period_label('all')
@@ -1,37 +1,92 @@
 """
 Módulo de Agregadores de Datos
 Funciones para agregar y procesar estadísticas
+
+Los agregadores de totales aceptan `model` (un core.stats_model.StatsModel ya construido)
+para leer los registros tipados del histórico completo en lugar del dict.
 """
 
-from typing import Dict, List, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 from datetime import datetime, timedelta
 
+from core.party_graph import PartyGraph
+
+
+def _game_rows(stats_data: Dict, model=None, game_name: Optional[str] = None) -> Iterator[Tuple]:
+    """
+    Filas (username, game, minutes, count, first_played, last_played) de cada juego de cada usuario.
+    Con `game_name` solo las de ese juego.
+    """
+    if model is not None:
+        for user in model.users().values():
+            games = user.games if game_name is None else (
+                {game_name: user.games[game_name]} if game_name in user.games else {}
+            )
+            for game, data in games.items():
+                yield user.username, game, data.total_minutes, data.count, data.first_played, data.last_played
+        return
+
+    for user_data in stats_data.get('users', {}).values():
+        username = user_data.get('username', 'Unknown')
+        games = user_data.get('games', {})
+        if game_name is not None:
+            games = {game_name: games[game_name]} if game_name in games else {}
+        for game, data in games.items():
+            yield (username, game, data.get('total_minutes', 0), data.get('count', 0),
+                   data.get('first_played'), data.get('last_played'))
+
 
-def aggregate_game_stats(stats_data: Dict) -> Dict[str, Dict]:
+def _user_rows(stats_data: Dict, model=None) -> Iterator[Tuple]:
+    """
+    Filas por usuario: (username, game_minutes, game_sessions, unique_games,
+    voice_minutes, voice_count, message_count, message_characters)
+    """
+    if model is not None:
+        for user in model.users().values():
+            messages = user.messages
+            yield (user.username, user.game_minutes, user.game_sessions, len(user.games),
+                   user.voice_minutes, user.voice_count,
+                   messages.count if messages is not None else 0,
+                   messages.characters if messages is not None else 0)
+        return
+
+    for user_data in stats_data.get('users', {}).values():
+        games = user_data.get('games', {})
+        voice = user_data.get('voice', {})
+        messages = user_data.get('messages', {})
+        yield (user_data.get('username', 'Unknown'),
+               sum(g.get('total_minutes', 0) for g in games.values()),
+               sum(g.get('count', 0) for g in games.values()),
+               len(games),
+               voice.get('total_minutes', 0), voice.get('count', 0),
+               messages.get('count', 0), messages.get('characters', 0))
+
+
+def aggregate_game_stats(stats_data: Dict, model=None) -> Dict[str, Dict]:
     """
     Agrega estadísticas de juegos de todos los usuarios
     
     Args:
         stats_data: Datos completos de stats
+        model: Modelo tipado de los usuarios (solo si stats_data es el histórico completo)
         
     Returns:
         Dict con {game_name: {minutes, count, players, parties}}
     """
     game_stats = {}
     
-    for user_data in stats_data.get('users', {}).values():
-        for game, data in user_data.get('games', {}).items():
-            if game not in game_stats:
-                game_stats[game] = {
-                    'minutes': 0,
-                    'count': 0,
-                    'players': set(),
-                    'parties': 0
-                }
-            
-            game_stats[game]['minutes'] += data.get('total_minutes', 0)
-            game_stats[game]['count'] += data.get('count', 0)
-            game_stats[game]['players'].add(user_data.get('username', 'Unknown'))
+    for username, game, minutes, count, _, _ in _game_rows(stats_data, model):
+        if game not in game_stats:
+            game_stats[game] = {
+                'minutes': 0,
+                'count': 0,
+                'players': set(),
+                'parties': 0
+            }
+        
+        game_stats[game]['minutes'] += minutes
+        game_stats[game]['count'] += count
+        game_stats[game]['players'].add(username)
     
     # Convertir sets a listas y contar
     for game in game_stats:
@@ -55,25 +110,20 @@ def aggregate_game_stats(stats_data: Dict) -> Dict[str, Dict]:
     return game_stats
 
 
-def aggregate_voice_stats(stats_data: Dict) -> List[Tuple[str, int, int]]:
+def aggregate_voice_stats(stats_data: Dict, model=None) -> List[Tuple[str, int, int]]:
     """
     Agrega estadísticas de voz de todos los usuarios
     
     Args:
         stats_data: Datos completos de stats
+        model: Modelo tipado de los usuarios (solo si stats_data es el histórico completo)
         
     Returns:
         Lista de tuplas (username, minutes, count) ordenada por tiempo
     """
     voice_stats = []
     
-    for user_id, user_data in stats_data.get('users', {}).items():
-        username = user_data.get('username', 'Unknown')
-        voice = user_data.get('voice', {})
-        
-        minutes = voice.get('total_minutes', 0)
-        count = voice.get('count', 0)
-        
+    for username, _, _, _, minutes, count, _, _ in _user_rows(stats_data, model):
         if minutes > 0 or count > 0:
             voice_stats.append((username, minutes, count))
     
@@ -83,26 +133,20 @@ def aggregate_voice_stats(stats_data: Dict) -> List[Tuple[str, int, int]]:
     return voice_stats
 
 
-def aggregate_game_time_by_user(stats_data: Dict) -> List[Tuple[str, int, int, int]]:
+def aggregate_game_time_by_user(stats_data: Dict, model=None) -> List[Tuple[str, int, int, int]]:
     """
     Agrega tiempo de juego por usuario
     
     Args:
         stats_data: Datos completos de stats
+        model: Modelo tipado de los usuarios (solo si stats_data es el histórico completo)
         
     Returns:
         Lista de tuplas (username, minutes, games_count, unique_games) ordenada por tiempo
     """
     user_stats = []
     
-    for user_id, user_data in stats_data.get('users', {}).items():
-        username = user_data.get('username', 'Unknown')
-        games = user_data.get('games', {})
-        
-        total_minutes = sum(g.get('total_minutes', 0) for g in games.values())
-        total_count = sum(g.get('count', 0) for g in games.values())
-        unique_games = len(games)
-        
+    for username, total_minutes, total_count, unique_games, _, _, _, _ in _user_rows(stats_data, model):
         if total_minutes > 0 or total_count > 0:
             user_stats.append((username, total_minutes, total_count, unique_games))
     
@@ -112,29 +156,21 @@ def aggregate_game_time_by_user(stats_data: Dict) -> List[Tuple[str, int, int, i
     return user_stats
 
 
-def aggregate_party_stats(stats_data: Dict) -> Dict:
+def aggregate_party_stats(stats_data: Dict, graph=None) -> Dict:
     """
     Agrega estadísticas desde stats['parties'] (history + stats_by_game).
+    
+    Args:
+        stats_data: Datos completos de stats
+        graph: Grafo de co-juego del mismo historial (core.persistence.get_party_graph());
+            sin él se arma uno en una pasada
     """
     parties_root = stats_data.get('parties') or {}
     history = parties_root.get('history') or []
     stats_by_game = parties_root.get('stats_by_game') or {}
 
-    by_user: Dict[str, int] = {}
-    companion_pairs: Dict[Tuple[str, str], int] = {}
-
-    for entry in history:
-        players = entry.get('players') or []
-        if isinstance(players, str):
-            continue
-        ids = [str(p) for p in players]
-        for uid in ids:
-            by_user[uid] = by_user.get(uid, 0) + 1
-        for i in range(len(ids)):
-            for j in range(i + 1, len(ids)):
-                a, b = sorted((ids[i], ids[j]))
-                key = (a, b)
-                companion_pairs[key] = companion_pairs.get(key, 0) + 1
+    if graph is None:
+        graph = PartyGraph.from_history(history)
 
     largest = 0
     longest_min = 0
@@ -152,32 +188,27 @@ def aggregate_party_stats(stats_data: Dict) -> Dict:
         'total_parties': len(history),
         'by_game': stats_by_game,
         'by_game_sorted': by_game_sorted,
-        'by_user': by_user,
-        'companion_pairs': companion_pairs,
+        'by_user': dict(graph.party_counts()),
+        'companion_pairs': graph.pair_counts(),
         'largest_party': largest,
         'longest_party_minutes': longest_min,
     }
 
 
-def aggregate_message_stats(stats_data: Dict) -> List[Tuple[str, int, int]]:
+def aggregate_message_stats(stats_data: Dict, model=None) -> List[Tuple[str, int, int]]:
     """
     Agrega estadísticas de mensajes por usuario
     
     Args:
         stats_data: Datos completos de stats
+        model: Modelo tipado de los usuarios (solo si stats_data es el histórico completo)
         
     Returns:
         Lista de tuplas (username, count, characters) ordenada por count
     """
     message_stats = []
     
-    for user_id, user_data in stats_data.get('users', {}).items():
-        username = user_data.get('username', 'Unknown')
-        messages = user_data.get('messages', {})
-        
-        count = messages.get('count', 0)
-        characters = messages.get('characters', 0)
-        
+    for username, _, _, _, _, _, count, characters in _user_rows(stats_data, model):
         if count > 0:
             message_stats.append((username, count, characters))
     
@@ -187,7 +218,8 @@ def aggregate_message_stats(stats_data: Dict) -> List[Tuple[str, int, int]]:
     return message_stats
 
 
-def get_top_players_for_game(stats_data: Dict, game_name: str, limit: int = 10) -> List[Tuple[str, int, int]]:
+def get_top_players_for_game(stats_data: Dict, game_name: str, limit: int = 10,
+                             model=None) -> List[Tuple[str, int, int]]:
     """
     Obtiene los mejores jugadores de un juego específico
     
@@ -195,23 +227,16 @@ def get_top_players_for_game(stats_data: Dict, game_name: str, limit: int = 10)
         stats_data: Datos completos de stats
         game_name: Nombre del juego
         limit: Límite de jugadores
+        model: Modelo tipado de los usuarios (solo si stats_data es el histórico completo)
         
     Returns:
         Lista de tuplas (username, minutes, count) ordenada por tiempo
     """
     players = []
     
-    for user_id, user_data in stats_data.get('users', {}).items():
-        username = user_data.get('username', 'Unknown')
-        games = user_data.get('games', {})
-        
-        if game_name in games:
-            game_data = games[game_name]
-            minutes = game_data.get('total_minutes', 0)
-            count = game_data.get('count', 0)
-            
-            if minutes > 0 or count > 0:
-                players.append((username, minutes, count))
+    for username, _, minutes, count, _, _ in _game_rows(stats_data, model, game_name):
+        if minutes > 0 or count > 0:
+            players.append((username, minutes, count))
     
     # Ordenar por tiempo
     players.sort(key=lambda x: x[1], reverse=True)
@@ -274,12 +299,13 @@ def find_common_games(stats_data: Dict, user_id1: str, user_id2: str) -> List[st
     return list(games1 & games2)
 
 
-def calculate_total_server_time(stats_data: Dict) -> Tuple[int, int, int]:
+def calculate_total_server_time(stats_data: Dict, model=None) -> Tuple[int, int, int]:
     """
     Calcula el tiempo total del servidor
     
     Args:
         stats_data: Datos completos de stats
+        model: Modelo tipado de los usuarios (solo si stats_data es el histórico completo)
         
     Returns:
         Tupla (game_minutes, voice_minutes, total_minutes)
@@ -287,27 +313,23 @@ def calculate_total_server_time(stats_data: Dict) -> Tuple[int, int, int]:
     total_game_minutes = 0
     total_voice_minutes = 0
     
-    for user_data in stats_data.get('users', {}).values():
-        # Sumar juegos
-        games = user_data.get('games', {})
-        total_game_minutes += sum(g.get('total_minutes', 0) for g in games.values())
-        
-        # Sumar voz
-        voice = user_data.get('voice', {})
-        total_voice_minutes += voice.get('total_minutes', 0)
+    for _, game_minutes, _, _, voice_minutes, _, _, _ in _user_rows(stats_data, model):
+        total_game_minutes += game_minutes
+        total_voice_minutes += voice_minutes
     
     total_minutes = total_game_minutes + total_voice_minutes
     
     return total_game_minutes, total_voice_minutes, total_minutes
 
 
-def get_game_stats_detailed(stats_data: Dict, game_name: str) -> Dict:
+def get_game_stats_detailed(stats_data: Dict, game_name: str, model=None) -> Dict:
     """
     Obtiene estadísticas detalladas de un juego
     
     Args:
         stats_data: Datos completos de stats
         game_name: Nombre del juego
+        model: Modelo tipado de los usuarios (solo si stats_data es el histórico completo)
         
     Returns:
         Dict con estadísticas detalladas del juego
@@ -333,26 +355,17 @@ def get_game_stats_detailed(stats_data: Dict, game_name: str) -> Dict:
     players = []
     all_dates = []
     
-    for user_data in stats_data.get('users', {}).values():
-        username = user_data.get('username', 'Unknown')
-        games = user_data.get('games', {})
+    for username, _, minutes, count, first_played, last_played in _game_rows(stats_data, model, game_name):
+        result['total_minutes'] += minutes
+        result['total_sessions'] += count
         
-        if game_name in games:
-            game_data = games[game_name]
-            
-            minutes = game_data.get('total_minutes', 0)
-            count = game_data.get('count', 0)
-            
-            result['total_minutes'] += minutes
-            result['total_sessions'] += count
-            
-            players.append((username, minutes, count))
-            
-            # Fechas
-            if game_data.get('first_played'):
-                all_dates.append(game_data['first_played'])
-            if game_data.get('last_played'):
-                all_dates.append(game_data['last_played'])
+        players.append((username, minutes, count))
+        
+        # Fechas
+        if first_played:
+            all_dates.append(first_played)
+        if last_played:
+            all_dates.append(last_played)
     
     # Top players
     players.sort(key=lambda x: x[1], reverse=True)
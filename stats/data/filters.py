@@ -4,74 +4,27 @@ Funciones para filtrar estadísticas por período
 """
 
 from typing import Dict
-from datetime import datetime, timedelta
 
+from core.rollups import filter_stats_by_period
 
-def filter_by_period(stats_data: Dict, period: str = 'all') -> Dict:
+
+def filter_by_period(stats_data: Dict, period: str = 'all', rollups=None) -> Dict:
     """
     Filtra estadísticas por período de tiempo
     
+    Los períodos son de calendario (día, semana ISO, mes y año en curso) y
+    cada juego/voz lleva solo los minutos y sesiones del período.
+    
     Args:
         stats_data: Datos completos de stats
-        period: 'today', 'week', 'month', 'all'
+        period: 'today', 'week', 'month', 'year', 'all'
+        rollups: Rollups en memoria (core.persistence.get_rollups()) para no
+            recorrer los históricos por día
     
     Returns:
         Dict filtrado con solo los datos del período
     """
-    now = datetime.now()
-    
-    if period == 'all':
-        return stats_data
-    
-    # Calcular fecha límite
-    if period == 'today':
-        cutoff = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    elif period == 'week':
-        cutoff = now - timedelta(days=7)
-    elif period == 'month':
-        cutoff = now - timedelta(days=30)
-    elif period == 'year':
-        cutoff = now - timedelta(days=365)
-    else:
-        return stats_data
-    
-    # Filtrar datos
-    filtered = {'users': {}}
-    
-    for user_id, user_data in stats_data.get('users', {}).items():
-        filtered_user = {
-            'username': user_data.get('username', 'Unknown'),
-            'games': {},
-            'voice': {'count': 0, 'total_minutes': 0, 'last_join': None},
-            'messages': user_data.get('messages', {}),  # Mensajes se mantienen
-            'reactions': user_data.get('reactions', {}),  # Reacciones se mantienen
-            'stickers': user_data.get('stickers', {})  # Stickers se mantienen
-        }
-        
-        # Filtrar juegos por last_played
-        for game_name, game_data in user_data.get('games', {}).items():
-            try:
-                last_played = datetime.fromisoformat(game_data.get('last_played', ''))
-                if last_played >= cutoff:
-                    filtered_user['games'][game_name] = game_data
-            except:
-                pass
-        
-        # Filtrar voz por last_join
-        voice = user_data.get('voice', {})
-        if voice.get('last_join'):
-            try:
-                last_join = datetime.fromisoformat(voice['last_join'])
-                if last_join >= cutoff:
-                    filtered_user['voice'] = voice
-            except:
-                pass
-        
-        # Solo agregar si tiene datos en el período
-        if filtered_user['games'] or filtered_user['voice'].get('count', 0) > 0:
-            filtered['users'][user_id] = filtered_user
-    
-    return filtered
+    return filter_stats_by_period(stats_data, period, rollups=rollups)
 
 
 def filter_by_game(stats_data: Dict, game_name: str) -> Dict:
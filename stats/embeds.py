@@ -4,8 +4,9 @@ Funciones para crear todos los embeds de visualización de stats
 """
 
 import discord
-from typing import Dict
-from datetime import datetime
+from typing import Dict, Optional
+from datetime import date, datetime
+from core.rollups import period_range
 from stats_viz import create_bar_chart, create_timeline_chart, calculate_daily_activity, format_time
 
 
@@ -186,34 +187,46 @@ async def create_games_ranking_embed(filtered_stats: Dict, period_label: str) ->
     return embed
 
 
-async def create_voice_ranking_embed(filtered_stats: Dict, period_label: str) -> discord.Embed:
-    """Crea embed con ranking de actividad de voz (ordenado por TIEMPO)"""
+async def create_voice_ranking_embed(filtered_stats: Dict, period_label: str, ranking: Optional[tuple] = None) -> discord.Embed:
+    """
+    Crea embed con ranking de actividad de voz (ordenado por TIEMPO)
+    
+    Args:
+        filtered_stats: Datos de estadísticas filtrados (ignorado si hay ranking)
+        period_label: Etiqueta del período
+        ranking: Top-k precalculado de los leaderboards (rows, members, total, detail_totals)
+    """
     embed = discord.Embed(
         title=f'🎙️ Top Voz',
         description=f'› {period_label}',
         color=discord.Color.dark_purple()
     )
     
-    # Recopilar actividad de voz CON TIEMPO
-    voice_stats = []
-    total_minutes = 0
-    total_sessions = 0
-    for user_data in filtered_stats.get('users', {}).values():
-        username = user_data.get('username', 'Unknown')
-        count = user_data.get('voice', {}).get('count', 0)
-        minutes = user_data.get('voice', {}).get('total_minutes', 0)
-        if count > 0:
-            voice_stats.append((username, minutes, count))  # Ordenar por minutos
-            total_minutes += minutes
-            total_sessions += count
-    
-    if not voice_stats:
+    if ranking is not None:
+        top_voice, active_users, total_minutes, detail_totals = ranking
+        total_sessions = detail_totals[0] if detail_totals else 0
+    else:
+        # Recopilar actividad de voz CON TIEMPO
+        voice_stats = []
+        total_minutes = 0
+        total_sessions = 0
+        for user_data in filtered_stats.get('users', {}).values():
+            username = user_data.get('username', 'Unknown')
+            count = user_data.get('voice', {}).get('count', 0)
+            minutes = user_data.get('voice', {}).get('total_minutes', 0)
+            if count > 0:
+                voice_stats.append((username, minutes, count))  # Ordenar por minutos
+                total_minutes += minutes
+                total_sessions += count
+        
+        # Ordenar por TIEMPO y tomar top 8
+        top_voice = sorted(voice_stats, key=lambda x: x[1], reverse=True)[:8]
+        active_users = len(voice_stats)
+    
+    if not top_voice:
         embed.description = 'No hay actividad de voz registrada en este período.'
         return embed
     
-    # Ordenar por TIEMPO y tomar top 8
-    top_voice = sorted(voice_stats, key=lambda x: x[1], reverse=True)[:8]
-    
     # Crear gráfico ASCII con TIEMPO
     chart_data = [(name, minutes) for name, minutes, _ in top_voice]
     chart = create_bar_chart(chart_data, max_width=15)
@@ -223,7 +236,7 @@ async def create_voice_ranking_embed(filtered_stats: Dict, period_label: str) ->
     embed.add_field(
         name='📊 Total',
         value=(
-            f'**{len(voice_stats)}** usuarios activos\n'
+            f'**{active_users}** usuarios activos\n'
             f'**{total_sessions}** sesiones\n'
             f'⏱️ **{format_time(total_minutes)}** en voz'
         ),
@@ -233,38 +246,48 @@ async def create_voice_ranking_embed(filtered_stats: Dict, period_label: str) ->
     return embed
 
 
-async def create_users_ranking_embed(filtered_stats: Dict, period_label: str) -> discord.Embed:
-    """Crea embed con ranking de usuarios (ordenado por TIEMPO TOTAL)"""
+async def create_users_ranking_embed(filtered_stats: Dict, period_label: str, ranking: Optional[tuple] = None) -> discord.Embed:
+    """
+    Crea embed con ranking de usuarios (ordenado por TIEMPO TOTAL)
+    
+    Args:
+        filtered_stats: Datos de estadísticas filtrados (ignorado si hay ranking)
+        period_label: Etiqueta del período
+        ranking: Top-k precalculado de los leaderboards (rows, members, total, detail_totals)
+    """
     embed = discord.Embed(
         title=f'👥 Top Usuarios',
         description=f'› {period_label}',
         color=discord.Color.dark_green()
     )
     
-    # Calcular actividad total por usuario CON TIEMPO Y MENSAJES
-    user_activity = []
-    for user_data in filtered_stats.get('users', {}).values():
-        username = user_data.get('username', 'Unknown')
-        games_count = sum(g['count'] for g in user_data.get('games', {}).values())
-        voice_count = user_data.get('voice', {}).get('count', 0)
-        messages_count = user_data.get('messages', {}).get('count', 0)
-        
-        # Tiempo total = juegos + voz
-        game_minutes = sum(g.get('total_minutes', 0) for g in user_data.get('games', {}).values())
-        voice_minutes = user_data.get('voice', {}).get('total_minutes', 0)
-        total_minutes = game_minutes + voice_minutes
-        total_sessions = games_count + voice_count
+    if ranking is not None:
+        top_users = ranking[0]
+    else:
+        # Calcular actividad total por usuario CON TIEMPO Y MENSAJES
+        user_activity = []
+        for user_data in filtered_stats.get('users', {}).values():
+            username = user_data.get('username', 'Unknown')
+            games_count = sum(g['count'] for g in user_data.get('games', {}).values())
+            voice_count = user_data.get('voice', {}).get('count', 0)
+            messages_count = user_data.get('messages', {}).get('count', 0)
+            
+            # Tiempo total = juegos + voz
+            game_minutes = sum(g.get('total_minutes', 0) for g in user_data.get('games', {}).values())
+            voice_minutes = user_data.get('voice', {}).get('total_minutes', 0)
+            total_minutes = game_minutes + voice_minutes
+            total_sessions = games_count + voice_count
+            
+            if total_sessions > 0 or messages_count > 0:
+                user_activity.append((username, total_minutes, total_sessions, games_count, voice_count, messages_count))
         
-        if total_sessions > 0 or messages_count > 0:
-            user_activity.append((username, total_minutes, total_sessions, games_count, voice_count, messages_count))
+        # Ordenar por TIEMPO TOTAL
+        top_users = sorted(user_activity, key=lambda x: x[1], reverse=True)[:8]
     
-    if not user_activity:
+    if not top_users:
         embed.description = 'No hay actividad registrada en este período.'
         return embed
     
-    # Ordenar por TIEMPO TOTAL
-    top_users = sorted(user_activity, key=lambda x: x[1], reverse=True)[:8]
-    
     # Crear gráfico ASCII con TIEMPO
     chart_data = [(name, minutes) for name, minutes, _, _, _, _ in top_users]
     chart = create_bar_chart(chart_data, max_width=15)
@@ -287,37 +310,49 @@ async def create_users_ranking_embed(filtered_stats: Dict, period_label: str) ->
     return embed
 
 
-async def create_messages_ranking_embed(filtered_stats: Dict, period_label: str) -> discord.Embed:
-    """Crea embed con ranking de mensajes"""
+async def create_messages_ranking_embed(filtered_stats: Dict, period_label: str, ranking: Optional[tuple] = None) -> discord.Embed:
+    """
+    Crea embed con ranking de mensajes
+    
+    Args:
+        filtered_stats: Datos de estadísticas filtrados (ignorado si hay ranking)
+        period_label: Etiqueta del período
+        ranking: Top-k precalculado de los leaderboards (rows, members, total, detail_totals)
+    """
     embed = discord.Embed(
         title=f'💬 Top Mensajes',
         description=f'› {period_label}',
         color=discord.Color.dark_teal()
     )
     
-    # Recopilar mensajes por usuario
-    message_stats = []
-    total_messages = 0
-    total_chars = 0
-    
-    for user_data in filtered_stats.get('users', {}).values():
-        username = user_data.get('username', 'Unknown')
-        messages_data = user_data.get('messages', {})
-        msg_count = messages_data.get('count', 0)
-        msg_chars = messages_data.get('characters', 0)
+    if ranking is not None:
+        top_messages, active_users, total_messages, detail_totals = ranking
+        total_chars = detail_totals[0] if detail_totals else 0
+    else:
+        # Recopilar mensajes por usuario
+        message_stats = []
+        total_messages = 0
+        total_chars = 0
+        
+        for user_data in filtered_stats.get('users', {}).values():
+            username = user_data.get('username', 'Unknown')
+            messages_data = user_data.get('messages', {})
+            msg_count = messages_data.get('count', 0)
+            msg_chars = messages_data.get('characters', 0)
+            
+            if msg_count > 0:
+                message_stats.append((username, msg_count, msg_chars))
+                total_messages += msg_count
+                total_chars += msg_chars
         
-        if msg_count > 0:
-            message_stats.append((username, msg_count, msg_chars))
-            total_messages += msg_count
-            total_chars += msg_chars
+        # Ordenar por cantidad de mensajes
+        top_messages = sorted(message_stats, key=lambda x: x[1], reverse=True)[:8]
+        active_users = len(message_stats)
     
-    if not message_stats:
+    if not top_messages:
         embed.description = 'No hay mensajes registrados en este período.'
         return embed
     
-    # Ordenar por cantidad de mensajes
-    top_messages = sorted(message_stats, key=lambda x: x[1], reverse=True)[:8]
-    
     # Crear gráfico ASCII
     chart_data = [(name, count) for name, count, _ in top_messages]
     chart = create_bar_chart(chart_data, max_width=15)
@@ -342,7 +377,7 @@ async def create_messages_ranking_embed(filtered_stats: Dict, period_label: str)
     embed.add_field(
         name='📊 Total',
         value=(
-            f'**{len(message_stats)}** usuarios activos\n'
+            f'**{active_users}** usuarios activos\n'
             f'**{total_messages:,}** mensajes\n'
             f'**{estimated_total_words:,}** palabras aprox.'
         ),
@@ -386,6 +421,36 @@ async def create_timeline_embed(stats_data: Dict, period_label: str) -> discord.
     return embed
 
 
+def _connection_rows(filtered_stats: Dict, timeframe: str):
+    """
+    Filas (username, conexiones en el período, récord personal, fecha del récord).
+
+    Suma by_date del dict del snapshot: convertir cada usuario al modelo
+    tipado para usar sus arrays cuesta mucho más que esta pasada.
+    """
+    period_bounds = period_range(timeframe)
+
+    for user_data in filtered_stats.get('users', {}).values():
+        username = user_data.get('username', 'Unknown')
+        connections_data = user_data.get('daily_connections', {})
+        
+        if not isinstance(connections_data, dict):
+            continue
+        
+        by_date = connections_data.get('by_date', {})
+        total = connections_data.get('total', 0)
+        personal_record = connections_data.get('personal_record', {})
+        
+        # Calcular según timeframe (día / semana / mes de calendario)
+        if period_bounds is not None:
+            start, end = period_bounds
+            count = sum(c for day, c in by_date.items() if start <= day <= end)
+        else:  # 'all'
+            count = total
+        
+        yield username, count, personal_record.get('count', 0), personal_record.get('date', 'N/A')
+
+
 async def create_connections_ranking_embed(filtered_stats: Dict, period_label: str, timeframe: str = 'today') -> discord.Embed:
     """
     Crea embed con ranking de conexiones diarias
@@ -405,46 +470,10 @@ async def create_connections_ranking_embed(filtered_stats: Dict, period_label: s
     connection_stats = []
     total_connections = 0
     
-    today = datetime.now().strftime('%Y-%m-%d')
-    
-    for user_data in filtered_stats.get('users', {}).values():
-        username = user_data.get('username', 'Unknown')
-        connections_data = user_data.get('daily_connections', {})
-        
-        if not isinstance(connections_data, dict):
-            continue
-        
-        by_date = connections_data.get('by_date', {})
-        total = connections_data.get('total', 0)
-        personal_record = connections_data.get('personal_record', {})
-        
-        # Calcular según timeframe
-        if timeframe == 'today':
-            count = by_date.get(today, 0)
-        elif timeframe == 'week':
-            # Últimos 7 días
-            count = 0
-            for i in range(7):
-                from datetime import timedelta
-                date = (datetime.now() - timedelta(days=i)).strftime('%Y-%m-%d')
-                count += by_date.get(date, 0)
-        elif timeframe == 'month':
-            count = 0
-            for i in range(30):
-                from datetime import timedelta
-                date = (datetime.now() - timedelta(days=i)).strftime('%Y-%m-%d')
-                count += by_date.get(date, 0)
-        else:  # 'all'
-            count = total
-        
-        if count > 0:
-            connection_stats.append((
-                username, 
-                count, 
-                personal_record.get('count', 0),
-                personal_record.get('date', 'N/A')
-            ))
-            total_connections += count
+    for row in _connection_rows(filtered_stats, timeframe):
+        if row[1] > 0:
+            connection_stats.append(row)
+            total_connections += row[1]
     
     if not connection_stats:
         embed.description = 'No hay conexiones registradas en este período.'
@@ -482,8 +511,8 @@ async def create_connections_ranking_embed(filtered_stats: Dict, period_label: s
     # Total
     timeframe_labels = {
         'today': 'Hoy',
-        'week': 'Esta semana',
-        'month': 'Últimos 30 días',
+        'week': 'esta semana',
+        'month': 'este mes',
         'all': 'Total histórico'
     }
     
@@ -4,7 +4,7 @@ Views, Selects y Buttons para la interfaz interactiva de Discord
 """
 
 import discord
-from core.persistence import stats
+from core.persistence import get_leaderboards, get_rollups, get_stats_snapshot
 from stats_viz import filter_by_period, get_period_label
 from stats.embeds import (
     create_overview_embed,
@@ -90,10 +90,31 @@ class StatsSelect(discord.ui.Select):
     async def callback(self, interaction: discord.Interaction):
         view_type = self.values[0]
         
-        # Filtrar datos por período
-        filtered_stats = filter_by_period(stats, self.period)
         period_label = get_period_label(self.period)
         
+        # Rankings: top-k desde los leaderboards mantenidos en memoria
+        if view_type == 'voice':
+            ranking = get_leaderboards().ranking('voice_time', self.period, 8)
+            embed = await create_voice_ranking_embed(None, period_label, ranking=ranking)
+            await interaction.response.edit_message(embed=embed, view=self.view)
+            return
+        
+        if view_type == 'users':
+            ranking = get_leaderboards().ranking('activity', self.period, 8)
+            embed = await create_users_ranking_embed(None, period_label, ranking=ranking)
+            await interaction.response.edit_message(embed=embed, view=self.view)
+            return
+        
+        if view_type == 'messages' and self.period == 'all':
+            ranking = get_leaderboards().ranking('messages', 'all', 8)
+            embed = await create_messages_ranking_embed(None, period_label, ranking=ranking)
+            await interaction.response.edit_message(embed=embed, view=self.view)
+            return
+        
+        # Filtrar datos por período (snapshot en memoria)
+        stats = get_stats_snapshot()
+        filtered_stats = filter_by_period(stats, self.period, rollups=get_rollups())
+        
         if view_type == 'overview':
             embed = await create_overview_embed(filtered_stats, period_label)
             await interaction.response.edit_message(embed=embed, view=self.view)
@@ -102,18 +123,10 @@ class StatsSelect(discord.ui.Select):
             embed = await create_games_ranking_embed(filtered_stats, period_label)
             await interaction.response.edit_message(embed=embed, view=self.view)
         
-        elif view_type == 'voice':
-            embed = await create_voice_ranking_embed(filtered_stats, period_label)
-            await interaction.response.edit_message(embed=embed, view=self.view)
-        
         elif view_type == 'messages':
             embed = await create_messages_ranking_embed(filtered_stats, period_label)
             await interaction.response.edit_message(embed=embed, view=self.view)
         
-        elif view_type == 'users':
-            embed = await create_users_ranking_embed(filtered_stats, period_label)
-            await interaction.response.edit_message(embed=embed, view=self.view)
-        
         elif view_type == 'timeline':
             embed = await create_timeline_embed(stats, period_label)
             await interaction.response.edit_message(embed=embed, view=self.view)
@@ -125,8 +138,8 @@ class PeriodSelect(discord.ui.Select):
     def __init__(self):
         options = [
             discord.SelectOption(label='Hoy', emoji='📅', value='today'),
-            discord.SelectOption(label='Última Semana', emoji='📆', value='week'),
-            discord.SelectOption(label='Último Mes', emoji='🗓️', value='month'),
+            discord.SelectOption(label='Esta Semana', emoji='📆', value='week'),
+            discord.SelectOption(label='Este Mes', emoji='🗓️', value='month'),
             discord.SelectOption(label='Histórico', emoji='📚', value='all'),
         ]
         
@@ -149,7 +162,7 @@ class PeriodSelect(discord.ui.Select):
         new_view.message = self.view.message
         
         # Mostrar vista general con el nuevo período
-        filtered_stats = filter_by_period(stats, period)
+        filtered_stats = filter_by_period(get_stats_snapshot(), period, rollups=get_rollups())
         period_label = get_period_label(period)
         embed = await create_overview_embed(filtered_stats, period_label)
         
@@ -294,9 +294,9 @@ def get_period_label(period: str) -> str:
     """
     labels = {
         'today': 'Hoy',
-        'week': 'Última Semana',
-        'month': 'Último Mes',
-        'year': 'Último Año',
+        'week': 'Esta Semana',
+        'month': 'Este Mes',
+        'year': 'Este Año',
         'all': 'Histórico'
     }
     return labels.get(period, period.title())
@@ -6,6 +6,8 @@ Genera gráficos ASCII y resúmenes para el bot de Discord
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional
 
+from core.rollups import filter_stats_by_period
+
 # Import discord solo si está disponible (para tests)
 try:
     import discord
@@ -227,74 +229,28 @@ def create_user_detail_view(user_data: Dict, username: str):
     return embed
 
 
-def filter_by_period(stats_data: Dict, period: str = 'all') -> Dict:
+def filter_by_period(stats_data: Dict, period: str = 'all', rollups=None) -> Dict:
     """
     Filtra estadísticas por período de tiempo
     
     Args:
         stats_data: Datos completos de stats
-        period: 'today', 'week', 'month', 'all'
+        period: 'today', 'week', 'month', 'year', 'all'
+        rollups: Rollups en memoria (opcional)
     
     Returns:
         Dict filtrado con solo los datos del período
     """
-    now = datetime.now()
-    
-    if period == 'all':
-        return stats_data
-    
-    # Calcular fecha límite
-    if period == 'today':
-        cutoff = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    elif period == 'week':
-        cutoff = now - timedelta(days=7)
-    elif period == 'month':
-        cutoff = now - timedelta(days=30)
-    else:
-        return stats_data
-    
-    # Filtrar datos
-    filtered = {'users': {}}
-    
-    for user_id, user_data in stats_data.get('users', {}).items():
-        filtered_user = {
-            'username': user_data.get('username', 'Unknown'),
-            'games': {},
-            'voice': {'count': 0, 'last_join': None}
-        }
-        
-        # Filtrar juegos
-        for game_name, game_data in user_data.get('games', {}).items():
-            try:
-                last_played = datetime.fromisoformat(game_data.get('last_played', ''))
-                if last_played >= cutoff:
-                    filtered_user['games'][game_name] = game_data
-            except:
-                pass
-        
-        # Filtrar voz
-        voice = user_data.get('voice', {})
-        if voice.get('last_join'):
-            try:
-                last_join = datetime.fromisoformat(voice['last_join'])
-                if last_join >= cutoff:
-                    filtered_user['voice'] = voice
-            except:
-                pass
-        
-        # Solo agregar si tiene datos en el período
-        if filtered_user['games'] or filtered_user['voice'].get('count', 0) > 0:
-            filtered['users'][user_id] = filtered_user
-    
-    return filtered
+    return filter_stats_by_period(stats_data, period, rollups=rollups, keep_social=False)
 
 
 def get_period_label(period: str) -> str:
     """Retorna el label legible para un período"""
     labels = {
         'today': 'Hoy',
-        'week': 'Última Semana',
-        'month': 'Último Mes',
+        'week': 'Esta Semana',
+        'month': 'Este Mes',
+        'year': 'Este Año',
         'all': 'Histórico'
     }
     return labels.get(period, period)
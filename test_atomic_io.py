@@ -0,0 +1,119 @@
+"""
+Tests de escritura atómica y backups rotativos (core/atomic_io.py)
+"""
+
+import json
+import os
+import stat
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import core.persistence as persistence
+from core.atomic_io import _DEFAULT_MODE, backup_path, load_json_with_fallback, write_json_atomic
+from core.stats_repository import JsonStatsRepository
+
+
+class TestAtomicWrite(unittest.TestCase):
+    """Tests del writer atómico"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmpdir.name) / 'stats.json'
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_escribe_y_no_deja_temporales(self):
+        write_json_atomic(self.path, {'a': 1})
+        self.assertEqual(json.loads(self.path.read_text(encoding='utf-8')), {'a': 1})
+        self.assertEqual([p.name for p in Path(self.tmpdir.name).iterdir()], ['stats.json'])
+
+    @unittest.skipIf(os.name == 'nt', 'permisos POSIX')
+    def test_conserva_permisos(self):
+        """El reemplazo no deja el 0600 del temporal de mkstemp"""
+        def mode(p):
+            return stat.S_IMODE(p.stat().st_mode)
+
+        write_json_atomic(self.path, {'a': 1})
+        self.assertEqual(mode(self.path), _DEFAULT_MODE)
+
+        os.chmod(self.path, 0o640)
+        write_json_atomic(self.path, {'a': 2}, backup_generations=1)
+        self.assertEqual(mode(self.path), 0o640)
+
+    def test_rotacion_de_generaciones(self):
+        """Cada escritura desplaza las versiones anteriores: .1 es la más reciente"""
+        for i in range(5):
+            write_json_atomic(self.path, {'version': i}, backup_generations=3)
+
+        def read(p):
+            return json.loads(p.read_text(encoding='utf-8'))['version']
+
+        self.assertEqual(read(self.path), 4)
+        self.assertEqual(read(backup_path(self.path, 1)), 3)
+        self.assertEqual(read(backup_path(self.path, 2)), 2)
+        self.assertEqual(read(backup_path(self.path, 3)), 1)
+        self.assertFalse(backup_path(self.path, 4).exists())
+
+    def test_error_serializando_no_toca_el_archivo(self):
+        """Si la escritura falla, el archivo anterior queda intacto"""
+        write_json_atomic(self.path, {'ok': True})
+        with self.assertRaises(TypeError):
+            write_json_atomic(self.path, {'bad': object()}, backup_generations=2)
+        self.assertEqual(json.loads(self.path.read_text(encoding='utf-8')), {'ok': True})
+
+    def test_fallback_a_backup_valido(self):
+        """Con el principal truncado se usa la generación válida más reciente"""
+        write_json_atomic(self.path, {'version': 1}, backup_generations=2)
+        write_json_atomic(self.path, {'version': 2}, backup_generations=2)
+        self.path.write_text('{"version": 3, "users": {', encoding='utf-8')
+
+        data, used = load_json_with_fallback(self.path, 2)
+        self.assertEqual(data, {'version': 1})
+        self.assertEqual(used, backup_path(self.path, 1))
+
+    def test_sin_archivos(self):
+        self.assertEqual(load_json_with_fallback(self.path, 3), (None, None))
+
+    def test_todo_corrupto(self):
+        self.path.write_text('{', encoding='utf-8')
+        with self.assertRaises(ValueError):
+            load_json_with_fallback(self.path, 3)
+
+
+class TestLoadStatsRecovery(unittest.TestCase):
+    """Tests de load_stats ante archivos corruptos"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.stats_file = Path(self.tmpdir.name) / 'stats.json'
+        self.patcher = patch.object(persistence, '_repository', JsonStatsRepository(self.stats_file))
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.tmpdir.cleanup()
+
+    def test_recupera_desde_backup(self):
+        write_json_atomic(self.stats_file, {'users': {'1': {}}, 'cooldowns': {}}, backup_generations=3)
+        write_json_atomic(self.stats_file, {'users': {}, 'cooldowns': {}}, backup_generations=3)
+        self.stats_file.write_text('', encoding='utf-8')
+
+        data = persistence.load_stats()
+        self.assertIn('1', data['users'])
+
+    def test_corrupto_sin_backups_arranca_vacio(self):
+        """Sin backups válidos no crashea: aparta el archivo y arranca vacío"""
+        self.stats_file.write_text('{"users": ', encoding='utf-8')
+
+        data = persistence.load_stats()
+        self.assertEqual(data, {'users': {}, 'cooldowns': {}})
+        self.assertFalse(self.stats_file.exists())
+        corrupt = list(Path(self.tmpdir.name).glob('stats.json.corrupt-*'))
+        self.assertEqual(len(corrupt), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+"""
+Tests del harness de benchmarks (benchmarks/)
+"""
+
+import asyncio
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.dataset import generate_stats
+from benchmarks.harness import compare_reports, percentile, summarize_ms
+
+
+class TestDataset(unittest.TestCase):
+
+    def test_forma_y_determinismo(self):
+        end = datetime(2025, 6, 30)
+        data = generate_stats(10, days=60, party_history=20, seed=7, end=end)
+        again = generate_stats(10, days=60, party_history=20, seed=7, end=end)
+        self.assertEqual(data, again)
+
+        self.assertEqual(len(data['users']), 10)
+        user = next(iter(data['users'].values()))
+        for game in user['games'].values():
+            self.assertEqual(game['total_minutes'], sum(game['daily_minutes'].values()))
+            self.assertTrue(all(day <= '2025-06-30' for day in game['daily_minutes']))
+        self.assertEqual(user['reactions']['total'], sum(user['reactions']['by_emoji'].values()))
+
+        history = data['parties']['history']
+        self.assertEqual(len(history), 20)
+        self.assertEqual(history, sorted(history, key=lambda p: p['start'], reverse=True))
+        self.assertEqual(sum(g['total_parties'] for g in data['parties']['stats_by_game'].values()), 20)
+
+
+class TestHarness(unittest.TestCase):
+
+    def test_percentiles(self):
+        self.assertEqual(percentile([1, 2, 3, 4, 5], 50), 3)
+        self.assertAlmostEqual(percentile([0, 10], 95), 9.5)
+        summary = summarize_ms([0.001, 0.002, 0.003])
+        self.assertEqual(summary['median_ms'], 2.0)
+        self.assertEqual(summary['max_ms'], 3.0)
+
+    def test_compare_marca_regresiones(self):
+        baseline = {'results': [{'name': 'a', 'users': 10, 'median_ms': 10.0},
+                                {'name': 'b', 'users': 10, 'median_ms': 10.0}]}
+        current = {'results': [{'name': 'a', 'users': 10, 'median_ms': 11.0},
+                               {'name': 'b', 'users': 10, 'median_ms': 25.0},
+                               {'name': 'c', 'users': 10, 'median_ms': 1.0}]}
+        rows = {row['name']: row for row in compare_reports(baseline, current, threshold=1.2)}
+        self.assertEqual(set(rows), {'a', 'b'})
+        self.assertFalse(rows['a']['regression'])
+        self.assertTrue(rows['b']['regression'])
+
+
+class TestStatsPipeline(unittest.TestCase):
+
+    def test_corrida_chica_no_toca_stats_reales(self):
+        from benchmarks import stats_pipeline
+        from core import persistence
+
+        live_stats = persistence.stats
+        live_repository = persistence._repository
+        with tempfile.TemporaryDirectory() as tmp:
+            output = Path(tmp) / 'out.json'
+            code = stats_pipeline.main(['--users', '15', '--days', '20', '--party-history', '10',
+                                        '--repeat', '1', '--output', str(output)])
+            self.assertEqual(code, 0)
+            report = stats_pipeline.load_report(output)
+
+        self.assertIs(persistence.stats, live_stats)
+        self.assertIs(persistence._repository, live_repository)
+        names = {r['name'] for r in report['results']}
+        self.assertTrue({'aggregate_game_stats', 'save_stats', 'load_stats', 'create_overview_embed'} <= names)
+        self.assertTrue(all(r['users'] == 15 for r in report['results']))
+
+
+class TestGatewayLoad(unittest.TestCase):
+
+    def test_simulacion_corta(self):
+        from benchmarks.gateway_load import GatewaySimulator
+        from core import persistence
+
+        users_before = dict(persistence.stats.get('users', {}))
+        simulator = GatewaySimulator(members=60, presence_rate=200, voice_rate=20, message_rate=40,
+                                     duration=0.5, seed=3)
+        summary = asyncio.run(simulator.run())
+
+        self.assertEqual(set(summary['handlers']), {'presence', 'voice', 'message'})
+        for handler in summary['handlers'].values():
+            self.assertGreater(handler['events'], 0)
+            self.assertEqual(handler['errors'], 0)
+        self.assertGreater(summary['disk']['journal_appends'], 0)
+        self.assertGreaterEqual(summary['loop_lag']['samples'], 1)
+        # Las stats del proceso vuelven a su estado original
+        self.assertEqual(persistence.stats.get('users', {}), users_before)
+
+
+if __name__ == '__main__':
+    unittest.main()
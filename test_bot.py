@@ -227,8 +227,8 @@ class TestPeriodFiltering(unittest.TestCase):
     def test_get_period_label(self):
         """Test labels de períodos"""
         self.assertEqual(get_period_label('today'), 'Hoy')
-        self.assertEqual(get_period_label('week'), 'Última Semana')
-        self.assertEqual(get_period_label('month'), 'Último Mes')
+        self.assertEqual(get_period_label('week'), 'Esta Semana')
+        self.assertEqual(get_period_label('month'), 'Este Mes')
         self.assertEqual(get_period_label('all'), 'Histórico')
 
 
@@ -1105,9 +1105,8 @@ class TestConnectionTracking(unittest.TestCase):
         self.assertFalse(check_cooldown(user_id, event_key, cooldown_seconds=5))
         
         # Limpiar cooldown
-        cooldown_key = f"{user_id}:{event_key}"
-        if cooldown_key in self.stats['cooldowns']:
-            del self.stats['cooldowns'][cooldown_key]
+        from core.cooldown import get_cooldown_store
+        get_cooldown_store().clear()
     
     def test_connections_milestone_notifications(self):
         """Verifica que las notificaciones de milestone están implementadas"""
@@ -1188,10 +1187,11 @@ class TestVoiceMessageTracking(unittest.TestCase):
             # Crear instancia del cog
             cog = EventsCog(mock_bot)
             
-            # Verificar que tiene el voice_manager
-            self.assertIsInstance(cog.voice_manager, VoiceSessionManager,
+            # Verificar que tiene un voice_manager por servidor
+            voice_manager = cog.voice_managers.get(1234)
+            self.assertIsInstance(voice_manager, VoiceSessionManager,
                                 "EventsCog debe tener voice_manager de tipo VoiceSessionManager")
-            self.assertEqual(len(cog.voice_manager.active_sessions), 0,
+            self.assertEqual(len(voice_manager.active_sessions), 0,
                            "active_sessions debe estar vacío al inicio")
             
         except ImportError as e:
@@ -1223,15 +1223,15 @@ class TestVoiceMessageTracking(unittest.TestCase):
         self.assertIn("voice_manager.handle_end", source,
                      "Debe delegar salida al voice_manager")
         
-        # Verificar que voice_session.py usa tasks en background
+        # Verificar que voice_session.py programa la verificación en background
         voice_session_file = Path(__file__).parent / 'core' / 'voice_session.py'
         if voice_session_file.exists():
             with open(voice_session_file, 'r', encoding='utf-8') as f:
                 voice_source = f.read()
             
-            # Verificar que usa asyncio.create_task (no bloquea)
-            self.assertIn("asyncio.create_task", voice_source,
-                         "Debe usar tasks en background para verificación")
+            # Verificar que usa timers del scheduler (no bloquea)
+            self.assertIn("_start_verification", voice_source,
+                         "Debe programar la verificación en background")
             
             # Verificar que guarda guild_id en la sesión
             self.assertIn("guild_id", voice_source,
@@ -1243,13 +1243,13 @@ class TestVoiceLeaveNotificationLogic(unittest.TestCase):
     
     def setUp(self):
         """Setup para cada test"""
-        from core.persistence import stats
-        self.stats = stats
-        self.stats_backup = stats['cooldowns'].copy()
+        from core.cooldown import get_cooldown_store
+        self.store = get_cooldown_store()
+        self.store.clear()
     
     def tearDown(self):
         """Cleanup después de cada test"""
-        self.stats['cooldowns'] = self.stats_backup.copy()
+        self.store.clear()
     
     def test_is_cooldown_passed_exists(self):
         """Verifica que existe la función is_cooldown_passed"""
@@ -1263,11 +1263,6 @@ class TestVoiceLeaveNotificationLogic(unittest.TestCase):
         user_id = 'test_user_no_cooldown'
         event_key = 'test_event'
         
-        # Limpiar cooldown si existe
-        cooldown_key = f"{user_id}:{event_key}"
-        if cooldown_key in self.stats['cooldowns']:
-            del self.stats['cooldowns'][cooldown_key]
-        
         # Debe retornar True (no hay cooldown)
         self.assertTrue(is_cooldown_passed(user_id, event_key, cooldown_seconds=600))
     
@@ -1281,7 +1276,7 @@ class TestVoiceLeaveNotificationLogic(unittest.TestCase):
         cooldown_key = f"{user_id}:{event_key}"
         
         # Establecer cooldown reciente (hace 5 minutos, cooldown de 10 min)
-        self.stats['cooldowns'][cooldown_key] = (datetime.now() - timedelta(minutes=5)).isoformat()
+        self.store.record(cooldown_key, 600, at=self.store.now() - 5 * 60)
         
         # Debe retornar False (cooldown activo)
         self.assertFalse(is_cooldown_passed(user_id, event_key, cooldown_seconds=600))
@@ -1296,7 +1291,7 @@ class TestVoiceLeaveNotificationLogic(unittest.TestCase):
         cooldown_key = f"{user_id}:{event_key}"
         
         # Establecer cooldown antiguo (hace 15 minutos, cooldown de 10 min)
-        self.stats['cooldowns'][cooldown_key] = (datetime.now() - timedelta(minutes=15)).isoformat()
+        self.store.record(cooldown_key, 600, at=self.store.now() - 15 * 60)
         
         # Debe retornar True (cooldown expirado)
         self.assertTrue(is_cooldown_passed(user_id, event_key, cooldown_seconds=600))
@@ -1311,20 +1306,18 @@ class TestVoiceLeaveNotificationLogic(unittest.TestCase):
         cooldown_key = f"{user_id}:{event_key}"
         
         # Establecer cooldown antiguo
-        old_time = (datetime.now() - timedelta(minutes=15)).isoformat()
-        self.stats['cooldowns'][cooldown_key] = old_time
+        self.store.record(cooldown_key, 3600, at=self.store.now() - 15 * 60)
         
         # Llamar is_cooldown_passed (no debe actualizar)
         result = is_cooldown_passed(user_id, event_key, cooldown_seconds=600)
         self.assertTrue(result)
         
         # Verificar que el cooldown NO cambió
-        self.assertEqual(self.stats['cooldowns'][cooldown_key], old_time)
+        self.assertGreaterEqual(self.store.seconds_since(cooldown_key), 15 * 60)
         
         # Comparar con check_cooldown que SÍ actualiza
         check_cooldown(user_id, event_key, cooldown_seconds=600)
-        new_time = self.stats['cooldowns'][cooldown_key]
-        self.assertNotEqual(new_time, old_time)
+        self.assertLess(self.store.seconds_since(cooldown_key), 60)
     
     def test_voice_leave_logic_with_entry_notification(self):
         """Verifica lógica de salida cuando hubo notificación de entrada (SIMPLIFICADO)"""
@@ -1531,7 +1524,7 @@ class TestPartyDetection(unittest.TestCase):
         # Verificar integración con PartySessionManager (nuevo sistema)
         self.assertIn('PartySessionManager', source)
         self.assertIn('party_manager', source)
-        self.assertIn('get_active_players_by_game', source)
+        self.assertIn('presence.update_member', source)
     
     def test_get_active_parties(self):
         """Verifica que active_sessions es un dict vacío inicialmente"""
@@ -0,0 +1,103 @@
+"""
+Tests del store de cooldowns en memoria (core/cooldown.py)
+"""
+
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import patch
+
+import core.cooldown as cooldown
+from core.cooldown import CooldownStore
+
+
+class _Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestCooldownStore(unittest.TestCase):
+    """Chequeo, vencimiento y persistencia diferida"""
+
+    def setUp(self):
+        self.clock = _Clock()
+        self.wall = _Clock(1_700_000_000.0)
+        self.store = CooldownStore(clock=self.clock, wall_clock=self.wall)
+
+    def test_check_consume_el_cooldown(self):
+        self.assertTrue(self.store.check('1:voice', 600))
+        self.assertFalse(self.store.check('1:voice', 600))
+        self.clock.now += 601
+        self.assertTrue(self.store.passed('1:voice', 600))
+        self.assertTrue(self.store.check('1:voice', 600))
+
+    def test_rechazo_no_actualiza(self):
+        self.store.check('1:voice', 600)
+        self.clock.now += 300
+        self.assertFalse(self.store.check('1:voice', 600))
+        self.assertEqual(self.store.seconds_since('1:voice'), 300)
+
+    def test_vencimiento_usa_el_mayor_cooldown(self):
+        """La misma clave se consulta con distintas duraciones (ej. game: 30 min y 60 min)"""
+        self.store.check('1:game:CS2', 3600)
+        self.store.check('2:voice', 600)
+        self.clock.now += 1800
+        self.assertEqual(self.store.evict_expired(), 1)
+        self.assertEqual(len(self.store), 1)
+        self.assertFalse(self.store.passed('1:game:CS2', 3600))
+        self.clock.now += 1801
+        self.assertEqual(self.store.evict_expired(), 1)
+        self.assertEqual(len(self.store), 0)
+
+    def test_persistencia_entre_reinicios(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'cooldowns.json'
+            store = CooldownStore(path, clock=self.clock, wall_clock=self.wall)
+            store.check('1:voice', 600)
+            store.check('2:voice', 60)
+            self.assertTrue(store.flush())
+            self.assertFalse(store.flush())  # sin cambios
+
+            # Reinicio: otro reloj monotónico, 120s de pared después
+            clock = _Clock(5.0)
+            self.wall.now += 120
+            restored = CooldownStore(path, clock=clock, wall_clock=self.wall)
+            self.assertEqual(restored.load(), 1)
+            self.assertEqual(restored.seconds_since('1:voice'), 120)
+            self.assertFalse(restored.passed('1:voice', 600))
+
+    def test_migracion_desde_stats(self):
+        now = datetime.now()
+        imported = self.store.import_legacy({
+            '1:voice': (now - timedelta(minutes=5)).isoformat(),
+            '2:voice': (now - timedelta(days=3)).isoformat(),
+            '3:voice': 'no-es-fecha',
+        })
+        self.assertEqual(imported, 1)
+        self.assertFalse(self.store.passed('1:voice', 600))
+        self.assertTrue(self.store.passed('2:voice', 600))
+
+    def test_migracion_explicita_al_arrancar(self):
+        """Importar el módulo no migra: lo hace migrate_legacy_cooldowns() en el arranque"""
+        live = {'users': {}, 'cooldowns': {'1:voice': datetime.now().isoformat()}}
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'cooldowns.json'
+            with patch.object(cooldown, 'stats', live), patch.object(cooldown, 'COOLDOWNS_FILE', path), \
+                    patch.object(cooldown, '_store', None), patch.object(cooldown, 'save_stats') as save_stats:
+                self.assertEqual(cooldown.migrate_legacy_cooldowns(), 1)
+                self.assertEqual(live['cooldowns'], {})
+                save_stats.assert_called_once()
+                self.assertTrue(path.exists())
+                self.assertFalse(cooldown.check_cooldown('1', 'voice'))
+
+                # Ya migrado: no vuelve a guardar
+                self.assertEqual(cooldown.migrate_legacy_cooldowns(), 0)
+                save_stats.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
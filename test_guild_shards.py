@@ -0,0 +1,124 @@
+"""
+Tests de los managers particionados por servidor (core/guild_shards.py)
+"""
+
+import asyncio
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+import core.party_session as party_session
+from core.game_session import GameSessionManager
+from core.guild_shards import GuildShards
+from core.party_graph import StatsPartyGraph
+from core.party_history import PartyHistoryStore
+from core.party_session import PartySession, PartySessionManager
+from core.rollups import period_range
+
+
+class TestGuildShards(unittest.TestCase):
+    """Creación perezosa y recorridos por servidor"""
+
+    def test_creacion_perezosa(self):
+        created = []
+        shards = GuildShards(lambda guild_id: created.append(guild_id) or {'guild': guild_id})
+
+        self.assertIsNone(shards.peek(1))
+        self.assertIs(shards.get(1), shards.get(1))
+        self.assertEqual(created, [1])
+        self.assertIn(1, shards)
+        self.assertEqual(len(shards), 1)
+
+    def test_with_sessions(self):
+        shards = GuildShards(lambda guild_id: MagicMock(active_sessions={}))
+        shards.get(1).active_sessions['Dota 2'] = object()
+        shards.get(2)
+
+        self.assertEqual([guild_id for guild_id, _ in shards.with_sessions()], [1])
+        self.assertEqual(shards.session_count(), 1)
+
+
+class TestPartiesPorServidor(unittest.TestCase):
+    """Dos servidores jugando al mismo juego no comparten party"""
+
+    def setUp(self):
+        self.live = {'parties': {'active': {}, 'active_by_guild': {}, 'history': [], 'stats_by_game': {}}}
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        store = PartyHistoryStore(lambda: self.live, tmp.name)
+        for patcher in (patch.object(party_session, 'stats', self.live),
+                        patch.object(party_session, 'get_party_history_store', lambda: store),
+                        patch.object(party_session, 'get_party_graph', StatsPartyGraph(lambda: self.live).get)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.shards = GuildShards(lambda guild_id: PartySessionManager(MagicMock(), guild_id=guild_id))
+
+    def test_sin_colision(self):
+        for guild_id, players in ((1, {'1', '2'}), (2, {'3', '4'})):
+            manager = self.shards.get(guild_id)
+            session = PartySession('Dota 2', players, sorted(players), guild_id)
+            manager.active_sessions['Dota 2'] = session
+            with patch.object(party_session, 'save_stats'):
+                manager._create_active_party_in_stats('Dota 2', session)
+
+        self.assertTrue(self.shards.get(1).has_active_party('Dota 2', '1'))
+        self.assertFalse(self.shards.get(2).has_active_party('Dota 2', '1'))
+        self.assertEqual(set(self.live['parties']['active_by_guild']), {'1', '2'})
+        self.assertEqual(self.live['parties']['active'], {})
+
+        with patch.object(party_session, 'save_stats'), patch.object(party_session, 'save_game_time'):
+            self.shards.get(1)._finalize_party_in_stats('Dota 2', self.shards.get(1).active_sessions['Dota 2'])
+
+        self.assertEqual(self.live['parties']['history'][0]['guild_id'], 1)
+        self.assertIn('Dota 2', self.live['parties']['active_by_guild']['2'])
+        self.assertEqual(len(self.shards.get(2).get_party_history()), 0)
+
+    def test_historial_por_periodo_de_calendario(self):
+        week_start = datetime.fromisoformat(period_range('week')[0])
+        self.live['parties']['history'] = [
+            {'game': 'Dota 2', 'start': week_start.isoformat(), 'players': ['1'], 'guild_id': 1},
+            {'game': 'CS2', 'start': (week_start - timedelta(seconds=1)).isoformat(),
+             'players': ['1'], 'guild_id': 1},
+        ]
+        manager = self.shards.get(1)
+
+        self.assertEqual([p['game'] for p in manager.get_party_history('week')], ['Dota 2'])
+        self.assertEqual(len(manager.get_party_history('all')), 2)
+
+    def test_cooldown_de_party_formada_por_servidor(self):
+        used = set()
+
+        def fake_cooldown(user_id, event_key, cooldown_seconds=600):
+            key = f'{user_id}:{event_key}'
+            if key in used:
+                return False
+            used.add(key)
+            return True
+
+        config = {'party_detection': {'cooldown_minutes': 10}}
+        with patch.object(party_session, 'check_cooldown', fake_cooldown), \
+                patch.object(party_session, 'save_stats'):
+            for guild_id, players in ((1, {'1', '2'}), (2, {'3', '4'}), (1, {'5', '6'})):
+                manager = self.shards.get(guild_id)
+                session = PartySession('Dota 2', players, sorted(players), guild_id)
+                with patch.object(manager, '_publish_live_message', return_value=True):
+                    asyncio.run(manager._on_session_confirmed_phase1(session, None, config))
+                manager.active_sessions.pop('Dota 2', None)
+                # La segunda party del servidor 1 cae en su cooldown; la del 2 no
+                self.assertEqual(session.entry_notification_sent, players != {'5', '6'}, guild_id)
+
+        self.assertEqual(used, {'party:formed:1:dota 2', 'party:formed:2:dota 2'})
+
+    def test_game_manager_consulta_el_servidor_de_la_sesion(self):
+        manager = self.shards.get(1)
+        manager.active_sessions['CS2'] = PartySession('CS2', {'1', '2'}, ['Ana', 'Beto'], 1)
+        game_manager = GameSessionManager(MagicMock(), party_managers=self.shards)
+
+        self.assertTrue(game_manager._in_party(1, 'CS2', '1'))
+        self.assertFalse(game_manager._in_party(2, 'CS2', '1'))
+        self.assertNotIn(2, self.shards)
+
+
+if __name__ == '__main__':
+    unittest.main()
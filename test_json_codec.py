@@ -0,0 +1,91 @@
+"""
+Tests del codec JSON (core/json_codec.py)
+"""
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from core.json_codec import JsonCodec, create_codec
+from core.stats_repository import JsonStatsRepository
+
+SAMPLE = {
+    'users': {
+        '123': {
+            'username': 'Ñandú 🎮',
+            'games': {'Dota 2': {'total_minutes': 90, 'daily_minutes': {'2025-03-01': 90}}},
+            'voice': {'current_session': None, 'ratio': 0.5},
+        }
+    },
+    'parties': {'history': [{'players': ['1', '2'], 'active': True}]},
+}
+
+
+def _available_codecs():
+    codecs = [JsonCodec()]
+    for name in ('orjson', 'msgspec'):
+        codec = create_codec(name)
+        if codec.name == name:
+            codecs.append(codec)
+    return codecs
+
+
+class TestJsonCodec(unittest.TestCase):
+
+    def test_roundtrip_y_formato_compacto(self):
+        for codec in _available_codecs():
+            with self.subTest(codec=codec.name):
+                encoded = codec.dumps(SAMPLE)
+                self.assertIsInstance(encoded, bytes)
+                self.assertNotIn(b'\n', encoded)
+                self.assertNotIn(b'": ', encoded)
+                self.assertIn('Ñandú 🎮'.encode('utf-8'), encoded)
+                self.assertEqual(codec.loads(encoded), SAMPLE)
+                # Cualquier codec lee lo que escribió otro
+                self.assertEqual(json.loads(encoded), SAMPLE)
+
+    def test_pretty(self):
+        for codec in _available_codecs():
+            with self.subTest(codec=codec.name):
+                pretty = codec.dumps(SAMPLE, pretty=True)
+                self.assertIn(b'\n  "users"', pretty)
+                self.assertEqual(codec.loads(pretty), SAMPLE)
+                self.assertGreater(len(pretty), len(codec.dumps(SAMPLE)))
+
+    def test_json_invalido_es_value_error(self):
+        for codec in _available_codecs():
+            with self.subTest(codec=codec.name):
+                with self.assertRaises(ValueError):
+                    codec.loads(b'{"users": ')
+
+    def test_fallback_sin_librerias(self):
+        def fail(*args, **kwargs):
+            raise ImportError
+
+        with patch('core.json_codec.OrjsonCodec.__init__', fail), \
+                patch('core.json_codec.MsgspecCodec.__init__', fail):
+            self.assertEqual(create_codec('auto').name, 'json')
+            self.assertEqual(create_codec('orjson').name, 'json')
+        self.assertEqual(create_codec('json').name, 'json')
+        self.assertIn(create_codec('desconocido').name, ('orjson', 'msgspec', 'json'))
+
+
+class TestRepositorioCompacto(unittest.TestCase):
+
+    def test_stats_json_compacto_por_defecto(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'stats.json'
+            JsonStatsRepository(path, backup_generations=0).save_snapshot(SAMPLE)
+            compact = path.read_bytes()
+            self.assertNotIn(b'\n', compact)
+            self.assertEqual(JsonStatsRepository(path).load(), SAMPLE)
+
+            JsonStatsRepository(path, backup_generations=0, pretty=True).save_snapshot(SAMPLE)
+            self.assertGreater(len(path.read_bytes()), len(compact))
+            self.assertEqual(JsonStatsRepository(path).load(), SAMPLE)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,180 @@
+"""
+Tests de los leaderboards mantenidos incrementalmente (core/leaderboard.py)
+"""
+
+import random
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import core.persistence as persistence
+from core.leaderboard import Leaderboard, StatsLeaderboards
+from core.rollups import StatsRollups
+from core.stats_mutations import apply_mutation
+from stats.data import aggregate_game_time_by_user, aggregate_message_stats, aggregate_voice_stats, filter_by_period
+
+
+class TestLeaderboard(unittest.TestCase):
+    """Estructura ordenada básica"""
+
+    def test_orden_y_actualizacion(self):
+        board = Leaderboard()
+        board.update('a', 10, (1,))
+        board.update('b', 30, (2,))
+        board.update('c', 20, (3,))
+        board.update('a', 40, (4,))
+
+        self.assertEqual([m for m, _, _ in board.top()], ['a', 'b', 'c'])
+        self.assertEqual(board.top(1), [('a', 40, (4,))])
+        self.assertEqual(board.total, 90)
+        self.assertEqual(board.detail_totals, [9])
+
+    def test_discard(self):
+        board = Leaderboard()
+        board.update('a', 10, (1,))
+        board.update('b', 5, (1,))
+        board.discard('a')
+        board.discard('zzz')
+
+        self.assertEqual(board.top(), [('b', 5, (1,))])
+        self.assertEqual(board.total, 5)
+        self.assertEqual(len(board), 1)
+
+    def test_rank_con_empates(self):
+        """Misma semántica que SQL: cantidad de puntajes mayores + 1"""
+        board = Leaderboard()
+        for member, score in (('a', 50), ('b', 30), ('c', 30), ('d', 10)):
+            board.update(member, score)
+
+        self.assertEqual(board.rank('a'), 1)
+        self.assertEqual(board.rank('b'), 2)
+        self.assertEqual(board.rank('c'), 2)
+        self.assertEqual(board.rank('d'), 4)
+        self.assertEqual(board.rank('x'), 0)
+        self.assertEqual(board.rank_for_score(0), 5)
+
+
+class TestStatsLeaderboards(unittest.TestCase):
+    """Los leaderboards coinciden con los agregadores tras mutaciones"""
+
+    def setUp(self):
+        self.live = {'users': {}, 'cooldowns': {}}
+        self.rollups = StatsRollups(lambda: self.live)
+        self.leaderboards = StatsLeaderboards(lambda: self.live, self.rollups)
+
+    def _apply(self, op, now, **args):
+        apply_mutation(self.live, op, args, now)
+        self.rollups.record(op, args, now)
+        self.leaderboards.user_changed(args.get('user_id'), op, now)
+
+    def _scores(self, rows):
+        return sorted((row[0], row[1:]) for row in rows)
+
+    def test_paridad_con_agregadores(self):
+        rng = random.Random(7)
+        now = datetime.now()
+        # construir antes de las mutaciones (incluidos los boards por período)
+        for period in ('all', 'week', 'month'):
+            self.leaderboards.board('game_time', period)
+
+        for _ in range(300):
+            uid = str(rng.randint(1, 12))
+            username = f'user{uid}'
+            when = now - timedelta(days=rng.randint(0, 40), minutes=rng.randint(0, 600))
+            op = rng.choice(['game_time', 'game_count', 'voice_time', 'voice_count', 'message', 'reaction'])
+            if op in ('game_time', 'game_count'):
+                args = {'game_name': rng.choice(['Dota 2', 'CS2', 'LoL'])}
+                if op == 'game_time':
+                    args['minutes'] = rng.randint(1, 120)
+            elif op == 'voice_time':
+                args = {'minutes': rng.randint(1, 90)}
+            elif op == 'message':
+                args = {'message_length': rng.randint(1, 50)}
+            elif op == 'reaction':
+                args = {'emoji': '🔥'}
+            else:
+                args = {}
+            self._apply(op, when, user_id=uid, username=username, **args)
+
+        top_games = self.leaderboards.top('game_time', 'all')
+        self.assertEqual(
+            self._scores((u, m, *d) for _, u, m, d in top_games),
+            self._scores(aggregate_game_time_by_user(self.live))
+        )
+        self.assertEqual(
+            [m for _, _, m, _ in top_games],
+            [row[1] for row in aggregate_game_time_by_user(self.live)]
+        )
+        self.assertEqual(
+            self._scores((u, m, *d) for _, u, m, d in self.leaderboards.top('voice_time', 'all')),
+            self._scores(aggregate_voice_stats(self.live))
+        )
+        self.assertEqual(
+            self._scores((u, c, *d) for _, u, c, d in self.leaderboards.top('messages')),
+            self._scores(aggregate_message_stats(self.live))
+        )
+        for period in ('today', 'week', 'month'):
+            filtered = filter_by_period(self.live, period)
+            self.assertEqual(
+                self._scores((u, m, *d) for _, u, m, d in self.leaderboards.top('game_time', period)),
+                self._scores(aggregate_game_time_by_user(filtered)),
+                period
+            )
+            self.assertEqual(
+                self._scores((u, m, *d) for _, u, m, d in self.leaderboards.top('voice_time', period)),
+                self._scores(aggregate_voice_stats(filtered)),
+                period
+            )
+
+    def test_periodo_cuenta_solo_el_bucket(self):
+        """La semana cuenta solo los minutos de la semana en curso"""
+        monday = datetime(2025, 3, 3, 12, 0)
+        self._apply('game_time', monday - timedelta(days=1), user_id='1', username='Ana', game_name='Dota 2', minutes=90)
+        self.leaderboards.board('game_time', 'week', now=monday)
+        self._apply('game_count', monday, user_id='1', username='Ana', game_name='Dota 2')
+        self._apply('game_time', monday, user_id='1', username='Ana', game_name='Dota 2', minutes=30)
+
+        board = self.leaderboards.board('game_time', 'week', now=monday + timedelta(days=2))
+        self.assertEqual(board.top(), [('1', 30, (1, 1))])
+        self.assertEqual(self.leaderboards.board('game_time', 'all').top(), [('1', 120, (1, 1))])
+
+        # Semana siguiente: bucket nuevo, sin actividad
+        board = self.leaderboards.board('game_time', 'week', now=monday + timedelta(days=7))
+        self.assertEqual(board.top(), [])
+
+    def test_today_cambia_a_medianoche(self):
+        now = datetime(2025, 3, 1, 23, 0)
+        self.leaderboards.board('voice_time', 'today', now=now)
+        self._apply('voice_count', now, user_id='1', username='Ana')
+
+        self.assertEqual(len(self.leaderboards.board('voice_time', 'today', now=now)), 1)
+        self.assertEqual(len(self.leaderboards.board('voice_time', 'today', now=now + timedelta(hours=2))), 0)
+
+    def test_store_reemplazado_reconstruye(self):
+        self.live['users']['1'] = {'username': 'Ana', 'messages': {'count': 3, 'characters': 9}}
+        self.assertEqual(self.leaderboards.top('messages'), [('1', 'Ana', 3, (9,))])
+
+        self.live = {'users': {'2': {'username': 'Beto', 'messages': {'count': 1, 'characters': 2}}}}
+        self.assertEqual(self.leaderboards.top('messages'), [('2', 'Beto', 1, (2,))])
+
+
+class TestRecordMutationActualizaLeaderboards(unittest.TestCase):
+    """Integración con record_mutation en persistence"""
+
+    def test_record_mutation(self):
+        live = {'users': {}, 'cooldowns': {}}
+        with patch.object(persistence, 'stats', live), \
+                patch.object(persistence, 'save_stats'), \
+                patch.object(persistence, '_journal', None):
+            self.assertEqual(persistence.get_leaderboards().top('messages'), [])
+            persistence.record_mutation('message', user_id='1', username='Ana', message_length=4)
+            persistence.record_mutation('message', user_id='2', username='Beto', message_length=4)
+            persistence.record_mutation('message', user_id='2', username='Beto', message_length=4)
+
+            top = persistence.get_leaderboards().top('messages', limit=1)
+
+        self.assertEqual(top, [('2', 'Beto', 2, (8,))])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+"""
+Tests de métricas de rendimiento (core/metrics.py) y !perf
+"""
+
+import asyncio
+import unittest
+
+from core.metrics import Metrics, PrometheusServer, get_metrics, timed_listener
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_latencias_y_percentiles(self):
+        metrics = Metrics()
+        for ms in range(1, 101):
+            metrics.observe('dsbot_listener_duration_seconds', ms / 1000, listener='on_message')
+
+        summary = metrics.latency('dsbot_listener_duration_seconds', listener='on_message').summary()
+        self.assertEqual(summary['count'], 100)
+        self.assertEqual(summary['max_ms'], 100.0)
+        self.assertAlmostEqual(summary['p50_ms'], 51.0)
+        self.assertAlmostEqual(summary['p99_ms'], 100.0)
+        self.assertIsNone(metrics.latency('dsbot_listener_duration_seconds', listener='otro'))
+
+    def test_formato_prometheus(self):
+        metrics = Metrics()
+        metrics.describe('dsbot_listener_duration_seconds', 'Duración')
+        metrics.observe('dsbot_listener_duration_seconds', 0.5, listener='on_message')
+        metrics.inc('dsbot_stats_write_bytes_total', 2048)
+        metrics.register_gauge('dsbot_active_sessions', lambda: {'voice': 3, 'game': 1}, label='manager')
+        metrics.register_gauge('dsbot_notification_queue_depth', lambda: 7)
+        metrics.register_gauge('dsbot_roto', lambda: 1 / 0)
+
+        text = metrics.render_prometheus()
+        self.assertIn('# HELP dsbot_listener_duration_seconds Duración', text)
+        self.assertIn('# TYPE dsbot_listener_duration_seconds summary', text)
+        self.assertIn('dsbot_listener_duration_seconds{listener="on_message",quantile="0.99"} 0.500000', text)
+        self.assertIn('dsbot_listener_duration_seconds_count{listener="on_message"} 1', text)
+        self.assertIn('dsbot_stats_write_bytes_total 2048', text)
+        self.assertIn('dsbot_active_sessions{manager="voice"} 3', text)
+        self.assertIn('dsbot_notification_queue_depth 7', text)
+        self.assertNotIn('dsbot_roto', text)
+
+    def test_timed_listener(self):
+        @timed_listener
+        async def on_test_event(value):
+            await asyncio.sleep(0)
+            return value * 2
+
+        self.assertEqual(on_test_event.__name__, 'on_test_event')
+        self.assertEqual(asyncio.run(on_test_event(21)), 42)
+        stat = get_metrics().latency('dsbot_listener_duration_seconds', listener='on_test_event')
+        self.assertEqual(stat.count, 1)
+
+    def test_endpoint_http(self):
+        metrics = Metrics()
+        metrics.register_gauge('dsbot_notification_queue_depth', lambda: 2)
+
+        async def fetch(path):
+            server = PrometheusServer(metrics, '127.0.0.1', 0)
+            await server.start()
+            port = server._server.sockets[0].getsockname()[1]
+            try:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode())
+                await writer.drain()
+                response = await reader.read()
+                writer.close()
+                return response.decode()
+            finally:
+                await server.stop()
+
+        response = asyncio.run(fetch('/metrics'))
+        self.assertTrue(response.startswith('HTTP/1.1 200 OK'))
+        self.assertIn('dsbot_notification_queue_depth 2', response)
+        self.assertTrue(asyncio.run(fetch('/otro')).startswith('HTTP/1.1 404'))
+
+
+class TestPerfEmbed(unittest.TestCase):
+
+    def test_embed(self):
+        from cogs.config import create_perf_embed
+
+        metrics = Metrics()
+        metrics.observe('dsbot_listener_duration_seconds', 0.002, listener='on_presence_update')
+        metrics.observe('dsbot_event_loop_lag_seconds', 0.001)
+        metrics.observe('dsbot_stats_write_duration_seconds', 0.05)
+        metrics.inc('dsbot_stats_write_bytes_total', 4096)
+        metrics.register_gauge('dsbot_active_sessions', lambda: {'voice': 2}, label='manager')
+
+        embed = create_perf_embed(metrics.snapshot())
+        fields = {field.name: field.value for field in embed.fields}
+        self.assertIn('on_presence_update', fields['🎧 Listeners'])
+        self.assertIn('p99', fields['⏱️ Lag del event loop'])
+        self.assertIn('MB', fields['💾 Escrituras de stats'])
+        self.assertIn('voice: **2**', fields['🎮 Sesiones activas'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,237 @@
+"""
+Tests de la cola de notificaciones salientes (core/notification_queue.py)
+"""
+
+import asyncio
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import discord
+
+from core.notification_queue import NotificationDispatcher
+
+
+def _http_error(status, retry_after=None, cls=discord.errors.HTTPException):
+    error = cls(SimpleNamespace(status=status, reason='test'), 'test')
+    if retry_after is not None:
+        error.retry_after = retry_after
+    return error
+
+
+class _Channel:
+    """Canal falso que registra los envíos y puede fallar los primeros N"""
+
+    def __init__(self, channel_id, failures=()):
+        self.id = channel_id
+        self.sent = []
+        self.sent_at = []
+        self.failures = list(failures)
+
+    async def send(self, content):
+        if self.failures:
+            raise self.failures.pop(0)
+        self.sent.append(content)
+        self.sent_at.append(time.monotonic())
+        return SimpleNamespace(id=len(self.sent), content=content, channel=self)
+
+
+def _bot(*channels):
+    by_id = {channel.id: channel for channel in channels}
+    bot = MagicMock()
+    bot.get_channel.side_effect = by_id.get
+    return bot
+
+
+def _dispatcher(**settings):
+    base = {'initial_delay': 0.01, 'max_delay': 0.05, 'channel_messages': 100, 'channel_window_seconds': 1}
+    base.update(settings)
+    return NotificationDispatcher(base)
+
+
+class TestNotificationDispatcher(unittest.TestCase):
+    """Envío asíncrono por canal"""
+
+    def test_envia_en_orden_y_resuelve_mensaje(self):
+        channel = _Channel(10)
+        bot = _bot(channel)
+        dispatcher = _dispatcher()
+
+        async def run():
+            futures = [dispatcher.submit(bot, 10, f'msg {i}') for i in range(3)]
+            self.assertEqual(dispatcher.pending(), 3)
+            return await asyncio.gather(*futures)
+
+        results = asyncio.run(run())
+        self.assertEqual(channel.sent, ['msg 0', 'msg 1', 'msg 2'])
+        self.assertEqual([m.content for m in results], channel.sent)
+        self.assertEqual(dispatcher.pending(), 0)
+
+    def test_limite_por_canal(self):
+        channel = _Channel(10)
+        dispatcher = _dispatcher(channel_messages=2, channel_window_seconds=0.2)
+
+        async def run():
+            bot = _bot(channel)
+            await asyncio.gather(*(dispatcher.submit(bot, 10, str(i)) for i in range(3)))
+
+        asyncio.run(run())
+        self.assertEqual(len(channel.sent), 3)
+        # El tercero espera a que se libere la ventana del canal
+        self.assertGreaterEqual(channel.sent_at[2] - channel.sent_at[0], 0.18)
+
+    def test_429_pausa_solo_ese_canal(self):
+        limited = _Channel(10, failures=[_http_error(429, retry_after=0.2)])
+        other = _Channel(20)
+        dispatcher = _dispatcher()
+
+        async def run():
+            bot = _bot(limited, other)
+            start = time.monotonic()
+            first = dispatcher.submit(bot, 10, 'a')
+            await dispatcher.submit(bot, 20, 'b')
+            other_elapsed = time.monotonic() - start
+            await first
+            return other_elapsed, time.monotonic() - start
+
+        other_elapsed, limited_elapsed = asyncio.run(run())
+        self.assertEqual(limited.sent, ['a'])
+        self.assertEqual(other.sent, ['b'])
+        self.assertLess(other_elapsed, 0.1)
+        self.assertGreaterEqual(limited_elapsed, 0.19)
+
+    def test_canal_lento_no_frena_a_los_demas(self):
+        slow = _Channel(10)
+        fast = _Channel(20)
+        original_send = slow.send
+
+        async def slow_send(content):
+            await asyncio.sleep(0.3)  # discord.py esperando su propio rate limit
+            return await original_send(content)
+
+        slow.send = slow_send
+        dispatcher = _dispatcher()
+
+        async def run():
+            bot = _bot(slow, fast)
+            start = time.monotonic()
+            first = [dispatcher.submit(bot, 10, f'lento {i}') for i in range(2)]
+            await asyncio.gather(*(dispatcher.submit(bot, 20, f'rápido {i}') for i in range(3)))
+            fast_elapsed = time.monotonic() - start
+            await asyncio.gather(*first)
+            return fast_elapsed
+
+        fast_elapsed = asyncio.run(run())
+        self.assertEqual(fast.sent, ['rápido 0', 'rápido 1', 'rápido 2'])
+        self.assertEqual(slow.sent, ['lento 0', 'lento 1'])
+        self.assertLess(fast_elapsed, 0.1)
+
+    def test_backoff_y_descartes(self):
+        dispatcher = NotificationDispatcher({'initial_delay': 30, 'max_delay': 300, 'exponential_base': 2})
+        self.assertEqual([dispatcher.backoff_delay(n) for n in (1, 2, 3, 5, 8)], [30, 60, 120, 300, 300])
+
+        flaky = _Channel(10, failures=[_http_error(500), _http_error(502)])
+        forbidden = _Channel(20, failures=[_http_error(403, cls=discord.errors.Forbidden)])
+        broken = _Channel(30, failures=[_http_error(500)] * 3)
+        dispatcher = _dispatcher(max_retries=2)
+
+        async def run():
+            bot = _bot(flaky, forbidden, broken)
+            return await asyncio.gather(
+                dispatcher.submit(bot, 10, 'ok'),
+                dispatcher.submit(bot, 20, 'no'),
+                dispatcher.submit(bot, 30, 'roto'),
+            )
+
+        sent, denied, dropped = asyncio.run(run())
+        self.assertEqual(sent.content, 'ok')
+        self.assertIsNone(denied)
+        self.assertIsNone(dropped)
+        self.assertEqual(forbidden.failures, [])
+        self.assertEqual(broken.sent, [])
+
+    def test_coalescing(self):
+        channel = _Channel(10, failures=[_http_error(429, retry_after=0.05)])
+        dispatcher = _dispatcher()
+
+        async def run():
+            bot = _bot(channel)
+            first = dispatcher.submit(bot, 10, 'party: Ana', coalesce_key='party:1')
+            second = dispatcher.submit(bot, 10, 'party: Ana, Beto', coalesce_key='party:1')
+            self.assertIs(first, second)
+            self.assertEqual(dispatcher.pending(), 1)
+            await first
+            # Ya enviado: la misma clave encola un mensaje nuevo
+            await dispatcher.submit(bot, 10, 'party: Ana, Beto, Caro', coalesce_key='party:1')
+
+        asyncio.run(run())
+        self.assertEqual(channel.sent, ['party: Ana, Beto', 'party: Ana, Beto, Caro'])
+
+    def test_coalescing_con_envio_en_vuelo(self):
+        """Una clave cuyo envío ya empezó no absorbe el contenido nuevo: se encola otro"""
+        channel = _Channel(10)
+        original_send = channel.send
+        release = None
+
+        async def blocking_send(content):
+            if not channel.sent:
+                await release.wait()
+            return await original_send(content)
+
+        channel.send = blocking_send
+        dispatcher = _dispatcher()
+
+        async def run():
+            nonlocal release
+            release = asyncio.Event()
+            bot = _bot(channel)
+            first = dispatcher.submit(bot, 10, 'party: Ana', coalesce_key='party:1')
+            await asyncio.sleep(0.01)  # _deliver esperando al canal
+            second = dispatcher.submit(bot, 10, 'party: Ana, Beto', coalesce_key='party:1')
+            self.assertIsNot(first, second)
+            release.set()
+            return await first, await second
+
+        first, second = asyncio.run(run())
+        self.assertEqual(channel.sent, ['party: Ana', 'party: Ana, Beto'])
+        self.assertEqual((first.content, second.content), ('party: Ana', 'party: Ana, Beto'))
+
+    def test_edicion(self):
+        channel = _Channel(10)
+        message = MagicMock()
+        message.channel = channel
+        message.edit = MagicMock(side_effect=lambda **kwargs: asyncio.sleep(0))
+        dispatcher = _dispatcher()
+
+        async def run():
+            return await dispatcher.submit_edit(message, 'editado')
+
+        self.assertIs(asyncio.run(run()), message)
+        message.edit.assert_called_once_with(content='editado')
+
+
+class TestSendNotification(unittest.TestCase):
+    """send_notification encola en lugar de enviar en línea"""
+
+    def test_encola_y_retorna_mensaje(self):
+        from core import helpers
+
+        channel = _Channel(10)
+        bot = _bot(channel)
+        dispatcher = _dispatcher()
+
+        async def run():
+            with patch.object(helpers, 'get_channel_id', return_value=10), \
+                    patch.object(helpers, 'get_dispatcher', return_value=dispatcher):
+                self.assertIsNone(await helpers.send_notification('hola', bot))
+                self.assertEqual(dispatcher.pending(), 1)
+                return await helpers.send_notification('chau', bot, return_message=True)
+
+        message = asyncio.run(run())
+        self.assertEqual(message.content, 'chau')
+        self.assertEqual(channel.sent, ['hola', 'chau'])
+
+
+if __name__ == '__main__':
+    unittest.main()
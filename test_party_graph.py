@@ -0,0 +1,148 @@
+"""
+Tests del grafo de co-juego de las parties (core/party_graph.py)
+"""
+
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from itertools import combinations
+from unittest.mock import patch
+
+from benchmarks.dataset import generate_stats
+from core.party_graph import PartyGraph, StatsPartyGraph
+from core.party_history import PartyHistoryStore
+from stats.data import aggregate_party_stats
+
+
+def party(game, players, minutes, start='2025-03-01T20:00:00'):
+    return {'game': game, 'players': players, 'duration_minutes': minutes, 'start': start}
+
+
+def naive_pairs(history, game=None):
+    """Doble loop sobre el historial (la implementación anterior)"""
+    pairs = {}
+    for entry in history:
+        if game is not None and entry.get('game') != game:
+            continue
+        for a, b in combinations(sorted(set(entry['players'])), 2):
+            pairs[(a, b)] = pairs.get((a, b), 0) + 1
+    return pairs
+
+
+class TestPartyGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.history = [
+            party('LoL', ['1', '2', '3'], 40),
+            party('LoL', ['1', '2'], 25),
+            party('Valorant', ['2', '3'], 55),
+            party('LoL', ['3', '2', '1'], 30),
+            party('Valorant', ['4', '2', '3'], 10),
+        ]
+        self.graph = PartyGraph.from_history(self.history)
+
+    def test_companeros(self):
+        self.assertEqual(self.graph.partners('2'), [('3', 4, 135), ('1', 3, 95), ('4', 1, 10)])
+        self.assertEqual(self.graph.partners('2', game='Valorant'), [('3', 2, 65), ('4', 1, 10)])
+        self.assertEqual(self.graph.partners('2', limit=1), [('3', 4, 135)])
+        self.assertEqual(self.graph.partners('nadie'), [])
+        self.assertEqual(self.graph.partners('1', game='Minecraft'), [])
+
+    def test_duplas_y_squad(self):
+        self.assertEqual(self.graph.top_pairs(limit=1), [('2', '3', 4, 135)])
+        self.assertEqual(self.graph.top_pairs(game='LoL', limit=2), [('1', '2', 3, 95), ('1', '3', 2, 70)])
+        self.assertEqual(self.graph.best_squad(), (('1', '2', '3'), 2, 70))
+        self.assertEqual(self.graph.best_squad(game='Valorant'), (('2', '3', '4'), 1, 10))
+        self.assertIsNone(PartyGraph.from_history([party('LoL', ['1', '2'], 5)]).best_squad())
+        self.assertEqual(self.graph.party_counts(), {'1': 3, '2': 5, '3': 4, '4': 1})
+
+    def test_quitar_party_deshace_la_suma(self):
+        self.graph.top_pairs()  # Rankings ya armados: también se mantienen
+        extra = party('Minecraft', ['4', '5', '6'], 20)
+        self.graph.add_party(extra)
+        self.assertEqual(self.graph.best_squad(game='Minecraft'), (('4', '5', '6'), 1, 20))
+        self.graph.remove_party(extra)
+        self.graph.remove_party(self.history[1])
+
+        rebuilt = PartyGraph.from_history([p for p in self.history if p is not self.history[1]])
+        for game in (None, 'LoL', 'Valorant', 'Minecraft'):
+            with self.subTest(game=game):
+                self.assertEqual(self.graph.top_pairs(game=game), rebuilt.top_pairs(game=game))
+                self.assertEqual(self.graph.best_squad(game=game), rebuilt.best_squad(game=game))
+                self.assertEqual(self.graph.pair_counts(game=game), rebuilt.pair_counts(game=game))
+        self.assertNotIn('5', self.graph.party_counts())
+        self.assertEqual(self.graph.partners('6'), [])
+
+    def test_equivale_al_doble_loop(self):
+        history = generate_stats(60, days=60, party_history=300, seed=4)['parties']['history']
+        graph = PartyGraph.from_history(history)
+        self.assertEqual(graph.pair_counts(), naive_pairs(history))
+        game = history[0]['game']
+        self.assertEqual(graph.pair_counts(game=game), naive_pairs(history, game))
+
+        pairs = naive_pairs(history)
+        best = max(pairs.values())
+        self.assertEqual(graph.top_pairs(limit=1)[0][2], best)
+        uid = history[0]['players'][0]
+        expected = {b if a == uid else a: count for (a, b), count in pairs.items() if uid in (a, b)}
+        self.assertEqual({other: count for other, count, _ in graph.partners(uid, limit=1000)}, expected)
+
+    def test_aggregate_party_stats_con_grafo(self):
+        data = generate_stats(40, days=60, party_history=200, seed=6)
+        graph = PartyGraph.from_history(data['parties']['history'])
+        self.assertEqual(aggregate_party_stats(data, graph=graph), aggregate_party_stats(data))
+
+
+class TestFinalizeParty(unittest.TestCase):
+    """_finalize_party_in_stats mantiene el grafo al día con el historial"""
+
+    def setUp(self):
+        from core.party_session import PartySession, PartySessionManager
+
+        class MockBot:
+            pass
+
+        self.stats = {'parties': {'history': [party('LoL', ['1', '2'], 25)], 'stats_by_game': {}}}
+        self.index = StatsPartyGraph(lambda: self.stats)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = PartyHistoryStore(lambda: self.stats, self.tmp.name)
+        self.active = {}
+        self.manager = PartySessionManager(MockBot())
+        self.session = PartySession('LoL', {'1', '2', '3'}, ['A', 'B', 'C'], 1)
+        self.patches = [
+            patch('core.party_session.stats', self.stats),
+            patch('core.party_session.get_party_graph', self.index.get),
+            patch('core.party_session.get_party_history_store', lambda: self.store),
+            patch('core.party_session.save_stats'),
+            patch('core.party_session.save_game_time'),
+            patch.object(self.manager, '_active_parties', lambda: self.active),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        self.tmp.cleanup()
+
+    def _finalize(self, start):
+        self.active['LoL'] = {'start': start.isoformat(), 'players': ['1', '2', '3'],
+                              'player_names': ['A', 'B', 'C'], 'max_players': 3}
+        self.manager._finalize_party_in_stats('LoL', self.session)
+
+    def test_nueva_y_repetida(self):
+        start = datetime.now() - timedelta(minutes=30)
+        self._finalize(start)
+        graph = self.index.get()
+        self.assertEqual(graph.partners('1'), [('2', 2, 55), ('3', 1, 30)])
+        self.assertEqual(graph.best_squad(), (('1', '2', '3'), 1, 30))
+
+        # handle_end repetido: la entrada se reemplaza y el grafo no la cuenta dos veces
+        self._finalize(start)
+        self.assertEqual(len(self.stats['parties']['history']), 2)
+        self.assertEqual(graph.pair_counts(), naive_pairs(self.stats['parties']['history']))
+        self.assertEqual(graph.best_squad()[1], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
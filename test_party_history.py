@@ -0,0 +1,105 @@
+"""
+Tests del historial de parties con índice por id y archivo mensual (core/party_history.py)
+"""
+
+import gzip
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from core.party_history import PartyArchive, PartyHistoryStore, entry_key, party_key
+
+
+def party(game, start, players=('1', '2'), minutes=30, guild_id=1):
+    entry = {'game': game, 'start': start.isoformat(), 'duration_minutes': minutes, 'players': list(players)}
+    if guild_id is not None:
+        entry['guild_id'] = guild_id
+    return entry
+
+
+class TestPartyHistoryStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.archive_dir = Path(self.tmp.name) / 'party_archive'
+        self.stats = {'parties': {'history': []}}
+        self.store = PartyHistoryStore(lambda: self.stats, self.archive_dir, live_limit=5, archive_batch=3)
+        self.base = datetime(2025, 1, 25, 20, 0)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _record(self, count, offset=0):
+        archived = []
+        for i in range(offset, offset + count):
+            _, dropped = self.store.record(party('LoL', self.base + timedelta(days=i)))
+            archived.extend(dropped)
+        return archived
+
+    def test_duplicados_por_id(self):
+        first = party('LoL', self.base, minutes=10)
+        self.assertEqual(self.store.record(first), (None, []))
+        self.assertEqual(first['id'], party_key('LoL', first['start'], 1))
+
+        previous, archived = self.store.record(party('LoL', self.base, minutes=45))
+        self.assertEqual(previous['duration_minutes'], 10)
+        self.assertEqual(archived, [])
+        self.assertEqual([e['duration_minutes'] for e in self.stats['parties']['history']], [45])
+
+        # Otro servidor con el mismo juego e inicio es otra party
+        self.assertIsNone(self.store.record(party('LoL', self.base, guild_id=2))[0])
+        self.assertEqual(len(self.stats['parties']['history']), 2)
+
+    def test_entradas_historicas_sin_id_ni_servidor(self):
+        legacy = party('LoL', self.base, minutes=10, guild_id=None)
+        self.stats['parties']['history'] = [legacy]
+        previous, _ = self.store.record(party('LoL', self.base, minutes=20))
+        self.assertEqual(previous['duration_minutes'], 10)
+        self.assertEqual(self.stats['parties']['history'], [legacy])
+        self.assertEqual(legacy['guild_id'], 1)
+        self.assertEqual(entry_key(legacy), party_key('LoL', legacy['start'], 1))
+
+    def test_archiva_por_lotes_sin_perder_parties(self):
+        self.assertEqual(self._record(8), [])
+        archived = self._record(1, offset=8)
+        history = self.stats['parties']['history']
+        self.assertEqual(len(history), 5)
+        self.assertEqual(len(archived), 4)
+        self.assertEqual(archived[0]['start'], (self.base + timedelta(days=3)).isoformat())
+
+        # Segmentos por mes del inicio (enero y febrero)
+        self.assertEqual(PartyArchive(self.archive_dir).months(), ['2025-01'])
+        self._record(4, offset=9)
+        self.assertEqual(PartyArchive(self.archive_dir).months(), ['2025-02', '2025-01'])
+
+        starts = [entry['start'] for entry in self.store.iter_history()]
+        self.assertEqual(starts, [(self.base + timedelta(days=i)).isoformat() for i in reversed(range(13))])
+
+        # Una party archivada ya no está en el índice: no se confunde con una nueva
+        self.assertIsNone(self.store.find('LoL', self.base.isoformat(), 1))
+
+    def test_iter_history_por_servidor_y_fecha(self):
+        self._record(9)
+        self.store.record(party('LoL', self.base + timedelta(days=20), guild_id=2))
+        since = self.base + timedelta(days=2)
+        starts = [e['start'] for e in self.store.iter_history(guild_id=1, since=since)]
+        self.assertEqual(starts, [(self.base + timedelta(days=i)).isoformat() for i in reversed(range(2, 9))])
+        self.assertEqual(len(list(self.store.iter_history(guild_id=2))), 1)
+        self.assertEqual(len(list(self.store.iter_history())), 10)
+
+    def test_archivo_repetido_o_truncado(self):
+        self._record(9)
+        archive = PartyArchive(self.archive_dir)
+        # Corte entre el archivo y el guardado de stats: la misma entrada archivada dos veces
+        archive.append([self.stats['parties']['history'][-1]])
+        self.assertEqual(len(list(self.store.iter_history())), 9)
+
+        path = archive.segment_path('2025-01')
+        with open(path, 'ab') as f:
+            f.write(gzip.compress(b'{"game": "LoL", "start": "2025-01-31T20:00:00"}\n')[:-12])
+        self.assertEqual(len(archive.read_segment('2025-01')), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+"""
+Tests del mensaje en vivo de las parties (core/party_session.py)
+Los joins editan un único mensaje por party con una cadencia fija.
+"""
+
+import asyncio
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from core import helpers
+from core import party_session as party_module
+from core.cooldown import get_cooldown_store
+from core.notification_queue import NotificationDispatcher
+from core.party_session import PartySession, PartySessionManager
+
+
+class _Channel:
+    def __init__(self, channel_id):
+        self.id = channel_id
+        self.sent = []
+        self.edits = []
+
+    async def send(self, content):
+        self.sent.append(content)
+        channel = self
+
+        async def edit(content):
+            channel.edits.append(content)
+
+        return SimpleNamespace(id=len(self.sent), content=content, channel=self, edit=edit)
+
+
+def _players(*names):
+    return [{'user_id': str(i), 'username': name, 'activity': None} for i, name in enumerate(names, 1)]
+
+
+class TestPartyLiveMessage(unittest.TestCase):
+
+    def setUp(self):
+        get_cooldown_store().clear()
+        self.channel = _Channel(10)
+        bot = MagicMock()
+        bot.get_channel.side_effect = lambda cid: self.channel if cid == 10 else None
+        self.manager = PartySessionManager(bot, guild_id=1)
+        self.dispatcher = NotificationDispatcher({'channel_messages': 100, 'channel_window_seconds': 1})
+        self.config = {'party_detection': {
+            'live_message_edit_seconds': 0.2,
+            'suppress_join_notifications_for_games': [],
+            'use_here_mention': False,
+        }}
+        self.patches = [
+            patch.object(helpers, 'get_channel_id', return_value=10),
+            patch.object(helpers, 'get_dispatcher', return_value=self.dispatcher),
+            patch.object(party_module, 'get_dispatcher', return_value=self.dispatcher),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        get_cooldown_store().clear()
+
+    def _confirmed_party(self, *names):
+        players = _players(*names)
+        session = PartySession('Dota 2', {p['user_id'] for p in players}, [p['username'] for p in players], guild_id=1)
+        session.is_confirmed = True
+        self.manager.active_sessions['Dota 2'] = session
+        return session
+
+    def test_varios_joins_un_mensaje_y_una_edicion(self):
+        session = self._confirmed_party('Ana', 'Beto')
+
+        async def run():
+            for count in range(3, 7):
+                names = ['Ana', 'Beto', 'Caro', 'Dani', 'Eli', 'Fede'][:count]
+                await self.manager.handle_start('Dota 2', _players(*names), 1, self.config)
+                await asyncio.sleep(0.02)
+            await asyncio.sleep(0.3)
+
+        asyncio.run(run())
+        self.assertEqual(len(self.channel.sent), 1)
+        self.assertEqual(len(self.channel.edits), 1)
+        self.assertIn('**Fede**', self.channel.edits[0])
+        self.assertIn('(6 jugadores)', self.channel.edits[0])
+        self.assertIs(session.notification_message, session.live_message)
+
+    def test_party_formada_se_actualiza_con_joins(self):
+        session = self._confirmed_party('Ana', 'Beto')
+
+        async def run():
+            await self.manager._on_session_confirmed_phase1(session, None, self.config)
+            await asyncio.sleep(0.02)
+            await self.manager.handle_start('Dota 2', _players('Ana', 'Beto', 'Caro'), 1, self.config)
+            await asyncio.sleep(0.3)
+
+        asyncio.run(run())
+        self.assertEqual(len(self.channel.sent), 1)
+        self.assertNotIn('Caro', self.channel.sent[0])
+        self.assertEqual(len(self.channel.edits), 1)
+        self.assertIn('**Caro**', self.channel.edits[0])
+
+    def test_joins_durante_el_envio_se_reflejan_despues(self):
+        """Un join mientras 'party formada' está en vuelo no crea otro mensaje ni se pierde"""
+        session = self._confirmed_party('Ana', 'Beto')
+        original_send = self.channel.send
+        release = None
+
+        async def blocking_send(content):
+            await release.wait()
+            return await original_send(content)
+
+        self.channel.send = blocking_send
+
+        async def run():
+            nonlocal release
+            release = asyncio.Event()
+            await self.manager._on_session_confirmed_phase1(session, None, self.config)
+            await asyncio.sleep(0.02)  # Envío en vuelo
+            await self.manager.handle_start('Dota 2', _players('Ana', 'Beto', 'Caro'), 1, self.config)
+            await asyncio.sleep(0.02)
+            release.set()
+            await asyncio.sleep(0.4)
+
+        asyncio.run(run())
+        self.assertEqual(len(self.channel.sent), 1)
+        self.assertNotIn('Caro', self.channel.sent[0])
+        self.assertEqual(len(self.channel.edits), 1)
+        self.assertIn('**Caro**', self.channel.edits[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+"""
+Tests del índice de presencia (core/presence_index.py)
+"""
+
+import asyncio
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import discord
+
+from core.party_session import PartySession, PartySessionManager
+from core.presence_index import PresenceIndex
+
+
+def _activity(name, activity_type=discord.ActivityType.playing):
+    return SimpleNamespace(name=name, type=activity_type)
+
+
+def _member(guild, user_id, name, *activities, bot=False):
+    return SimpleNamespace(id=user_id, display_name=name, activities=list(activities), bot=bot, guild=guild)
+
+
+class _Guild(SimpleNamespace):
+    def __init__(self, guild_id=1):
+        super().__init__(id=guild_id, name='Test', members=[])
+
+
+class TestPresenceIndex(unittest.TestCase):
+    """El índice refleja la presencia sin recorrer los miembros en cada evento"""
+
+    def setUp(self):
+        self.guild = _Guild()
+        self.guild.members = [
+            _member(self.guild, 1, 'Ana', _activity('Dota 2')),
+            _member(self.guild, 2, 'Beto', _activity('Spotify', discord.ActivityType.listening), _activity('Dota 2')),
+            _member(self.guild, 3, 'Caro'),
+            _member(self.guild, 4, 'Bot', _activity('Dota 2'), bot=True),
+        ]
+        self.index = PresenceIndex()
+
+    def test_construccion_inicial(self):
+        by_game = self.index.players_by_game(self.guild)
+        self.assertEqual(list(by_game), ['Dota 2'])
+        self.assertEqual(sorted(p['user_id'] for p in by_game['Dota 2']), ['1', '2'])
+        self.assertEqual(self.index.count(self.guild, 'Dota 2'), 2)
+
+    def test_actualizacion_por_diff(self):
+        self.index.rebuild_guild(self.guild)
+        # Los miembros ya no se recorren: el índice se mantiene con los eventos
+        self.guild.members = []
+
+        ana = _member(self.guild, 1, 'Ana', _activity('CS2'))
+        self.assertEqual(self.index.update_member(ana), ('Dota 2', 'CS2'))
+        caro = _member(self.guild, 3, 'Caro', _activity('CS2'))
+        self.assertEqual(self.index.update_member(caro), (None, 'CS2'))
+
+        self.assertEqual(self.index.count(self.guild, 'Dota 2'), 1)
+        self.assertEqual(self.index.count(self.guild, 'CS2'), 2)
+        self.assertEqual(self.index.game_of(self.guild, '1'), 'CS2')
+
+        beto = _member(self.guild, 2, 'Beto')
+        self.assertEqual(self.index.update_member(beto), ('Dota 2', None))
+        self.assertNotIn('Dota 2', self.index.players_by_game(self.guild))
+
+    def test_remove_member(self):
+        self.index.rebuild_guild(self.guild)
+        self.assertEqual(self.index.remove_member(self.guild.members[0]), 'Dota 2')
+        self.assertEqual([p['username'] for p in self.index.players(self.guild, 'Dota 2')], ['Beto'])
+
+    def test_servidores_separados(self):
+        other = _Guild(2)
+        other.members = [_member(other, 1, 'Ana', _activity('LoL'))]
+        self.assertEqual(self.index.count(self.guild, 'LoL'), 0)
+        self.assertEqual(self.index.count(other, 'LoL'), 1)
+
+
+class TestPartyManagerUsaIndice(unittest.TestCase):
+    """PartySessionManager consulta el índice"""
+
+    def test_is_still_active(self):
+        guild = _Guild()
+        guild.members = [
+            _member(guild, 1, 'Ana', _activity('Dota 2')),
+            _member(guild, 2, 'Beto', _activity('Dota 2')),
+        ]
+        bot = MagicMock()
+        bot.get_guild.return_value = guild
+        manager = PartySessionManager(bot)
+        session = PartySession('Dota 2', {'1', '2'}, ['Ana', 'Beto'], guild_id=guild.id)
+
+        self.assertTrue(asyncio.run(manager._is_still_active(session, None)))
+
+        manager.presence.update_member(_member(guild, 2, 'Beto'))
+        self.assertFalse(asyncio.run(manager._is_still_active(session, None)))
+        self.assertEqual(list(manager.get_active_players_by_game(guild)), ['Dota 2'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+"""
+Tests de los rollups por período (core/rollups.py)
+"""
+
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+import core.persistence as persistence
+from core.rollups import StatsRollups, bucket_keys, filter_stats_by_period, period_range, user_period_totals
+from core.stats_mutations import apply_mutation
+
+
+class TestBuckets(unittest.TestCase):
+    """Claves de bucket y rangos de calendario"""
+
+    def test_semana_iso_cruza_el_año(self):
+        self.assertEqual(bucket_keys('2025-12-29'), ('D:2025-12-29', 'W:2026-W01', 'M:2025-12', 'Y:2025'))
+
+    def test_rangos(self):
+        now = datetime(2024, 2, 14, 18, 30)  # miércoles, año bisiesto
+        self.assertEqual(period_range('today', now), ('2024-02-14', '2024-02-14'))
+        self.assertEqual(period_range('week', now), ('2024-02-12', '2024-02-18'))
+        self.assertEqual(period_range('month', now), ('2024-02-01', '2024-02-29'))
+        self.assertEqual(period_range('year', now), ('2024-01-01', '2024-12-31'))
+        self.assertIsNone(period_range('all', now))
+
+
+class TestStatsRollups(unittest.TestCase):
+    """Los buckets se mantienen igual que si se reconstruyeran desde cero"""
+
+    def setUp(self):
+        self.live = {'users': {}, 'cooldowns': {}}
+        self.rollups = StatsRollups(lambda: self.live)
+
+    def _apply(self, op, now, **args):
+        apply_mutation(self.live, op, args, now)
+        self.rollups.record(op, args, now)
+
+    def test_incremental_igual_a_reconstruccion(self):
+        self.rollups.period_users('week')  # construir vacío
+        events = [
+            ('game_count', datetime(2025, 3, 3, 10), {'game_name': 'Dota 2'}),
+            ('game_time', datetime(2025, 3, 3, 11), {'game_name': 'Dota 2', 'minutes': 40}),
+            ('game_time', datetime(2025, 3, 9, 11), {'game_name': 'CS2', 'minutes': 15}),
+            ('voice_count', datetime(2025, 3, 4, 20), {}),
+            ('voice_time', datetime(2025, 3, 4, 21), {'minutes': 25}),
+            ('game_time', datetime(2025, 3, 10, 9), {'game_name': 'Dota 2', 'minutes': 5}),
+        ]
+        for op, when, args in events:
+            self._apply(op, when, user_id='1', username='Ana', **args)
+
+        now = datetime(2025, 3, 5, 12)
+        incremental = self.rollups.period_users('week', now)['1']
+
+        rebuilt = StatsRollups(lambda: self.live)
+        self.assertEqual(rebuilt.period_users('week', now)['1'], incremental)
+        self.assertEqual(incremental['game_minutes'], 55)
+        self.assertEqual(incremental['game_count'], 1)
+        self.assertEqual(incremental['voice_minutes'], 25)
+        self.assertEqual(incremental['games'], {'Dota 2': [40, 1], 'CS2': [15, 0]})
+
+        game = self.rollups.period_games('month', now)['Dota 2']
+        self.assertEqual((game['minutes'], game['count'], game['players']), (45, 1, {'1'}))
+
+    def test_sesiones_sin_desglose_diario(self):
+        """Los counts históricos sin daily_counts no suman en ningún período (el juego figura en 0)"""
+        self.live['users']['1'] = {
+            'username': 'Ana',
+            'games': {'LoL': {'count': 4, 'last_played': '2025-03-04T22:00:00',
+                              'total_minutes': 100, 'daily_minutes': {'2025-02-01': 100}}},
+            'voice': {'count': 0, 'last_join': None, 'total_minutes': 0},
+        }
+        now = datetime(2025, 3, 5)
+        self.assertEqual(self.rollups.user_totals('1', 'week', now)['games'], {'LoL': [0, 0]})
+        self.assertEqual(self.rollups.user_totals('1', 'year', now)['games'], {'LoL': [100, 0]})
+
+    def test_sesiones_historicas_incremental_igual_a_reconstruccion(self):
+        """Un usuario con count mayor a la suma de daily_counts juega hoy"""
+        self.live['users']['1'] = {
+            'username': 'Ana',
+            'games': {'LoL': {'count': 500, 'last_played': '2025-03-01T22:00:00', 'total_minutes': 9000,
+                              'daily_minutes': {}, 'daily_counts': {}}},
+            'voice': {'count': 0, 'last_join': None, 'total_minutes': 0},
+        }
+        now = datetime(2025, 3, 5, 20)
+        self.rollups.period_users('today', now)  # construir antes del evento
+        self._apply('game_count', now, user_id='1', username='Ana', game_name='LoL')
+
+        incremental = self.rollups.user_totals('1', 'today', now)
+        rebuilt = StatsRollups(lambda: self.live).user_totals('1', 'today', now)
+        self.assertEqual(incremental['game_count'], 1)
+        self.assertEqual(rebuilt, incremental)
+        for period in ('today', 'week', 'month', 'year'):
+            with self.subTest(period=period):
+                self.assertEqual(user_period_totals(self.live['users']['1'], period, now)['game_count'], 1)
+
+
+class TestFilterByPeriod(unittest.TestCase):
+    """La vista por período lleva solo los minutos del período"""
+
+    def test_minutos_del_periodo(self):
+        stats_data = {'users': {}, 'cooldowns': {}}
+        apply_mutation(stats_data, 'game_time', {'user_id': '1', 'username': 'Ana', 'game_name': 'Dota 2', 'minutes': 500},
+                       datetime(2025, 1, 10))
+        apply_mutation(stats_data, 'game_count', {'user_id': '1', 'username': 'Ana', 'game_name': 'Dota 2'},
+                       datetime(2025, 3, 4))
+        apply_mutation(stats_data, 'game_time', {'user_id': '1', 'username': 'Ana', 'game_name': 'Dota 2', 'minutes': 20},
+                       datetime(2025, 3, 4))
+
+        now = datetime(2025, 3, 5)
+        week = filter_stats_by_period(stats_data, 'week', now=now)
+        self.assertEqual(week['users']['1']['games']['Dota 2']['total_minutes'], 20)
+        self.assertEqual(week['users']['1']['games']['Dota 2']['count'], 1)
+
+        rollups = StatsRollups(lambda: stats_data)
+        self.assertEqual(filter_stats_by_period(stats_data, 'week', rollups=rollups, now=now), week)
+        self.assertIs(filter_stats_by_period(stats_data, 'all', now=now), stats_data)
+
+    def test_record_mutation_actualiza_rollups(self):
+        live = {'users': {}, 'cooldowns': {}}
+        with patch.object(persistence, 'stats', live), \
+                patch.object(persistence, 'save_stats'), \
+                patch.object(persistence, '_journal', None):
+            self.assertEqual(persistence.get_rollups().period_users('today'), {})
+            persistence.record_mutation('voice_time', user_id='1', username='Ana', minutes=12)
+            totals = persistence.get_rollups().user_totals('1', 'today')
+
+        self.assertEqual(totals['voice_minutes'], 12)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+"""
+Tests del scheduler de timers (core/scheduler.py)
+"""
+
+import asyncio
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+from core.base_session import BaseSession, BaseSessionManager
+from core.scheduler import Scheduler
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestScheduler(unittest.TestCase):
+    """Orden de disparo y cancelación"""
+
+    def setUp(self):
+        self.clock = _Clock()
+        self.scheduler = Scheduler(clock=self.clock)
+
+    def test_dispara_en_orden(self):
+        fired = []
+        self.scheduler.call_later(5, fired.append, 'b')
+        self.scheduler.call_later(1, fired.append, 'a')
+        handle = self.scheduler.call_later(9, fired.append, 'c')
+
+        self.clock.now = 6
+        self.assertEqual(self.scheduler.run_due(), 2)
+        self.assertEqual(fired, ['a', 'b'])
+        self.assertFalse(handle.done())
+        self.assertEqual(self.scheduler.pending(), 1)
+
+    def test_cancelar(self):
+        fired = []
+        cancelled = []
+        handle = self.scheduler.call_later(1, fired.append, 'x', on_cancel=lambda: cancelled.append(True))
+        handle.cancel()
+        handle.cancel()
+
+        self.clock.now = 2
+        self.assertEqual(self.scheduler.run_due(), 0)
+        self.assertEqual(fired, [])
+        self.assertEqual(cancelled, [True])
+        self.assertTrue(handle.done())
+        self.assertTrue(handle.cancelled())
+        self.assertEqual(self.scheduler.pending(), 0)
+
+    def test_compactacion(self):
+        handles = [self.scheduler.call_later(i, lambda: None) for i in range(300)]
+        for handle in handles[:250]:
+            handle.cancel()
+        self.assertEqual(self.scheduler.pending(), 50)
+        self.assertLess(len(self.scheduler._heap), 300)
+
+
+class TestSchedulerAsync(unittest.TestCase):
+    """La task del scheduler dispara corrutinas sin una task dormida por timer"""
+
+    def test_corrutinas(self):
+        async def scenario():
+            scheduler = Scheduler()
+            fired = []
+
+            async def job(name):
+                fired.append(name)
+
+            scheduler.call_later(0.02, job, 'tarde')
+            scheduler.call_later(0.01, job, 'temprano')
+            cancelled = scheduler.call_later(0.01, job, 'cancelado')
+            cancelled.cancel()
+            await asyncio.sleep(0.08)
+            scheduler.stop()
+            return fired
+
+        self.assertEqual(asyncio.run(scenario()), ['temprano', 'tarde'])
+
+
+class _Manager(BaseSessionManager):
+    """Manager mínimo para probar las fases de verificación"""
+
+    VERIFY_PHASE1_DELAY = 0.01
+    VERIFY_PHASE2_DELAY = 0.01
+
+    def __init__(self):
+        super().__init__(MagicMock(), grace_period_seconds=1)
+        self.active = True
+        self.phases = []
+
+    async def handle_start(self, member, config, *args, **kwargs):
+        pass
+
+    async def handle_end(self, member, config, *args, **kwargs):
+        pass
+
+    async def _is_still_active(self, session, member):
+        return self.active
+
+    async def _on_session_confirmed_phase1(self, session, member, config):
+        self.phases.append(1)
+
+    async def _on_session_confirmed_phase2(self, session, member, config):
+        self.phases.append(2)
+
+
+class TestVerificacionConTimers(unittest.TestCase):
+    """Fases de verificación y vencimiento de gracia"""
+
+    def test_confirma_en_dos_fases(self):
+        async def scenario():
+            manager = _Manager()
+            session = BaseSession('1', 'Ana', 1)
+            manager.active_sessions['1'] = session
+            manager._start_verification(session, None, {})
+            await asyncio.sleep(0.1)
+            return manager, session
+
+        manager, session = asyncio.run(scenario())
+        self.assertEqual(manager.phases, [1, 2])
+        self.assertTrue(session.is_confirmed)
+        self.assertTrue(session.verification_task.done())
+
+    def test_cancelar_antes_de_fase1_limpia_la_sesion(self):
+        async def scenario():
+            manager = _Manager()
+            session = BaseSession('1', 'Ana', 1)
+            manager.active_sessions['1'] = session
+            manager._start_verification(session, None, {})
+            session.verification_task.cancel()
+            await asyncio.sleep(0.05)
+            return manager
+
+        manager = asyncio.run(scenario())
+        self.assertEqual(manager.phases, [])
+        self.assertEqual(manager.active_sessions, {})
+
+    def test_gracia_vence_en_su_deadline(self):
+        async def scenario():
+            manager = _Manager()
+            manager.grace_period_seconds = 1.02  # el timer agrega 1s de margen
+            session = BaseSession('1', 'Ana', 1)
+            session.last_activity_update = datetime.now() - timedelta(seconds=1)
+            expired = asyncio.Event()
+            manager._schedule_grace_expiry(session, expired.set)
+            await asyncio.wait_for(expired.wait(), 1.5)
+            return session
+
+        session = asyncio.run(scenario())
+        self.assertTrue(session.grace_timer.done())
+
+
+if __name__ == '__main__':
+    unittest.main()
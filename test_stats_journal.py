@@ -0,0 +1,195 @@
+"""
+Tests del journal (WAL) de mutaciones de estadísticas
+"""
+
+import json
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import patch
+
+import core.persistence as persistence
+from core.stats_repository import JsonStatsRepository
+from core.stats_journal import StatsJournal
+from core.stats_mutations import apply_mutation
+
+
+def _empty_stats():
+    return {'users': {}, 'cooldowns': {}}
+
+
+class TestStatsMutations(unittest.TestCase):
+    """Las mutaciones son deterministas: dependen solo del timestamp del evento"""
+
+    def test_connection_usa_fecha_del_evento(self):
+        stats = _empty_stats()
+        when = datetime(2025, 3, 1, 23, 59)
+        self.assertEqual(apply_mutation(stats, 'connection', {'user_id': '1', 'username': 'A'}, when), (1, True))
+        self.assertEqual(apply_mutation(stats, 'connection', {'user_id': '1', 'username': 'A'}, when), (2, True))
+
+        connections = stats['users']['1']['daily_connections']
+        self.assertEqual(connections['by_date'], {'2025-03-01': 2})
+        self.assertEqual(connections['personal_record'], {'count': 2, 'date': '2025-03-01'})
+
+    def test_game_time_crea_juego(self):
+        stats = _empty_stats()
+        when = datetime(2025, 3, 1, 10, 0)
+        apply_mutation(stats, 'game_time', {'user_id': '1', 'username': 'A', 'game_name': 'Dota 2', 'minutes': 30}, when)
+
+        game = stats['users']['1']['games']['Dota 2']
+        self.assertEqual(game['total_minutes'], 30)
+        self.assertEqual(game['daily_minutes'], {'2025-03-01': 30})
+        self.assertEqual(game['first_played'], when.isoformat())
+
+
+class TestStatsJournal(unittest.TestCase):
+    """Tests de append / replay del journal"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmpdir.name) / 'stats.journal'
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _write_events(self, journal, events):
+        journal.open()
+        for seq, (op, args) in enumerate(events, 1):
+            journal.append(seq, op, args, datetime(2025, 3, 1, 12, seq))
+        journal.close()
+
+    def test_replay_reproduce_el_estado(self):
+        events = [
+            ('message', {'user_id': '1', 'username': 'A', 'message_length': 5}),
+            ('message', {'user_id': '1', 'username': 'A', 'message_length': 7}),
+            ('reaction', {'user_id': '2', 'username': 'B', 'emoji': '🔥'}),
+        ]
+        journal = StatsJournal(self.path)
+        self._write_events(journal, events)
+
+        stats = _empty_stats()
+        last_seq = journal.replay(stats)
+
+        self.assertEqual(last_seq, 3)
+        self.assertEqual(stats['users']['1']['messages']['count'], 2)
+        self.assertEqual(stats['users']['1']['messages']['characters'], 12)
+        self.assertEqual(stats['users']['2']['reactions']['by_emoji'], {'🔥': 1})
+
+    def test_replay_ignora_eventos_del_snapshot(self):
+        events = [('message', {'user_id': '1', 'username': 'A', 'message_length': 1})] * 3
+        journal = StatsJournal(self.path)
+        self._write_events(journal, events)
+
+        stats = _empty_stats()
+        self.assertEqual(journal.replay(stats, after_seq=2), 3)
+        self.assertEqual(stats['users']['1']['messages']['count'], 1)
+
+    def test_linea_cortada_por_crash(self):
+        """Una última línea incompleta se ignora y no corrompe el próximo registro"""
+        journal = StatsJournal(self.path)
+        self._write_events(journal, [('voice_count', {'user_id': '1', 'username': 'A'})])
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write('{"seq":2,"ts":"2025-03-')
+
+        journal = StatsJournal(self.path)
+        journal.open()
+        self.assertEqual(journal.record_count, 1)
+        journal.append(3, 'voice_count', {'user_id': '1', 'username': 'A'}, datetime(2025, 3, 1))
+        journal.close()
+
+        stats = _empty_stats()
+        self.assertEqual(journal.replay(stats), 3)
+        self.assertEqual(stats['users']['1']['voice']['count'], 2)
+
+
+    def test_truncate_hasta_marca_conserva_posteriores(self):
+        """Los eventos que llegan mientras se escribe el snapshot no se pierden"""
+        journal = StatsJournal(self.path)
+        journal.open()
+        args = {'user_id': '1', 'username': 'A', 'message_length': 3}
+        journal.append(1, 'message', args, datetime(2025, 3, 1, 12, 0))
+        journal.append(2, 'message', args, datetime(2025, 3, 1, 12, 1))
+        mark = journal.mark()
+        journal.append(3, 'message', args, datetime(2025, 3, 1, 12, 2))
+
+        journal.truncate(upto=mark)
+        self.assertEqual(journal.record_count, 1)
+        journal.append(4, 'message', args, datetime(2025, 3, 1, 12, 3))
+        journal.close()
+        self.assertEqual([r['seq'] for r in journal.iter_records()], [3, 4])
+
+    def test_marca_vieja_no_trunca(self):
+        """Un truncate completo posterior invalida las marcas anteriores"""
+        journal = StatsJournal(self.path)
+        journal.open()
+        args = {'user_id': '1', 'username': 'A', 'message_length': 3}
+        journal.append(1, 'message', args, datetime(2025, 3, 1, 12, 0))
+        mark = journal.mark()
+        journal.truncate()
+        journal.append(2, 'message', args, datetime(2025, 3, 1, 12, 1))
+
+        journal.truncate(upto=mark)
+        journal.close()
+        self.assertEqual([r['seq'] for r in journal.iter_records()], [2])
+
+
+class TestRecordMutationConJournal(unittest.TestCase):
+    """Integración record_mutation + compactación + replay en persistence"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        tmp = Path(self.tmpdir.name)
+        self.stats_file = tmp / 'stats.json'
+        self.journal_file = tmp / 'stats.journal'
+        self.journal = StatsJournal(self.journal_file)
+        self.patches = [
+            patch.object(persistence, '_repository', JsonStatsRepository(self.stats_file)),
+            patch.object(persistence, 'STATS_JOURNAL_FILE', self.journal_file),
+            patch.object(persistence, 'stats', _empty_stats()),
+            patch.object(persistence, '_journal', self.journal),
+            patch.object(persistence, '_journal_seq', 0),
+            patch.object(persistence, '_pending_changes', 0),
+            patch.object(persistence, '_compactor', None),
+        ]
+        for p in self.patches:
+            p.start()
+        self.journal.open()
+
+    def tearDown(self):
+        self.journal.close()
+        for p in reversed(self.patches):
+            p.stop()
+        self.tmpdir.cleanup()
+
+    def _record_messages(self, count):
+        for _ in range(count):
+            persistence.record_mutation('message', user_id='1', username='A', message_length=3)
+
+    def test_mutacion_va_al_journal_no_al_snapshot(self):
+        self._record_messages(2)
+        self.assertFalse(self.stats_file.exists())
+        self.assertEqual(self.journal.record_count, 2)
+        self.assertTrue(persistence.has_pending_changes())
+
+    def test_compactar_y_recuperar(self):
+        """Snapshot + journal posterior se recuperan igual que el estado en memoria"""
+        self._record_messages(3)
+        self.assertTrue(persistence.compact_journal())
+        self.assertEqual(self.journal.record_count, 0)
+
+        with open(self.stats_file, 'r', encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['_journal_seq'], 3)
+
+        self._record_messages(2)
+        expected = json.loads(json.dumps(persistence.stats))
+
+        # Simular reinicio: cargar snapshot y re-aplicar el journal
+        persistence.stats = persistence.load_stats()
+        persistence._replay_journal()
+        self.assertEqual(persistence.stats, expected)
+        self.assertEqual(persistence._journal_seq, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
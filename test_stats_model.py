@@ -0,0 +1,192 @@
+"""
+Tests del modelo tipado de estadísticas (core/stats_model.py)
+"""
+
+import unittest
+from datetime import date, datetime
+
+from benchmarks.dataset import generate_stats
+from core.stats_model import DayCounts, GameStats, StatsModel, UserStats, new_user_dict
+from core.stats_mutations import apply_mutation
+from stats.data import (
+    aggregate_game_stats, aggregate_game_time_by_user, aggregate_message_stats, aggregate_voice_stats,
+    calculate_total_server_time, get_game_stats_detailed, get_top_players_for_game,
+)
+
+
+class TestDayCounts(unittest.TestCase):
+
+    def test_roundtrip_con_huecos_y_ceros(self):
+        by_date = {'2025-03-01': 30, '2025-03-05': 0, '2025-02-27': 12}
+        days = DayCounts.from_dict(by_date)
+        self.assertEqual(days.to_dict(), by_date)
+        self.assertEqual(days.total(), 42)
+        self.assertEqual(len(days), 3)
+        self.assertEqual(days.get(date(2025, 3, 1)), 30)
+        self.assertEqual(days.get(date(2024, 1, 1)), 0)
+
+    def test_add_extiende_en_ambos_sentidos(self):
+        days = DayCounts()
+        days.add(date(2025, 3, 10), 5)
+        days.add(date(2025, 3, 8), 2)
+        days.add(date(2025, 3, 12), 1)
+        days.add(date(2025, 3, 10), 1)
+        self.assertEqual(days.to_dict(), {'2025-03-08': 2, '2025-03-10': 6, '2025-03-12': 1})
+
+    def test_valores_grandes_pasan_a_4_bytes(self):
+        days = DayCounts.from_dict({'2025-03-01': 60000})
+        self.assertEqual(days.values.itemsize, 2)
+        days.add(date(2025, 3, 1), 10000)
+        self.assertEqual(days.get(date(2025, 3, 1)), 70000)
+        self.assertEqual(DayCounts.from_dict({'2025-03-01': 100000}).to_dict(), {'2025-03-01': 100000})
+
+    def test_valores_invalidos(self):
+        with self.assertRaises(ValueError):
+            DayCounts.from_dict({'2025-03-01': 1.5})
+        with self.assertRaises(ValueError):
+            DayCounts.from_dict({'ayer': 1})
+
+
+class TestDayCountsRangos(unittest.TestCase):
+
+    def setUp(self):
+        self.days = DayCounts.from_dict({
+            '2024-12-30': 10, '2024-12-31': 20, '2025-01-01': 30, '2025-01-02': 0,
+            '2025-01-03': 5, '2025-01-04': 7, '2025-01-05': 9, '2025-03-01': 40,
+        })
+
+    def test_range_sum_y_dias_activos(self):
+        self.assertEqual(self.days.range_sum(), 121)
+        self.assertEqual(self.days.range_sum(date(2025, 1, 1), date(2025, 1, 31)), 51)
+        self.assertEqual(self.days.range_sum(date(2020, 1, 1), date(2020, 12, 31)), 0)
+        self.assertEqual(self.days.range_sum(date(2025, 3, 1), date(2030, 1, 1)), 40)
+        self.assertEqual(self.days.active_days(date(2025, 1, 1), date(2025, 12, 31)), 5)
+        self.assertEqual(DayCounts().range_sum(date(2025, 1, 1), date(2025, 1, 2)), 0)
+
+    def test_max_day_y_racha(self):
+        self.assertEqual(self.days.max_day(), (date(2025, 3, 1), 40))
+        self.assertEqual(self.days.max_day(date(2024, 1, 1), date(2024, 12, 31)), (date(2024, 12, 31), 20))
+        self.assertIsNone(self.days.max_day(date(2025, 2, 1), date(2025, 2, 28)))
+        # El día con 0 corta la racha
+        self.assertEqual(self.days.longest_streak(), 3)
+        self.assertEqual(self.days.longest_streak(date(2024, 12, 31), date(2025, 1, 1)), 2)
+        self.assertEqual(DayCounts().longest_streak(), 0)
+
+    def test_recorte_por_anio(self):
+        year = self.days.year(2025)
+        self.assertEqual(year.to_dict(), {'2025-01-01': 30, '2025-01-02': 0, '2025-01-03': 5,
+                                          '2025-01-04': 7, '2025-01-05': 9, '2025-03-01': 40})
+        self.assertEqual(self.days.year(2023).to_dict(), {})
+        # El recorte es una copia
+        year.add(date(2025, 1, 1), 1)
+        self.assertEqual(self.days.get(date(2025, 1, 1)), 30)
+
+    def test_combine(self):
+        other = DayCounts.from_dict({'2025-01-01': 65530, '2025-01-10': 1})
+        combined = DayCounts.combine([self.days, DayCounts(), other])
+        self.assertEqual(combined.get(date(2025, 1, 1)), 65560)
+        self.assertEqual(combined.total(), self.days.total() + other.total())
+        self.assertEqual(combined.to_dict()['2025-01-02'], 0)
+        self.assertEqual(DayCounts.combine([]).to_dict(), {})
+        self.assertEqual(DayCounts.combine([self.days]), self.days)
+
+
+class TestRecords(unittest.TestCase):
+
+    def test_roundtrip_dataset(self):
+        data = generate_stats(30, days=90, party_history=0, seed=5, end=datetime(2025, 6, 30))
+        for user_id, user_data in data['users'].items():
+            self.assertEqual(UserStats.from_dict(user_data).to_dict(), user_data)
+
+    def test_roundtrip_datos_viejos(self):
+        """Secciones faltantes, claves desconocidas y formas inesperadas se conservan"""
+        legacy = {
+            'username': 'A',
+            'games': {'Hades': {'count': 2, 'total_minutes': 40, 'legacy_flag': True}},
+            'messages': {'count': 3},
+            'daily_connections': {'total': 1, 'by_date': {'2025-01-01': 1}, 'personal_record': {'count': 1, 'date': '2025-01-01'}},
+            'voice': {'count': 1, 'total_minutes': 5, 'daily_minutes': {'2025-01-01': 'x'}},
+            'custom': [1, 2],
+        }
+        record = UserStats.from_dict(legacy)
+        self.assertEqual(record.to_dict(), legacy)
+        self.assertIsNone(record.reactions)
+        self.assertEqual(record.games['Hades'].daily_minutes.total(), 0)
+        self.assertEqual(record.voice_minutes, 5)
+        self.assertEqual(record.game_minutes, 40)
+
+    def test_template_de_usuario(self):
+        user = new_user_dict('A')
+        self.assertEqual(set(user), {'username', 'games', 'voice', 'messages', 'reactions', 'stickers',
+                                     'daily_connections'})
+        self.assertNotIn('daily_counts', user['voice'])
+        self.assertEqual(UserStats.from_dict(user).to_dict(), user)
+
+    def test_slots(self):
+        record = GameStats.empty()
+        with self.assertRaises(AttributeError):
+            record.otro = 1
+
+
+class TestStatsModel(unittest.TestCase):
+
+    def setUp(self):
+        self.stats = generate_stats(40, days=60, party_history=20, seed=9, end=datetime(2025, 6, 30))
+        self.model = StatsModel(lambda: self.stats)
+
+    def test_actualiza_solo_usuarios_marcados(self):
+        users = self.model.users()
+        user_id = next(iter(self.stats['users']))
+        untouched = next(uid for uid in users if uid != user_id)
+        before_untouched = users[untouched]
+
+        apply_mutation(self.stats, 'game_time', {'user_id': user_id, 'username': 'X', 'game_name': 'Nuevo',
+                                                 'minutes': 15}, datetime(2025, 6, 30, 20, 0))
+        self.model.mark_user_dirty(user_id)
+
+        users = self.model.users()
+        self.assertEqual(users[user_id].games['Nuevo'].total_minutes, 15)
+        self.assertEqual(users[user_id].to_dict(), self.stats['users'][user_id])
+        self.assertIs(users[untouched], before_untouched)
+
+    def test_usuarios_nuevos_sin_marcar(self):
+        self.model.users()
+        apply_mutation(self.stats, 'message', {'user_id': 'nuevo', 'username': 'N', 'message_length': 4},
+                       datetime(2025, 6, 30, 20, 0))
+        self.assertEqual(self.model.user('nuevo').messages.count, 1)
+
+    def test_agregadores_con_y_sin_modelo(self):
+        game = next(iter(aggregate_game_stats(self.stats)))
+        self.assertEqual(aggregate_game_stats(self.stats, model=self.model), aggregate_game_stats(self.stats))
+        for func in (aggregate_voice_stats, aggregate_game_time_by_user, aggregate_message_stats,
+                     calculate_total_server_time):
+            with self.subTest(func=func.__name__):
+                self.assertEqual(func(self.stats, model=self.model), func(self.stats))
+        self.assertEqual(get_game_stats_detailed(self.stats, game, model=self.model),
+                         get_game_stats_detailed(self.stats, game))
+        self.assertEqual(get_top_players_for_game(self.stats, game, model=self.model),
+                         get_top_players_for_game(self.stats, game))
+
+    def test_ranking_de_conexiones_igual_a_los_arrays(self):
+        """La suma por período del dict coincide con range_sum de los arrays del modelo"""
+        from core.rollups import period_range
+        from stats.embeds import _connection_rows
+        for timeframe in ('today', 'week', 'month'):
+            first, last = (date.fromisoformat(day) for day in period_range(timeframe))
+            expected = sorted(
+                (user.username, user.daily_connections.by_date.range_sum(first, last))
+                for user in self.model.users().values() if user.daily_connections is not None
+            )
+            with self.subTest(timeframe=timeframe):
+                self.assertEqual(sorted(row[:2] for row in _connection_rows(self.stats, timeframe)), expected)
+
+    def test_wrapped_con_registro_del_modelo(self):
+        from stats.commands.wrapped import _calculate_gaming_stats, _calculate_voice_stats
+        for user_id, user_data in self.stats['users'].items():
+            record = self.model.user(user_id)
+            self.assertEqual(_calculate_gaming_stats(record, 2025), _calculate_gaming_stats(user_data, 2025))
+            self.assertEqual(_calculate_voice_stats(record, 2025), _calculate_voice_stats(user_data, 2025))
+
+
+if __name__ == '__main__':
+    unittest.main()
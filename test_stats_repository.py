@@ -0,0 +1,226 @@
+"""
+Tests del repositorio de estadísticas (backends JSON y SQLite)
+"""
+
+import json
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import patch
+
+import core.persistence as persistence
+from core.sqlite_repository import SqliteStatsRepository
+from core.stats_mutations import apply_mutation
+from core.stats_repository import JsonStatsRepository
+
+
+def _sample_stats():
+    """Dataset chico con juegos, voz, mensajes, conexiones y parties"""
+    now = datetime.now()
+    recent = now.isoformat()
+    today = now.strftime('%Y-%m-%d')
+    old = (now - timedelta(days=90)).isoformat()
+    return {
+        'users': {
+            '1': {
+                'username': 'Ana',
+                'games': {
+                    'Dota 2': {'count': 5, 'first_played': old, 'last_played': recent, 'total_minutes': 300,
+                               'daily_minutes': {'2025-01-01': 100, '2025-01-02': 170, today: 30},
+                               'daily_counts': {today: 2}, 'current_session': None},
+                },
+                'voice': {'count': 3, 'last_join': recent, 'total_minutes': 50,
+                          'daily_minutes': {'2025-01-01': 40, today: 10}, 'current_session': None},
+                'messages': {'count': 10, 'characters': 200, 'last_message': recent},
+                'reactions': {'total': 4, 'by_emoji': {'🔥': 4}},
+                'stickers': {'total': 0, 'by_name': {}},
+                'daily_connections': {'total': 2, 'by_date': {'2025-01-01': 2},
+                                      'personal_record': {'count': 2, 'date': '2025-01-01'}},
+            },
+            '2': {
+                'username': 'Beto',
+                'games': {
+                    'CS2': {'count': 2, 'first_played': old, 'last_played': old, 'total_minutes': 500,
+                            'daily_minutes': {'2024-10-01': 500}, 'current_session': None},
+                },
+                'voice': {'count': 1, 'last_join': old, 'total_minutes': 120,
+                          'daily_minutes': {'2024-10-01': 120}, 'current_session': None},
+                'messages': {'count': 30, 'characters': 900, 'last_message': old},
+                'reactions': {'total': 0, 'by_emoji': {}},
+                'stickers': {'total': 1, 'by_name': {'hola': 1}},
+                'daily_connections': {'total': 0, 'by_date': {},
+                                      'personal_record': {'count': 0, 'date': None}},
+            },
+        },
+        'cooldowns': {'1:game:Dota 2': recent},
+        'parties': {
+            'active': {},
+            'history': [
+                {'game': 'Dota 2', 'start': recent, 'end': recent, 'duration_minutes': 40,
+                 'players': ['1', '2'], 'player_names': ['Ana', 'Beto'], 'max_players': 2},
+                {'game': 'Dota 2', 'start': old, 'end': old, 'duration_minutes': 20,
+                 'players': ['1'], 'player_names': ['Ana'], 'max_players': 2},
+            ],
+            'stats_by_game': {'Dota 2': {'total_parties': 2}},
+        },
+        '_journal_seq': 7,
+    }
+
+
+class TestSqliteRepository(unittest.TestCase):
+    """El backend SQLite reconstruye el dict sin pérdidas y resuelve rankings por SQL"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.repo = SqliteStatsRepository(Path(self.tmpdir.name) / 'stats.db')
+
+    def tearDown(self):
+        self.repo.close()
+        self.tmpdir.cleanup()
+
+    def test_base_vacia(self):
+        self.assertIsNone(self.repo.load())
+
+    def test_roundtrip_sin_perdidas(self):
+        data = _sample_stats()
+        self.repo.save_snapshot(data, include_days=True)
+        self.assertEqual(self.repo.load(), data)
+
+    def test_modo_wal(self):
+        mode = self.repo._conn.execute('PRAGMA journal_mode').fetchone()[0]
+        self.assertEqual(mode.lower(), 'wal')
+
+    def test_record_mutation_persiste_el_dia(self):
+        data = _sample_stats()
+        self.repo.save_snapshot(data, include_days=True)
+
+        when = datetime(2025, 1, 2, 18, 0)
+        args = {'user_id': '1', 'username': 'Ana', 'game_name': 'Dota 2', 'minutes': 15}
+        apply_mutation(data, 'game_time', args, when)
+        self.repo.record_mutation(data, 'game_time', args, when)
+
+        loaded = self.repo.load()
+        self.assertEqual(loaded['users']['1']['games']['Dota 2']['daily_minutes']['2025-01-02'], 185)
+        self.assertEqual(loaded['users']['1']['games']['Dota 2']['total_minutes'], 315)
+
+    def test_snapshot_reescribe_historial_de_parties_si_cambia(self):
+        data = _sample_stats()
+        self.repo.save_snapshot(data, include_days=True)
+
+        data['parties']['history'].insert(0, {'game': 'CS2', 'start': 'x', 'players': ['2']})
+        self.repo.save_snapshot(data)
+        self.assertEqual(len(self.repo.load()['parties']['history']), 3)
+        self.assertEqual(self.repo.load()['parties']['history'][0]['game'], 'CS2')
+
+    def test_snapshot_persiste_party_actualizada_en_el_lugar(self):
+        data = _sample_stats()
+        data['parties']['history'].append({'game': 'CS2', 'start': 'x', 'players': ['2']})
+        self.repo.save_snapshot(data, include_days=True)
+
+        # Como PartyHistoryStore.record(): entrada del medio, mismo largo
+        entry = data['parties']['history'][1]
+        updated = dict(entry, duration_minutes=35, players=['1', '2'])
+        entry.clear()
+        entry.update(updated)
+        self.repo.save_snapshot(data)
+        self.assertEqual(self.repo.load()['parties']['history'][1]['duration_minutes'], 35)
+        self.assertEqual(self.repo.load()['parties'], data['parties'])
+
+    def test_snapshot_normal_solo_reescribe_usuarios_marcados(self):
+        data = _sample_stats()
+        self.repo.save_snapshot(data, include_days=True)
+
+        # Sin record_mutation ni mark_user_dirty el snapshot no toca los usuarios
+        data['users']['1']['username'] = 'Ana María'
+        data['cooldowns']['2:voice'] = 'x'
+        self.repo.save_snapshot(data)
+        loaded = self.repo.load()
+        self.assertEqual(loaded['users']['1']['username'], 'Ana')
+        self.assertEqual(loaded['cooldowns']['2:voice'], 'x')
+
+        self.repo.mark_user_dirty('1')
+        self.repo.save_snapshot(data)
+        self.assertEqual(self.repo.load()['users']['1']['username'], 'Ana María')
+
+    def test_snapshot_borra_usuarios_eliminados(self):
+        data = _sample_stats()
+        self.repo.save_snapshot(data, include_days=True)
+
+        del data['users']['1']
+        self.repo.mark_user_dirty('1')
+        self.repo.save_snapshot(data)
+        self.assertEqual(self.repo.load(), data)
+        for table in ('user_games', 'game_days', 'game_day_counts', 'voice_days', 'connections'):
+            count = self.repo._conn.execute(f'SELECT COUNT(*) FROM {table} WHERE user_id = ?', ('1',)).fetchone()[0]
+            self.assertEqual(count, 0, table)
+
+
+class TestRankingsParity(unittest.TestCase):
+    """JSON y SQLite devuelven los mismos rankings"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.data = _sample_stats()
+        self.data.pop('_journal_seq')
+        self.sqlite = SqliteStatsRepository(Path(self.tmpdir.name) / 'stats.db')
+        self.sqlite.save_snapshot(self.data, include_days=True)
+        self.json = JsonStatsRepository(Path(self.tmpdir.name) / 'stats.json')
+        self.patcher = patch.object(persistence, 'stats', self.data)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.sqlite.close()
+        self.tmpdir.cleanup()
+
+    def test_top_game_time(self):
+        for period in ('all', 'week', 'month'):
+            self.assertEqual(self.sqlite.top_game_time(period), self.json.top_game_time(period), period)
+        self.assertEqual(self.sqlite.top_game_time('all')[0][0], 'Beto')
+        self.assertEqual(self.sqlite.top_game_time('week'), [('Ana', 30, 2, 1)])
+
+    def test_top_voice_time(self):
+        for period in ('all', 'week'):
+            self.assertEqual(self.sqlite.top_voice_time(period), self.json.top_voice_time(period), period)
+        self.assertEqual(self.sqlite.top_voice_time('today'), [('Ana', 10, 0)])
+        self.assertEqual(self.json.top_voice_time('today'), [('Ana', 10, 0)])
+
+    def test_top_messages_con_limite(self):
+        self.assertEqual(self.sqlite.top_messages(limit=1), self.json.top_messages(limit=1))
+        self.assertEqual(self.sqlite.top_messages(limit=1), [('Beto', 30, 900)])
+
+    def test_user_rankings(self):
+        for user_id in ('1', '2'):
+            self.assertEqual(self.sqlite.user_rankings(user_id), self.json.user_rankings(user_id))
+        self.assertEqual(self.sqlite.user_rankings('1'), {'gaming': 2, 'social': 2, 'parties': 1})
+
+
+class TestMigracionJsonASqlite(unittest.TestCase):
+    """Al cambiar a SQLite con la base vacía se importa stats.json + journal"""
+
+    def test_migracion(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            data = _sample_stats()
+            (tmp / 'stats.json').write_text(json.dumps(data), encoding='utf-8')
+            (tmp / 'stats.journal').write_text(
+                json.dumps({'seq': 8, 'ts': '2025-01-03T10:00:00', 'op': 'message',
+                            'args': {'user_id': '2', 'username': 'Beto', 'message_length': 4}}) + '\n',
+                encoding='utf-8'
+            )
+
+            repo = SqliteStatsRepository(tmp / 'stats.db')
+            with patch.object(persistence, '_repository', repo), \
+                    patch.object(persistence, 'STATS_FILE', tmp / 'stats.json'), \
+                    patch.object(persistence, 'STATS_JOURNAL_FILE', tmp / 'stats.journal'):
+                loaded = persistence.load_stats()
+
+            self.assertEqual(loaded['users']['2']['messages']['count'], 31)
+            self.assertEqual(loaded['_journal_seq'], 8)
+            self.assertEqual(repo.load()['users']['2']['messages']['count'], 31)
+            repo.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+Tests de los snapshots de solo lectura (core/stats_snapshot.py)
+"""
+
+import unittest
+from unittest.mock import patch
+
+import core.persistence as persistence
+from core.stats_snapshot import StatsSnapshotProvider
+
+
+def _stats():
+    return {
+        'users': {
+            '1': {'username': 'Ana', 'messages': {'count': 1}},
+            '2': {'username': 'Beto', 'messages': {'count': 5}},
+        },
+        'cooldowns': {},
+        'parties': {'history': []},
+    }
+
+
+class TestStatsSnapshotProvider(unittest.TestCase):
+    """Copy-on-write por usuario y versionado"""
+
+    def setUp(self):
+        self.live = _stats()
+        self.provider = StatsSnapshotProvider(lambda: self.live)
+
+    def test_snapshot_se_reutiliza_sin_cambios(self):
+        self.assertIs(self.provider.get(), self.provider.get())
+
+    def test_snapshot_es_independiente_del_store(self):
+        snapshot = self.provider.get()
+        self.live['users']['1']['messages']['count'] = 99
+        self.provider.mark_user_dirty('1')
+
+        self.assertEqual(snapshot['users']['1']['messages']['count'], 1)
+        self.assertEqual(self.provider.get()['users']['1']['messages']['count'], 99)
+
+    def test_solo_se_copian_usuarios_modificados(self):
+        first = self.provider.get()
+        self.live['users']['1']['messages']['count'] += 1
+        self.provider.mark_user_dirty('1')
+        second = self.provider.get()
+
+        self.assertIsNot(first, second)
+        self.assertIsNot(first['users']['1'], second['users']['1'])
+        self.assertIs(first['users']['2'], second['users']['2'])
+        self.assertIs(first['parties'], second['parties'])
+
+    def test_usuarios_nuevos_aparecen(self):
+        self.provider.get()
+        self.live['users']['3'] = {'username': 'Caro'}
+        self.provider.mark_user_dirty('3')
+        self.assertIn('3', self.provider.get()['users'])
+
+    def test_claves_raiz(self):
+        first = self.provider.get()
+        self.live['parties']['history'].append({'game': 'CS2'})
+        self.provider.mark_root_dirty()
+        second = self.provider.get()
+
+        self.assertEqual(first['parties']['history'], [])
+        self.assertEqual(second['parties']['history'], [{'game': 'CS2'}])
+        self.assertIs(first['users']['1'], second['users']['1'])
+
+    def test_store_reemplazado(self):
+        self.provider.get()
+        self.live = {'users': {'9': {'username': 'Zoe'}}}
+        self.assertEqual(list(self.provider.get()['users']), ['9'])
+
+
+class TestGetStatsSnapshot(unittest.TestCase):
+    """Integración con record_mutation en persistence"""
+
+    def test_record_mutation_invalida_el_usuario(self):
+        live = {'users': {}, 'cooldowns': {}}
+        with patch.object(persistence, 'stats', live), \
+                patch.object(persistence, 'save_stats'), \
+                patch.object(persistence, '_journal', None):
+            before = persistence.get_stats_snapshot()
+            persistence.record_mutation('message', user_id='1', username='Ana', message_length=4)
+            after = persistence.get_stats_snapshot()
+
+        self.assertNotIn('1', before['users'])
+        self.assertEqual(after['users']['1']['messages']['count'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -236,6 +236,22 @@ class TestWrappedEdgeCases(unittest.TestCase):
         self.assertIsNone(stats)
 
 
+@unittest.skipIf(_SKIP_DISCORD, 'discord.py requerido (pip install discord.py)')
+class TestWrappedRender(unittest.TestCase):
+    """Tests del embed armado desde secciones precalculadas"""
+    
+    def test_render_desde_secciones(self):
+        from benchmarks.dataset import generate_stats
+        from stats.commands.wrapped import compute_wrapped_year, render_wrapped_embed
+        
+        stats = generate_stats(5, days=200, party_history=20, seed=3, end=datetime(2025, 6, 30))
+        user_id = next(iter(stats['users']))
+        embed = render_wrapped_embed('Test', 2025, compute_wrapped_year(stats, 2025).get(user_id))
+        self.assertIn('2025', embed.title)
+        self.assertIn('2025', embed.footer.text)
+        self.assertGreater(len(embed.fields), 0)
+
+
 if __name__ == '__main__':
     # Ejecutar tests
     unittest.main(verbosity=2)
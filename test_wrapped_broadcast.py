@@ -0,0 +1,218 @@
+"""
+Tests del envío masivo del Wrapped (core/wrapped_broadcast.py, core/rate_limits.py)
+"""
+
+import asyncio
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import discord
+
+from benchmarks.dataset import generate_stats
+from core.atomic_io import get_io_executor
+from core.rate_limits import RateLimitTracker
+from core.wrapped_broadcast import WrappedBroadcast, iter_batches, load_cursor
+
+
+class FakeMember:
+    def __init__(self, user_id: str):
+        self.id = int(user_id)
+        self.display_name = f'user{user_id}'
+        self.mention = f'<@{user_id}>'
+
+
+class FakeGuild:
+    def __init__(self, members):
+        self._members = {member.id: member for member in members}
+
+    def get_member(self, member_id: int):
+        return self._members.get(member_id)
+
+
+class FakeBot:
+    def __init__(self, members):
+        self.guilds = [FakeGuild(members)]
+
+
+class FakeChannel:
+    id = 99
+
+    def __init__(self, fail_on: int = 0, http_error: bool = False):
+        self.messages = []
+        self.fail_on = fail_on
+        self.http_error = http_error
+
+    async def send(self, content=None, embeds=None):
+        if self.fail_on and len(self.messages) + 1 == self.fail_on:
+            if self.http_error:
+                raise discord.HTTPException(Mock(status=500, reason='Server Error'), 'caído')
+            raise RuntimeError('reinicio')
+        self.messages.append((content, embeds or []))
+
+
+def small_render(username, year, sections):
+    return discord.Embed(title=username, description='x' * 100)
+
+
+def drain_io():
+    """Espera las escrituras del cursor pendientes en el thread de I/O"""
+    get_io_executor().submit(lambda: None).result()
+
+
+class TestRateLimitTracker(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 100.0
+        self.tracker = RateLimitTracker(clock=lambda: self.now)
+
+    def test_headers_por_ruta(self):
+        self.assertIsNone(self.tracker.delay('POST', '/channels/1/messages'))
+
+        self.tracker.observe('POST', '/api/v10/channels/1/messages',
+                             {'X-RateLimit-Remaining': '3', 'X-RateLimit-Reset-After': '4.0'})
+        self.assertEqual(self.tracker.delay('POST', '/channels/1/messages'), 0.0)
+
+        self.tracker.observe('POST', '/api/v10/channels/1/messages',
+                             {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset-After': '2.5'})
+        self.assertAlmostEqual(self.tracker.delay('POST', '/channels/1/messages'), 2.5)
+        self.now += 1
+        self.assertAlmostEqual(self.tracker.delay('POST', '/channels/1/messages'), 1.5)
+        self.now += 2
+        self.assertEqual(self.tracker.delay('POST', '/channels/1/messages'), 0.0)
+
+        # Otra ruta u otro método no comparten estado
+        self.assertIsNone(self.tracker.delay('POST', '/channels/2/messages'))
+        self.assertIsNone(self.tracker.delay('PATCH', '/channels/1/messages'))
+
+    def test_headers_incompletos(self):
+        self.tracker.observe('POST', '/channels/1/messages', {'X-RateLimit-Remaining': '0'})
+        self.tracker.observe('POST', '/channels/1/messages',
+                             {'X-RateLimit-Remaining': 'x', 'X-RateLimit-Reset-After': '1'})
+        self.assertIsNone(self.tracker.delay('POST', '/channels/1/messages'))
+
+
+class TestBatches(unittest.TestCase):
+
+    def test_maximo_de_embeds_y_caracteres(self):
+        items = [(str(i), None, discord.Embed(description='x' * 100)) for i in range(25)]
+        self.assertEqual([len(b) for b in iter_batches(items)], [10, 10, 5])
+
+        items = [(str(i), None, discord.Embed(description='x' * 2500)) for i in range(5)]
+        self.assertEqual([len(b) for b in iter_batches(items)], [2, 2, 1])
+
+
+class TestWrappedBroadcast(unittest.TestCase):
+
+    def setUp(self):
+        self.stats = generate_stats(25, days=200, party_history=40, seed=8, end=datetime(2025, 6, 30))
+        self.user_ids = sorted(self.stats['users'])
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cursor_path = Path(self.tmp.name) / 'wrapped_broadcast.json'
+        self.tracker = RateLimitTracker()
+
+    def tearDown(self):
+        drain_io()
+        self.tmp.cleanup()
+
+    def _broadcast(self, channel, members=None, **kwargs):
+        members = members if members is not None else [FakeMember(uid) for uid in self.user_ids]
+        return WrappedBroadcast(FakeBot(members), channel, 2025, self.cursor_path, tracker=self.tracker,
+                                render=small_render, min_interval=0, **kwargs)
+
+    def _mentioned(self, channel):
+        return [part[2:-1] for content, _ in channel.messages[1:-1] for part in content[3:].split()]
+
+    def test_envio_en_lotes(self):
+        channel = FakeChannel()
+        cursor = asyncio.run(self._broadcast(channel).run(self.stats))
+
+        # Intro + 3 mensajes de hasta 10 embeds + resumen
+        self.assertEqual([len(embeds) for _, embeds in channel.messages], [1, 10, 10, 5, 1])
+        self.assertEqual(channel.messages[0][0], '@here')
+        self.assertEqual(self._mentioned(channel), self.user_ids)
+        self.assertEqual((cursor['sent'], cursor['skipped'], cursor['finished']), (25, 0, True))
+        drain_io()
+        self.assertTrue(load_cursor(self.cursor_path)['finished'])
+
+    def test_omitidos(self):
+        channel = FakeChannel()
+        members = [FakeMember(uid) for uid in self.user_ids[1:]]
+        self.stats['users']['sin-datos'] = {'username': 'X', 'games': {}}
+        members.append(FakeMember('1'))
+        self.stats['users']['1'] = {'username': 'Y', 'games': {}}
+        cursor = asyncio.run(self._broadcast(channel, members).run(self.stats))
+        self.assertEqual((cursor['sent'], cursor['skipped']), (24, 3))
+
+    def test_retoma_tras_reinicio(self):
+        # Se corta al enviar el tercer mensaje (intro y primer lote ya salieron)
+        crashed = FakeChannel(fail_on=3)
+        with self.assertRaises(RuntimeError):
+            asyncio.run(self._broadcast(crashed).run(self.stats))
+        drain_io()
+        self.assertEqual(load_cursor(self.cursor_path)['last_user_id'], self.user_ids[9])
+
+        resumed = FakeChannel()
+        cursor = asyncio.run(self._broadcast(resumed).run(self.stats))
+        self.assertNotEqual(resumed.messages[0][0], '@here')
+        sent_before = [part[2:-1] for content, _ in crashed.messages[1:] for part in content[3:].split()]
+        sent_after = [part[2:-1] for content, _ in resumed.messages[:-1] for part in content[3:].split()]
+        self.assertEqual(sent_before + sent_after, self.user_ids)
+        self.assertEqual((cursor['sent'], cursor['finished']), (25, True))
+
+        # Un envío terminado no se repite: arranca uno nuevo solo si cambia el año/canal
+        drain_io()
+        again = FakeChannel()
+        asyncio.run(self._broadcast(again).run(self.stats))
+        self.assertEqual(again.messages[0][0], '@here')
+
+    def test_lote_fallido_se_reintenta(self):
+        # El segundo lote falla con error HTTP: el cursor queda antes de ese lote
+        failed = FakeChannel(fail_on=3, http_error=True)
+        cursor = asyncio.run(self._broadcast(failed, max_retries=0).run(self.stats))
+        self.assertFalse(cursor['finished'])
+        self.assertEqual((cursor['sent'], cursor['skipped']), (10, 0))
+        drain_io()
+        self.assertEqual(load_cursor(self.cursor_path)['last_user_id'], self.user_ids[9])
+
+        resumed = FakeChannel()
+        cursor = asyncio.run(self._broadcast(resumed).run(self.stats))
+        sent_before = [part[2:-1] for content, _ in failed.messages[1:] for part in content[3:].split()]
+        sent_after = [part[2:-1] for content, _ in resumed.messages[:-1] for part in content[3:].split()]
+        self.assertEqual(sent_before + sent_after, self.user_ids)
+        self.assertEqual((cursor['sent'], cursor['finished']), (25, True))
+
+    def test_intro_fallida_se_reintenta(self):
+        failed = FakeChannel(fail_on=1, http_error=True)
+        cursor = asyncio.run(self._broadcast(failed, max_retries=0).run(self.stats))
+        self.assertEqual(failed.messages, [])
+        self.assertFalse(cursor['intro_sent'])
+        self.assertFalse(cursor['finished'])
+
+        drain_io()
+        resumed = FakeChannel()
+        cursor = asyncio.run(self._broadcast(resumed).run(self.stats))
+        self.assertEqual(resumed.messages[0][0], '@here')
+        self.assertEqual(self._mentioned(resumed), self.user_ids)
+        self.assertTrue(cursor['finished'])
+
+    def test_ritmo_por_headers(self):
+        path = f'/api/v10/channels/{FakeChannel.id}/messages'
+        self.tracker.observe('POST', path, {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset-After': '2.5'})
+        delays = []
+
+        async def fake_sleep(delay):
+            delays.append(delay)
+            # Después de esperar, los headers de la respuesta dan cupo
+            self.tracker.observe('POST', path, {'X-RateLimit-Remaining': '4', 'X-RateLimit-Reset-After': '5'})
+
+        with patch('core.wrapped_broadcast.asyncio.sleep', fake_sleep):
+            asyncio.run(self._broadcast(FakeChannel()).run(self.stats))
+        self.assertEqual(len(delays), 1)
+        self.assertAlmostEqual(delays[0], 2.5, places=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+"""
+Tests del motor del Wrapped (core/wrapped_engine.py)
+"""
+
+import asyncio
+import tempfile
+import unittest
+from copy import deepcopy
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import patch
+
+from benchmarks.dataset import generate_stats
+from core.sqlite_repository import SqliteStatsRepository
+from core.stats_model import StatsModel
+from core.wrapped_engine import (
+    WrappedEngine, compute_wrapped_sections, compute_wrapped_year, iter_wrapped_year,
+)
+
+
+class TestWrappedEngine(unittest.TestCase):
+    """Motor precalculado (una pasada para todos los usuarios)"""
+
+    def setUp(self):
+        self.stats = generate_stats(40, days=400, party_history=150, seed=21, end=datetime(2025, 6, 30))
+
+    def test_igual_al_calculo_por_usuario(self):
+        """Las secciones precalculadas coinciden con el cálculo individual"""
+        model = StatsModel(lambda: self.stats)
+        for year in (2024, 2025):
+            precomputed = compute_wrapped_year(self.stats, year)
+            with_model = compute_wrapped_year(self.stats, year, model=model)
+            for user_id in self.stats['users']:
+                with self.subTest(year=year, user=user_id):
+                    expected = compute_wrapped_sections(self.stats, user_id, year)
+                    self.assertEqual(precomputed.get(user_id), expected)
+                    self.assertEqual(with_model.get(user_id), expected)
+
+    def test_rankings_con_empates_igual_al_repositorio(self):
+        """Empates: mismo puesto que user_rankings() (1 + puntajes estrictamente mayores)"""
+        users = self.stats['users']
+        uids = list(users)
+        for uid in uids[:4]:
+            users[uid]['games'] = {'Tetris': {'count': 1, 'total_minutes': 500, 'daily_minutes': {}}}
+            users[uid]['messages'] = {'count': 0, 'characters': 0}
+            users[uid]['reactions'] = {'total': 0, 'by_emoji': {}}
+
+        with tempfile.TemporaryDirectory() as tmp:
+            repo = SqliteStatsRepository(Path(tmp) / 'stats.db')
+            try:
+                repo.save_snapshot(self.stats, include_days=True)
+                expected = {uid: repo.user_rankings(uid) for uid in uids}
+            finally:
+                repo.close()
+
+        precomputed = compute_wrapped_year(self.stats, 2025)
+        for uid in uids:
+            with self.subTest(user=uid):
+                self.assertEqual(precomputed.get(uid)['rankings'], expected[uid])
+                self.assertEqual(compute_wrapped_sections(self.stats, uid, 2025)['rankings'], expected[uid])
+        tied = {precomputed.get(uid)['rankings']['social'] for uid in uids[:4]}
+        self.assertEqual(len(tied), 1)
+
+    def test_usuarios_sin_datos(self):
+        self.stats['users']['vacio'] = {'username': 'Vacío', 'games': {}, 'voice': {'total_minutes': 0}}
+        precomputed = compute_wrapped_year(self.stats, 2025)
+        self.assertFalse(precomputed.has_data('vacio'))
+        self.assertFalse(precomputed.has_data('no-existe'))
+        self.assertTrue(precomputed.has_data(next(iter(self.stats['users']))))
+
+    def test_cache_por_anio_y_snapshot(self):
+        engine = WrappedEngine(max_years=2)
+        first = engine.get_year(self.stats, 2025)
+        self.assertIs(engine.get_year(self.stats, 2025), first)
+        self.assertIs(engine.cached(self.stats, 2025), first)
+
+        # Otro snapshot (hubo cambios): se recalcula
+        changed = deepcopy(self.stats)
+        self.assertIsNone(engine.cached(changed, 2025))
+        self.assertIsNot(engine.get_year(changed, 2025), first)
+
+        engine.get_year(changed, 2024)
+        engine.get_year(changed, 2023)
+        self.assertIsNone(engine.cached(changed, 2025))
+        self.assertIsNotNone(engine.cached(changed, 2023))
+
+
+class TestWrappedParalelo(unittest.TestCase):
+    """Cálculo repartido en un pool de procesos"""
+
+    def setUp(self):
+        self.stats = generate_stats(60, days=400, party_history=150, seed=4, end=datetime(2025, 6, 30))
+        self.expected = compute_wrapped_year(self.stats, 2025)
+
+    def test_stream_de_resultados(self):
+        async def collect():
+            return [row async for row in iter_wrapped_year(self.stats, 2025, workers=2, chunk_size=7)]
+
+        rows = asyncio.run(collect())
+        self.assertEqual(sorted(uid for uid, _, _ in rows), sorted(self.stats['users']))
+        for uid, sections, has_data in rows:
+            self.assertEqual(sections, self.expected.get(uid))
+            self.assertEqual(has_data, self.expected.has_data(uid))
+
+    def test_engine_con_pool(self):
+        engine = WrappedEngine(workers=2, parallel_min_users=10, chunk_size=16)
+        result = asyncio.run(engine.get_year_async(self.stats, 2025))
+        self.assertEqual(result.sections, self.expected.sections)
+        self.assertEqual(list(result.sections), list(self.stats['users']))
+        self.assertEqual(result.active, self.expected.active)
+        self.assertIs(engine.cached(self.stats, 2025), result)
+
+    def test_pocos_usuarios_sin_pool(self):
+        engine = WrappedEngine(workers=2, parallel_min_users=1000)
+        with patch('core.wrapped_engine.ProcessPoolExecutor') as pool:
+            result = asyncio.run(engine.get_year_async(self.stats, 2025))
+        pool.assert_not_called()
+        self.assertEqual(result.sections, self.expected.sections)
+
+    def test_fallback_si_el_pool_falla(self):
+        engine = WrappedEngine(workers=2, parallel_min_users=10)
+        with patch('core.wrapped_engine.ProcessPoolExecutor', side_effect=OSError('sin procesos')):
+            result = asyncio.run(engine.get_year_async(self.stats, 2025))
+        self.assertEqual(result.sections, self.expected.sections)
+
+
+if __name__ == '__main__':
+    unittest.main()
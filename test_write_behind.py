@@ -0,0 +1,201 @@
+"""
+Tests del write-behind de estadísticas (core/write_behind.py + persistence)
+"""
+
+import asyncio
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import core.persistence as persistence
+from core.stats_journal import StatsJournal
+from core.stats_repository import JsonStatsRepository
+from core.write_behind import WriteBehindFlusher
+
+
+class TestWriteBehindFlusher(unittest.IsolatedAsyncioTestCase):
+    """Tests del flusher en background"""
+
+    async def test_flush_por_umbral(self):
+        """Al alcanzar max_pending escribe sin esperar el intervalo"""
+        calls = []
+        flusher = WriteBehindFlusher(lambda: calls.append(1) or True, interval_seconds=60, max_pending=3)
+        flusher.start()
+
+        flusher.notify(1)
+        flusher.notify(2)
+        await asyncio.sleep(0.05)
+        self.assertEqual(len(calls), 0)
+
+        flusher.notify(3)
+        await asyncio.sleep(0.05)
+        self.assertEqual(len(calls), 1)
+
+        await flusher.stop()
+
+    async def test_flush_por_intervalo(self):
+        """Sin llegar al umbral, escribe al cumplirse el intervalo"""
+        calls = []
+        flusher = WriteBehindFlusher(lambda: calls.append(1) or True, interval_seconds=0.1, max_pending=1000)
+        flusher.start()
+        await asyncio.sleep(0.25)
+        await flusher.stop()
+        self.assertGreaterEqual(len(calls), 2)
+
+    async def test_stop_hace_flush_final(self):
+        """stop() siempre fuerza un último flush"""
+        calls = []
+        flusher = WriteBehindFlusher(lambda: calls.append(1) or True, interval_seconds=60, max_pending=1000)
+        flusher.start()
+        await flusher.stop()
+        self.assertEqual(len(calls), 1)
+        self.assertFalse(flusher.is_running())
+
+    async def test_flush_asincrono(self):
+        """flush_fn puede ser una corutina"""
+        calls = []
+
+        async def flush():
+            await asyncio.sleep(0)
+            calls.append(1)
+            return True
+
+        flusher = WriteBehindFlusher(flush, interval_seconds=60, max_pending=1)
+        flusher.start()
+        flusher.notify(1)
+        await asyncio.sleep(0.05)
+        await flusher.stop()
+        self.assertEqual(len(calls), 2)
+
+    async def test_error_en_flush_no_mata_la_task(self):
+        """Un error escribiendo no detiene el flusher"""
+        def failing_flush():
+            raise OSError('disco lleno')
+
+        flusher = WriteBehindFlusher(failing_flush, interval_seconds=0.05, max_pending=1000)
+        flusher.start()
+        await asyncio.sleep(0.15)
+        self.assertTrue(flusher.is_running())
+        await flusher.stop()
+
+
+class TestSaveStatsWriteBehind(unittest.IsolatedAsyncioTestCase):
+    """Tests de save_stats / flush_now con y sin flusher activo"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.stats_file = Path(self.tmpdir.name) / 'stats.json'
+        self.patches = [
+            patch.object(persistence, '_repository', JsonStatsRepository(self.stats_file)),
+            patch.object(persistence, '_pending_changes', 0),
+            patch.object(persistence, '_flusher', None),
+            patch.object(persistence, '_journal', None),
+            patch.object(persistence, '_compactor', None),
+            patch.dict(persistence.config, {'persistence': {'journal_enabled': False}}),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in reversed(self.patches):
+            p.stop()
+        self.tmpdir.cleanup()
+
+    async def test_sin_flusher_escribe_inmediatamente(self):
+        """Sin flusher (scripts/tests) save_stats mantiene el comportamiento síncrono"""
+        persistence.save_stats()
+        self.assertTrue(self.stats_file.exists())
+        self.assertFalse(persistence.has_pending_changes())
+
+    async def test_con_flusher_agrupa_escrituras(self):
+        """Con flusher activo los cambios quedan pendientes hasta el flush"""
+        persistence.start_write_behind()
+        try:
+            persistence.stats.setdefault('users', {})
+            persistence.save_stats()
+            persistence.save_stats()
+            self.assertFalse(self.stats_file.exists())
+            self.assertTrue(persistence.has_pending_changes())
+
+            self.assertTrue(persistence.flush_now())
+            self.assertFalse(persistence.has_pending_changes())
+            self.assertFalse(persistence.flush_now())
+
+            with open(self.stats_file, 'r', encoding='utf-8') as f:
+                self.assertIn('users', json.load(f))
+        finally:
+            await persistence.stop_write_behind()
+
+    async def test_stop_escribe_pendientes(self):
+        """El shutdown escribe los cambios pendientes"""
+        persistence.start_write_behind()
+        persistence.save_stats()
+        self.assertFalse(self.stats_file.exists())
+
+        await persistence.stop_write_behind()
+        self.assertTrue(self.stats_file.exists())
+        self.assertFalse(persistence.has_pending_changes())
+
+
+
+class TestEscrituraFueraDelLoop(unittest.IsolatedAsyncioTestCase):
+    """El snapshot se serializa en el thread de I/O sin perder eventos del journal"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        tmp = Path(self.tmpdir.name)
+        self.stats_file = tmp / 'stats.json'
+        self.journal = StatsJournal(tmp / 'stats.journal')
+        self.patches = [
+            patch.object(persistence, '_repository', JsonStatsRepository(self.stats_file)),
+            patch.object(persistence, 'stats', {'users': {}, 'cooldowns': {}}),
+            patch.object(persistence, '_journal', self.journal),
+            patch.object(persistence, '_journal_seq', 0),
+            patch.object(persistence, '_pending_changes', 0),
+            patch.object(persistence, '_flusher', None),
+            patch.object(persistence, '_compactor', None),
+        ]
+        for p in self.patches:
+            p.start()
+        self.journal.open()
+
+    def tearDown(self):
+        self.journal.close()
+        for p in reversed(self.patches):
+            p.stop()
+        self.tmpdir.cleanup()
+
+    def _message(self):
+        persistence.record_mutation('message', user_id='1', username='A', message_length=3)
+
+    async def test_eventos_durante_la_escritura_quedan_en_el_journal(self):
+        self._message()
+        self._message()
+        write = asyncio.ensure_future(persistence._write_snapshot_async())
+        await asyncio.sleep(0)
+        # Llega mientras el thread de I/O escribe: no está en el snapshot
+        self._message()
+        await write
+
+        with open(self.stats_file, 'r', encoding='utf-8') as f:
+            written = json.load(f)
+        self.assertEqual(written['_journal_seq'], 2)
+        self.assertEqual(written['users']['1']['messages']['count'], 2)
+        self.assertEqual([r['seq'] for r in self.journal.iter_records()], [3])
+        self.assertEqual(persistence.stats['users']['1']['messages']['count'], 3)
+
+    async def test_escritura_vieja_no_pisa_una_nueva(self):
+        self._message()
+        old = persistence._capture_snapshot(consistent=True)
+        self._message()
+        persistence.flush_now()
+
+        self.assertFalse(persistence._write_stats_file(old[0], old[1]))
+        with open(self.stats_file, 'r', encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['_journal_seq'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()